@@ -0,0 +1,109 @@
+# bench/datagen.py
+import random
+
+# Generadores de claves sintéticas. Todo sale de un random.Random con
+# semilla fija: la misma semilla produce exactamente los mismos datos.
+
+DISTRIBUTIONS = ("uniform", "skewed", "sorted")
+
+# Exponente de la Zipf para "skewed": pocas claves muy repetidas
+ZIPF_S = 1.2
+# Lado del área donde caen los puntos del R-tree
+SPACE = 1000.0
+
+
+def int_keys(n, distribution, seed=0):
+    """
+    n claves enteras.
+    uniform: valores al azar en [0, 10n) (con algunas repetidas)
+    skewed:  Zipf sobre n valores distintos (la clave 0 es la más frecuente)
+    sorted:  0, 1, ..., n-1 en orden (peor caso para árboles sin balanceo)
+    """
+    rng = random.Random(seed)
+    if distribution == "uniform":
+        return [rng.randrange(10 * n) for _ in range(n)]
+    if distribution == "skewed":
+        return _zipf(rng, n, n)
+    if distribution == "sorted":
+        return list(range(n))
+    raise ValueError(f"Distribución desconocida: {distribution}")
+
+
+def point_keys(n, distribution, seed=0):
+    """
+    n puntos (x, y) para el R-tree.
+    uniform: puntos al azar en el cuadrado [0, SPACE]^2
+    skewed:  nubes gaussianas alrededor de unos pocos centros
+    sorted:  puntos sobre la diagonal, en orden de x
+    """
+    rng = random.Random(seed)
+    if distribution == "uniform":
+        return [(rng.uniform(0, SPACE), rng.uniform(0, SPACE)) for _ in range(n)]
+    if distribution == "skewed":
+        centers = [(rng.uniform(0, SPACE), rng.uniform(0, SPACE)) for _ in range(8)]
+        weights = [1 / (i + 1) ** ZIPF_S for i in range(len(centers))]
+        points = []
+        for cx, cy in rng.choices(centers, weights=weights, k=n):
+            points.append((_clamp(rng.gauss(cx, SPACE / 50)), _clamp(rng.gauss(cy, SPACE / 50))))
+        return points
+    if distribution == "sorted":
+        step = SPACE / max(1, n)
+        return [(i * step, i * step) for i in range(n)]
+    raise ValueError(f"Distribución desconocida: {distribution}")
+
+
+def sample_queries(keys, count, seed=0, missing=0.1):
+    """
+    Claves para búsquedas puntuales: la mayoría existen y una fracción
+    (missing) no está en el índice.
+    """
+    rng = random.Random(seed + 1)
+    if not keys:
+        return []
+    queries = []
+    for _ in range(count):
+        if rng.random() < missing:
+            key = rng.choice(keys)
+            # Desplazar fuera de los datos: enteros negativos o puntos fuera del área
+            queries.append(-1 - key if isinstance(key, int) else (key[0] + 2 * SPACE, key[1]))
+        else:
+            queries.append(rng.choice(keys))
+    return queries
+
+
+def sample_ranges(keys, count, fraction, seed=0):
+    """
+    Rangos [bajo, alto] que cubren aproximadamente `fraction` del dominio.
+    Para puntos devuelve rectángulos ((x1, y1), (x2, y2)) con esa fracción del área.
+    """
+    rng = random.Random(seed + 2)
+    if not keys:
+        return []
+    if isinstance(keys[0], tuple):
+        side = SPACE * fraction ** 0.5
+        ranges = []
+        for _ in range(count):
+            x, y = rng.uniform(0, SPACE - side), rng.uniform(0, SPACE - side)
+            ranges.append(((x, y), (x + side, y + side)))
+        return ranges
+    low, high = min(keys), max(keys)
+    width = max(1, int((high - low) * fraction))
+    ranges = []
+    for _ in range(count):
+        start = rng.randint(low, max(low, high - width))
+        ranges.append((start, start + width))
+    return ranges
+
+
+def _zipf(rng, n, distinct):
+    # Muestreo por la inversa de la acumulada (bisección sobre los pesos)
+    from bisect import bisect_left
+    from itertools import accumulate
+
+    cumulative = list(accumulate(1 / (k + 1) ** ZIPF_S for k in range(distinct)))
+    total = cumulative[-1]
+    return [bisect_left(cumulative, rng.random() * total) for _ in range(n)]
+
+
+def _clamp(value):
+    return min(SPACE, max(0.0, value))
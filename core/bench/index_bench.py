@@ -0,0 +1,318 @@
+# bench/index_bench.py
+"""
+Benchmark reproducible de las organizaciones de archivo del motor:
+sequential, ISAM, hash extensible, B+ tree, LSM y R-tree.
+
+Para cada índice, distribución y tamaño mide inserción, búsqueda puntual,
+búsqueda por rango y borrado: throughput, percentiles de latencia y
+accesos a páginas (contadores de io_counters()). Los resultados se
+escriben en JSON (y opcionalmente CSV) para comparar entre versiones.
+
+Uso (desde core/):
+    python -m bench.index_bench
+    python -m bench.index_bench --sizes 1000 100000 --indexes btree hash --out results.json
+    python -m bench.index_bench --baseline results_anterior.json --fail-on-regression
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from src.dbms.sequential import SequentialIndex
+from src.dbms.isam import ISAMIndex
+from src.dbms.extendible_hash import ExtendibleHash
+from src.dbms.bplustree import BPlusTree
+from src.dbms.rtree import RTree
+from src.dbms.lsm import LSMIndex
+from src.dbms.wal import WriteAheadLog
+from bench.datagen import DISTRIBUTIONS, int_keys, point_keys, sample_queries, sample_ranges
+
+# índice -> (clase, tipo de la clave)
+INDEXES = {
+    "sequential": (SequentialIndex, "INT"),
+    "isam": (ISAMIndex, "INT"),
+    "hash": (ExtendibleHash, "INT"),
+    "btree": (BPlusTree, "INT"),
+    "lsm": (LSMIndex, "INT"),
+    "rtree": (RTree, "ARRAY[FLOAT]"),
+}
+
+# Tamaño de registro simulado: los offsets son i * RECORD_SIZE
+RECORD_SIZE = 64
+# Las inserciones se vuelcan por lotes, como hace COPY
+FLUSH_EVERY = 1000
+# Entradas que se verifican después de cargar
+VERIFY_SAMPLE = 100
+
+
+# ---------------------------
+# Medición
+# ---------------------------
+def percentiles(samples):
+    """
+    Latencias en microsegundos: media, p50, p95, p99 y máximo.
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(q):
+        return round(ordered[min(last, int(q * len(ordered)))] * 1e6, 2)
+
+    return {
+        "mean": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def measure(op, index, items, fn, flush_every=None):
+    """
+    Ejecuta fn(item) para cada item y devuelve las métricas de la operación.
+    Con flush_every, el volcado del lote se carga a la operación que lo dispara.
+    """
+    latencies = []
+    before = index.io_counters()
+    start = time.perf_counter()
+    for i, item in enumerate(items):
+        t = time.perf_counter()
+        fn(item)
+        if flush_every and (i + 1) % flush_every == 0:
+            index.flush()
+        latencies.append(time.perf_counter() - t)
+    if flush_every:
+        t = time.perf_counter()
+        index.flush()
+        if latencies:
+            latencies[-1] += time.perf_counter() - t
+    elapsed = time.perf_counter() - start
+    after = index.io_counters()
+
+    count = max(1, len(latencies))
+    io = {k: after[k] - before.get(k, 0) for k in after}
+    return {
+        "op": op,
+        "count": len(latencies),
+        "seconds": round(elapsed, 6),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "latency_us": percentiles(latencies),
+        "pages_read_per_op": round(io.get("pages_read", 0) / count, 3),
+        "buffer_hits_per_op": round(io.get("buffer_hits", 0) / count, 3),
+        "node_visits_per_op": round(io.get("node_visits", 0) / count, 3),
+        "bloom_skips_per_op": round(io.get("bloom_skips", 0) / count, 3),
+    }
+
+
+def disk_size(workdir, base):
+    prefix = os.path.basename(base)
+    return sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir) if f.startswith(prefix))
+
+
+# ---------------------------
+# Un caso: índice x distribución x tamaño
+# ---------------------------
+def run_case(name, distribution, n, queries, range_fraction, seed, use_wal, workdir):
+    cls, key_type = INDEXES[name]
+    keys = point_keys(n, distribution, seed) if key_type.startswith("ARRAY") else int_keys(n, distribution, seed)
+    base = os.path.join(workdir, f"{name}_{distribution}_{n}")
+    wal = WriteAheadLog(os.path.join(workdir, f"{name}_{distribution}_{n}.wal"), base_dir=workdir) if use_wal else None
+
+    results = []
+    index = cls(base, key_type, wal=wal)
+    results.append(measure("insert", index, list(enumerate(keys)),
+                           lambda item: index.add(item[1], item[0] * RECORD_SIZE),
+                           flush_every=FLUSH_EVERY))
+    if wal is not None:
+        wal.checkpoint()
+    size = disk_size(workdir, base)
+
+    # Cada búsqueda se mide sobre el índice recién reabierto (caché de páginas
+    # vacío); verificar antes lo calentaría y pages_read_per_op daría 0
+    index = cls(base, key_type, wal=wal)
+    results.append(measure("point_search", index, sample_queries(keys, queries, seed), index.search))
+    if name == "hash":
+        results.append({"op": "range_search", "unsupported": True})
+    else:
+        index = cls(base, key_type, wal=wal)
+        ranges = sample_ranges(keys, queries, range_fraction, seed)
+        results.append(measure("range_search", index, ranges, lambda r: index.range_search(r[0], r[1])))
+
+    rng = random.Random(seed + 3)
+    check = rng.sample(range(n), min(VERIFY_SAMPLE, n))
+    errors = sum(1 for i in check if i * RECORD_SIZE not in index.search(keys[i]))
+
+    victims = rng.sample(range(n), min(queries, n))
+    results.append(measure("delete", index, victims,
+                           lambda i: index.remove(keys[i], i * RECORD_SIZE),
+                           flush_every=FLUSH_EVERY))
+    errors += sum(1 for i in victims[:VERIFY_SAMPLE] if i * RECORD_SIZE in index.search(keys[i]))
+    if wal is not None:
+        wal.close()
+
+    return {
+        "index": name,
+        "distribution": distribution,
+        "n": n,
+        "disk_bytes": size,
+        "height": index.height(),
+        "verify_errors": errors,
+        "operations": results,
+    }
+
+
+# ---------------------------
+# Reporte
+# ---------------------------
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            "indexes": args.indexes,
+            "distributions": args.distributions,
+            "sizes": args.sizes,
+            "queries": args.queries,
+            "range_fraction": args.range_fraction,
+            "seed": args.seed,
+            "wal": args.wal,
+        },
+    }
+
+
+def print_summary(cases):
+    header = f"{'index':<11}{'dist':<9}{'n':>9}  {'op':<13}{'ops/s':>12}{'p50 us':>10}{'p99 us':>10}{'pages/op':>10}"
+    print(header)
+    print("-" * len(header))
+    for case in cases:
+        for r in case["operations"]:
+            if r.get("unsupported"):
+                print(f"{case['index']:<11}{case['distribution']:<9}{case['n']:>9}  {r['op']:<13}{'n/a':>12}")
+                continue
+            print(f"{case['index']:<11}{case['distribution']:<9}{case['n']:>9}  {r['op']:<13}"
+                  f"{r['throughput'] or 0:>12.1f}{r['latency_us'].get('p50', 0):>10.1f}"
+                  f"{r['latency_us'].get('p99', 0):>10.1f}{r['pages_read_per_op']:>10.2f}")
+        if case["verify_errors"]:
+            print(f"  !! {case['verify_errors']} verificaciones fallidas en {case['index']}/{case['distribution']}")
+
+
+def write_csv(path, cases):
+    fields = ["index", "distribution", "n", "op", "count", "seconds", "throughput",
+              "p50_us", "p95_us", "p99_us", "max_us", "pages_read_per_op", "node_visits_per_op"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for case in cases:
+            for r in case["operations"]:
+                if r.get("unsupported"):
+                    continue
+                lat = r["latency_us"]
+                writer.writerow({
+                    "index": case["index"], "distribution": case["distribution"], "n": case["n"],
+                    "op": r["op"], "count": r["count"], "seconds": r["seconds"], "throughput": r["throughput"],
+                    "p50_us": lat.get("p50"), "p95_us": lat.get("p95"), "p99_us": lat.get("p99"),
+                    "max_us": lat.get("max"), "pages_read_per_op": r["pages_read_per_op"],
+                    "node_visits_per_op": r["node_visits_per_op"],
+                })
+
+
+def compare(baseline_path, cases, threshold):
+    """
+    Compara el throughput con una corrida anterior y devuelve las regresiones
+    mayores al umbral (fracción, ej. 0.10 = 10% más lento).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {}
+    for case in baseline.get("results", []):
+        for r in case["operations"]:
+            if r.get("throughput"):
+                previous[(case["index"], case["distribution"], case["n"], r["op"])] = r["throughput"]
+
+    regressions = []
+    for case in cases:
+        for r in case["operations"]:
+            key = (case["index"], case["distribution"], case["n"], r["op"])
+            if key in previous and r.get("throughput"):
+                change = r["throughput"] / previous[key] - 1
+                if change < -threshold:
+                    regressions.append({"case": "/".join(map(str, key)), "before": previous[key],
+                                        "after": r["throughput"], "change": round(change, 4)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los índices del motor")
+    parser.add_argument("--indexes", nargs="+", default=list(INDEXES), choices=list(INDEXES))
+    parser.add_argument("--distributions", nargs="+", default=list(DISTRIBUTIONS), choices=list(DISTRIBUTIONS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="cantidades de filas (se aceptan de 10^3 a 10^7)")
+    parser.add_argument("--queries", type=int, default=1000, help="búsquedas/borrados por caso")
+    parser.add_argument("--range-fraction", type=float, default=0.001, help="fracción del dominio por rango")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--wal", action="store_true", help="medir con write-ahead log (fsync por commit)")
+    parser.add_argument("--workdir", default=None, help="directorio para los archivos (por defecto uno temporal)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--csv", default=None, help="además, volcar una fila por operación en CSV")
+    parser.add_argument("--baseline", default=None, help="resultados anteriores para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_")
+    os.makedirs(workdir, exist_ok=True)
+    cases = []
+    try:
+        for n in args.sizes:
+            for distribution in args.distributions:
+                for name in args.indexes:
+                    case_dir = os.path.join(workdir, f"{name}_{distribution}_{n}")
+                    os.makedirs(case_dir, exist_ok=True)
+                    print(f"[bench] {name} / {distribution} / {n}", file=sys.stderr)
+                    cases.append(run_case(name, distribution, n, args.queries, args.range_fraction,
+                                          args.seed, args.wal, case_dir))
+                    shutil.rmtree(case_dir, ignore_errors=True)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"meta": metadata(args), "results": cases}
+    if args.baseline:
+        report["regressions"] = compare(args.baseline, cases, args.threshold)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.csv:
+        write_csv(args.csv, cases)
+
+    print_summary(cases)
+    print(f"\nResultados en {args.out}")
+    if report.get("regressions"):
+        print(f"{len(report['regressions'])} regresiones mayores a {args.threshold:.0%}:")
+        for reg in report["regressions"]:
+            print(f"  {reg['case']}: {reg['before']} -> {reg['after']} ops/s ({reg['change']:+.1%})")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
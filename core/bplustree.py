@@ -4,7 +4,9 @@
 
 import struct
 import os
-import os
+import logging
+
+logger = logging.getLogger(__name__)
 BLOCK_FACTOR = 2
 
 
@@ -207,17 +209,17 @@ class DataFile:
             return IndexPage.unpack(data)
     #guardar archivo indice con los nuevos datos
     def save_index(self, index_page: IndexPage):
-        print("agregando indice a archivo index")
+        logger.debug("agregando indice a archivo index")
         with open(self.index_filename, 'wb') as f:
             f.write(index_page.pack())
     #busqueda binaria en el archivo indice  a traves de la key : ID
 
 
     def binary_search_index(self, index_page: IndexPage, key: int):
-        print("///////////////BUSQUEDA BINARIA  : /////////////////")
+        logger.debug("///////////////BUSQUEDA BINARIA : /////////////////")
         tam_index = index_page.size
         if tam_index == 0:
-            print("/////////////// FIN BUSQUEDA BINARIA  : /////////////////")
+            logger.debug("/////////////// FIN BUSQUEDA BINARIA : /////////////////")
             return -1
 
         lista = index_page.keys
@@ -229,7 +231,7 @@ class DataFile:
             mid = (low + high) // 2
             if lista[mid] == key:
                 floor_index = mid
-                print("/////////////// FIN BUSQUEDA BINARIA  : /////////////////")
+                logger.debug("/////////////// FIN BUSQUEDA BINARIA : /////////////////")
                 break
             elif lista[mid] < key:
                 floor_index = mid
@@ -239,10 +241,10 @@ class DataFile:
 
         # Si no hay ningún key <= key, usamos pages[0] (puntero "antes" del primer key)
         if floor_index == -1:
-            print("/////////////// FIN BUSQUEDA BINARIA  : /////////////////")
+            logger.debug("/////////////// FIN BUSQUEDA BINARIA : /////////////////")
             return index_page.pages[0]
         # pages[ floor_index + 1 ] es el pointer correspondiente a keys[floor_index]
-        print("/////////////// FIN BUSQUEDA BINARIA  : /////////////////")
+        logger.debug("/////////////// FIN BUSQUEDA BINARIA : /////////////////")
         return index_page.pages[floor_index + 1]
     # no encontrado
 
@@ -272,16 +274,16 @@ class DataFile:
             return (f.tell() // Page.SIZE_OF_PAGE) - 1
 
     def chain(self, page_number: int, next_page: int):
-        print("INICIO CHAIN")
+        logger.debug("INICIO CHAIN")
         # inicialmente
 
         page = self.read_page(page_number) # clase Page
         if page.next_page == -1:
             page.next_page = next_page
             self.write_page(page_number, page)
-            print("page actual numero:", page_number)
-            print("capacidad :  ", len(page.records))
-            print("FIN CHAIN")
+            logger.debug("page actual numero: %s", page_number)
+            logger.debug("capacidad : %s", len(page.records))
+            logger.debug("FIN CHAIN")
             return
 
         # recursivo
@@ -300,34 +302,34 @@ class DataFile:
         self.write_page(page_actual_number, page_actual)
 
 
-        print("FIN CHAIN")
+        logger.debug("FIN CHAIN")
 
 
 
 
 
     def insert(self, record: Record):
-        print("-------------INICIO INSERCION--------------")
+        logger.debug("-------------INICIO INSERCION--------------")
         index_page = self.load_index() # abre archivo indice y traemos  O(1)
         page_number = self.binary_search_index(index_page, record.id) #RAM
-        print("insercion deberia ser en el page numero", page_number)
+        logger.debug("insercion deberia ser en el page numero %s", page_number)
         if page_number == -1:
-            print("Insercion falla, numero de pagina = ", page_number)
+            logger.debug("Insercion falla, numero de pagina = %s", page_number)
             return False
         page = self.read_page(page_number) #Leemos pagina especifica de datos O(1)
         if len(page.records) < BLOCK_FACTOR:
-            print("Insercion facil, insertamos en page encontrado ( hay espacio)")
+            logger.debug("Insercion facil, insertamos en page encontrado ( hay espacio)")
             #agregamos en el page y guardamos
             page.records.append(record)
             page.records.sort(key=lambda record: record.id)
             self.write_page(page_number, page)
-            print("insercion correcta en page numero, ", page_number)
-            print("capacidad actual : ", len(page.records))
-            print("-------------Fin INSERCION---------------")
+            logger.debug("insercion correcta en page numero, %s", page_number)
+            logger.debug("capacidad actual : %s", len(page.records))
+            logger.debug("-------------Fin INSERCION---------------")
 
 
         elif len(page.records)== BLOCK_FACTOR and index_page.size < IndexPage.m:
-            print("Insercion intermedia, aun hay espacio en index, se divide el page en dos")
+            logger.debug("Insercion intermedia, aun hay espacio en index, se divide el page en dos")
             # si el tamaño del page que se debe agregar ya esta lleno y aun hay espacio en en el indexpage
             record_ext = page.records
             record_ext.append(record)
@@ -355,26 +357,25 @@ class DataFile:
                 indexPage.insert(list_right[0].id, new_page_numer)
                 self.save_index(indexPage)
                 # insertamos una nueva key y un numero de pagina a la lista de keys y de pages
-            print("se spliteo \n page_a", page_number, "capacidad: ", size1,"\n"
-                "page b", new_page_numer, "capacidad: ", size2,"\n")
-            print("-------------Fin INSERCION---------------")
+            logger.debug("se spliteo page_a %s capacidad: %s page b %s capacidad: %s", page_number, size1, new_page_numer, size2)
+            logger.debug("-------------Fin INSERCION---------------")
 
         # ya no tenemos espacio en el index
         #encadenamos
         # verificar si hay espacio en el next, sino no es necesario crear otra pagina
         else:
-            print("Insercion dificil, se alcanzo el limite de indices")
+            logger.debug("Insercion dificil, se alcanzo el limite de indices")
             if page.next_page == -1:
 
                 #el bucle termino porque aun no hay creada una pagina y todos los next estan llens
                 page_new_chain = Page([record])
                 page_new_number = self.append_page(page_new_chain)
-                print("encadenando page numero : ", page_number, " con page numero: ", page_new_number )
+                logger.debug("encadenando page numero : %s con page numero: %s", page_number, page_new_number)
                 # encadenamiento
                 self.chain(page_number, page_new_number)
-                print("se inserto correctamente en page :", page_new_number)
-                print("capacidad actual del next: ", len(page_new_chain.records))
-                print("-------------Fin INSERCION---------------")
+                logger.debug("se inserto correctamente en page : %s", page_new_number)
+                logger.debug("capacidad actual del next: %s", len(page_new_chain.records))
+                logger.debug("-------------Fin INSERCION---------------")
                 return True
             prev_number = page_number
             curr_number = page.next_page
@@ -388,22 +389,22 @@ class DataFile:
 
             # caso 1: encontramos página con espacio
             if len(currPage.records) < BLOCK_FACTOR:
-                print("numero de next page encontrado : ", curr_number)
-                print("capacidad del nextpage encontrado: ", len(currPage.records))
+                logger.debug("numero de next page encontrado : %s", curr_number)
+                logger.debug("capacidad del nextpage encontrado: %s", len(currPage.records))
                 currPage.records.append(record)
                 currPage.records.sort(key=lambda record: record.id)
                 self.write_page(curr_number, currPage)
-                print("se inserto correctamente en page :", curr_number)
-                print("capacidad actual del next: ", len(currPage.records))
-                print("-------------Fin INSERCION---------------")
+                logger.debug("se inserto correctamente en page : %s", curr_number)
+                logger.debug("capacidad actual del next: %s", len(currPage.records))
+                logger.debug("-------------Fin INSERCION---------------")
             else:
                 # caso 2: última página llena y sin next → creamos nueva
                 page_new_chain = Page([record])
                 page_new_number = self.append_page(page_new_chain)
                 self.chain(curr_number, page_new_number)
-                print("se inserto correctamente en nueva page :", page_new_number)
-                print("capacidad actual del next: ", len(page_new_chain.records))
-                print("-------------Fin INSERCION---------------")
+                logger.debug("se inserto correctamente en nueva page : %s", page_new_number)
+                logger.debug("capacidad actual del next: %s", len(page_new_chain.records))
+                logger.debug("-------------Fin INSERCION---------------")
 
     def search(self, key: int):
         indexPage = self.load_index()
@@ -413,7 +414,7 @@ class DataFile:
 
         # 2. Recorremos la página principal y, si no está, seguimos por el chain
         while page_number != -1:
-            print(f"Buscando en página {page_number}")
+            logger.debug("Buscando en página %s", page_number)
             page = self.read_page(page_number)
 
             # 3. Búsqueda lineal dentro de la página
@@ -428,7 +429,7 @@ class DataFile:
         return None
 
     def remove(self, key: int):
-        print("\n------ INICIO REMOVE ------")
+        logger.debug("------ INICIO REMOVE ------")
 
         index_page = self.load_index()
         page_number = self.binary_search_index(index_page, key)
@@ -454,14 +455,14 @@ class DataFile:
                          prev_page = self.read_page(prev_number)
                          prev_page.next_page = page.next_page
                          self.write_page(prev_number, prev_page)
-                         print(f"Se actualizó página {prev_number} para apuntar a {page.next_page}")
-                print("------ FIN REMOVE ------")
+                         logger.debug("Se actualizó página %s para apuntar a %s", prev_number, page.next_page)
+                logger.debug("------ FIN REMOVE ------")
                 return True
 
             prev_number = current_number
             current_number = page.next_page
-        print(f"Registro {key} no encontrado en ninguna página de la cadena")
-        print("------ FIN REMOVE ------")
+        logger.debug("Registro %s no encontrado en ninguna página de la cadena", key)
+        logger.debug("------ FIN REMOVE ------")
         return False
 
     def scanAll(self):
@@ -503,33 +504,35 @@ class DataFile:
 
 
 
-db = DataFile("data.dat", "index.dat")
-print("Tamaño de record:", Record.SIZE_OF_RECORD)
-print("Block factor:", BLOCK_FACTOR)
-print("Header size:", Page.HEADER_SIZE)
-print("Tamaño de página:", Page.SIZE_OF_PAGE)
-db.load("sales_dataset_unsorted (1).csv")
-print("////////////////// ESCANEO ///////////////")
-db.scanAll()
-print("////////////////// FIN ESCANEO ///////////////")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    db = DataFile("data.dat", "index.dat")
+    print("Tamaño de record:", Record.SIZE_OF_RECORD)
+    print("Block factor:", BLOCK_FACTOR)
+    print("Header size:", Page.HEADER_SIZE)
+    print("Tamaño de página:", Page.SIZE_OF_PAGE)
+    db.load("sales_dataset_unsorted (1).csv")
+    print("////////////////// ESCANEO ///////////////")
+    db.scanAll()
+    print("////////////////// FIN ESCANEO ///////////////")
 
-print("////////////////// CHAIN  ///////////////")
-result = db.read_page(3)
-print(result.next_page)
+    print("////////////////// CHAIN  ///////////////")
+    result = db.read_page(3)
+    print(result.next_page)
 
-#comprobacion de chain
-print("//////////////////  FIN CHAIN  ///////////////")
+    #comprobacion de chain
+    print("//////////////////  FIN CHAIN  ///////////////")
 
-print("////////////////// BUSQUEDA   ///////////////")
-result = db.search(614)
-if result:
-    print(result.id, result.producto, result.cantidad, result.precio, result.fecha)
-else:
-    print("no encontrado")
-print("////////////////// FIN BUSQUEDA   ///////////////")
-print("///////////////// ELIMINACION   ///////////////")
-isRemoved = db.remove(681)
-print("confirmacion de eliminacion, " , isRemoved)
-db.scanAll()
-db.insert(Record(405, "Tablet", 5, 750.0, "10/08/2024"))
-db.scanAll()
+    print("////////////////// BUSQUEDA   ///////////////")
+    result = db.search(614)
+    if result:
+        print(result.id, result.producto, result.cantidad, result.precio, result.fecha)
+    else:
+        print("no encontrado")
+    print("////////////////// FIN BUSQUEDA   ///////////////")
+    print("///////////////// ELIMINACION   ///////////////")
+    isRemoved = db.remove(681)
+    print("confirmacion de eliminacion, " , isRemoved)
+    db.scanAll()
+    db.insert(Record(405, "Tablet", 5, 750.0, "10/08/2024"))
+    db.scanAll()
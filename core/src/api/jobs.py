@@ -0,0 +1,259 @@
+# api/jobs.py
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.dbms.bulk_loader import LoadCancelled
+
+logger = logging.getLogger(__name__)
+
+# Cargas que corren a la vez en este proceso (cada una ya parsea con varios procesos)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+# Trabajos en cola o corriendo; más allá se rechazan para no acumular cargas sin límite
+MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 8))
+# Trabajos terminados que se recuerdan (los más viejos se olvidan)
+KEEP_FINISHED = 100
+# Cada cuánto se publica el avance en disco, como mínimo
+PUBLISH_INTERVAL = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class Job:
+    """
+    Una carga en segundo plano: estado, avance y resultado.
+    total_bytes: tamaño del archivo; el avance y la ETA se calculan por bytes leídos
+    """
+
+    def __init__(self, kind, table, file_name, total_bytes):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.table = table
+        self.file_name = file_name
+        self.total_bytes = total_bytes
+        self.status = QUEUED
+        self.rows = 0
+        self.bytes_done = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.errors = []
+        self.result = None
+        self.cancel_requested = threading.Event()
+
+    def update(self, rows, bytes_done):
+        self.rows = rows
+        self.bytes_done = bytes_done
+
+    def to_dict(self):
+        now = time.time()
+        elapsed = ((self.finished or now) - self.started) if self.started else 0.0
+        throughput = self.rows / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.status == RUNNING and self.bytes_done:
+            # Lo que falta, al ritmo que se viene leyendo el archivo
+            eta = elapsed * (self.total_bytes - self.bytes_done) / self.bytes_done
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "tableName": self.table,
+            "fileName": self.file_name,
+            "status": self.status,
+            "createdAt": self.created,
+            "rowsProcessed": self.rows,
+            "bytesProcessed": self.bytes_done,
+            "totalBytes": self.total_bytes,
+            "progress": round(self.bytes_done / self.total_bytes, 4) if self.total_bytes else 1.0,
+            "rowsPerSecond": round(throughput, 1),
+            "elapsedSeconds": round(elapsed, 3),
+            "etaSeconds": round(eta, 1) if eta is not None else None,
+            "errors": self.errors,
+            "result": self.result,
+            "cancelRequested": self.cancel_requested.is_set(),
+        }
+
+
+class JobManager:
+    """
+    Pool acotado de hilos para cargas largas: la API encola y responde
+    enseguida, y el trabajo corre fuera del request.
+
+    Con varios workers de uvicorn cada proceso tiene su pool. Para que
+    cualquiera pueda responder por un trabajo, el estado se publica en
+    <data>/jobs/<id>.json y la cancelación se pide con <id>.cancel, que el
+    proceso dueño revisa entre bloques.
+    """
+
+    def __init__(self, data_dir="data", workers=JOB_WORKERS, max_pending=MAX_PENDING):
+        self.dir = os.path.join(data_dir, "jobs")
+        os.makedirs(self.dir, exist_ok=True)
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self.jobs = OrderedDict()  # id -> Job de este proceso, en orden de llegada
+        self._published = {}       # id -> momento de la última publicación
+
+    def _path(self, job_id, ext):
+        return os.path.join(self.dir, job_id + ext)
+
+    # ---------------------------
+    # Encolar y correr
+    # ---------------------------
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.status not in FINISHED)
+
+    def full(self):
+        return self.pending() >= self.max_pending
+
+    def submit(self, job, fn):
+        """
+        Encola fn(job). fn informa el avance con job.update y debe revisar
+        self.cancelled(job) entre bloques. Lo que devuelve queda en job.result.
+        """
+        with self._lock:
+            if sum(1 for j in self.jobs.values() if j.status not in FINISHED) >= self.max_pending:
+                raise RuntimeError(f"Hay {self.max_pending} cargas pendientes; intente más tarde")
+            self.jobs[job.id] = job
+            self._forget()
+        self._publish(job, force=True)
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if self.cancelled(job):
+            # Cancelado mientras esperaba: no llega a correr
+            job.status = CANCELLED
+        else:
+            job.status = RUNNING
+            job.started = time.time()
+            self._publish(job, force=True)
+            try:
+                job.result = fn(job)
+                job.status = DONE
+            except LoadCancelled as e:
+                job.status = CANCELLED
+                job.errors.append(str(e))
+            except Exception as e:
+                logger.exception("Falló la carga %s en %s", job.id, job.table)
+                job.status = FAILED
+                job.errors.append(str(e))
+        job.finished = time.time()
+        self._publish(job, force=True)
+        self._remove(self._path(job.id, ".cancel"))
+
+    def progress(self, job):
+        """
+        Función (filas, bytes) para copy_from: anota el avance y lo publica cada tanto.
+        """
+        def update(rows, bytes_done):
+            job.update(rows, bytes_done)
+            self._publish(job)
+        return update
+
+    def _forget(self):
+        # Con self._lock tomado: se olvidan los terminados más viejos
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job_id]
+            self._published.pop(job_id, None)
+            self._remove(self._path(job_id, ".json"))
+
+    # ---------------------------
+    # Estado compartido entre procesos
+    # ---------------------------
+    def _publish(self, job, force=False):
+        now = time.time()
+        if not force and now - self._published.get(job.id, 0) < PUBLISH_INTERVAL:
+            return
+        self._published[job.id] = now
+        # Se reemplaza entero: quien lo lee nunca ve un JSON a medias
+        tmp = self._path(job.id, f".json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp, self._path(job.id, ".json"))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, job_id):
+        """
+        Estado del trabajo como dict, o None si no existe. Si lo corre otro
+        proceso se lee lo último que publicó.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id, ".json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self):
+        jobs = {}
+        for name in os.listdir(self.dir):
+            if name.endswith(".json"):
+                state = self.get(name[:-len(".json")])
+                if state is not None:
+                    jobs[state["id"]] = state
+        for job in list(self.jobs.values()):
+            jobs[job.id] = job.to_dict()
+        # Los más recientes primero
+        return sorted(jobs.values(), key=lambda state: state["createdAt"], reverse=True)
+
+    # ---------------------------
+    # Cancelación
+    # ---------------------------
+    def cancel(self, job_id):
+        """
+        Pide cancelar un trabajo. El que está en cola no llega a correr; el que
+        corre se aborta al terminar el bloque actual. Devuelve el estado o None.
+        """
+        state = self.get(job_id)
+        if state is None or state["status"] in FINISHED:
+            return state
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel_requested.set()
+            return job.to_dict()
+        # Lo corre otro proceso: lo ve en el próximo bloque
+        open(self._path(job_id, ".cancel"), "w").close()
+        state["cancelRequested"] = True
+        return state
+
+    def cancelled(self, job):
+        if job.cancel_requested.is_set():
+            return True
+        if os.path.exists(self._path(job.id, ".cancel")):
+            job.cancel_requested.set()
+            return True
+        return False
+
+    def shutdown(self):
+        # Al apagar se cancela todo: las cargas a medias se abortan y no dejan filas visibles
+        for job in list(self.jobs.values()):
+            job.cancel_requested.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for job in list(self.jobs.values()):
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished = time.time()
+                self._publish(job, force=True)
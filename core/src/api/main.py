@@ -1,15 +1,34 @@
 from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 import os
+import json
 import shutil
 import csv
+import logging
+from itertools import chain
 
+from src.api.jobs import Job, JobManager
 from src.parser.executor import Executor
+from src.parser.result import ResultSet
 
-# Inicializamos Executor
+# Nivel de log configurable (DEBUG, INFO, WARNING...); por defecto solo advertencias
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Inicializamos Executor. Con varios workers (uvicorn --workers N) cada uno
+# arma el suyo sobre el mismo data/: catálogo, WAL y tablas se coordinan con locks de archivo
 executor = Executor(data_dir="data")
+# Las cargas de CSV corren fuera del request, en un pool acotado
+jobs = JobManager(data_dir="data")
+# ADVISOR_AUTO_INDEX=1: con el servidor ocioso se crean solos los índices sugeridos
+if os.environ.get("ADVISOR_AUTO_INDEX") == "1":
+    executor.advisor.start()
 
 app = FastAPI(
     title="Mini DB Backend",
@@ -26,15 +45,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def shutdown():
+    # Cancelar las cargas en curso (se abortan sin dejar filas) y dejar los datos sincronizados y el WAL vacío
+    jobs.shutdown()
+    executor.advisor.stop()
+    executor.schema_manager.checkpoint()
+
 # -------------------------------
 # MODELOS
 # -------------------------------
 class QueryRequest(BaseModel):
     query: str
+    # Formato de las filas de un SELECT: "json" (objetos), "columnar" (JSON por
+    # columnas) o "binary" (columnas empacadas, ver src/parser/result.py)
+    format: str = "json"
+
+
+RESULT_FORMATS = {"json", "columnar", "binary"}
 
 class IndexRequest(BaseModel):
     index_type: str
     table_name: str
+    # Columna a indexar; si no se indica, la primera de la tabla
+    column: Optional[str] = None
 
 # -------------------------------
 # ENDPOINTS
@@ -45,24 +79,41 @@ def health():
 
 @app.post("/query")
 def run_query(request: QueryRequest):
+    if request.format not in RESULT_FORMATS:
+        return {"ok": False, "error": f"Formato no soportado: {request.format}"}
     try:
-        print(f"Query recibida: {request.query}")  # Debug
+        logger.debug("Query recibida: %s", request.query)
         result = executor.execute(request.query)
-        print(f"Resultado: {result}")  # Debug - VER ESTO
-        print(f"Tipo resultado: {type(result)}")  # Debug
+        logger.debug("Resultado (%s): %r", type(result).__name__, result)
+        if isinstance(result, ResultSet):
+            if request.format == "binary":
+                return Response(result.to_binary(), media_type="application/octet-stream")
+            if request.format == "columnar":
+                return Response(json.dumps({"ok": True, "result": result.to_columnar()}),
+                                media_type="application/json")
+            # Las filas son tuplas: se escriben como objetos JSON al enviarlas
+            body = chain(['{"ok": true, "result": '], result.json_chunks(), ["}"])
+            return StreamingResponse(body, media_type="application/json")
         return {"ok": True, "result": result}
     except Exception as e:
-        print(f"Error: {str(e)}")  # Debug
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error ejecutando query: %s", request.query)
         return {"ok": False, "error": str(e)}
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...), table_name: str = Form("uploaded_table")):
+def upload_file(file: UploadFile = File(...), table_name: str = Form("uploaded_table")):
     """
-    Sube un CSV, lo guarda como tabla en el motor y queda persistido en catalog.json
+    Sube un CSV; la creación de la tabla y la carga de las filas quedan
+    encoladas como trabajo en segundo plano. Devuelve enseguida el id del
+    trabajo: el avance se consulta en /jobs/{id} y se cancela con DELETE /jobs/{id}.
     """
     try:
+        # Se rechaza antes de copiar el archivo y crear la tabla
+        if jobs.full():
+            return JSONResponse(
+                content={"ok": False, "error": "Hay demasiadas cargas pendientes; intente más tarde."},
+                status_code=503
+            )
+
         os.makedirs("data", exist_ok=True)
         save_path = os.path.join("data", file.filename)
 
@@ -72,19 +123,16 @@ async def upload_file(file: UploadFile = File(...), table_name: str = Form("uplo
 
         headers = []
         rows = []
-        all_data = []
-        record_count = 0
 
-        # Leer el CSV
-        with open(save_path, newline='', encoding="utf-8") as csvfile:
+        # Leer solo cabeceras y vista previa; la carga completa va por COPY
+        with open(save_path, newline='', encoding="utf-8-sig") as csvfile:
             reader = csv.reader(csvfile)
             headers = next(reader)  # primera fila = cabeceras
 
             for i, row in enumerate(reader):
-                all_data.append(row)
-                if i < 10:  # preview
-                    rows.append(row)
-                record_count = i + 1
+                if i >= 10:
+                    break
+                rows.append(row)
 
         # Normalizar headers (sin espacios, todo lowercase)
         clean_headers = [col.strip().replace(" ", "_").replace("-", "_").lower() for col in headers]
@@ -93,62 +141,105 @@ async def upload_file(file: UploadFile = File(...), table_name: str = Form("uplo
         columns_def = [{"name": col, "type": "VARCHAR[100]"} for col in clean_headers]
 
         # --- Crear tabla solo si no existe ---
-        if table_name in executor.schema_manager.tables:
+        if executor.schema_manager.has_table(table_name):
             return JSONResponse(
                 content={"ok": False, "error": f"La tabla '{table_name}' ya existe."},
                 status_code=400
             )
 
-        executor.schema_manager.create_table(table_name, columns_def)
-
-        inserted = 0
-        failed = 0
+        # Carga por bloques (parseo en workers, una escritura por bloque) fuera del request
+        path = os.path.abspath(save_path)
+        job = Job("upload", table_name, file.filename, os.path.getsize(save_path))
 
-        # Insertar cada fila como diccionario
-        for row_data in all_data:
-            try:
-                record_dict = {col: val.strip() for col, val in zip(clean_headers, row_data)}
-                executor.schema_manager.insert(table_name, record_dict)
-                inserted += 1
-            except Exception as insert_error:
-                print(f"[ERROR] insertando fila {inserted + failed + 1}: {insert_error}")
-                failed += 1
+        def load(job):
+            # La tabla se crea con la carga: si el pool rechaza el trabajo no queda una tabla vacía
+            executor.schema_manager.create_table(table_name, columns_def)
+            loaded = executor.schema_manager.copy_from(
+                table_name, path, header=True,
+                progress=jobs.progress(job), cancelled=lambda: jobs.cancelled(job)
+            )
+            # Una línea inválida aborta toda la carga: el trabajo queda "failed" con la línea y el motivo en errors
+            return {"inserted": loaded["count"], "message": loaded["message"]}
 
-        # Verificar que se insertaron los datos
-        verify = executor.schema_manager.select(table_name, ["*"], None)
-        print(f"[DEBUG] Registros en {table_name}: {len(verify)}")
+        jobs.submit(job, load)
 
-        return {
-            "ok": True,
-            "fileName": file.filename,
-            "tableName": table_name,
-            "fileSize": f"{round(os.path.getsize(save_path)/1024, 2)} KB",
-            "recordCount": record_count,
-            "inserted": inserted,
-            "failed": failed,
-            "headers": clean_headers,
-            "rows": rows,
-            "message": f"Tabla '{table_name}' creada y persistida. Insertados: {inserted}, Fallidos: {failed}"
-        }
+        return JSONResponse(
+            content={
+                "ok": True,
+                "jobId": job.id,
+                "status": job.status,
+                "fileName": file.filename,
+                "tableName": table_name,
+                "fileSize": f"{round(job.total_bytes/1024, 2)} KB",
+                "headers": clean_headers,
+                "rows": rows,
+                "message": f"Creación y carga de '{table_name}' encoladas (trabajo {job.id})"
+            },
+            status_code=202
+        )
 
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
-        print(f"[ERROR] upload: {error_detail}")
+        logger.error("upload: %s", error_detail)
         return JSONResponse(
             content={"ok": False, "error": str(e), "detail": error_detail},
             status_code=500
         )
 
+@app.get("/jobs")
+def list_jobs():
+    return {"ok": True, "jobs": jobs.list()}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Avance de una carga: filas procesadas, filas por segundo, errores y ETA.
+    """
+    state = jobs.get(job_id)
+    if state is None:
+        return JSONResponse(content={"ok": False, "error": f"No existe el trabajo {job_id}"}, status_code=404)
+    return {"ok": True, "job": state}
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancela una carga: la transacción se aborta y ninguna de sus filas queda visible.
+    """
+    state = jobs.cancel(job_id)
+    if state is None:
+        return JSONResponse(content={"ok": False, "error": f"No existe el trabajo {job_id}"}, status_code=404)
+    return {"ok": True, "job": state}
+
+@app.get("/advisor")
+def advisor():
+    """
+    Índices sugeridos según las consultas ejecutadas (con su ahorro estimado)
+    y el perfil de uso de cada tabla.
+    """
+    try:
+        return {
+            "ok": True,
+            "recommendations": executor.advisor.recommend(),
+            "workload": executor.workload.summary(),
+            "built": executor.advisor.built,
+        }
+    except Exception as e:
+        logger.exception("advisor")
+        return {"ok": False, "error": str(e)}
+
 @app.post("/create_index")
 def create_index(request: IndexRequest):
     """
     Crea un índice en la tabla especificada usando el motor DBMS.
     """
     try:
-        # Aquí decides cómo se traduce la petición a una consulta en tu motor
-        query = f"CREATE INDEX {request.index_type.upper()} ON {request.table_name}"
-        result = executor.execute(query)
-        return {"ok": True, "message": f"{request.index_type} index created on {request.table_name}", "result": result}
+        column = request.column
+        if column is None:
+            table = executor.schema_manager.get_table(request.table_name)
+            column = table["schema"].columns[0]["name"]
+        result = executor.schema_manager.create_index(request.table_name, column, request.index_type)
+        return {"ok": True, "message": f"{request.index_type} index created on {request.table_name}({column})",
+                "result": result}
     except Exception as e:
         return {"ok": False, "error": str(e)}
@@ -0,0 +1,122 @@
+# dbms/bloom.py
+import os
+import math
+import mmap
+import struct
+import hashlib
+
+from src.dbms.wal import WRITE, TRUNCATE
+
+# Cabecera del archivo: magic | funciones hash | bits | claves agregadas | capacidad
+HEADER = struct.Struct("<4sIQQQ")
+MAGIC = b"BLM1"
+
+# Tasa de falsos positivos por defecto (1%: ~9.6 bits por clave)
+DEFAULT_FPR = 0.01
+# Capacidad mínima para que un índice vacío no se reconstruya a cada rato
+MIN_CAPACITY = 256
+# Los bits se persisten por tramos: solo se reescriben los tramos modificados
+CHUNK = 4096
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom persistente: dice con certeza que una clave NO está,
+    sin tocar el disco. Un positivo puede ser falso con probabilidad ~fpr.
+
+    No admite borrados: las claves eliminadas siguen dando positivo hasta
+    que el dueño reconstruye el filtro (reconstruct / reorganize). Cuando
+    se agregan más claves que la capacidad, full() avisa que conviene
+    reconstruirlo más grande.
+    """
+
+    def __init__(self, capacity, fpr=DEFAULT_FPR):
+        self.capacity = max(MIN_CAPACITY, int(capacity))
+        self.fpr = fpr
+        bits = math.ceil(-self.capacity * math.log(fpr) / math.log(2) ** 2)
+        self.num_bits = max(64, -(-bits // 8) * 8)
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray(self.num_bits // 8)
+        self.count = 0
+        self._dirty = set()      # tramos de bits modificados desde el último collect()
+        self._rewrite = True     # el archivo se escribe entero (nuevo o reconstruido)
+
+    @classmethod
+    def build(cls, keys, capacity=0, fpr=DEFAULT_FPR):
+        keys = list(keys)
+        bloom = cls(max(capacity, 2 * len(keys)), fpr)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def _positions(self, key):
+        # Doble hashing (Kirsch-Mitzenmacher) sobre un blake2b de 128 bits
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+            self._dirty.add((pos >> 3) // CHUNK)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def full(self):
+        return self.count > self.capacity
+
+    # ---------------------------
+    # Persistencia
+    # ---------------------------
+    def collect(self, path):
+        """
+        Operaciones (tipo, path, posición, datos) para persistir el filtro,
+        pensadas para ir en el mismo commit que las páginas del índice.
+        """
+        if not self._rewrite and not self._dirty:
+            return []
+        header = HEADER.pack(MAGIC, self.num_hashes, self.num_bits, self.count, self.capacity)
+        if self._rewrite:
+            self._rewrite = False
+            self._dirty.clear()
+            return [(TRUNCATE, path, 0, b""), (WRITE, path, 0, header + bytes(self.bits))]
+        ops = [(WRITE, path, 0, header)]
+        for chunk in sorted(self._dirty):
+            start = chunk * CHUNK
+            ops.append((WRITE, path, HEADER.size + start, bytes(self.bits[start:start + CHUNK])))
+        self._dirty.clear()
+        return ops
+
+    @classmethod
+    def load(cls, path, fpr=DEFAULT_FPR):
+        """
+        Abre el filtro de path; None si no existe o está incompleto (el dueño
+        debe reconstruirlo desde sus datos). Los bits se mapean en memoria
+        (copia privada): abrir no lee el archivo, solo las páginas que se consultan.
+        """
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            return None
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, num_hashes, num_bits, count, capacity = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) < HEADER.size + num_bits // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.fpr = fpr
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        # Al reconstruirse el filtro se reemplaza por un bytearray nuevo antes
+        # de reescribir el archivo, así el mapeo viejo nunca se lee truncado
+        bloom.bits = memoryview(data)[HEADER.size:HEADER.size + num_bits // 8]
+        bloom.count = count
+        bloom._dirty = set()
+        bloom._rewrite = False
+        return bloom
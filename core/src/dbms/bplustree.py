@@ -1,4 +1,288 @@
-# Clase base vacía temporal para evitar errores de importación
+# dbms/bplustree.py
+import struct
+from bisect import bisect_left, bisect_right, insort
+
+from src.dbms.index_entry import EntryCodec
+from src.dbms.pager import Pager, PAGE_SIZE
+
+# Página 0: magic | raíz | cantidad de entradas
+META = struct.Struct("<4sii")
+MAGIC = b"BPT1"
+# Cabecera de nodo: es_hoja | cantidad de entradas | siguiente hoja
+NODE = struct.Struct("<BHi")
+CHILD = struct.Struct("<i")
+# Ocupación de las páginas al construir en bloque: deja lugar para
+# inserciones posteriores sin dividir enseguida
+BULK_FILL = 0.9
+
+
+class _Node:
+    def __init__(self, is_leaf, entries=None, children=None, next_leaf=-1):
+        self.is_leaf = is_leaf
+        self.entries = entries or []    # (clave, offset[, incluidas]) ordenadas
+        self.children = children or []  # solo nodos internos: len(entries) + 1
+        self.next_leaf = next_leaf
+
+
 class BPlusTree:
-	def __init__(self, *args, **kwargs):
-		pass
+    """
+    Índice secundario B+ en disco: clave -> offset del registro en el .dat.
+
+    Las entradas se ordenan por el par (clave, offset), así las claves
+    repetidas conviven y se puede borrar una entrada exacta. Las hojas están
+    encadenadas para las búsquedas por rango. El borrado es perezoso: quita
+    la entrada de la hoja sin fusionar nodos.
+
+    Con include las hojas guardan también esas columnas del registro
+    (índice cubriente); los nodos internos siguen con pares (clave, offset).
+    """
+
+    def __init__(self, file_name, key_type, wal=None, include=None):
+        """
+        file_name: ruta base del índice (se agrega la extensión .bpt)
+        key_type: tipo de la columna indexada (ej. "INT", "VARCHAR[20]")
+        include: columnas extra [(nombre, tipo)] que se copian en las hojas
+        """
+        self.codec = EntryCodec(key_type, include)
+        self.pager = Pager(f"{file_name}.bpt", wal=wal)
+        self.leaf_capacity = (PAGE_SIZE - NODE.size) // self.codec.entry_size
+        self.inner_capacity = (PAGE_SIZE - NODE.size - CHILD.size) // (self.codec.size + CHILD.size)
+
+        if self.pager.num_pages == 0:
+            self.pager.allocate()
+            self.root = self.pager.allocate()
+            self.count = 0
+            self._write_node(self.root, _Node(True))
+            self._write_meta()
+            self.pager.flush()
+        else:
+            magic, self.root, self.count = META.unpack_from(self.pager.read(0))
+            if magic != MAGIC:
+                raise ValueError(f"{self.pager.filename} no es un índice B+")
+
+    # ---------------------------
+    # Páginas <-> nodos
+    # ---------------------------
+    def _read_node(self, page_no):
+        data = self.pager.read(page_no)
+        is_leaf, n, next_leaf = NODE.unpack_from(data)
+        pos = NODE.size
+        entries = []
+        if is_leaf:
+            for _ in range(n):
+                entries.append(self.codec.unpack_entry(data, pos))
+                pos += self.codec.entry_size
+        else:
+            for _ in range(n):
+                entries.append(self.codec.unpack(data, pos))
+                pos += self.codec.size
+        children = []
+        if not is_leaf:
+            for _ in range(n + 1):
+                children.append(CHILD.unpack_from(data, pos)[0])
+                pos += CHILD.size
+        return _Node(bool(is_leaf), entries, children, next_leaf)
+
+    def _write_node(self, page_no, node):
+        parts = [NODE.pack(node.is_leaf, len(node.entries), node.next_leaf)]
+        if node.is_leaf:
+            parts.extend(self.codec.pack_entry(e) for e in node.entries)
+        else:
+            parts.extend(self.codec.pack(k, o) for k, o in node.entries)
+        parts.extend(CHILD.pack(c) for c in node.children)
+        self.pager.write(page_no, b"".join(parts))
+
+    def _write_meta(self):
+        self.pager.write(0, META.pack(MAGIC, self.root, self.count))
+
+    # ---------------------------
+    # Inserción
+    # ---------------------------
+    def add(self, key, offset, values=None):
+        """
+        values: valores de las columnas incluidas (si el índice las tiene)
+        """
+        entry = self.codec.make_entry(self.codec.coerce(key), offset, values)
+        split = self._insert(self.root, entry)
+        if split:
+            separator, right = split
+            new_root = self.pager.allocate()
+            self._write_node(new_root, _Node(False, [separator], [self.root, right]))
+            self.root = new_root
+        self.count += 1
+        self._write_meta()
+
+    def _insert(self, page_no, entry):
+        node = self._read_node(page_no)
+        if node.is_leaf:
+            insort(node.entries, entry)
+            if len(node.entries) <= self.leaf_capacity:
+                self._write_node(page_no, node)
+                return None
+            mid = len(node.entries) // 2
+            right_page = self.pager.allocate()
+            right = _Node(True, node.entries[mid:], next_leaf=node.next_leaf)
+            node.entries = node.entries[:mid]
+            node.next_leaf = right_page
+            self._write_node(page_no, node)
+            self._write_node(right_page, right)
+            # El separador que sube es solo (clave, offset)
+            return right.entries[0][:2], right_page
+
+        i = bisect_right(node.entries, entry)
+        split = self._insert(node.children[i], entry)
+        if not split:
+            return None
+        separator, right_page = split
+        node.entries.insert(i, separator)
+        node.children.insert(i + 1, right_page)
+        if len(node.entries) <= self.inner_capacity:
+            self._write_node(page_no, node)
+            return None
+
+        mid = len(node.entries) // 2
+        up = node.entries[mid]
+        new_page = self.pager.allocate()
+        right = _Node(False, node.entries[mid + 1:], node.children[mid + 1:])
+        node.entries = node.entries[:mid]
+        node.children = node.children[:mid + 1]
+        self._write_node(page_no, node)
+        self._write_node(new_page, right)
+        return up, new_page
+
+    # ---------------------------
+    # Construcción en bloque
+    # ---------------------------
+    def bulk_load(self, entries, count=None):
+        """
+        Reconstruye el árbol desde cero con entradas (clave, offset[, incluidas])
+        ya ordenadas: se llenan las hojas de izquierda a derecha y luego cada
+        nivel interno, con la primera entrada de cada hijo como separador.
+        Cada página se escribe una sola vez (sin divisiones).
+        """
+        self.pager.truncate()
+        self.pager.allocate()  # página 0: meta
+        per_leaf = max(1, int(self.leaf_capacity * BULK_FILL))
+
+        # Las hojas se reservan seguidas: la siguiente de cada una es la página que sigue
+        items, chunk, last, n = [], [], [], 0
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) == per_leaf:
+                items.append(self._write_leaf(chunk))
+                n += len(chunk)
+                last, chunk = chunk, []
+        if chunk or not items:
+            items.append(self._write_leaf(chunk))
+            n += len(chunk)
+            last = chunk
+        self._write_node(items[-1][1], _Node(True, last))  # la última hoja no tiene siguiente
+
+        fan_out = max(2, int((self.inner_capacity + 1) * BULK_FILL))
+        while len(items) > 1:
+            next_items = []
+            for i in range(0, len(items), fan_out):
+                group = items[i:i + fan_out]
+                page_no = self.pager.allocate()
+                self._write_node(page_no, _Node(False, [s for s, _ in group[1:]], [p for _, p in group]))
+                next_items.append((group[0][0], page_no))
+            items = next_items
+
+        self.root = items[0][1]
+        self.count = n
+        self._write_meta()
+
+    def _write_leaf(self, chunk):
+        page_no = self.pager.allocate()
+        self._write_node(page_no, _Node(True, chunk, next_leaf=page_no + 1))
+        return (chunk[0][:2] if chunk else None), page_no
+
+    # ---------------------------
+    # Búsquedas
+    # ---------------------------
+    def _find_leaf(self, entry):
+        page_no = self.root
+        node = self._read_node(page_no)
+        while not node.is_leaf:
+            page_no = node.children[bisect_right(node.entries, entry)]
+            node = self._read_node(page_no)
+        return page_no, node
+
+    def _scan(self, low, high):
+        """
+        Recorre las hojas desde la primera clave >= low hasta pasar high.
+        Genera (entrada, página, nodo).
+        """
+        if low is None:
+            page_no = self.root
+            node = self._read_node(page_no)
+            while not node.is_leaf:
+                page_no = node.children[0]
+                node = self._read_node(page_no)
+            start = 0
+        else:
+            page_no, node = self._find_leaf((low, -1))
+            start = bisect_left(node.entries, (low, -1))
+
+        while True:
+            for i in range(start, len(node.entries)):
+                entry = node.entries[i]
+                if high is not None and entry[0] > high:
+                    return
+                yield entry, page_no, node
+            if node.next_leaf == -1:
+                return
+            page_no = node.next_leaf
+            node = self._read_node(page_no)
+            start = 0
+
+    def search(self, key):
+        return [entry[1] for entry in self.search_entries(key)]
+
+    def range_search(self, low=None, high=None):
+        return [entry[1] for entry in self.range_entries(low, high)]
+
+    def search_entries(self, key):
+        """
+        Entradas completas (clave, offset[, incluidas]) de la clave.
+        """
+        key = self.codec.coerce(key)
+        return [entry for entry, _, _ in self._scan(key, key)]
+
+    def range_entries(self, low=None, high=None):
+        low = None if low is None else self.codec.coerce(low)
+        high = None if high is None else self.codec.coerce(high)
+        return [entry for entry, _, _ in self._scan(low, high)]
+
+    # ---------------------------
+    # Borrado
+    # ---------------------------
+    def remove(self, key, offset=None):
+        """
+        Borra la entrada (clave, offset), o todas las de la clave si offset es None.
+        """
+        key = self.codec.coerce(key)
+        targets = [(e, p) for e, p, _ in self._scan(key, key) if offset is None or e[1] == offset]
+        for entry, page_no in targets:
+            node = self._read_node(page_no)
+            node.entries.remove(entry)
+            self._write_node(page_no, node)
+        self.count -= len(targets)
+        self._write_meta()
+        return bool(targets)
+
+    def height(self):
+        levels, node = 1, self._read_node(self.root)
+        while not node.is_leaf:
+            node = self._read_node(node.children[0])
+            levels += 1
+        return levels
+
+    def io_counters(self):
+        return self.pager.counters()
+
+    def flush(self):
+        self.pager.flush()
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,157 @@
+# dbms/bulk_loader.py
+import os
+import io
+import csv
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from src.record import RecordSchema
+from src.dbms.statistics import TableStats
+
+# Tamaño de cada bloque de CSV que procesa un worker
+CHUNK_SIZE = 4 * 1024 * 1024
+# Por debajo de este tamaño no vale la pena levantar procesos
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+# Bloques en vuelo por worker: si la escritura va más lenta que el parseo,
+# los bloques ya empacados no se acumulan en memoria más allá de esta ventana
+CHUNKS_PER_WORKER = 2
+
+
+class LoadCancelled(Exception):
+    """
+    La carga se canceló a pedido: la transacción se aborta y no queda nada visible.
+    """
+
+
+class RejectedRow(ValueError):
+    """
+    Una línea del CSV no entra en la tabla (un valor incompatible con su
+    columna o una cantidad de campos distinta): la carga se aborta y no
+    queda ninguna fila visible. line es la línea del archivo (desde 1).
+    """
+
+    def __init__(self, line, reason):
+        super().__init__(line, reason)
+        self.line = line
+        self.reason = reason
+
+    def __str__(self):
+        return f"Línea {self.line} del CSV: {self.reason}"
+
+
+def _split_chunks(path, start, chunk_size):
+    """
+    Divide el archivo en rangos [inicio, fin) alineados a inicio de línea.
+    No soporta saltos de línea dentro de campos entre comillas.
+    """
+    size = os.path.getsize(path)
+    bounds = []
+    with open(path, "rb") as f:
+        begin = start
+        while begin < size:
+            end = begin + chunk_size
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()  # avanzar hasta el final de la línea actual
+                end = f.tell()
+            bounds.append((begin, end))
+            begin = end
+    return bounds
+
+
+def _pack_chunk(args):
+    """
+    Parsea un rango del CSV y devuelve (bytes empacados, cantidad de filas,
+    estadísticas parciales del bloque, líneas del bloque). Se ejecuta en un
+    proceso worker, por eso recibe y devuelve solo datos serializables.
+    Una línea que no entra lanza RejectedRow con su número dentro del bloque.
+    """
+    path, begin, end, columns, delimiter = args
+    schema = RecordSchema(columns)
+    names = [col["name"] for col in columns]
+
+    with open(path, "rb") as f:
+        f.seek(begin)
+        text = f.read(end - begin).decode("utf-8", errors="replace")
+    if begin == 0:
+        text = text.lstrip("\ufeff")  # BOM de Excel
+
+    packed = []
+    stats = TableStats(schema)
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(names):
+            raise RejectedRow(reader.line_num, f"tiene {len(row)} campos y la tabla tiene {len(names)} columnas")
+        try:
+            data = schema.pack({name: value.strip() for name, value in zip(names, row)})
+        except ValueError as e:
+            raise RejectedRow(reader.line_num, str(e)) from None
+        packed.append(data)
+        # Las estadísticas se toman sobre el valor tal como queda en disco
+        stats.observe(schema.unpack(data))
+    return b"".join(packed), len(packed), stats.to_dict(), reader.line_num
+
+
+def load_csv(path, schema, header=False, delimiter=",", workers=None):
+    """
+    Genera bloques (bytes empacados, cantidad de filas, estadísticas, fin del
+    bloque en el archivo) a partir de un CSV, en el orden del archivo. El fin
+    del bloque sirve para informar el avance. Los archivos grandes se parsean
+    en paralelo.
+
+    Una línea que no entra en la tabla corta la carga con RejectedRow.
+
+    Si se deja de consumir (carga cancelada), los bloques que todavía no
+    empezó ningún worker se descartan.
+    """
+    start = 0
+    if header:
+        with open(path, "rb") as f:
+            f.readline()
+            start = f.tell()
+
+    bounds = _split_chunks(path, start, CHUNK_SIZE)
+    tasks = [(path, begin, end, schema.columns, delimiter) for begin, end in bounds]
+    parallel = os.path.getsize(path) - start >= PARALLEL_THRESHOLD and len(tasks) >= 2
+
+    chunks = _packed(tasks, workers) if parallel else ((task, _pack_chunk(task)) for task in tasks)
+    line = 1 if header else 0  # líneas de los bloques ya entregados
+    try:
+        for task, (data, count, stats, lines) in chunks:
+            line += lines
+            yield data, count, stats, task[2]
+    except RejectedRow as e:
+        # El worker numera las líneas de su bloque: se pasan a líneas del archivo
+        raise RejectedRow(line + e.line, e.reason) from None
+    finally:
+        chunks.close()
+
+
+def _packed(tasks, workers=None):
+    """
+    (tarea, resultado de _pack_chunk) de cada bloque, parseados en procesos
+    worker y entregados en el orden del archivo. Hay a lo sumo
+    CHUNKS_PER_WORKER bloques por worker encargados o listos sin consumir:
+    cada bloque que se entrega libera lugar para encargar el siguiente.
+    """
+    workers = workers or os.cpu_count()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Se entregan en el orden del archivo: siempre el más viejo de la ventana
+        remaining = iter(tasks)
+        window = deque((task, pool.submit(_pack_chunk, task))
+                       for task in islice(remaining, workers * CHUNKS_PER_WORKER))
+        while window:
+            task, future = window.popleft()
+            result = future.result()
+            following = next(remaining, None)
+            if following is not None:
+                window.append((following, pool.submit(_pack_chunk, following)))
+            yield task, result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
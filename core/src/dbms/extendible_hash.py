@@ -1,4 +1,288 @@
-# Clase base vacía temporal para evitar errores de importación
+# dbms/extendible_hash.py
+import os
+import struct
+import zlib
+from array import array
+
+from src.dbms.bloom import BloomFilter, DEFAULT_FPR
+from src.dbms.index_entry import EntryCodec
+from src.dbms.pager import Pager, PAGE_SIZE
+from src.dbms.wal import WRITE, apply_ops
+
+# Directorio: magic | profundidad global | cantidad de entradas, luego 2^d punteros
+DIR_HEADER = struct.Struct("<4sii")
+MAGIC = b"EXH1"
+# Bucket: profundidad local | cantidad de entradas | siguiente página de overflow
+BUCKET = struct.Struct("<iii")
+MAX_DEPTH = 20
+# Ocupación de los buckets al construir en bloque
+BULK_FILL = 0.75
+
+
+class _Bucket:
+    def __init__(self, local_depth, entries=None, next_page=-1):
+        self.local_depth = local_depth
+        self.entries = entries or []
+        self.next_page = next_page
+
+
 class ExtendibleHash:
-	def __init__(self, *args, **kwargs):
-		pass
+    """
+    Índice secundario de hashing extensible: clave -> offsets en el .dat.
+
+    El directorio vive en memoria y se persiste en <base>.hdir; los buckets
+    son páginas de <base>.hash. Cuando un bucket no se puede dividir más
+    (profundidad máxima o todas las claves con el mismo hash) se encadenan
+    páginas de overflow. Solo responde igualdad.
+    Con include cada entrada guarda también esas columnas del registro.
+    Un filtro de Bloom (<base>.bloom) descarta sin E/S las claves ausentes.
+    """
+
+    def __init__(self, file_name, key_type, wal=None, include=None, bloom_fpr=DEFAULT_FPR):
+        """
+        file_name: ruta base del índice
+        key_type: tipo de la columna indexada
+        include: columnas extra [(nombre, tipo)] que se copian en cada entrada
+        bloom_fpr: tasa de falsos positivos del filtro de Bloom
+        """
+        self.codec = EntryCodec(key_type, include)
+        self.pager = Pager(f"{file_name}.hash", wal=wal)
+        self.dir_file = f"{file_name}.hdir"
+        self.wal = wal
+        self.capacity = (PAGE_SIZE - BUCKET.size) // self.codec.entry_size
+        self._dir_dirty = False
+        self.bloom_file = f"{file_name}.bloom"
+        self.bloom_fpr = bloom_fpr
+        self.bloom_skips = 0  # búsquedas resueltas solo con el filtro
+        self.bloom = None
+
+        if os.path.exists(self.dir_file) and os.path.getsize(self.dir_file) >= DIR_HEADER.size:
+            with open(self.dir_file, "rb") as f:
+                data = f.read()
+            magic, self.global_depth, self.count = DIR_HEADER.unpack_from(data)
+            if magic != MAGIC:
+                raise ValueError(f"{self.dir_file} no es un índice hash")
+            self.directory = array("i")
+            self.directory.frombytes(data[DIR_HEADER.size:DIR_HEADER.size + 4 * (1 << self.global_depth)])
+        else:
+            self.global_depth = 0
+            self.count = 0
+            page = self.pager.allocate()
+            self._write_bucket(page, _Bucket(0))
+            self.directory = array("i", [page])
+            self._dir_dirty = True
+            self.bloom = BloomFilter(0, bloom_fpr)
+            self.flush()
+
+        if self.bloom is None:
+            # Índices creados antes del filtro (o filtro perdido): se arma desde los buckets
+            self.bloom = BloomFilter.load(self.bloom_file, bloom_fpr) or self._build_bloom()
+
+    # ---------------------------
+    # Utilidades
+    # ---------------------------
+    def _hash(self, key):
+        # crc32 es estable entre ejecuciones (hash() de str no lo es)
+        return zlib.crc32(self.codec.pack_key(key))
+
+    def _read_bucket(self, page_no):
+        data = self.pager.read(page_no)
+        local_depth, n, next_page = BUCKET.unpack_from(data)
+        pos = BUCKET.size
+        entries = []
+        for _ in range(n):
+            entries.append(self.codec.unpack_entry(data, pos))
+            pos += self.codec.entry_size
+        return _Bucket(local_depth, entries, next_page)
+
+    def _write_bucket(self, page_no, bucket):
+        parts = [BUCKET.pack(bucket.local_depth, len(bucket.entries), bucket.next_page)]
+        parts.extend(self.codec.pack_entry(e) for e in bucket.entries)
+        self.pager.write(page_no, b"".join(parts))
+
+    def _chain(self, page_no):
+        while page_no != -1:
+            bucket = self._read_bucket(page_no)
+            yield page_no, bucket
+            page_no = bucket.next_page
+
+    def _build_bloom(self):
+        keys = [e[0] for page_no in dict.fromkeys(self.directory)
+                for _, bucket in self._chain(page_no) for e in bucket.entries]
+        return BloomFilter.build(keys, fpr=self.bloom_fpr)
+
+    # ---------------------------
+    # Inserción
+    # ---------------------------
+    def add(self, key, offset, values=None):
+        """
+        values: valores de las columnas incluidas (si el índice las tiene)
+        """
+        key = self.codec.coerce(key)
+        entry = self.codec.make_entry(key, offset, values)
+        h = self._hash(key)
+        while True:
+            idx = h & ((1 << self.global_depth) - 1)
+            page_no = self.directory[idx]
+            bucket = self._read_bucket(page_no)
+            if len(bucket.entries) < self.capacity:
+                bucket.entries.append(entry)
+                self._write_bucket(page_no, bucket)
+                break
+            if bucket.local_depth < MAX_DEPTH and self._splittable(bucket, h):
+                self._split(page_no, bucket)
+                continue
+            self._add_overflow(page_no, bucket, entry)
+            break
+        self.count += 1
+        self._dir_dirty = True
+        self.bloom.add(key)
+        if self.bloom.full():
+            self.bloom = self._build_bloom()
+
+    def _splittable(self, bucket, h):
+        mask = (1 << MAX_DEPTH) - 1
+        hashes = {self._hash(e[0]) & mask for e in bucket.entries}
+        hashes.add(h & mask)
+        return len(hashes) > 1
+
+    def _split(self, page_no, bucket):
+        depth = bucket.local_depth
+        if depth == self.global_depth:
+            self.directory.extend(self.directory)
+            self.global_depth += 1
+
+        # Se redistribuye toda la cadena, no solo la página principal
+        entries = [e for _, b in self._chain(page_no) for e in b.entries]
+        low, high = [], []
+        for e in entries:
+            (high if (self._hash(e[0]) >> depth) & 1 else low).append(e)
+
+        new_page = self.pager.allocate()
+        for i in range(len(self.directory)):
+            if self.directory[i] == page_no and (i >> depth) & 1:
+                self.directory[i] = new_page
+        self._write_chain(page_no, depth + 1, low)
+        self._write_chain(new_page, depth + 1, high)
+
+    def _write_chain(self, page_no, depth, entries):
+        chunks = [entries[i:i + self.capacity] for i in range(0, len(entries), self.capacity)] or [[]]
+        pages = [page_no] + [self.pager.allocate() for _ in chunks[1:]]
+        for i, chunk in enumerate(chunks):
+            next_page = pages[i + 1] if i + 1 < len(pages) else -1
+            self._write_bucket(pages[i], _Bucket(depth, chunk, next_page))
+
+    def _add_overflow(self, page_no, bucket, entry):
+        last_page, last = page_no, bucket
+        for chain_page, chain_bucket in self._chain(bucket.next_page):
+            if len(chain_bucket.entries) < self.capacity:
+                chain_bucket.entries.append(entry)
+                self._write_bucket(chain_page, chain_bucket)
+                return
+            last_page, last = chain_page, chain_bucket
+        new_page = self.pager.allocate()
+        self._write_bucket(new_page, _Bucket(bucket.local_depth, [entry]))
+        last.next_page = new_page
+        self._write_bucket(last_page, last)
+
+    # ---------------------------
+    # Construcción en bloque
+    # ---------------------------
+    def bulk_load(self, entries, count=None):
+        """
+        Reconstruye el índice desde cero. Con la cantidad de entradas se fija
+        de entrada la profundidad global (buckets llenos a BULK_FILL), las
+        entradas se reparten ya empacadas y cada página se escribe una vez,
+        sin las divisiones de add. Un bucket que igual se pasa encadena overflow.
+        """
+        if count is None:
+            entries = list(entries)
+            count = len(entries)
+        depth = 0
+        while depth < MAX_DEPTH and count > (1 << depth) * self.capacity * BULK_FILL:
+            depth += 1
+        mask = (1 << depth) - 1
+
+        self.bloom = BloomFilter(2 * count, self.bloom_fpr)
+        buckets = [bytearray() for _ in range(1 << depth)]
+        # Vienen ordenadas: las repeticiones de una clave se hashean una sola vez
+        key_size, last, bucket = self.codec.key_size, object(), None
+        for entry in entries:
+            data = self.codec.pack_entry(entry)
+            if entry[0] != last:
+                last = entry[0]
+                bucket = buckets[zlib.crc32(data[:key_size]) & mask]  # igual que _hash
+                self.bloom.add(last)
+            bucket += data
+
+        self.pager.truncate()
+        self.directory = array("i", [self.pager.allocate() for _ in buckets])
+        page_bytes = self.capacity * self.codec.entry_size
+        for page_no, data in zip(self.directory, buckets):
+            chunks = [data[i:i + page_bytes] for i in range(0, len(data), page_bytes)] or [b""]
+            pages = [page_no] + [self.pager.allocate() for _ in chunks[1:]]
+            for i, chunk in enumerate(chunks):
+                next_page = pages[i + 1] if i + 1 < len(pages) else -1
+                header = BUCKET.pack(depth, len(chunk) // self.codec.entry_size, next_page)
+                self.pager.write(pages[i], header + bytes(chunk))
+
+        self.global_depth = depth
+        self.count = count
+        self._dir_dirty = True
+
+    # ---------------------------
+    # Búsqueda y borrado
+    # ---------------------------
+    def search(self, key):
+        return [entry[1] for entry in self.search_entries(key)]
+
+    def search_entries(self, key):
+        """
+        Entradas completas (clave, offset[, incluidas]) de la clave.
+        """
+        key = self.codec.coerce(key)
+        if key not in self.bloom:
+            self.bloom_skips += 1
+            return []
+        page_no = self.directory[self._hash(key) & ((1 << self.global_depth) - 1)]
+        return [e for _, bucket in self._chain(page_no) for e in bucket.entries if e[0] == key]
+
+    def range_search(self, low=None, high=None):
+        raise ValueError("El índice hash no soporta búsquedas por rango")
+
+    def remove(self, key, offset=None):
+        key = self.codec.coerce(key)
+        if key not in self.bloom:
+            return False
+        page_no = self.directory[self._hash(key) & ((1 << self.global_depth) - 1)]
+        removed = 0
+        for chain_page, bucket in self._chain(page_no):
+            kept = [e for e in bucket.entries if not (e[0] == key and (offset is None or e[1] == offset))]
+            if len(kept) != len(bucket.entries):
+                removed += len(bucket.entries) - len(kept)
+                bucket.entries = kept
+                self._write_bucket(chain_page, bucket)
+        if removed:
+            self.count -= removed
+            self._dir_dirty = True
+        return bool(removed)
+
+    def io_counters(self):
+        return dict(self.pager.counters(), bloom_skips=self.bloom_skips)
+
+    def height(self):
+        # El directorio está en memoria: una página por búsqueda (más el overflow)
+        return 1
+
+    def flush(self):
+        ops = self.pager.collect()
+        if self._dir_dirty:
+            data = DIR_HEADER.pack(MAGIC, self.global_depth, self.count) + self.directory.tobytes()
+            ops.append((WRITE, self.dir_file, 0, data))
+            self._dir_dirty = False
+        # El filtro va en el mismo commit que los buckets: nunca queda atrasado
+        ops.extend(self.bloom.collect(self.bloom_file))
+        apply_ops(self.wal, ops)
+
+    def __len__(self):
+        return self.count
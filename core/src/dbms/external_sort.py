@@ -0,0 +1,63 @@
+# dbms/external_sort.py
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+
+# Elementos que se ordenan en memoria antes de volcar un tramo (run) a disco
+RUN_SIZE = 500_000
+# Elementos por bloque serializado dentro de un run
+BLOCK_SIZE = 8192
+
+
+def external_sort(items, run_size=RUN_SIZE, tmp_dir=None):
+    """
+    Ordena un iterable que puede no caber en memoria.
+    Devuelve (cantidad, iterador ordenado).
+
+    Se ordenan en memoria tramos de run_size elementos; si todo entra en
+    uno no se toca el disco. Si no, cada tramo se vuelca ordenado a un
+    archivo temporal (en tmp_dir) y se mezclan todos en una sola pasada
+    con heapq.merge. Los temporales se borran al terminar de recorrer.
+    """
+    items = iter(items)
+    run = sorted(islice(items, run_size))
+    if len(run) < run_size:
+        return len(run), iter(run)
+
+    runs, count = [], 0
+    try:
+        while run:
+            count += len(run)
+            runs.append(_spill(run, tmp_dir))
+            run = sorted(islice(items, run_size))
+    except BaseException:
+        for f in runs:
+            f.close()
+        raise
+    return count, _merge(runs)
+
+
+def _spill(run, tmp_dir):
+    f = tempfile.TemporaryFile(dir=tmp_dir, prefix="sort_", suffix=".run")
+    for i in range(0, len(run), BLOCK_SIZE):
+        pickle.dump(run[i:i + BLOCK_SIZE], f, protocol=pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    while True:
+        try:
+            block = pickle.load(f)
+        except EOFError:
+            return
+        yield from block
+
+
+def _merge(runs):
+    try:
+        yield from heapq.merge(*(_read_run(f) for f in runs))
+    finally:
+        for f in runs:
+            f.close()
@@ -1,5 +1,17 @@
 # core/file_manager.py
 import os
+import logging
+import threading
+from contextlib import closing
+
+from src.dbms.wal import WRITE, apply_ops
+from src.dbms.zone_map import ZoneMap
+from src.dbms.mvcc import VersionMap
+from src.dbms.prefetch import read_ahead
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 4096
 
 class FileManager:
     """
@@ -7,30 +19,77 @@ class FileManager:
     Se apoya en RecordSchema para empacar y desempacar registros.
     """
 
-    def __init__(self, filename, schema):
+    def __init__(self, filename, schema, wal=None):
         """
         filename: ruta del archivo binario (ej. "restaurantes.dat")
         schema: instancia de RecordSchema
+        wal: WriteAheadLog opcional; si se pasa, toda escritura se registra antes
         """
         self.filename = filename
         self.schema = schema
+        self.wal = wal
 
         # Si no existe, creamos el archivo vacío
         if not os.path.exists(filename):
             with open(filename, "wb") as f:
                 pass
 
-    def append_record(self, record_dict):
+        # Fin lógico del archivo: los appends reservan su offset aquí
+        self._lock = threading.Lock()
+        self._end = os.path.getsize(filename)
+
+        # Mínimo/máximo por bloque de cada columna, para saltar bloques en los recorridos
+        self.zone_map = ZoneMap(f"{os.path.splitext(filename)[0]}.zmap", schema, wal=wal)
+        self.zone_map.sync(filename)
+        # xmin/xmax de cada registro (MVCC), en <tabla>.ver
+        self.versions = VersionMap(f"{os.path.splitext(filename)[0]}.ver", wal=wal)
+
+        # Contadores de E/S (los usa EXPLAIN ANALYZE)
+        self.pages_read = 0
+        self.bytes_read = 0
+        self.blocks_skipped = 0
+
+    def _reserve(self, size):
+        with self._lock:
+            offset = self._end
+            self._end += size
+        return offset
+
+    def _write(self, offset, data, txid=None):
+        # El mapa de zonas va en el mismo commit: nunca queda atrás del .dat
+        ops = [(WRITE, self.filename, offset, data)] + self.zone_map.collect()
+        if txid is not None:
+            # Las versiones se escriben antes que los datos: un lector concurrente
+            # nunca ve un registro nuevo sin su xmin (se leería como txid 0, visible)
+            size = self.schema.size
+            ops = self.versions.insert_ops(offset // size, len(data) // size, txid) + ops
+        apply_ops(self.wal, ops)
+
+    def append_record(self, record_dict, txid=None):
         data = self.schema.pack(record_dict)
-        print(f"[DEBUG] Empacando registro: {record_dict}")
-        print(f"[DEBUG] Bytes generados: {len(data)} -> {data[:50]}...")  # primeras 50 bytes
-        with open(self.filename, "ab") as f:
-            offset = f.tell()
-            print(f"[DEBUG] Offset antes de escribir: {offset}")
-            f.write(data)
-            print(f"[DEBUG] Nuevo tamaño archivo: {f.tell()}")
+        offset = self._reserve(len(data))
+        self.zone_map.observe_block(offset, data)
+        self._write(offset, data, txid)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("append %s: %d bytes en offset %d -> %r", self.filename, len(data), offset, record_dict)
         return offset
 
+    def append_records(self, data, records=None, txid=None):
+        """
+        Escribe un bloque de registros ya empacados con una sola apertura
+        del archivo. Devuelve el offset del primer registro.
+        records: los mismos registros ya desempacados, si el llamador los tiene
+        (se ahorra desempacarlos otra vez para el mapa de zonas)
+        txid: transacción que los crea (su xmin); sin txid no se versionan
+        """
+        offset = self._reserve(len(data))
+        if records is None:
+            self.zone_map.observe_block(offset, data)
+        else:
+            for i, rec in enumerate(records):
+                self.zone_map.observe(offset + i * self.schema.size, rec)
+        self._write(offset, data, txid)
+        return offset
 
     def read_record(self, offset):
         """
@@ -39,41 +98,164 @@ class FileManager:
         with open(self.filename, "rb") as f:
             f.seek(offset)
             binary = f.read(self.schema.size)
+            self.pages_read += 1
+            self.bytes_read += len(binary)
             if not binary or len(binary) < self.schema.size:
                 return None
+        # Registro borrado (tombstone)
+        if binary.strip(b"\x00") == b"":
+            return None
         return self.schema.unpack(binary)
 
+    def read_records(self, offsets, columns=None, as_tuple=False, snapshot=None):
+        """
+        Lee varios registros con una sola apertura del archivo.
+        Los offsets deben venir ordenados para leer hacia adelante.
+        Genera (offset, registro) omitiendo los borrados.
+        columns: si se pasa, solo se decodifican esas columnas
+        as_tuple: registros como tuplas en el orden de schema.row_columns(columns)
+        snapshot: si se pasa, omite también las versiones que no ve
+        """
+        size = self.schema.size
+        decode = self.schema.decoder(columns, as_tuple)
+        last_page = -1
+        with open(self.filename, "rb") as f, self.versions.reader() as version:
+            for offset in offsets:
+                if snapshot is not None and not snapshot.visible(*version(offset // size)):
+                    continue
+                # Solo cuenta como lectura si el registro cae en otra página
+                page = offset // PAGE_SIZE
+                if page != last_page:
+                    self.pages_read += 1
+                    last_page = page
+                f.seek(offset)
+                binary = f.read(size)
+                self.bytes_read += len(binary)
+                if len(binary) < size or binary.strip(b"\x00") == b"":
+                    continue
+                yield offset, decode(binary)
+
     def update_record(self, offset, new_record_dict):
         """
         Sobrescribe un registro en un offset específico.
         """
         data = self.schema.pack(new_record_dict)
-        with open(self.filename, "r+b") as f:
-            f.seek(offset)
-            f.write(data)
+        # Los rangos del bloque solo se ensanchan (el valor viejo puede seguir en otro registro)
+        self.zone_map.observe_block(offset, data)
+        self._write(offset, data)
+
+    def update_records(self, records):
+        """
+        Sobrescribe varios registros {offset: dict} con un solo commit del WAL.
+        """
+        ops = []
+        for offset, record_dict in sorted(records.items()):
+            data = self.schema.pack(record_dict)
+            self.zone_map.observe_block(offset, data)
+            ops.append((WRITE, self.filename, offset, data))
+        if ops:
+            apply_ops(self.wal, ops + self.zone_map.collect())
 
     def delete_record(self, offset):
         """
         Marca un registro como borrado (tombstone).
         En este caso, sobrescribimos con bytes nulos.
         """
-        with open(self.filename, "r+b") as f:
-            f.seek(offset)
-            f.write(b"\x00" * self.schema.size)
+        self._write(offset, b"\x00" * self.schema.size)
+
+    def delete_records(self, offsets, txid=None):
+        """
+        Marca varios registros como borrados con un solo commit del WAL.
+        Con txid el borrado es lógico (se anota su xmax y las lecturas que
+        empezaron antes lo siguen viendo); sin txid el registro se pone en
+        ceros (lo hace VACUUM cuando ya nadie lo puede ver).
+        """
+        if txid is not None:
+            rows = [offset // self.schema.size for offset in offsets]
+            apply_ops(self.wal, self.versions.delete_ops(rows, txid))
+            return
+        tombstone = b"\x00" * self.schema.size
+        if self.wal is not None:
+            self.wal.write_many([(self.filename, offset, tombstone) for offset in offsets])
+            return
+        for offset in offsets:
+            self._write(offset, tombstone)
+
+    def scan_with_offsets(self, condition=None, columns=None, matches=None, match_columns=None,
+                          as_tuple=False, snapshot=None, sample=None):
+        """
+        Genera (offset, registro) para todos los registros válidos.
+        condition: árbol del WHERE ya coercionado; los bloques que según el
+        mapa de zonas no pueden cumplirlo se saltan sin leerlos.
+        columns: columnas a decodificar (None = todas)
+        matches: filtro registro -> bool sobre match_columns. Se decodifican
+        primero solo esas columnas y el resto solo en los registros que pasan.
+        as_tuple: registros (y lo que recibe matches) como tuplas en el orden
+        de schema.row_columns(...)
+        snapshot: si se pasa, solo las versiones que ese snapshot ve
+        sample: TableSample; solo se leen las páginas (SYSTEM) o se
+        decodifican las filas (BERNOULLI) de la muestra
+        """
+        size = self.schema.size
+        block_bytes = self.zone_map.block_rows * size
+        decode = self.schema.decoder(columns, as_tuple)
+        if matches is not None:
+            check = self.schema.decoder(match_columns, as_tuple)
+            if columns is not None and not as_tuple:
+                # Las columnas del filtro ya están decodificadas: se agrega el resto
+                rest = set(columns) - set(match_columns)
+                decode = self.schema.decoder(rest) if rest else None
+        # Los bloques que hay que leer se conocen de antemano: se leen por delante
+        # (ver prefetch) mientras se decodifican los anteriores
+        blocks = -(-os.path.getsize(self.filename) // block_bytes)
+        wanted = [(block * block_bytes, block_bytes) for block in range(blocks)
+                  if condition is None or self.zone_map.may_match(block, condition)]
+        skipped = blocks - len(wanted)
+        sampled = None
+        if sample is not None:
+            wanted = sample.ranges(wanted, size)
+            sampled = sample.row_filter()
+        read = 0
+        try:
+            with closing(read_ahead(self.filename, wanted)) as chunks:
+                for start, data in chunks:
+                    read += len(data)
+                    if snapshot is not None:
+                        versions = self.versions.read_array(start // size, len(data) // size)
+                    for i in range(0, len(data) - size + 1, size):
+                        if sampled is not None and not sampled((start + i) // size):
+                            continue
+                        if data[i:i + size].strip(b"\x00") == b"":
+                            continue
+                        if snapshot is not None:
+                            j = 2 * (i // size)
+                            if not snapshot.visible(versions[j], versions[j + 1]):
+                                continue
+                        if matches is None:
+                            yield start + i, decode(data, i)
+                            continue
+                        rec = check(data, i)
+                        if not matches(rec):
+                            continue
+                        if columns is None or as_tuple:
+                            # Una tupla no se completa: se decodifica entera de nuevo
+                            rec = decode(data, i)
+                        elif decode is not None:
+                            rec.update(decode(data, i))
+                        yield start + i, rec
+        finally:
+            # Se cuenta al terminar (o al cortar con LIMIT), no por registro
+            self.bytes_read += read
+            self.pages_read += -(-read // PAGE_SIZE)
+            self.blocks_skipped += skipped
+
+    def io_counters(self):
+        return {"pages_read": self.pages_read, "bytes_read": self.bytes_read,
+                "blocks_skipped": self.blocks_skipped}
 
     def scan_all(self):
         """
         Devuelve todos los registros válidos en el archivo.
         """
-        records = []
-        with open(self.filename, "rb") as f:
-            while True:
-                binary = f.read(self.schema.size)
-                if not binary or len(binary) < self.schema.size:
-                    break
-                # Ignorar registros "borrados"
-                if binary.strip(b"\x00") == b"":
-                    continue
-                records.append(self.schema.unpack(binary))
-        return records
+        return [rec for _, rec in self.scan_with_offsets()]
     
\ No newline at end of file
@@ -0,0 +1,677 @@
+# dbms/fulltext.py
+import os
+import re
+import math
+import heapq
+import struct
+import tempfile
+import unicodedata
+from collections import Counter
+from itertools import accumulate, groupby
+from operator import itemgetter
+
+from src.dbms.wal import WRITE, TRUNCATE, REPLACE, apply_ops
+
+# Meta (<base>.ftm): magic | segmento activo (0 = .fta, 1 = .ftb, NO_SEGMENT = ninguno)
+META = struct.Struct("<4sB")
+META_MAGIC = b"FTM1"
+NO_SEGMENT = 255
+SEGMENT_EXTENSIONS = (".fta", ".ftb")
+# Segmento: magic | términos | documentos | largo total | dónde empieza el diccionario
+SEGMENT = struct.Struct("<4sIQQQ")
+SEGMENT_MAGIC = b"FTS1"
+# Registro de la cola (<base>.ftt): operación | offset | largo del texto, luego el texto
+TAIL = struct.Struct("<BqI")
+ADD = 1
+DEL = 2
+# Entrada de un bloque de SPIMI: largo del término | postings | primer y último offset | bytes
+RUN_ENTRY = struct.Struct("<HIqqI")
+
+# Postings que junta un bloque de SPIMI antes de volcarse a un archivo temporal
+BLOCK_POSTINGS = 1_000_000
+# La cola se funde con el segmento cuando pasa de max(MERGE_RECORDS, documentos / MERGE_RATIO)
+MERGE_RECORDS = 4096
+MERGE_RATIO = 16
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+")
+_QUERY = re.compile(r"\(|\)|[^\s()]+")
+
+
+# ---------------------------
+# Texto
+# ---------------------------
+def tokenize(text):
+    """
+    Términos del texto: palabras en minúsculas y sin tildes.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text)
+
+
+def parse_query(text):
+    """
+    Consulta de MATCH: términos unidos por AND / OR, con paréntesis. Dos
+    términos seguidos sin operador van con AND. Devuelve el árbol
+    ("term", t) | ("and", [nodos]) | ("or", [nodos]), o None si no hay términos.
+    """
+    tokens = _QUERY.findall(text or "")
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def expr():
+        nodes = [conjunction()]
+        while peek() is not None and peek().upper() == "OR":
+            advance()
+            nodes.append(conjunction())
+        return _group("or", nodes)
+
+    def conjunction():
+        nodes = [primary()]
+        while peek() is not None and peek() != ")" and peek().upper() != "OR":
+            if peek().upper() == "AND":
+                advance()
+            nodes.append(primary())
+        return _group("and", nodes)
+
+    def primary():
+        token = advance()
+        if token is None:
+            raise ValueError("Consulta de MATCH incompleta")
+        if token == "(":
+            node = expr()
+            if advance() != ")":
+                raise ValueError("Falta ')' en la consulta de MATCH")
+            return node
+        if token == ")" or token.upper() in ("AND", "OR"):
+            raise ValueError(f"Token inesperado en la consulta de MATCH: {token}")
+        # "e-mail" son dos términos y los dos tienen que estar
+        return _group("and", [("term", t) for t in tokenize(token)])
+
+    def advance():
+        nonlocal pos
+        token = peek()
+        pos += 1
+        return token
+
+    if not tokens:
+        return None
+    node = expr()
+    if pos < len(tokens):
+        raise ValueError(f"Token inesperado en la consulta de MATCH: {tokens[pos]}")
+    return node
+
+
+def _group(kind, nodes):
+    # Las palabras que no dejan términos ("!!") no cuentan
+    nodes = [n for n in nodes if n is not None]
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else (kind, nodes)
+
+
+def query_terms(node):
+    if node is None:
+        return set()
+    if node[0] == "term":
+        return {node[1]}
+    return set().union(*(query_terms(child) for child in node[1]))
+
+
+def compile_query(text):
+    """
+    Función valor -> bool que dice si el texto cumple la consulta (para
+    evaluar MATCH fila por fila, sin índice).
+    """
+    node = parse_query(text)
+    if node is None:
+        return lambda value: False
+
+    def holds(node, terms):
+        if node[0] == "term":
+            return node[1] in terms
+        if node[0] == "and":
+            return all(holds(child, terms) for child in node[1])
+        return any(holds(child, terms) for child in node[1])
+
+    return lambda value: holds(node, set(tokenize(value)))
+
+
+# ---------------------------
+# Postings: (delta del offset, frecuencia, largo del documento) en varint
+# ---------------------------
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_postings(postings, out=None, previous=0):
+    """
+    postings: [(offset, tf, largo)] ordenados por offset. Cada offset se
+    guarda como diferencia con el anterior (el primero, con previous).
+    """
+    out = bytearray() if out is None else out
+    for offset, tf, length in postings:
+        encode_varint(offset - previous, out)
+        encode_varint(tf, out)
+        encode_varint(length, out)
+        previous = offset
+    return out
+
+
+def decode_postings(data):
+    """
+    Lo inverso de encode_postings: (offsets, frecuencias, largos).
+    """
+    values = []
+    value = shift = 0
+    for byte in data:
+        if byte < 0x80:
+            values.append(value | (byte << shift))
+            value = shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    return list(accumulate(values[0::3])), values[1::3], values[2::3]
+
+
+def bm25(tf, length, df, docs, avg_length):
+    idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+    return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+# ---------------------------
+# Archivos de SPIMI y segmentos
+# ---------------------------
+def _write_run_entry(f, term, postings_bytes, count, first, last):
+    raw = term.encode("utf-8")
+    f.write(RUN_ENTRY.pack(len(raw), count, first, last, len(postings_bytes)))
+    f.write(raw)
+    f.write(postings_bytes)
+
+
+def _read_run(path, run_no):
+    """
+    Genera (término, n.º de bloque, cantidad, primer offset, último offset, bytes)
+    de un bloque volcado por SPIMI, leyéndolo de a una entrada.
+    """
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(RUN_ENTRY.size)
+            if len(head) < RUN_ENTRY.size:
+                return
+            term_size, count, first, last, size = RUN_ENTRY.unpack(head)
+            term = f.read(term_size).decode("utf-8")
+            yield term, run_no, count, first, last, f.read(size)
+
+
+def _concat(parts):
+    """
+    Une las listas de un término que vienen de varios bloques. Si los
+    bloques están en orden de offset (como sale del recorrido del .dat)
+    basta con reescribir el primer delta de cada uno; si no, se decodifica
+    todo y se ordena.
+    """
+    if len(parts) == 1:
+        _, _, count, _, _, data = parts[0]
+        return count, data
+    if all(parts[i][3] > parts[i - 1][4] for i in range(1, len(parts))):
+        out = bytearray(parts[0][5])
+        for i in range(1, len(parts)):
+            data = parts[i][5]
+            _, pos = _read_varint(data, 0)
+            encode_varint(parts[i][3] - parts[i - 1][4], out)
+            out += data[pos:]
+        return sum(p[2] for p in parts), out
+    postings = []
+    for part in parts:
+        offsets, tfs, lengths = decode_postings(part[5])
+        postings.extend(zip(offsets, tfs, lengths))
+    postings.sort()
+    return len(postings), encode_postings(postings)
+
+
+class _SegmentWriter:
+    """
+    Escribe un segmento: las listas de postings una tras otra y al final
+    el diccionario ordenado (término, df, posición, largo en bytes).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "wb")
+        self.f.write(bytes(SEGMENT.size))
+        self.position = SEGMENT.size
+        self.dictionary = bytearray()
+        self.terms = 0
+
+    def add(self, term, df, postings_bytes):
+        raw = term.encode("utf-8")
+        encode_varint(len(raw), self.dictionary)
+        self.dictionary += raw
+        encode_varint(df, self.dictionary)
+        encode_varint(self.position, self.dictionary)
+        encode_varint(len(postings_bytes), self.dictionary)
+        self.f.write(postings_bytes)
+        self.position += len(postings_bytes)
+        self.terms += 1
+
+    def close(self, docs, total_length):
+        self.f.write(self.dictionary)
+        self.f.seek(0)
+        self.f.write(SEGMENT.pack(SEGMENT_MAGIC, self.terms, docs, total_length, self.position))
+        self.f.flush()
+        # Durable antes de que la meta lo active
+        os.fsync(self.f.fileno())
+        self.f.close()
+
+
+class FullTextIndex:
+    """
+    Índice invertido sobre una columna VARCHAR: término -> postings
+    (offset en el .dat, frecuencia en el registro, largo del registro).
+    Responde MATCH(col, 'consulta') con AND / OR y ordena por BM25.
+
+    Se guarda en un segmento inmutable (<base>.fta o <base>.ftb) con las
+    listas comprimidas (deltas de offset en varint) y el diccionario al
+    final, más una cola (<base>.ftt) con los registros agregados y borrados
+    desde que se escribió. La cola se lee entera a memoria al abrir; cuando
+    crece se funde con el segmento en el otro archivo y la meta (<base>.ftm)
+    pasa a apuntar a ese en el mismo commit del WAL que vacía la cola.
+    El diccionario del segmento se carga en el primer MATCH.
+
+    La construcción en bloque es SPIMI: cada bloque de BLOCK_POSTINGS se
+    invierte en memoria y se vuelca ordenado por término a un archivo
+    temporal; al final los bloques se mezclan en el segmento.
+    """
+
+    def __init__(self, file_name, key_type, wal=None):
+        if not key_type.startswith("VARCHAR"):
+            raise ValueError("El índice fulltext es solo para columnas VARCHAR")
+        self.base = file_name
+        self.wal = wal
+        self.meta_file = f"{file_name}.ftm"
+        self.tail_file = f"{file_name}.ftt"
+        self.terms_read = 0     # listas de postings leídas del segmento
+        self.bytes_read = 0
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._meta_dirty = False
+        self._reset_tail = False
+
+        if os.path.exists(self.meta_file) and os.path.getsize(self.meta_file) >= META.size:
+            with open(self.meta_file, "rb") as f:
+                magic, self.active = META.unpack(f.read(META.size))
+            if magic != META_MAGIC:
+                raise ValueError(f"{self.meta_file} no es un índice fulltext")
+        else:
+            self.active = NO_SEGMENT
+            self._meta_dirty = True
+        self._open_segment()
+        self._load_tail()
+        if self._meta_dirty:
+            self.flush()
+
+    # ---------------------------
+    # Estado en disco
+    # ---------------------------
+    def _segment_path(self, slot):
+        return self.base + SEGMENT_EXTENSIONS[slot]
+
+    def _open_segment(self):
+        self.dictionary = None
+        self.segment_docs = self.segment_length = 0
+        if self.active == NO_SEGMENT:
+            return
+        with open(self._segment_path(self.active), "rb") as f:
+            magic, self.segment_terms, self.segment_docs, self.segment_length, self.dict_start = \
+                SEGMENT.unpack(f.read(SEGMENT.size))
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{self._segment_path(self.active)} no es un segmento fulltext")
+
+    def _load_dictionary(self):
+        # término -> (df, posición, largo)
+        if self.dictionary is not None:
+            return self.dictionary
+        self.dictionary = {}
+        if self.active == NO_SEGMENT:
+            return self.dictionary
+        with open(self._segment_path(self.active), "rb") as f:
+            f.seek(self.dict_start)
+            data = f.read()
+        pos = 0
+        for _ in range(self.segment_terms):
+            size, pos = _read_varint(data, pos)
+            term = data[pos:pos + size].decode("utf-8")
+            pos += size
+            df, pos = _read_varint(data, pos)
+            start, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            self.dictionary[term] = (df, start, length)
+        return self.dictionary
+
+    def _segment_postings(self, term):
+        entry = self._load_dictionary().get(term)
+        if entry is None:
+            return [], [], []
+        _, start, length = entry
+        with open(self._segment_path(self.active), "rb") as f:
+            f.seek(start)
+            data = f.read(length)
+        self.terms_read += 1
+        self.bytes_read += len(data)
+        return decode_postings(data)
+
+    def _load_tail(self):
+        """
+        Rehace en memoria lo que dice la cola: documentos nuevos (con sus
+        términos) y offsets del segmento que ya no valen.
+        """
+        self._reset_memory()
+        if not os.path.exists(self.tail_file):
+            return
+        with open(self.tail_file, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + TAIL.size <= len(data):
+            op, offset, size = TAIL.unpack_from(data, pos)
+            end = pos + TAIL.size + size
+            if end > len(data):
+                break
+            text = data[pos + TAIL.size:end].decode("utf-8")
+            if op == ADD:
+                self._add_memory(text, offset)
+            else:
+                self._remove_memory(text, offset)
+            pos = end
+            self.tail_records += 1
+        self.tail_size = pos
+
+    def _reset_memory(self):
+        self.added = {}          # término -> {offset: tf}
+        self.added_length = {}   # offset -> largo, de los documentos de la cola
+        self.removed = {}        # offset del segmento -> largo
+        self.removed_df = Counter()
+        self.tail_records = 0
+        self.tail_size = 0
+
+    def _add_memory(self, text, offset):
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.added.setdefault(term, {})[offset] = tf
+        self.added_length[offset] = sum(counts.values())
+
+    def _remove_memory(self, text, offset):
+        counts = Counter(tokenize(text))
+        if offset in self.added_length:
+            for term in counts:
+                postings = self.added.get(term)
+                if postings is not None:
+                    postings.pop(offset, None)
+                    if not postings:
+                        del self.added[term]
+            del self.added_length[offset]
+        elif offset not in self.removed:
+            self.removed[offset] = sum(counts.values())
+            self.removed_df.update(counts.keys())
+
+    def _log(self, op, text, offset):
+        raw = text.encode("utf-8")
+        self._pending += TAIL.pack(op, offset, len(raw)) + raw
+        self._pending_records += 1
+
+    # ---------------------------
+    # Estadísticas de la colección
+    # ---------------------------
+    def __len__(self):
+        return self.segment_docs - len(self.removed) + len(self.added_length)
+
+    def _total_length(self):
+        return self.segment_length - sum(self.removed.values()) + sum(self.added_length.values())
+
+    def _df(self, term):
+        entry = self._load_dictionary().get(term)
+        df = entry[0] if entry else 0
+        return df - self.removed_df.get(term, 0) + len(self.added.get(term, ()))
+
+    # ---------------------------
+    # Inserción y borrado
+    # ---------------------------
+    def add(self, key, offset):
+        text = str(key)
+        self._add_memory(text, offset)
+        self._log(ADD, text, offset)
+
+    def remove(self, key, offset=None):
+        if offset is None:
+            raise ValueError("El índice fulltext necesita el offset del registro para borrarlo")
+        text = str(key)
+        self._remove_memory(text, offset)
+        self._log(DEL, text, offset)
+        return True
+
+    def flush(self):
+        """
+        Agrega a la cola lo pendiente; si la cola ya es grande, la funde con
+        el segmento. La meta nueva y la cola vacía van en el mismo commit.
+        """
+        if self._pending_records and \
+                self.tail_records + self._pending_records >= max(MERGE_RECORDS, len(self) // MERGE_RATIO):
+            self._merge()
+        ops = []
+        if self._reset_tail:
+            ops.append((TRUNCATE, self.tail_file, 0, b""))
+            self._reset_tail = False
+        elif self._pending:
+            ops.append((WRITE, self.tail_file, self.tail_size, bytes(self._pending)))
+            self.tail_size += len(self._pending)
+            self.tail_records += self._pending_records
+        self._pending = bytearray()
+        self._pending_records = 0
+        if self._meta_dirty:
+            ops.append((REPLACE, self.meta_file, 0, META.pack(META_MAGIC, self.active)))
+            self._meta_dirty = False
+        apply_ops(self.wal, ops)
+
+    def _activate(self, slot):
+        # El segmento ya está en disco: la meta y la cola vacía se escriben en flush
+        self.active = slot
+        self._open_segment()
+        self._reset_memory()
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._meta_dirty = True
+        self._reset_tail = True
+
+    def _spare_slot(self):
+        return 1 if self.active == 0 else 0
+
+    def _merge(self):
+        """
+        Segmento nuevo = segmento actual sin lo borrado + documentos de la
+        cola. Las listas que la cola no toca se copian sin decodificar.
+        """
+        dictionary = self._load_dictionary()
+        slot = self._spare_slot()
+        writer = _SegmentWriter(self._segment_path(slot))
+        segment = open(self._segment_path(self.active), "rb") if dictionary else None
+        try:
+            terms = heapq.merge(dictionary, sorted(self.added))
+            for term, _ in groupby(terms):
+                entry = dictionary.get(term)
+                data = b""
+                if entry is not None:
+                    segment.seek(entry[1])
+                    data = segment.read(entry[2])
+                if term not in self.added and not self.removed_df.get(term):
+                    writer.add(term, entry[0], data)
+                    continue
+                offsets, tfs, lengths = decode_postings(data)
+                postings = [p for p in zip(offsets, tfs, lengths) if p[0] not in self.removed]
+                postings.extend((offset, tf, self.added_length[offset])
+                                for offset, tf in self.added.get(term, {}).items())
+                if postings:
+                    postings.sort()
+                    writer.add(term, len(postings), encode_postings(postings))
+            writer.close(len(self), self._total_length())
+        finally:
+            if segment is not None:
+                segment.close()
+        self._activate(slot)
+
+    # ---------------------------
+    # Construcción en bloque (SPIMI)
+    # ---------------------------
+    def bulk_load(self, entries, count=None):
+        """
+        Reconstruye el índice desde las entradas (texto, offset), en
+        cualquier orden. count no hace falta: los bloques se cortan por
+        cantidad de postings.
+        """
+        tmp_dir = os.path.dirname(self.base) or "."
+        runs = []
+        block, postings = {}, 0
+        docs = total = 0
+        try:
+            for entry in entries:
+                counts = Counter(tokenize(entry[0]))
+                length = sum(counts.values())
+                docs += 1
+                total += length
+                for term, tf in counts.items():
+                    block.setdefault(term, []).append((entry[1], tf, length))
+                postings += len(counts)
+                if postings >= BLOCK_POSTINGS:
+                    runs.append(_spill(block, tmp_dir))
+                    block, postings = {}, 0
+
+            slot = self._spare_slot()
+            writer = _SegmentWriter(self._segment_path(slot))
+            if not runs:
+                # Todo entró en un bloque: va directo al segmento
+                for term in sorted(block):
+                    term_postings = sorted(block[term])
+                    writer.add(term, len(term_postings), encode_postings(term_postings))
+            else:
+                if block:
+                    runs.append(_spill(block, tmp_dir))
+                    block = {}
+                merged = heapq.merge(*(_read_run(path, i) for i, path in enumerate(runs)))
+                for term, parts in groupby(merged, key=itemgetter(0)):
+                    term_count, data = _concat(list(parts))
+                    writer.add(term, term_count, data)
+            writer.close(docs, total)
+        finally:
+            for path in runs:
+                os.remove(path)
+        self._activate(slot)
+
+    # ---------------------------
+    # Búsqueda
+    # ---------------------------
+    def _postings(self, term):
+        """
+        {offset: (tf, largo)} vigentes del término (segmento + cola).
+        """
+        offsets, tfs, lengths = self._segment_postings(term)
+        postings = dict(zip(offsets, zip(tfs, lengths)))
+        if self.removed_df.get(term):
+            postings = {o: p for o, p in postings.items() if o not in self.removed}
+        for offset, tf in self.added.get(term, {}).items():
+            postings[offset] = (tf, self.added_length[offset])
+        return postings
+
+    def match_scores(self, query):
+        """
+        [(offset, puntaje BM25)] de los registros que cumplen la consulta,
+        de mayor a menor puntaje.
+        """
+        node = parse_query(query)
+        if node is None:
+            return []
+        postings = {term: self._postings(term) for term in query_terms(node)}
+        matched = _evaluate(node, postings)
+        docs = len(self)
+        avg_length = self._total_length() / docs if docs else 0
+        scores = dict.fromkeys(matched, 0.0)
+        for term_postings in postings.values():
+            df = len(term_postings)
+            for offset in (matched if len(matched) < df else term_postings):
+                if offset in scores and offset in term_postings:
+                    tf, length = term_postings[offset]
+                    scores[offset] += bm25(tf, length, df, docs, avg_length)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def match(self, query):
+        return [offset for offset, _ in self.match_scores(query)]
+
+    def estimate(self, query):
+        """
+        Registros que se espera que cumplan la consulta, solo con el
+        diccionario (sin leer postings): para el planner.
+        """
+        def rows(node):
+            if node[0] == "term":
+                return max(0, self._df(node[1]))
+            counts = [rows(child) for child in node[1]]
+            return min(counts) if node[0] == "and" else min(len(self), sum(counts))
+        node = parse_query(query)
+        return 0 if node is None else rows(node)
+
+    def search(self, key):
+        raise ValueError("El índice fulltext solo responde MATCH")
+
+    def range_search(self, low=None, high=None):
+        raise ValueError("El índice fulltext solo responde MATCH")
+
+    def io_counters(self):
+        return {"postings_read": self.terms_read, "bytes_read": self.bytes_read}
+
+    def height(self):
+        # Diccionario en memoria: una lectura por término de la consulta
+        return 1
+
+
+def _evaluate(node, postings):
+    # Offsets que cumplen el árbol de la consulta
+    if node[0] == "term":
+        return set(postings[node[1]])
+    parts = sorted((_evaluate(child, postings) for child in node[1]), key=len)
+    if node[0] == "and":
+        return parts[0].intersection(*parts[1:])
+    return parts[0].union(*parts[1:])
+
+
+def _spill(block, tmp_dir):
+    """
+    Vuelca un bloque de SPIMI ordenado por término a un archivo temporal.
+    """
+    fd, path = tempfile.mkstemp(prefix="spimi_", suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, "wb", buffering=1024 * 1024) as f:
+        for term in sorted(block):
+            postings = sorted(block[term])
+            _write_run_entry(f, term, encode_postings(postings), len(postings),
+                             postings[0][0], postings[-1][0])
+    return path
@@ -0,0 +1,72 @@
+# dbms/index_entry.py
+import struct
+
+from src.record import RecordSchema
+
+OFFSET = struct.Struct("<q")
+
+
+class EntryCodec:
+    """
+    Empaqueta entradas (clave, offset) de un índice secundario.
+    La clave usa el mismo formato binario que la columna indexada.
+
+    Con include (lista de (nombre, tipo)) las entradas de las hojas llevan
+    además una copia de esas columnas: (clave, offset, valores). Así el
+    índice puede responder una consulta sin leer el .dat (índice cubriente).
+    """
+
+    def __init__(self, key_type, include=None):
+        self.key_type = key_type.upper()
+        self.key_schema = RecordSchema([{"name": "key", "type": self.key_type}])
+        self.key_size = self.key_schema.size
+        self.size = self.key_size + OFFSET.size
+
+        self.include = [name for name, _ in include or []]
+        self.include_schema = None
+        self.entry_size = self.size
+        if self.include:
+            self.include_schema = RecordSchema([{"name": n, "type": t} for n, t in include])
+            self.entry_size += self.include_schema.size
+
+    def coerce(self, key):
+        return self.key_schema.coerce("key", key)
+
+    def pack_key(self, key):
+        return self.key_schema.pack([key])
+
+    def unpack_key(self, data, pos=0):
+        return self.key_schema.unpack(data[pos:pos + self.key_size])["key"]
+
+    def pack(self, key, offset):
+        return self.key_schema.pack([key]) + OFFSET.pack(offset)
+
+    def unpack(self, data, pos=0):
+        key = self.key_schema.unpack(data[pos:pos + self.key_size])["key"]
+        return key, OFFSET.unpack_from(data, pos + self.key_size)[0]
+
+    # ---------------------------
+    # Entradas con columnas incluidas
+    # ---------------------------
+    def make_entry(self, key, offset, values=None):
+        if not self.include_schema:
+            return (key, offset)
+        values = list(values or ())
+        values += [None] * (len(self.include) - len(values))
+        # Ida y vuelta por el formato binario: se guarda lo mismo que en el .dat
+        decoded = self.include_schema.unpack(self.include_schema.pack(values))
+        return (key, offset, tuple(decoded[n] for n in self.include))
+
+    def pack_entry(self, entry):
+        data = self.pack(entry[0], entry[1])
+        if self.include_schema:
+            data += self.include_schema.pack(list(entry[2]))
+        return data
+
+    def unpack_entry(self, data, pos=0):
+        key, offset = self.unpack(data, pos)
+        if not self.include_schema:
+            return key, offset
+        start = pos + self.size
+        values = self.include_schema.unpack(data[start:start + self.include_schema.size])
+        return key, offset, tuple(values[n] for n in self.include)
@@ -1,4 +1,294 @@
-# Clase base vacía temporal para evitar errores de importación
+# dbms/isam.py
+import struct
+from bisect import bisect_right, insort
+from itertools import islice
+
+from src.dbms.bloom import BloomFilter, DEFAULT_FPR
+from src.dbms.index_entry import EntryCodec
+from src.dbms.pager import Pager, PAGE_SIZE, sum_counters
+from src.dbms.wal import apply_ops
+
+# Página 0 del índice: magic | raíz | niveles | páginas de datos | entradas | páginas de overflow
+META = struct.Struct("<4siiiii")
+MAGIC = b"ISM1"
+# Página de índice: cantidad de separadores
+INDEX_NODE = struct.Struct("<H")
+CHILD = struct.Struct("<i")
+# Página de datos: cantidad | siguiente overflow | tiene cota inferior
+DATA_PAGE = struct.Struct("<iiB")
+
+# Espacio que se deja libre en cada página al construir, para absorber inserciones
+FILL_FACTOR = 0.75
+
+
 class ISAMIndex:
-	def __init__(self, *args, **kwargs):
-		pass
+    """
+    Índice secundario ISAM: clave -> offsets en el .dat.
+
+    El índice es estático (varios niveles de páginas construidos de abajo
+    hacia arriba sobre las páginas de datos ordenadas). Las inserciones
+    posteriores van a la página de datos que corresponde o a su cadena de
+    overflow. Cuando hay más páginas de overflow que de datos, se reorganiza.
+    Un filtro de Bloom (<base>.bloom) evita bajar por el índice y recorrer
+    las cadenas de overflow cuando la clave no existe.
+    """
+
+    def __init__(self, file_name, key_type, wal=None, bloom_fpr=DEFAULT_FPR):
+        """
+        file_name: ruta base del índice (.isam para datos, .isx para el índice)
+        key_type: tipo de la columna indexada
+        bloom_fpr: tasa de falsos positivos del filtro de Bloom
+        """
+        self.codec = EntryCodec(key_type)
+        self.wal = wal
+        self.bloom_file = f"{file_name}.bloom"
+        self.bloom_fpr = bloom_fpr
+        self.bloom_skips = 0  # búsquedas resueltas solo con el filtro
+        self.data = Pager(f"{file_name}.isam", wal=wal)
+        self.index = Pager(f"{file_name}.isx", wal=wal)
+        self.data_capacity = (PAGE_SIZE - DATA_PAGE.size - self.codec.size) // self.codec.size
+        self.index_capacity = (PAGE_SIZE - INDEX_NODE.size - CHILD.size) // (self.codec.size + CHILD.size)
+
+        if self.index.num_pages == 0:
+            self.build([])
+            self.flush()
+        else:
+            magic, self.root, self.levels, self.data_pages, self.count, self.overflow_pages = \
+                META.unpack_from(self.index.read(0))
+            if magic != MAGIC:
+                raise ValueError(f"{self.index.filename} no es un índice ISAM")
+            # Índices creados antes del filtro (o filtro perdido): se arma desde los datos
+            self.bloom = BloomFilter.load(self.bloom_file, bloom_fpr) or \
+                BloomFilter.build((k for k, _ in self._all_entries()), fpr=bloom_fpr)
+
+    # ---------------------------
+    # Páginas
+    # ---------------------------
+    def _read_data(self, page_no):
+        data = self.data.read(page_no)
+        n, next_page, has_fence = DATA_PAGE.unpack_from(data)
+        pos = DATA_PAGE.size
+        fence = self.codec.unpack(data, pos) if has_fence else None
+        pos += self.codec.size
+        entries = []
+        for _ in range(n):
+            entries.append(self.codec.unpack(data, pos))
+            pos += self.codec.size
+        return fence, entries, next_page
+
+    def _write_data(self, page_no, fence, entries, next_page=-1):
+        parts = [DATA_PAGE.pack(len(entries), next_page, fence is not None)]
+        parts.append(self.codec.pack(*fence) if fence is not None else b"\x00" * self.codec.size)
+        parts.extend(self.codec.pack(k, o) for k, o in entries)
+        self.data.write(page_no, b"".join(parts))
+
+    def _read_index(self, page_no):
+        data = self.index.read(page_no)
+        (n,) = INDEX_NODE.unpack_from(data)
+        pos = INDEX_NODE.size
+        entries = []
+        for _ in range(n):
+            entries.append(self.codec.unpack(data, pos))
+            pos += self.codec.size
+        children = [CHILD.unpack_from(data, pos + i * CHILD.size)[0] for i in range(n + 1)]
+        return entries, children
+
+    def _write_index(self, page_no, entries, children):
+        parts = [INDEX_NODE.pack(len(entries))]
+        parts.extend(self.codec.pack(k, o) for k, o in entries)
+        parts.extend(CHILD.pack(c) for c in children)
+        self.index.write(page_no, b"".join(parts))
+
+    def _write_meta(self):
+        self.index.write(0, META.pack(MAGIC, self.root, self.levels, self.data_pages,
+                                      self.count, self.overflow_pages))
+
+    # ---------------------------
+    # Construcción
+    # ---------------------------
+    def build(self, entries, count=None):
+        """
+        Construye el ISAM desde cero con entradas (clave, offset) ordenadas.
+        entries puede ser un iterador (ej. la salida de un ordenamiento
+        externo); en ese caso count dimensiona el filtro de Bloom.
+        """
+        self.data.truncate()
+        self.index.truncate()
+        if count is None:
+            entries = list(entries)
+            count = len(entries)
+        # El filtro se rehace con las claves actuales (olvida las borradas)
+        self.bloom = BloomFilter(2 * count, self.bloom_fpr)
+
+        per_page = max(1, int(self.data_capacity * FILL_FACTOR))
+        entries = iter(entries)
+        items = []
+        while True:
+            chunk = list(islice(entries, per_page))
+            if not chunk and items:
+                break
+            fence = chunk[0] if items else None
+            page_no = self.data.allocate()
+            self._write_data(page_no, fence, chunk)
+            items.append((fence, page_no))
+            for key in dict.fromkeys(k for k, _ in chunk):
+                self.bloom.add(key)
+        self.data_pages = len(items)
+
+        self.index.allocate()  # página 0: meta
+        self.levels = 0
+        fan_out = self.index_capacity + 1
+        while True:
+            next_items = []
+            for i in range(0, len(items), fan_out):
+                group = items[i:i + fan_out]
+                page_no = self.index.allocate()
+                self._write_index(page_no, [f for f, _ in group[1:]], [p for _, p in group])
+                next_items.append((group[0][0], page_no))
+            items = next_items
+            self.levels += 1
+            if len(items) == 1:
+                break
+
+        self.root = items[0][1]
+        self.count = count
+        self.overflow_pages = 0
+        self._write_meta()
+
+    def bulk_load(self, entries, count=None):
+        """
+        Construcción en bloque desde entradas ordenadas (ver build).
+        """
+        self.build(entries, count)
+
+    def reorganize(self):
+        """
+        Reconstruye el índice con todas las entradas (incluido el overflow).
+        """
+        self.build(sorted(self._all_entries()))
+
+    def _all_entries(self):
+        for page_no in range(self.data_pages):
+            for _, chain_entries, _ in self._chain(page_no):
+                yield from chain_entries
+
+    # ---------------------------
+    # Navegación
+    # ---------------------------
+    def _find_page(self, entry):
+        page_no = self.root
+        for _ in range(self.levels):
+            separators, children = self._read_index(page_no)
+            page_no = children[bisect_right(separators, entry)]
+        return page_no
+
+    def _chain(self, page_no):
+        while page_no != -1:
+            fence, entries, next_page = self._read_data(page_no)
+            yield page_no, entries, next_page
+            page_no = next_page
+
+    # ---------------------------
+    # Operaciones
+    # ---------------------------
+    def add(self, key, offset):
+        entry = (self.codec.coerce(key), offset)
+        page_no = self._find_page(entry)
+        fence, entries, next_page = self._read_data(page_no)
+        self.count += 1
+
+        if len(entries) < self.data_capacity:
+            insort(entries, entry)
+            self._write_data(page_no, fence, entries, next_page)
+        else:
+            self._add_overflow(page_no, fence, entries, next_page, entry)
+
+        if self.overflow_pages > self.data_pages:
+            self.reorganize()
+        else:
+            self._write_meta()
+            self.bloom.add(entry[0])
+            if self.bloom.full():
+                self.bloom = BloomFilter.build((k for k, _ in self._all_entries()), fpr=self.bloom_fpr)
+
+    def _add_overflow(self, page_no, fence, entries, next_page, entry):
+        last_page, last = page_no, (fence, entries)
+        current = next_page
+        while current != -1:
+            ofence, oentries, onext = self._read_data(current)
+            if len(oentries) < self.data_capacity:
+                oentries.append(entry)
+                self._write_data(current, ofence, oentries, onext)
+                return
+            last_page, last, current = current, (ofence, oentries), onext
+
+        new_page = self.data.allocate()
+        self._write_data(new_page, None, [entry])
+        self._write_data(last_page, last[0], last[1], new_page)
+        self.overflow_pages += 1
+
+    def search(self, key):
+        key = self.codec.coerce(key)
+        if key not in self.bloom:
+            self.bloom_skips += 1
+            return []
+        page_no = self._find_page((key, -1))
+        results = []
+        # Una clave repetida puede ocupar varias páginas de datos seguidas
+        for current in range(page_no, self.data_pages):
+            fence, _, _ = self._read_data(current)
+            if current != page_no and fence is not None and fence[0] > key:
+                break
+            results.extend(o for _, entries, _ in self._chain(current) for k, o in entries if k == key)
+        return results
+
+    def range_search(self, low=None, high=None):
+        low = None if low is None else self.codec.coerce(low)
+        high = None if high is None else self.codec.coerce(high)
+        page_no = 0 if low is None else self._find_page((low, -1))
+
+        results = []
+        for current in range(page_no, self.data_pages):
+            fence, _, _ = self._read_data(current)
+            if high is not None and fence is not None and fence[0] > high:
+                break
+            for _, entries, _ in self._chain(current):
+                results.extend((k, o) for k, o in entries
+                               if (low is None or k >= low) and (high is None or k <= high))
+        results.sort()
+        return [o for _, o in results]
+
+    def remove(self, key, offset=None):
+        key = self.codec.coerce(key)
+        if key not in self.bloom:
+            return False
+        page_no = self._find_page((key, -1))
+        removed = 0
+        # Las entradas de una clave pueden seguir en las páginas siguientes
+        for current in range(page_no, self.data_pages):
+            fence, _, _ = self._read_data(current)
+            if current != page_no and fence is not None and fence[0] > key:
+                break
+            for chain_page, entries, next_page in list(self._chain(current)):
+                kept = [(k, o) for k, o in entries if not (k == key and (offset is None or o == offset))]
+                if len(kept) != len(entries):
+                    removed += len(entries) - len(kept)
+                    chain_fence = fence if chain_page == current else None
+                    self._write_data(chain_page, chain_fence, kept, next_page)
+        if removed:
+            self.count -= removed
+            self._write_meta()
+        return bool(removed)
+
+    def height(self):
+        return self.levels + 1
+
+    def io_counters(self):
+        return sum_counters(self.data.counters(), self.index.counters(), {"bloom_skips": self.bloom_skips})
+
+    def flush(self):
+        # Datos, índice y filtro en un solo commit
+        apply_ops(self.wal, self.data.collect() + self.index.collect() + self.bloom.collect(self.bloom_file))
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,164 @@
+# dbms/locks.py
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # sin fcntl (Windows) solo se coordinan los hilos de un proceso
+    fcntl = None
+
+# Contador que guarda cada archivo de lock (stamp de cambios, siguiente txid...)
+VALUE = struct.Struct("<Q")
+
+
+class FileLock:
+    """
+    Lock entre procesos (flock) sobre un archivo chico que además guarda un
+    contador de 8 bytes. flock no distingue hilos de un mismo proceso (todos
+    comparten el descriptor), así que exclusive() los excluye con un lock propio.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mutex = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def lock(self, shared=False):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    def unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        with self._mutex:
+            self.lock()
+            try:
+                yield self
+            finally:
+                self.unlock()
+
+    def read_value(self):
+        data = os.pread(self._fd, VALUE.size, 0)
+        return VALUE.unpack(data)[0] if len(data) == VALUE.size else 0
+
+    def write_value(self, value):
+        # Sin fsync: el contador solo coordina procesos vivos
+        os.pwrite(self._fd, VALUE.pack(value), 0)
+
+
+class TableLock:
+    """
+    Lock de una tabla: reentrante entre hilos y exclusivo entre procesos.
+    El archivo (<tabla>.lock) cuenta las escrituras: si al tomarlo el
+    contador no es el que dejó este proceso, otro proceso escribió la tabla
+    y se llama a on_stale para descartar lo que hay en memoria (fin del .dat,
+    mapa de zonas, páginas de los índices).
+    """
+
+    def __init__(self, path, on_stale=None):
+        self.file = FileLock(path)
+        self.on_stale = on_stale
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._modified = False
+        self.seen = self.file.read_value()
+
+    def __enter__(self):
+        self._rlock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            self.file.lock()
+            stamp = self.file.read_value()
+            if stamp != self.seen:
+                self.seen = stamp
+                if self.on_stale is not None:
+                    self.on_stale()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self._depth == 1:
+                if self._modified:
+                    self.seen += 1
+                    self.file.write_value(self.seen)
+                    self._modified = False
+                self.file.unlock()
+        finally:
+            self._depth -= 1
+            self._rlock.release()
+
+    def modified(self):
+        """
+        La escribe quien tiene el lock: al soltarlo se avisa a los demás procesos.
+        """
+        self._modified = True
+
+
+class Slots:
+    """
+    Una ranura de 8 bytes por proceso en un archivo compartido. Cada proceso
+    toma la suya con un lock de rango (fcntl.lockf) que el sistema suelta si
+    el proceso muere: una ranura con lock es de un proceso vivo.
+    """
+
+    def __init__(self, path, count=256):
+        self.path = path
+        self.count = count
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.slot = self._claim()
+        self.write(0)
+
+    def _claim(self):
+        if fcntl is None:
+            return 0
+        for i in range(self.count):
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, VALUE.size, i * VALUE.size)
+            except OSError:
+                continue
+            return i
+        raise RuntimeError(f"No quedan ranuras libres en {self.path}")
+
+    def write(self, value):
+        os.pwrite(self._fd, VALUE.pack(value), self.slot * VALUE.size)
+
+    def others(self):
+        """
+        Valores de las ranuras de los demás procesos vivos.
+        """
+        if fcntl is None:
+            return []
+        values = []
+        for i in range(self.count):
+            if i == self.slot:
+                continue
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_SH | fcntl.LOCK_NB, VALUE.size, i * VALUE.size)
+            except OSError:
+                data = os.pread(self._fd, VALUE.size, i * VALUE.size)
+                values.append(VALUE.unpack(data)[0] if len(data) == VALUE.size else 0)
+                continue
+            # Libre: nadie la usa (el lock de prueba se suelta enseguida)
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, VALUE.size, i * VALUE.size)
+        return values
+
+    def alone(self):
+        """
+        True si ningún otro proceso tiene ranura.
+        """
+        if fcntl is None:
+            return True
+        for i in range(self.count):
+            if i == self.slot:
+                continue
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_SH | fcntl.LOCK_NB, VALUE.size, i * VALUE.size)
+            except OSError:
+                return False
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, VALUE.size, i * VALUE.size)
+        return True
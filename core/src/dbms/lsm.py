@@ -0,0 +1,521 @@
+# dbms/lsm.py
+import os
+import glob
+import json
+import uuid
+import heapq
+import struct
+import logging
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from src.dbms.bloom import BloomFilter, DEFAULT_FPR
+from src.dbms.index_entry import EntryCodec
+from src.dbms.prefetch import advise_sequential, spans
+from src.dbms.wal import WRITE, TRUNCATE, REPLACE, apply_ops
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 4096
+# Cada entrada es (clave, offset) seguida de su tipo: alta o marca de borrado
+PUT = 0
+DELETE = 1
+KIND = struct.Struct("<B")
+# Cabecera de un run: magic | entradas | marcas de borrado | entradas por bloque
+RUN = struct.Struct("<4sQQI")
+RUN_MAGIC = b"LSR1"
+
+# Entradas de la memtable a partir de las cuales se vuelca a un run
+MEMTABLE_ENTRIES = 65536
+# Runs por nivel: al juntarse tantos, se mezclan en uno del nivel siguiente
+FANOUT = 4
+# Entradas por bloque; la cerca guarda la primera clave de cada uno
+BLOCK_ENTRIES = 128
+# Bytes que se juntan antes de cada escritura al armar un run
+WRITE_BYTES = 1024 * 1024
+# Hilos que compactan en segundo plano (compartidos por todos los índices)
+COMPACTION_WORKERS = 1
+
+_compactor = None
+
+
+def _executor():
+    global _compactor
+    if _compactor is None:
+        _compactor = ThreadPoolExecutor(max_workers=COMPACTION_WORKERS, thread_name_prefix="lsm-compact")
+    return _compactor
+
+
+def run_files(base):
+    """
+    Runs y filtros de un índice en disco (incluidos los temporales de una compactación a medias).
+    """
+    return glob.glob(glob.escape(base) + ".*.lsr") + glob.glob(glob.escape(base) + ".*.lsb")
+
+
+def _bloom_path(run_path):
+    return run_path[:-len(".lsr")] + ".lsb"
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _tag(entries, age):
+    # age ordena las fuentes de más nueva (0) a más vieja
+    for key, offset, kind in entries:
+        yield key, offset, age, kind
+
+
+def _merged(sources, drop_deletes=False):
+    """
+    Mezcla fuentes ordenadas por (clave, offset), de la más nueva a la más
+    vieja. De cada (clave, offset) vale la versión más nueva; con
+    drop_deletes no se devuelven las marcas de borrado.
+    """
+    last = None
+    for key, offset, _, kind in heapq.merge(*(_tag(src, age) for age, src in enumerate(sources))):
+        if (key, offset) == last:
+            continue
+        last = (key, offset)
+        if drop_deletes and kind == DELETE:
+            continue
+        yield key, offset, kind
+
+
+class _Run:
+    """
+    Run inmutable en disco: entradas ordenadas por (clave, offset) en
+    bloques de BLOCK_ENTRIES, y al final la cerca (primera clave de cada
+    bloque). El filtro de Bloom va aparte (<run>.lsb).
+
+    El descriptor queda abierto mientras alguien use el run: una
+    compactación puede borrar el archivo y las lecturas en curso lo siguen viendo.
+    """
+
+    def __init__(self, run_id, path, codec, bloom_fpr=DEFAULT_FPR):
+        self.id = run_id
+        self.path = path
+        self.codec = codec
+        self.entry_size = codec.size + KIND.size
+        self.fd = os.open(path, os.O_RDONLY)
+        try:
+            magic, self.count, self.deletes, self.block = RUN.unpack(os.pread(self.fd, RUN.size, 0))
+            if magic != RUN_MAGIC:
+                raise ValueError(f"{path} no es un run de índice LSM")
+            self.data_end = RUN.size + self.count * self.entry_size
+            blocks = -(-self.count // self.block)
+            raw = os.pread(self.fd, blocks * codec.key_size, self.data_end)
+            self.fences = [codec.unpack_key(raw, i * codec.key_size) for i in range(blocks)]
+        except BaseException:
+            os.close(self.fd)
+            raise
+        # Sin filtro (perdido o incompleto) siempre se lee el run
+        self.bloom = BloomFilter.load(_bloom_path(path), bloom_fpr)
+
+    def __del__(self):
+        fd = getattr(self, "fd", None)
+        if fd is not None:
+            os.close(fd)
+
+    def may_contain(self, key):
+        return self.bloom is None or key in self.bloom
+
+    def entries(self, low=None, high=None, counters=None):
+        """
+        Genera (clave, offset, tipo) con low <= clave <= high, en orden. La
+        cerca dice desde qué bloque leer: una clave repetida puede empezar
+        en el bloque anterior al de su primera aparición en la cerca.
+        """
+        if not self.count:
+            return
+        first = 0 if low is None else max(0, bisect_left(self.fences, low) - 1)
+        last = len(self.fences) if high is None else bisect_right(self.fences, high)
+        size = self.entry_size
+        start = RUN.size + first * self.block * size
+        end = min(self.data_end, RUN.size + last * self.block * size)
+        if counters is not None:
+            counters["node_visits"] += 1
+        if end - start > PAGE_SIZE:
+            advise_sequential(self.fd, start, end - start)
+        codec = self.codec
+        for offset, length in spans(start, end, size):
+            data = os.pread(self.fd, length, offset)
+            if counters is not None:
+                counters["bytes_read"] += len(data)
+                counters["pages_read"] += -(-len(data) // PAGE_SIZE)
+            for pos in range(0, len(data) - size + 1, size):
+                key, row = codec.unpack(data, pos)
+                if low is not None and key < low:
+                    continue
+                if high is not None and key > high:
+                    return
+                yield key, row, data[pos + codec.size]
+
+
+class LSMIndex:
+    """
+    Índice LSM para tablas con muchas escrituras: las inserciones nunca
+    reescriben datos en su lugar.
+
+    - Memtable: en memoria, ordenada por clave. Lo que se agrega se anota
+      además al final de un log (<base>.lsl), una escritura secuencial por
+      flush(); al abrir el índice se rehace desde el log.
+    - Al pasar de MEMTABLE_ENTRIES se vuelca entera a un run inmutable del
+      nivel 0 (<base>.<id>.lsr) y el log se vacía en el mismo commit que
+      agrega el run al manifiesto (<base>.lsm).
+    - Compactación por niveles escalonados (tiered): cuando un nivel junta
+      FANOUT runs se mezclan en uno del nivel siguiente. Corre en un hilo
+      de fondo; solo el cambio del manifiesto se hace con el lock de la
+      tabla, así las escrituras no esperan la mezcla.
+
+    Un borrado es una marca (tombstone) de (clave, offset) que tapa las
+    versiones más viejas; la compactación las quita al llegar al último
+    nivel. Las búsquedas miran la memtable y luego los runs de más nuevo a
+    más viejo: el filtro de Bloom de cada run evita leerlo en búsquedas
+    puntuales y la cerca lleva directo al bloque de la clave.
+    """
+
+    def __init__(self, file_name, key_type, wal=None, lock=None, bloom_fpr=DEFAULT_FPR):
+        """
+        lock: lock de la tabla; con él la compactación va en segundo plano.
+              Sin él se compacta dentro de flush() (quien escribe ya tiene el lock)
+        """
+        self.base = file_name
+        self.wal = wal
+        self.lock = lock
+        self.bloom_fpr = bloom_fpr
+        self.codec = EntryCodec(key_type)
+        self.entry_size = self.codec.size + KIND.size
+        self.manifest_file = f"{file_name}.lsm"
+        self.log_file = f"{file_name}.lsl"
+        self.runs = {}        # id -> _Run
+        self.levels = []      # ids de los runs de cada nivel, de más viejo a más nuevo
+        self._pending = bytearray()
+        self._compacting = False
+        self.counters = {"pages_read": 0, "bytes_read": 0, "node_visits": 0, "bloom_skips": 0}
+
+        if not os.path.exists(self.manifest_file):
+            apply_ops(wal, [(REPLACE, self.manifest_file, 0, _dump({"next": 1, "levels": []}))])
+        self._load()
+
+    # ---------------------------
+    # Estado en disco
+    # ---------------------------
+    def _run_path(self, run_id):
+        return f"{self.base}.{run_id}.lsr"
+
+    def _read_manifest(self):
+        with open(self.manifest_file, "rb") as f:
+            return f.read()
+
+    def _load(self):
+        """
+        Abre los runs del manifiesto (los que ya estaban abiertos se
+        reusan) y rehace la memtable desde el log.
+        """
+        for attempt in range(3):
+            raw = self._read_manifest()
+            manifest = json.loads(raw)
+            try:
+                runs = {run_id: self.runs.get(run_id) or _Run(run_id, self._run_path(run_id), self.codec,
+                                                              self.bloom_fpr)
+                        for level in manifest["levels"] for run_id in level}
+                break
+            except FileNotFoundError:
+                # Una compactación lo reemplazó entre leer el manifiesto y abrirlo
+                if attempt == 2:
+                    raise
+        self.manifest_raw = raw
+        self.next_id = manifest["next"]
+        self.levels = manifest["levels"]
+        self.runs = runs
+        self._load_log()
+
+    def _load_log(self):
+        self.memtable = {}   # clave -> {offset: tipo}
+        self.keys = []       # claves de la memtable, ordenadas
+        self.mem_entries = 0
+        data = b""
+        if os.path.exists(self.log_file):
+            with open(self.log_file, "rb") as f:
+                data = f.read()
+        size = self.entry_size
+        self.log_size = len(data) - len(data) % size
+        for pos in range(0, self.log_size, size):
+            key, offset = self.codec.unpack(data, pos)
+            self._memtable_put(key, offset, data[pos + self.codec.size])
+
+    def _refresh(self):
+        """
+        Si el manifiesto cambió (compactación de fondo, otro proceso) se
+        vuelve a cargar. Nunca con escrituras pendientes: esas tienen el
+        lock de la tabla y nadie más puede cambiarlo mientras tanto.
+        """
+        if self._pending:
+            return
+        if self._read_manifest() != self.manifest_raw:
+            self._load()
+
+    def _manifest_op(self, levels, next_id):
+        while levels and not levels[-1]:
+            levels.pop()
+        return (REPLACE, self.manifest_file, 0, _dump({"next": next_id, "levels": levels}))
+
+    def _sources(self):
+        # Runs de más nuevo a más viejo: nivel 0 primero y dentro de cada nivel del último al primero
+        runs = self.runs
+        return [runs[run_id] for level in self.levels for run_id in reversed(level)]
+
+    # ---------------------------
+    # Memtable
+    # ---------------------------
+    def _memtable_put(self, key, offset, kind):
+        slot = self.memtable.get(key)
+        if slot is None:
+            slot = self.memtable[key] = {}
+            insort(self.keys, key)
+        if offset not in slot:
+            self.mem_entries += 1
+        slot[offset] = kind
+
+    def _log(self, key, offset, kind):
+        raw = self.codec.pack(key, offset)
+        # En memoria queda la clave tal como se guarda en el run
+        self._memtable_put(self.codec.unpack_key(raw), offset, kind)
+        self._pending += raw + KIND.pack(kind)
+
+    def _memtable_entries(self, low=None, high=None):
+        keys = self.keys
+        start = 0 if low is None else bisect_left(keys, low)
+        end = len(keys) if high is None else bisect_right(keys, high)
+        memtable = self.memtable
+        # Copia ordenada: un escritor puede seguir agregando mientras se lee
+        return [(key, offset, kind) for key in keys[start:end] for offset, kind in sorted(memtable.get(key, {}).items())]
+
+    # ---------------------------
+    # Escrituras
+    # ---------------------------
+    def add(self, key, offset):
+        if not self._pending:
+            self._refresh()
+        self._log(self.codec.coerce(key), offset, PUT)
+
+    def remove(self, key, offset=None):
+        key = self.codec.coerce(key)
+        offsets = [offset] if offset is not None else self.search(key)
+        if not self._pending:
+            self._refresh()
+        for row in offsets:
+            self._log(key, row, DELETE)
+        return bool(offsets)
+
+    def flush(self):
+        """
+        Anota lo pendiente al final del log; si la memtable se llenó, la
+        vuelca a un run del nivel 0. Después, si algún nivel juntó FANOUT
+        runs, se programa su compactación.
+        """
+        if not self._pending:
+            return
+        if self.mem_entries >= MEMTABLE_ENTRIES:
+            self._flush_memtable()
+        else:
+            apply_ops(self.wal, [(WRITE, self.log_file, self.log_size, bytes(self._pending))])
+            self.log_size += len(self._pending)
+            self._pending = bytearray()
+        self._schedule_compaction()
+
+    def _flush_memtable(self):
+        run_id = self.next_id
+        path = self._run_path(run_id)
+        self._write_run(path, self._memtable_entries(), self.mem_entries)
+        levels = [list(level) for level in self.levels] or [[]]
+        levels[0].append(run_id)
+        # El run ya está en disco: manifiesto y log vacío van en un solo commit
+        apply_ops(self.wal, [self._manifest_op(levels, run_id + 1), (TRUNCATE, self.log_file, 0, b"")])
+        self._pending = bytearray()
+        self._load()
+
+    def _write_run(self, path, entries, capacity):
+        """
+        Escribe un run con entradas (clave, offset, tipo) ordenadas, de una
+        pasada y con escrituras grandes, y lo deja durable (con su filtro)
+        antes de que el manifiesto lo nombre. Devuelve cuántas escribió.
+        """
+        codec = self.codec
+        bloom = BloomFilter(capacity, self.bloom_fpr)
+        fences = bytearray()
+        buffer = bytearray()
+        count = deletes = 0
+        last = None
+        with open(path, "wb") as f:
+            f.write(bytes(RUN.size))
+            for key, offset, kind in entries:
+                if count % BLOCK_ENTRIES == 0:
+                    fences += codec.pack_key(key)
+                buffer += codec.pack(key, offset)
+                buffer.append(kind)
+                if key != last:
+                    bloom.add(key)
+                    last = key
+                count += 1
+                deletes += kind == DELETE
+                if len(buffer) >= WRITE_BYTES:
+                    f.write(buffer)
+                    buffer.clear()
+            f.write(buffer)
+            f.write(fences)
+            f.seek(0)
+            f.write(RUN.pack(RUN_MAGIC, count, deletes, BLOCK_ENTRIES))
+            f.flush()
+            os.fsync(f.fileno())
+        bloom_path = _bloom_path(path)
+        apply_ops(None, bloom.collect(bloom_path))
+        fd = os.open(bloom_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return count
+
+    # ---------------------------
+    # Compactación
+    # ---------------------------
+    def _schedule_compaction(self):
+        if self._compacting:
+            return
+        for level, ids in enumerate(self.levels):
+            if len(ids) >= FANOUT:
+                break
+        else:
+            return
+        inputs = [self.runs[run_id] for run_id in ids]
+        # Las marcas de borrado se pueden quitar si no hay nada más viejo debajo
+        bottom = not any(self.levels[level + 1:])
+        self._compacting = True
+        if self.lock is None:
+            self._compact(level, inputs, bottom)
+        else:
+            _executor().submit(self._compact, level, inputs, bottom)
+
+    def _compact(self, level, inputs, bottom):
+        """
+        Mezcla los runs de un nivel en un run nuevo (temporal) sin tomar
+        ningún lock: son inmutables. Solo el cambio de manifiesto necesita el
+        lock de la tabla.
+        """
+        tmp = f"{self.base}.{uuid.uuid4().hex}.lsr"
+        try:
+            entries = _merged([run.entries() for run in reversed(inputs)], drop_deletes=bottom)
+            count = self._write_run(tmp, entries, sum(run.count for run in inputs))
+            self._install(level, [run.id for run in inputs], tmp, count)
+        except Exception:
+            logger.exception("Falló la compactación del nivel %d de %s", level, self.base)
+        finally:
+            for path in (tmp, _bloom_path(tmp)):
+                _remove(path)
+            self._compacting = False
+
+    def _install(self, level, input_ids, tmp, count):
+        with self.lock if self.lock is not None else nullcontext():
+            # Con el lock, el manifiesto en disco es el vigente (de este proceso o de otro)
+            manifest = json.loads(self._read_manifest())
+            levels, next_id = manifest["levels"], manifest["next"]
+            if level >= len(levels) or not set(input_ids) <= set(levels[level]):
+                # Otro proceso ya los compactó o se reconstruyó el índice
+                return
+            levels[level] = [run_id for run_id in levels[level] if run_id not in input_ids]
+            if count:
+                path = self._run_path(next_id)
+                os.replace(tmp, path)
+                os.replace(_bloom_path(tmp), _bloom_path(path))
+                levels += [[] for _ in range(level + 2 - len(levels))]
+                levels[level + 1].append(next_id)
+                next_id += 1
+            apply_ops(self.wal, [self._manifest_op(levels, next_id)])
+            if self.lock is not None:
+                self.lock.modified()
+            # Las lecturas en curso tienen su descriptor abierto
+            for run_id in input_ids:
+                path = self._run_path(run_id)
+                _remove(path)
+                _remove(_bloom_path(path))
+            self._refresh()
+
+    # ---------------------------
+    # Construcción en bloque
+    # ---------------------------
+    def bulk_load(self, entries, count=None):
+        """
+        Reconstruye el índice con entradas (clave, offset) ordenadas: van
+        todas a un solo run, en el nivel que le toca por tamaño (así no se
+        vuelve a mezclar enseguida con los runs chicos).
+        """
+        if count is None:
+            entries = list(entries)
+            count = len(entries)
+        for path in run_files(self.base):
+            _remove(path)
+        level, capacity = 0, MEMTABLE_ENTRIES
+        while capacity < count:
+            capacity *= FANOUT
+            level += 1
+        levels = [[] for _ in range(level + 1)]
+        ops = [(TRUNCATE, self.log_file, 0, b"")]
+        if count:
+            self._write_run(self._run_path(1), ((key, offset, PUT) for key, offset, *_ in entries), count)
+            levels[level].append(1)
+        apply_ops(self.wal, [self._manifest_op(levels, 2)] + ops)
+        self._pending = bytearray()
+        self.runs = {}
+        self._load()
+
+    # ---------------------------
+    # Búsquedas
+    # ---------------------------
+    def search(self, key):
+        key = self.codec.coerce(key)
+        self._refresh()
+        found = dict(self.memtable.get(key, {}))
+        for run in self._sources():
+            if not run.may_contain(key):
+                self.counters["bloom_skips"] += 1
+                continue
+            for _, offset, kind in run.entries(key, key, self.counters):
+                # Lo más nuevo ya está anotado
+                found.setdefault(offset, kind)
+        return [offset for offset, kind in found.items() if kind == PUT]
+
+    def range_search(self, low=None, high=None):
+        low = None if low is None else self.codec.coerce(low)
+        high = None if high is None else self.codec.coerce(high)
+        self._refresh()
+        sources = [self._memtable_entries(low, high)]
+        sources += [run.entries(low, high, self.counters) for run in self._sources()]
+        return [offset for _, offset, _ in _merged(sources, drop_deletes=True)]
+
+    # ---------------------------
+    # Estadísticas
+    # ---------------------------
+    def __len__(self):
+        # Aproximado: cada marca de borrado tapa una entrada más vieja
+        puts = sum(run.count - 2 * run.deletes for run in self.runs.values())
+        for slot in self.memtable.values():
+            puts += sum(1 if kind == PUT else -1 for kind in slot.values())
+        return max(0, puts)
+
+    def height(self):
+        # Los filtros de Bloom descartan casi todos los runs sin la clave: un bloque por nivel, más o menos
+        return 1 + len(self.levels)
+
+    def io_counters(self):
+        return dict(self.counters, buffer_hits=0)
+
+
+def _dump(manifest):
+    return json.dumps(manifest).encode("utf-8")
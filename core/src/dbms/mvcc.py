@@ -0,0 +1,300 @@
+# dbms/mvcc.py
+import os
+import sys
+import struct
+import threading
+from array import array
+from contextlib import contextmanager
+
+from src.dbms.locks import FileLock, Slots
+from src.dbms.wal import WRITE, apply_ops
+
+# Estado de una transacción en el clog: lo que no está marcado se confirmó
+COMMITTED = 0
+IN_PROGRESS = 1   # durable (va por el WAL): si el proceso muere queda abortada
+ABORTED = 2
+RUNNING = 3       # en curso y de un solo commit; se anota sin WAL solo para que otros procesos la vean
+
+# Cabecera del clog: siguiente txid reservado; luego un byte de estado por txid
+CLOG_HEADER = struct.Struct("<Q")
+# Los txid se reservan de a tantos: una escritura durable cada TXID_BATCH transacciones
+TXID_BATCH = 1024
+
+# Versión de cada registro en <tabla>.ver: txid que lo creó | txid que lo borró (0 = vivo)
+VERSION = struct.Struct("<II")
+XMAX = struct.Struct("<I")
+
+
+class Snapshot:
+    """
+    Lo que ve una lectura: las transacciones confirmadas antes de tomarlo.
+    xmax: primer txid que todavía no existía
+    invisible: txid menores que xmax en curso, abortados o interrumpidos
+    xmin: txid más viejo en curso al tomarlo (límite para VACUUM)
+    """
+
+    __slots__ = ("xmin", "xmax", "invisible")
+
+    def __init__(self, xmin, xmax, invisible):
+        self.xmin = xmin
+        self.xmax = xmax
+        self.invisible = invisible
+
+    def sees(self, txid):
+        return txid < self.xmax and txid not in self.invisible
+
+    def visible(self, xmin, xmax):
+        # Creado por algo que se ve y no borrado por algo que se ve
+        return self.sees(xmin) and not (xmax and self.sees(xmax))
+
+
+class TransactionManager:
+    """
+    Reparte txids y lleva el estado de cada transacción (clog en <data>/xact.clog).
+
+    Una escritura que entra en un solo commit del WAL (INSERT, DELETE) no
+    necesita marcarse en forma durable: sus datos están en disco si y solo
+    si se confirmó. Las que abarcan varios commits (COPY) se marcan
+    IN_PROGRESS al empezar; si el proceso se cae a la mitad quedan así y se
+    tratan como abortadas.
+
+    Entre procesos (workers con el mismo directorio de datos):
+    - el siguiente txid vive en <clog>.lock y se reparte con flock;
+    - las de un solo commit se anotan RUNNING en el clog (sin WAL) mientras
+      duran, así los snapshots de otros procesos no las ven a medias;
+    - cada proceso publica el xmin de su snapshot más viejo en una ranura de
+      <clog>.slots, para que VACUUM no borre lo que otro todavía lee.
+    El primer proceso en arrancar (ninguna otra ranura viva) limpia las marcas
+    que dejaron los procesos muertos.
+    """
+
+    def __init__(self, path, wal=None):
+        self.path = path
+        self.wal = wal
+        self._lock = threading.Lock()
+        self.active = set()
+        self.snapshots = {}  # id(snapshot) -> snapshot de las lecturas en curso
+        self._published = 0
+
+        self._counter = FileLock(path + ".lock")
+        with self._counter.exclusive():
+            self._slots = Slots(path + ".slots")
+            if not os.path.exists(path):
+                apply_ops(wal, [(WRITE, path, 0, CLOG_HEADER.pack(1))])  # el txid 0 es el de las filas anteriores a MVCC
+            self._fd = os.open(path, os.O_RDWR)
+            if self._slots.alone():
+                self._cleanup()
+        # Abortadas (o interrumpidas por una caída): nunca se van a ver
+        self.failed = set()
+        self._low = 0  # txid desde el que puede haber marcas en curso
+        self._running(self._next())
+
+    def _write(self, ops):
+        apply_ops(self.wal, ops)
+
+    def _state_op(self, txid, state):
+        return (WRITE, self.path, CLOG_HEADER.size + txid, bytes([state]))
+
+    def _mark(self, txid, state):
+        os.pwrite(self._fd, bytes([state]), CLOG_HEADER.size + txid)
+
+    def _reserved(self):
+        return CLOG_HEADER.unpack(os.pread(self._fd, CLOG_HEADER.size, 0))[0]
+
+    def _next(self):
+        # Siguiente txid de todos los procesos; nunca menor que lo reservado al arrancar solo
+        return self._counter.read_value()
+
+    def _cleanup(self):
+        """
+        Arranque sin otros procesos: RUNNING era de un solo commit (si sus
+        datos están, se confirmó); IN_PROGRESS quedó interrumpida. Los txid
+        siguen desde lo reservado en forma durable.
+        """
+        reserved = self._reserved()
+        states = os.pread(self._fd, reserved, CLOG_HEADER.size)
+        for txid, state in enumerate(states):
+            if state == RUNNING:
+                self._mark(txid, COMMITTED)
+        self._write([self._state_op(txid, ABORTED) for txid, state in enumerate(states) if state == IN_PROGRESS])
+        self._counter.write_value(reserved)
+
+    def _running(self, xmax):
+        """
+        Txid menores que xmax que no se ven: en curso en cualquier proceso o
+        abortados. Las abortadas se acumulan en failed; _low avanza hasta la
+        más vieja todavía en curso.
+        """
+        states = os.pread(self._fd, xmax - self._low, CLOG_HEADER.size + self._low)
+        running, low = set(), None
+        for i, state in enumerate(states):
+            if state == ABORTED:
+                self.failed.add(self._low + i)
+            elif state != COMMITTED:
+                running.add(self._low + i)
+                if low is None:
+                    low = self._low + i
+        self._low = xmax if low is None else low
+        return running
+
+    # ---------------------------
+    # Transacciones
+    # ---------------------------
+    def begin(self, durable=False):
+        """
+        Nuevo txid. durable: la transacción hará varios commits del WAL y
+        queda marcada en curso hasta commit/abort.
+        """
+        with self._counter.exclusive():
+            txid = self._next()
+            ops = []
+            if txid + 1 > self._reserved():
+                ops.append((WRITE, self.path, 0, CLOG_HEADER.pack(txid + TXID_BATCH)))
+            if durable:
+                ops.append(self._state_op(txid, IN_PROGRESS))
+            self._write(ops)
+            if not durable:
+                self._mark(txid, RUNNING)
+            # La marca va antes que el contador: quien ve el txid ve también la marca
+            self._counter.write_value(txid + 1)
+        with self._lock:
+            self.active.add(txid)
+        return txid
+
+    def commit(self, txid, durable=False):
+        if durable:
+            self._write([self._state_op(txid, COMMITTED)])
+        else:
+            self._mark(txid, COMMITTED)
+        with self._lock:
+            self.active.discard(txid)
+
+    def abort(self, txid):
+        # Lo que haya llegado a escribir queda invisible hasta que VACUUM lo quite
+        with self._lock:
+            self.failed.add(txid)
+        self._write([self._state_op(txid, ABORTED)])
+        with self._lock:
+            self.active.discard(txid)
+
+    @contextmanager
+    def transaction(self, durable=False):
+        txid = self.begin(durable)
+        try:
+            yield txid
+        except BaseException:
+            self.abort(txid)
+            raise
+        self.commit(txid, durable)
+
+    # ---------------------------
+    # Snapshots
+    # ---------------------------
+    @contextmanager
+    def snapshot(self):
+        """
+        Snapshot registrado mientras dura el bloque: VACUUM no quita
+        versiones que todavía puede ver.
+        """
+        with self._lock:
+            xmax = self._next()
+            running = self._running(xmax)
+            xmin = min(running, default=xmax)
+            snap = Snapshot(xmin, xmax, frozenset(running | self.failed))
+            self.snapshots[id(snap)] = snap
+            self._publish()
+        try:
+            yield snap
+        finally:
+            with self._lock:
+                self.snapshots.pop(id(snap), None)
+                self._publish()
+
+    def _publish(self):
+        # Con self._lock tomado: solo se escribe si cambió el xmin más viejo
+        oldest = min((s.xmin for s in self.snapshots.values()), default=0)
+        if oldest != self._published:
+            self._slots.write(oldest)
+            self._published = oldest
+
+    def horizon(self):
+        """
+        Ningún snapshot actual ni futuro (de este proceso o de otro) ve como
+        vivo lo borrado por un txid menor.
+        """
+        with self._lock:
+            running = self._running(self._next())
+            xmins = [s.xmin for s in self.snapshots.values()] + [v for v in self._slots.others() if v]
+            return min(xmins + [min(running, default=self._low)])
+
+    def is_dead(self, xmin, xmax, horizon):
+        """
+        True si ninguna lectura puede ver la versión: la creó una transacción
+        abortada o la borró una confirmada antes del horizonte.
+        """
+        if xmin in self.failed:
+            return True
+        return bool(xmax) and xmax < horizon and xmax not in self.failed
+
+
+class VersionMap:
+    """
+    xmin/xmax de cada registro de una tabla, en un archivo aparte
+    (<tabla>.ver, 8 bytes por registro en el mismo orden que el .dat).
+    Así el formato del .dat no cambia: los registros anteriores a MVCC
+    no tienen entrada y se leen como (0, 0), creados por el txid 0 y vivos.
+    """
+
+    def __init__(self, path, wal=None):
+        self.path = path
+        self.wal = wal
+
+    def insert_ops(self, first_row, count, txid):
+        return [(WRITE, self.path, first_row * VERSION.size, VERSION.pack(txid, 0) * count)]
+
+    def delete_ops(self, rows, txid):
+        xmax = XMAX.pack(txid)
+        return [(WRITE, self.path, row * VERSION.size + 4, xmax) for row in rows]
+
+    def read(self, first_row, count):
+        """
+        Bytes de las versiones de count registros desde first_row (con
+        ceros para los que no tienen entrada).
+        """
+        size = count * VERSION.size
+        if not os.path.exists(self.path):
+            return bytes(size)
+        with open(self.path, "rb") as f:
+            f.seek(first_row * VERSION.size)
+            return f.read(size).ljust(size, b"\x00")
+
+    def read_array(self, first_row, count):
+        # [xmin0, xmax0, xmin1, xmax1, ...]
+        versions = array("I")
+        versions.frombytes(self.read(first_row, count))
+        if sys.byteorder == "big":
+            versions.byteswap()
+        return versions
+
+    @contextmanager
+    def reader(self):
+        """
+        Función fila -> (xmin, xmax) con el archivo abierto una sola vez.
+        """
+        files = []
+
+        def lookup(row):
+            if not files:
+                # Puede aparecer mientras se lee: lo crea la primera escritura con MVCC
+                if not os.path.exists(self.path):
+                    return 0, 0
+                files.append(open(self.path, "rb"))
+            f = files[0]
+            f.seek(row * VERSION.size)
+            data = f.read(VERSION.size)
+            return VERSION.unpack(data) if len(data) == VERSION.size else (0, 0)
+        try:
+            yield lookup
+        finally:
+            for f in files:
+                f.close()
@@ -0,0 +1,145 @@
+# dbms/pager.py
+import os
+from collections import OrderedDict
+
+from src.dbms.wal import WRITE, TRUNCATE, apply_ops
+
+PAGE_SIZE = 4096
+# Lecturas de páginas consecutivas tras las cuales el acceso se toma como secuencial
+SEQUENTIAL_TRIGGER = 3
+# Páginas que se leen de una vez (y quedan en caché) cuando el acceso es secuencial
+READAHEAD_PAGES = 32
+
+
+class Pager:
+    """
+    Acceso por páginas de tamaño fijo a un archivo de índice.
+
+    Mantiene un caché LRU de páginas leídas y las páginas modificadas quedan
+    en memoria hasta flush(), que las escribe todas juntas (con un solo
+    commit si hay WAL).
+
+    Si se piden varias páginas seguidas (hojas de un B+ construido en
+    bloque, páginas de datos de ISAM en un rango) el acceso se toma como
+    secuencial y cada lectura trae READAHEAD_PAGES páginas de una vez.
+    """
+
+    def __init__(self, filename, page_size=PAGE_SIZE, wal=None, capacity=256):
+        self.filename = filename
+        self.page_size = page_size
+        self.wal = wal
+        self.capacity = capacity
+
+        if not os.path.exists(filename):
+            open(filename, "wb").close()
+
+        self._cache = OrderedDict()
+        self._dirty = {}
+        self._truncated = False
+        self.num_pages = os.path.getsize(filename) // page_size
+        self._last = -2
+        self._run = 0  # páginas consecutivas pedidas hasta ahora
+
+        # Contadores de E/S (los usa EXPLAIN ANALYZE)
+        self.hits = 0
+        self.reads = 0
+        self.bytes_read = 0
+
+    def read(self, page_no):
+        self._run = self._run + 1 if page_no == self._last + 1 else 0
+        self._last = page_no
+        if page_no in self._dirty:
+            self.hits += 1
+            return self._dirty[page_no]
+        if page_no in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(page_no)
+            return self._cache[page_no]
+        if self._truncated:
+            return b"\x00" * self.page_size
+
+        count = 1
+        if self._run >= SEQUENTIAL_TRIGGER:
+            count = max(1, min(READAHEAD_PAGES, self.num_pages - page_no, self.capacity // 2))
+        self.reads += 1
+        with open(self.filename, "rb") as f:
+            f.seek(page_no * self.page_size)
+            block = f.read(count * self.page_size)
+        self.bytes_read += len(block)
+
+        # Las siguientes quedan en caché (las sucias ya tienen su versión en memoria)
+        for i in range(count - 1, 0, -1):
+            ahead = block[i * self.page_size:(i + 1) * self.page_size]
+            if page_no + i not in self._dirty and page_no + i not in self._cache and len(ahead) == self.page_size:
+                self._cache[page_no + i] = ahead
+        data = block[:self.page_size].ljust(self.page_size, b"\x00")
+        self._cache[page_no] = data
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        return data
+
+    def write(self, page_no, data):
+        if len(data) > self.page_size:
+            raise ValueError(f"Página de {len(data)} bytes excede {self.page_size}")
+        self._dirty[page_no] = data.ljust(self.page_size, b"\x00")
+        self._cache.pop(page_no, None)
+        self.num_pages = max(self.num_pages, page_no + 1)
+
+    def allocate(self):
+        """
+        Reserva una página nueva al final del archivo.
+        """
+        page_no = self.num_pages
+        self.write(page_no, b"")
+        return page_no
+
+    def collect(self):
+        """
+        Devuelve las operaciones pendientes (truncado y páginas sucias) y las
+        da por escritas. Permite que un índice con varios archivos las aplique
+        todas en un solo commit.
+        """
+        writes = sorted(self._dirty.items())
+        ops = [(TRUNCATE, self.filename, 0, b"")] if self._truncated else []
+        ops.extend((WRITE, self.filename, n * self.page_size, data) for n, data in writes)
+
+        for page_no, data in writes:
+            self._cache[page_no] = data
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        self._dirty.clear()
+        self._truncated = False
+        return ops
+
+    def flush(self):
+        apply_ops(self.wal, self.collect())
+
+    def counters(self):
+        """
+        Contadores acumulados: páginas leídas de disco, bytes, aciertos del
+        caché y visitas a nodos (toda página pedida, esté o no en caché).
+        """
+        return {
+            "pages_read": self.reads,
+            "bytes_read": self.bytes_read,
+            "buffer_hits": self.hits,
+            "node_visits": self.reads + self.hits,
+        }
+
+    def truncate(self):
+        """
+        Deja el archivo vacío (para reconstruir el índice desde cero).
+        El truncado se aplica en el próximo flush, junto con las páginas nuevas.
+        """
+        self._cache.clear()
+        self._dirty.clear()
+        self.num_pages = 0
+        self._truncated = True
+
+
+def sum_counters(*counters):
+    total = {}
+    for c in counters:
+        for name, value in c.items():
+            total[name] = total.get(name, 0) + value
+    return total
@@ -0,0 +1,183 @@
+# dbms/partition.py
+import zlib
+from bisect import bisect_right
+
+from src.dbms.index_entry import EntryCodec
+
+# Separa la tabla de la partición en el nombre interno (<tabla>$<partición>).
+# El lexer no acepta "$" en identificadores: ninguna tabla del usuario choca con estos nombres
+SEPARATOR = "$"
+
+
+def partition_table(table_name, partition):
+    return f"{table_name}{SEPARATOR}{partition}"
+
+
+class Partitioning:
+    """
+    Cómo se reparten las filas de una tabla entre sus particiones. Cada
+    partición es una tabla interna con su propio .dat e índices.
+
+    RANGE: particiones ordenadas por su límite superior (excluido); la
+    última puede no tener límite (MAXVALUE).
+    HASH: count particiones p0..p{count-1}; la fila va a crc32(clave) % count,
+    con la clave empacada como en el índice hash.
+    """
+
+    def __init__(self, kind, column, key_type, names, bounds=None):
+        """
+        names: nombres de las particiones, en orden
+        bounds: límites superiores de RANGE (None = MAXVALUE), ya coercionados
+        """
+        if kind not in ("range", "hash"):
+            raise ValueError(f"Tipo de partición no soportado: {kind}")
+        if not names:
+            raise ValueError("La tabla necesita al menos una partición")
+        if len(set(names)) != len(names):
+            raise ValueError("Hay particiones con el mismo nombre")
+        self.kind = kind
+        self.column = column
+        self.key_type = key_type
+        self.names = list(names)
+        self.bounds = list(bounds) if bounds is not None else None
+        self.codec = EntryCodec(key_type)
+        if kind == "range":
+            self._check_bounds()
+
+    @classmethod
+    def hash(cls, column, key_type, count):
+        if count < 1:
+            raise ValueError("PARTITION BY HASH necesita al menos una partición")
+        return cls("hash", column, key_type, [f"p{i}" for i in range(count)])
+
+    def _check_bounds(self):
+        if len(self.bounds) != len(self.names):
+            raise ValueError("Cada partición RANGE necesita su límite")
+        finite = self.bounds[:-1] if self.bounds[-1] is None else self.bounds
+        if None in finite:
+            raise ValueError("Solo la última partición puede ser MAXVALUE")
+        if any(a >= b for a, b in zip(finite, finite[1:])):
+            raise ValueError("Los límites de las particiones RANGE deben ser crecientes")
+
+    # ---------------------------
+    # Catálogo
+    # ---------------------------
+    def to_dict(self):
+        meta = {"kind": self.kind, "column": self.column, "partitions": self.names}
+        if self.kind == "range":
+            meta["bounds"] = self.bounds
+        return meta
+
+    @classmethod
+    def from_dict(cls, meta, schema):
+        return cls(meta["kind"], meta["column"], schema.types[meta["column"]], meta["partitions"],
+                   meta.get("bounds"))
+
+    # ---------------------------
+    # Particiones de RANGE
+    # ---------------------------
+    def add(self, name, bound):
+        """
+        Agrega una partición RANGE por encima de la última.
+        """
+        if self.kind != "range":
+            raise ValueError("Solo se agregan particiones a tablas PARTITION BY RANGE")
+        if name in self.names:
+            raise ValueError(f"Ya existe la partición {name}")
+        if self.bounds[-1] is None:
+            raise ValueError(f"La partición {self.names[-1]} es MAXVALUE: no se puede agregar otra encima")
+        if bound is not None and bound <= self.bounds[-1]:
+            raise ValueError(f"El límite de {name} debe ser mayor que el de {self.names[-1]}")
+        self.names.append(name)
+        self.bounds.append(bound)
+
+    def remove(self, name):
+        """
+        Quita una partición RANGE: sus valores quedan sin partición (o
+        pasan a la siguiente, si no era la última).
+        """
+        if self.kind != "range":
+            raise ValueError("En PARTITION BY HASH no se pueden borrar particiones")
+        if name not in self.names:
+            raise ValueError(f"No existe la partición {name}")
+        if len(self.names) == 1:
+            raise ValueError("No se puede borrar la única partición")
+        i = self.names.index(name)
+        del self.names[i]
+        del self.bounds[i]
+
+    # ---------------------------
+    # Enrutar y podar
+    # ---------------------------
+    def route(self, value):
+        """
+        Partición donde va una fila con este valor (tal como se lee del .dat).
+        """
+        if self.kind == "hash":
+            return self.names[self._hash(value)]
+        finite = self.bounds[:-1] if self.bounds[-1] is None else self.bounds
+        i = bisect_right(finite, value)
+        if i == len(self.names):
+            raise ValueError(f"El valor {value!r} de {self.column} no cae en ninguna partición")
+        return self.names[i]
+
+    def _hash(self, value):
+        # crc32 es estable entre ejecuciones (hash() de str no lo es)
+        return zlib.crc32(self.codec.pack_key(value)) % len(self.names)
+
+    def prune(self, node):
+        """
+        Particiones que pueden tener filas que cumplen la condición (ya
+        coercionada), en orden. Las demás no se leen.
+        """
+        keep = self._matching(node) if node is not None else set(range(len(self.names)))
+        return [name for i, name in enumerate(self.names) if i in keep]
+
+    def _matching(self, node):
+        everything = set(range(len(self.names)))
+        kind = node[0]
+        if kind == "and":
+            return everything.intersection(*(self._matching(child) for child in node[1]))
+        if kind == "or":
+            return set().union(*(self._matching(child) for child in node[1]))
+        if kind == "false":
+            return set()
+        if kind in ("not", "true") or node[1] != self.column:
+            # NOT no se poda (NOT IN, != ...): se leen todas
+            return everything
+        try:
+            if self.kind == "hash":
+                if kind == "cmp" and node[2] == "=" and node[3] is not None:
+                    return {self._hash(node[3])}
+                if kind == "in":
+                    return {self._hash(value) for value in node[2]}
+                return everything
+            return {i for i in everything if self._may_hold(i, node)}
+        except (TypeError, ValueError, OverflowError):
+            return everything
+
+    def _may_hold(self, i, node):
+        # ¿Puede un valor de [límite anterior, límite de i) cumplir el predicado?
+        low = self.bounds[i - 1] if i else None
+        high = self.bounds[i]
+        kind = node[0]
+        if kind == "cmp":
+            op, value = node[2], node[3]
+            if value is None:
+                return False
+            if op == "=":
+                return _in_range(value, low, high)
+            if op in ("<", "<="):
+                return low is None or (low < value if op == "<" else low <= value)
+            if op in (">", ">="):
+                return high is None or high > value
+            return True
+        if kind == "between":
+            return (low is None or low <= node[3]) and (high is None or high > node[2])
+        if kind == "in":
+            return any(_in_range(value, low, high) for value in node[2])
+        return True
+
+
+def _in_range(value, low, high):
+    return (low is None or low <= value) and (high is None or value < high)
@@ -0,0 +1,146 @@
+# dbms/prefetch.py
+import mmap
+import os
+import queue
+import threading
+from itertools import chain
+
+# Tamaño de cada lectura anticipada: los rangos contiguos se juntan hasta este tamaño
+PREFETCH_BYTES = 1024 * 1024
+# Lecturas que el hilo puede tener listas por delante del consumidor
+PREFETCH_DEPTH = 4
+# Primera lectura de spans(): una búsqueda que termina enseguida no lee de más
+FIRST_BYTES = 4096
+
+_DONE = object()
+
+
+def advise_sequential(fd, offset=0, length=0):
+    """
+    Avisa al sistema que el archivo se va a leer en orden (lee más adelante
+    por su cuenta). No hace nada donde posix_fadvise no existe.
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def advise_mmap(data, offset=0, length=None, willneed=False):
+    """
+    Lo mismo para un mmap: MADV_SEQUENTIAL para todo el mapeo o, con
+    willneed, pedir ya las páginas de [offset, offset + length).
+    """
+    option = getattr(mmap, "MADV_WILLNEED" if willneed else "MADV_SEQUENTIAL", None)
+    if option is None or not hasattr(data, "madvise"):
+        return
+    start = offset - offset % mmap.PAGESIZE  # madvise pide inicio alineado a página
+    length = len(data) - start if length is None else min(length + offset - start, len(data) - start)
+    if length > 0:
+        data.madvise(option, start, length)
+
+
+def _runs(ranges, chunk):
+    """
+    Agrupa rangos (offset, largo) en lecturas de hasta chunk bytes: los
+    contiguos van juntos. Genera (offset, largo, [rangos]).
+    """
+    run = []
+    for offset, length in ranges:
+        if run and (offset != run[-1][0] + run[-1][1]
+                    or offset + length - run[0][0] > chunk):
+            yield run[0][0], run[-1][0] + run[-1][1] - run[0][0], run
+            run = []
+        run.append((offset, length))
+    if run:
+        yield run[0][0], run[-1][0] + run[-1][1] - run[0][0], run
+
+
+def _split(start, data, run):
+    if len(run) == 1:
+        yield start, data
+        return
+    for offset, length in run:
+        yield offset, data[offset - start:offset - start + length]
+
+
+def spans(start, end, record_size, chunk=PREFETCH_BYTES):
+    """
+    Parte [start, end) en rangos de registros enteros para read_ahead: el
+    primero de una página y el resto de chunk bytes.
+    """
+    first = max(1, FIRST_BYTES // record_size) * record_size
+    step = max(1, chunk // record_size) * record_size
+    offset = start
+    while offset < end:
+        length = min(first if offset == start else step, end - offset)
+        yield offset, length
+        offset += length
+
+
+def read_ahead(path, ranges, chunk=PREFETCH_BYTES, depth=PREFETCH_DEPTH):
+    """
+    Genera (offset, bytes) de cada rango (offset, largo) de path, en orden.
+    Un rango que pasa el fin del archivo devuelve menos bytes.
+
+    El primer rango se lee solo y sin hilo. Si el consumidor pide el
+    siguiente el acceso es secuencial: un hilo de fondo sigue con el resto,
+    juntando los rangos contiguos en lecturas de hasta chunk bytes, y va
+    hasta depth lecturas por delante mientras el consumidor decodifica.
+
+    Hay que cerrarlo (o consumirlo entero) para que el hilo termine.
+    """
+    ranges = iter(ranges)
+    first = next(ranges, None)
+    if first is None:
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        advise_sequential(fd)
+        yield first[0], os.pread(fd, first[1], first[0])
+        second = next(ranges, None)
+        if second is None:
+            return
+        ranges = chain([second], ranges)
+
+        ready = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for start, length, run in _runs(ranges, chunk):
+                    item = (start, os.pread(fd, length, start), run)
+                    while not stop.is_set():
+                        try:
+                            ready.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+                item = _DONE
+            except BaseException as e:  # se relanza en el consumidor
+                item = e
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        worker = threading.Thread(target=produce, name="read-ahead", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from _split(*item)
+        finally:
+            stop.set()
+            worker.join()
+    finally:
+        os.close(fd)
@@ -1,4 +1,284 @@
-# Clase base vacía temporal para evitar errores de importación
+# dbms/rtree.py
+import os
+import math
+import heapq
+import struct
+
+from src.dbms.wal import WRITE, TRUNCATE, apply_ops
+
+# Entrada persistida: x | y | offset del registro (-1 = borrada)
+ENTRY = struct.Struct("<ddq")
+NODE_CAPACITY = 16
+
+
+class _RNode:
+    def __init__(self, leaf, items=None):
+        self.leaf = leaf
+        self.items = items or []  # hoja: (x, y, offset); interno: _RNode
+        self.mbr = None
+        self.update()
+
+    def update(self):
+        if not self.items:
+            self.mbr = None
+            return
+        if self.leaf:
+            xs = [it[0] for it in self.items]
+            ys = [it[1] for it in self.items]
+            self.mbr = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            boxes = [child.mbr for child in self.items if child.mbr]
+            self.mbr = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                        max(b[2] for b in boxes), max(b[3] for b in boxes)) if boxes else None
+
+
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def _union(box, x1, y1, x2, y2):
+    if box is None:
+        return (x1, y1, x2, y2)
+    return (min(box[0], x1), min(box[1], y1), max(box[2], x2), max(box[3], y2))
+
+
+def _intersects(box, x1, y1, x2, y2):
+    return box is not None and box[0] <= x2 and x1 <= box[2] and box[1] <= y2 and y1 <= box[3]
+
+
+def _mindist(box, x, y):
+    dx = max(box[0] - x, 0, x - box[2])
+    dy = max(box[1] - y, 0, y - box[3])
+    return math.hypot(dx, dy)
+
+
 class RTree:
-	def __init__(self, *args, **kwargs):
-		pass
+    """
+    Índice espacial para columnas ARRAY[FLOAT] (puntos x, y).
+
+    Las entradas se guardan en <base>.rtr en orden de llegada; el árbol vive
+    en memoria y se arma al abrir con empaquetado STR (Sort-Tile-Recursive).
+    Las inserciones posteriores usan menor ampliación de área y división lineal.
+    """
+
+    def __init__(self, file_name, key_type="ARRAY[FLOAT]", wal=None):
+        self.file_name = f"{file_name}.rtr"
+        self.wal = wal
+        self._positions = {}  # offset del registro -> posición en el .rtr
+        self._pending = []
+        self._tombstones = []  # escrituras de borrado pendientes hasta flush()
+        self._truncated = False  # el .rtr se reescribe entero en el próximo flush()
+        self.node_visits = 0
+
+        if not os.path.exists(self.file_name):
+            open(self.file_name, "wb").close()
+        self._size = os.path.getsize(self.file_name) // ENTRY.size
+
+        points = []
+        with open(self.file_name, "rb") as f:
+            data = f.read()
+        for pos in range(self._size):
+            x, y, offset = ENTRY.unpack_from(data, pos * ENTRY.size)
+            if offset != -1:
+                points.append((x, y, offset))
+                self._positions[offset] = pos
+        self.root = self._bulk_load(points)
+
+    # ---------------------------
+    # Construcción
+    # ---------------------------
+    def _bulk_load(self, points):
+        if not points:
+            return _RNode(True)
+        nodes = self._str_pack(points, leaf=True)
+        while len(nodes) > 1:
+            nodes = self._str_pack(nodes, leaf=False)
+        return nodes[0]
+
+    def bulk_load(self, entries, count=None):
+        """
+        Reconstruye el índice desde cero con entradas (punto, offset): el .rtr
+        se reescribe en el próximo flush y el árbol se arma con STR.
+        """
+        points = [(float(key[0]), float(key[1]), offset) for key, offset, *_ in entries]
+        self._truncated = True
+        self._tombstones = []
+        self._pending = points
+        self._size = 0
+        self._positions = {offset: pos for pos, (_, _, offset) in enumerate(points)}
+        self.root = self._bulk_load(points)
+
+    def _str_pack(self, items, leaf):
+        center = (lambda it: (it[0], it[1])) if leaf else \
+            (lambda n: ((n.mbr[0] + n.mbr[2]) / 2, (n.mbr[1] + n.mbr[3]) / 2))
+        n_nodes = math.ceil(len(items) / NODE_CAPACITY)
+        n_slices = math.ceil(math.sqrt(n_nodes))
+        per_slice = n_slices * NODE_CAPACITY
+
+        items = sorted(items, key=lambda it: center(it)[0])
+        nodes = []
+        for i in range(0, len(items), per_slice):
+            vertical = sorted(items[i:i + per_slice], key=lambda it: center(it)[1])
+            for j in range(0, len(vertical), NODE_CAPACITY):
+                nodes.append(_RNode(leaf, vertical[j:j + NODE_CAPACITY]))
+        return nodes
+
+    # ---------------------------
+    # Inserción
+    # ---------------------------
+    def add(self, key, offset):
+        x, y = float(key[0]), float(key[1])
+        self._pending.append((x, y, offset))
+        self._positions[offset] = self._size + len(self._pending) - 1
+
+        split = self._insert(self.root, (x, y, offset))
+        if split:
+            self.root = _RNode(False, [self.root, split])
+
+    def _insert(self, node, point):
+        x, y, _ = point
+        if node.leaf:
+            node.items.append(point)
+        else:
+            best = min(node.items, key=lambda c: (
+                _area(_union(c.mbr, x, y, x, y)) - (_area(c.mbr) if c.mbr else 0),
+                _area(c.mbr) if c.mbr else 0))
+            split = self._insert(best, point)
+            if split:
+                node.items.append(split)
+        node.update()
+        if len(node.items) <= NODE_CAPACITY:
+            return None
+        return self._split(node)
+
+    def _split(self, node):
+        # División lineal: ordenar por el eje más extendido y partir a la mitad
+        box = node.mbr
+        axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+        if node.leaf:
+            node.items.sort(key=lambda it: it[axis])
+        else:
+            node.items.sort(key=lambda n: n.mbr[axis] + n.mbr[axis + 2])
+        mid = len(node.items) // 2
+        sibling = _RNode(node.leaf, node.items[mid:])
+        node.items = node.items[:mid]
+        node.update()
+        return sibling
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def _walk(self, x1, y1, x2, y2):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            self.node_visits += 1
+            if not _intersects(node.mbr, x1, y1, x2, y2):
+                continue
+            if node.leaf:
+                for x, y, offset in node.items:
+                    if x1 <= x <= x2 and y1 <= y <= y2:
+                        yield x, y, offset
+            else:
+                stack.extend(node.items)
+
+    def search(self, key):
+        x, y = float(key[0]), float(key[1])
+        return [o for _, _, o in self._walk(x, y, x, y)]
+
+    def range_search(self, low, high):
+        """
+        Puntos dentro del rectángulo [low, high] (esquinas (x, y)).
+        """
+        x1, y1 = float(low[0]), float(low[1])
+        x2, y2 = float(high[0]), float(high[1])
+        return [o for _, _, o in self._walk(x1, y1, x2, y2)]
+
+    def radius_search(self, point, radius):
+        cx, cy = float(point[0]), float(point[1])
+        return [o for x, y, o in self._walk(cx - radius, cy - radius, cx + radius, cy + radius)
+                if math.hypot(x - cx, y - cy) <= radius]
+
+    def knn(self, point, k):
+        """
+        Los k puntos más cercanos (búsqueda best-first por distancia mínima).
+        """
+        cx, cy = float(point[0]), float(point[1])
+        if self.root.mbr is None:
+            return []
+        heap = [(0.0, 0, self.root)]
+        counter = 1
+        result = []
+        while heap and len(result) < k:
+            dist, _, item = heapq.heappop(heap)
+            if isinstance(item, _RNode):
+                self.node_visits += 1
+                for child in item.items:
+                    if item.leaf:
+                        d = math.hypot(child[0] - cx, child[1] - cy)
+                        heapq.heappush(heap, (d, counter, child))
+                    elif child.mbr:
+                        heapq.heappush(heap, (_mindist(child.mbr, cx, cy), counter, child))
+                    counter += 1
+            else:
+                result.append(item[2])
+        return result
+
+    # ---------------------------
+    # Borrado y persistencia
+    # ---------------------------
+    def remove(self, key, offset=None):
+        x, y = float(key[0]), float(key[1])
+        removed = [o for _, _, o in self._walk(x, y, x, y) if offset is None or o == offset]
+        if not removed:
+            return False
+        self._remove_from(self.root, set(removed), x, y)
+
+        pending_offsets = {p[2] for p in self._pending}
+        self._pending = [p for p in self._pending if p[2] not in removed]
+        for o in removed:
+            pos = self._positions.pop(o, None)
+            if pos is not None and o not in pending_offsets:
+                self._tombstones.append((WRITE, self.file_name, pos * ENTRY.size, ENTRY.pack(x, y, -1)))
+        # Las posiciones de lo pendiente se recalculan al quitar entradas
+        for i, (_, _, o) in enumerate(self._pending):
+            self._positions[o] = self._size + i
+        return True
+
+    def _remove_from(self, node, offsets, x, y):
+        # Solo se bajan los nodos cuyo rectángulo contiene el punto
+        if node.leaf:
+            node.items = [it for it in node.items if it[2] not in offsets]
+        else:
+            for child in node.items:
+                if _intersects(child.mbr, x, y, x, y):
+                    self._remove_from(child, offsets, x, y)
+            node.items = [c for c in node.items if c.items]
+        node.update()
+
+    def flush(self):
+        ops, self._tombstones = self._tombstones, []
+        if self._truncated:
+            ops.insert(0, (TRUNCATE, self.file_name, 0, b""))
+            self._truncated = False
+        if self._pending:
+            data = b"".join(ENTRY.pack(*p) for p in self._pending)
+            ops.append((WRITE, self.file_name, self._size * ENTRY.size, data))
+            self._size += len(self._pending)
+            self._pending = []
+        if ops:
+            apply_ops(self.wal, ops)
+
+    def height(self):
+        levels, node = 1, self.root
+        while not node.leaf and node.items:
+            node = node.items[0]
+            levels += 1
+        return levels
+
+    def io_counters(self):
+        # El árbol vive en memoria: solo hay visitas a nodos
+        return {"pages_read": 0, "bytes_read": 0, "buffer_hits": 0, "node_visits": self.node_visits}
+
+    def __len__(self):
+        return len(self._positions)
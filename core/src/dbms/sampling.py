@@ -0,0 +1,119 @@
+# dbms/sampling.py
+import random
+
+try:
+    import numpy as np
+except ImportError:  # sin NumPy solo se usa el camino fila a fila
+    np = None
+
+from src.dbms.file_manager import PAGE_SIZE
+
+METHODS = ("system", "bernoulli")
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(x):
+    # splitmix64: mezcla barata de 64 bits (blake2b sería demasiado lento por fila)
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def _mix_array(x):
+    # Lo mismo sobre un arreglo uint64 (la aritmética de NumPy ya es módulo 2^64)
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class TableSample:
+    """
+    TABLESAMPLE de un SELECT: qué parte de la tabla se lee.
+
+    SYSTEM(p): cada página (los registros de tamaño fijo que entran en
+    PAGE_SIZE bytes) entra con probabilidad p%; las demás no se leen.
+    BERNOULLI(p): cada fila entra con probabilidad p%; se recorre toda la
+    tabla, pero solo se decodifican y procesan las elegidas.
+
+    La elección depende solo de la semilla y de la posición de la página o
+    fila: con REPEATABLE(semilla) la misma consulta ve la misma muestra.
+    """
+
+    def __init__(self, method, percent, seed=None):
+        if method not in METHODS:
+            raise ValueError(f"Método de TABLESAMPLE no soportado: {method}")
+        if not 0 <= percent <= 100:
+            raise ValueError("El porcentaje de TABLESAMPLE debe estar entre 0 y 100")
+        self.method = method
+        self.percent = percent
+        self.seed = int(seed) if seed is not None else random.getrandbits(32)
+        self.fraction = percent / 100
+        # Una unidad entra si su hash queda debajo del umbral
+        self._threshold = min(int(self.fraction * 2 ** 64), 2 ** 64)
+        self._salt = _mix(self.seed & _MASK)
+
+    def to_dict(self):
+        return {"method": self.method, "percent": self.percent, "seed": self.seed}
+
+    @classmethod
+    def from_dict(cls, meta):
+        # El TABLESAMPLE como lo arma el parser
+        return cls(meta["method"], meta["percent"], meta.get("seed"))
+
+    def _chosen(self, unit):
+        return _mix(self._salt ^ unit) < self._threshold
+
+    @staticmethod
+    def page_rows(size):
+        return max(1, PAGE_SIZE // size)
+
+    # ---------------------------
+    # Fila a fila
+    # ---------------------------
+    def ranges(self, ranges, size):
+        """
+        Rangos (offset, largo) del .dat que hay que leer, de los pedidos:
+        con SYSTEM solo las páginas elegidas; con BERNOULLI todos.
+        """
+        if self.method == "bernoulli":
+            return list(ranges)
+        per_page = self.page_rows(size)
+        chosen = []
+        for offset, length in ranges:
+            first, end = offset // size, (offset + length) // size
+            for page in range(first // per_page, -(-end // per_page)):
+                if not self._chosen(page):
+                    continue
+                start = max(first, page * per_page)
+                stop = min(end, (page + 1) * per_page)
+                if chosen and chosen[-1][0] + chosen[-1][1] == start * size:
+                    chosen[-1] = (chosen[-1][0], chosen[-1][1] + (stop - start) * size)
+                else:
+                    chosen.append((start * size, (stop - start) * size))
+        return chosen
+
+    def row_filter(self):
+        """
+        Función número de fila -> bool para lo que ranges no filtró
+        (None con SYSTEM: las páginas ya son la muestra).
+        """
+        if self.method == "system":
+            return None
+        return self._chosen
+
+    # ---------------------------
+    # Por lotes (NumPy)
+    # ---------------------------
+    def row_mask(self, first_row, count, size):
+        """
+        Máscara de las filas first_row..first_row+count que están en la muestra.
+        """
+        rows = np.arange(first_row, first_row + count, dtype=np.uint64)
+        if self.method == "system":
+            rows = rows // np.uint64(self.page_rows(size))
+        if self._threshold >= 2 ** 64:
+            return np.ones(count, dtype=bool)
+        return _mix_array(np.uint64(self._salt) ^ rows) < np.uint64(self._threshold)
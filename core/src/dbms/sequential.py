@@ -1,22 +1,88 @@
 # storage/sequential.py
 import os
 import math
+import heapq
 import struct
+from contextlib import closing
+from itertools import islice
 from src.record import RecordSchema
+from src.dbms.bloom import BloomFilter, DEFAULT_FPR
+from src.dbms.wal import WRITE, TRUNCATE, apply_ops
+from src.dbms.prefetch import read_ahead, spans
+
+PAGE_SIZE = 4096
+# Entradas por escritura al construir un índice en bloque
+BULK_CHUNK = 65536
 
 
 class SequentialFile:
-    def __init__(self, file_name: str, schema: RecordSchema, aux_file="aux.dat", aux_limit=3):
+    def __init__(self, file_name: str, schema: RecordSchema, aux_file="aux.dat", aux_limit=3, wal=None,
+                 bloom_key=None, bloom_fpr=DEFAULT_FPR):
+        """
+        bloom_key: columna de búsqueda; si se indica, el principal y el auxiliar
+                   llevan cada uno un filtro de Bloom (<archivo>.bloom) que evita
+                   leerlos cuando la clave no está
+        """
         self.file_name = file_name
         self.aux_file = aux_file
         self.aux_limit = aux_limit
         self.schema = schema
+        self.wal = wal
+        self.bloom_key = bloom_key
+        self.bloom_fpr = bloom_fpr
+        self.bloom_skips = 0
 
         # Crear archivos si no existen
         for f in [self.file_name, self.aux_file]:
             if not os.path.exists(f):
                 open(f, "wb").close()
 
+        self.blooms = {}
+        if bloom_key:
+            for f in [self.file_name, self.aux_file]:
+                # Archivos anteriores al filtro (o filtro perdido): se arma leyendo el archivo
+                self.blooms[f] = BloomFilter.load(f"{f}.bloom", bloom_fpr) or self._build_bloom(f)
+
+    # ---------------------------
+    # Filtros de Bloom
+    # ---------------------------
+    def _build_bloom(self, file_name, records=None, capacity=0):
+        if records is None:
+            records = self._read_all(file_name)
+        keys = [r[self.bloom_key] for r in records if not self._is_deleted(r, self.bloom_key)]
+        return BloomFilter.build(keys, capacity=capacity, fpr=self.bloom_fpr)
+
+    def _may_contain(self, file_name, key, key_name):
+        bloom = self.blooms.get(file_name)
+        if bloom is None or key_name != self.bloom_key or key in bloom:
+            return True
+        self.bloom_skips += 1
+        return False
+
+    def _bloom_add(self, file_name, record):
+        if self.bloom_key:
+            self.blooms[file_name].add(record[self.bloom_key])
+
+    def _bloom_ops(self):
+        # Van en el mismo commit que los datos: el filtro nunca queda atrasado
+        return [op for f, bloom in self.blooms.items() for op in bloom.collect(f"{f}.bloom")]
+
+    def _write_at(self, file_name, offset, data):
+        # Con WAL la escritura queda registrada antes de tocar el archivo
+        apply_ops(self.wal, [(WRITE, file_name, offset, data)])
+
+    def _truncate(self, file_name):
+        apply_ops(self.wal, [(TRUNCATE, file_name, 0, b"")])
+
+    def _read_all(self, file_name):
+        with open(file_name, "rb") as f:
+            data = f.read()
+        size = self.schema.size
+        return [self.schema.unpack(data[i:i + size]) for i in range(0, len(data) - size + 1, size)]
+
+    def _is_deleted(self, rec, key_name):
+        return rec[key_name] == -1
+
     def get_size(self, file_name):
         with open(file_name, "rb") as f:
             f.seek(0, 2)
@@ -31,16 +97,15 @@ class SequentialFile:
             return self.schema.unpack(data)
 
     def write_record(self, file_name, pos: int, record: dict):
-        with open(file_name, "r+b") as f:
-            f.seek(pos * self.schema.size)
-            f.write(self.schema.pack(record))
+        self._write_at(file_name, pos * self.schema.size, self.schema.pack(record))
 
     def insert_aux(self, record: dict):
         size_aux = self.get_size(self.aux_file)
         if size_aux >= self.aux_limit:
             self.reconstruct()
-        with open(self.aux_file, "ab") as aux:
-            aux.write(self.schema.pack(record))
+        self._bloom_add(self.aux_file, record)
+        apply_ops(self.wal, [(WRITE, self.aux_file, self.get_size(self.aux_file) * self.schema.size,
+                              self.schema.pack(record))] + self._bloom_ops())
 
     def _insert_ordered(self, record: dict, key_name="id"):
         size = self.get_size(self.file_name)
@@ -64,33 +129,46 @@ class SequentialFile:
                     pos = mid
                     right = mid - 1
 
-        # Desplazar contenido para hacer espacio
-        with open(self.file_name, "r+b") as f:
+        # Desplazar contenido para hacer espacio (una sola escritura del tramo final)
+        with open(self.file_name, "rb") as f:
             f.seek(pos * self.schema.size)
             rest = f.read()
-            f.seek((pos + 1) * self.schema.size)
-            f.write(rest)
-            f.seek(pos * self.schema.size)
-            f.write(self.schema.pack(record))
+        self._bloom_add(self.file_name, record)
+        apply_ops(self.wal, [(WRITE, self.file_name, pos * self.schema.size, self.schema.pack(record) + rest)]
+                  + self._bloom_ops())
 
-    def reconstruct(self, key_name="id"):
-        with open(self.aux_file, "rb") as aux:
-            while True:
-                data = aux.read(self.schema.size)
-                if not data:
-                    break
-                rec = self.schema.unpack(data)
-                if rec[key_name] != -1:
-                    self._insert_ordered(rec, key_name=key_name)
+    def reconstruct(self, key_name="id", extra=()):
+        """
+        Mezcla el archivo principal (ordenado) con aux.dat ordenado en una sola
+        pasada y reescribe el principal de una vez; luego vacía aux.dat.
+        `extra` son registros pendientes que se mezclan junto con el auxiliar.
+        """
+        main = [r for r in self._read_all(self.file_name) if not self._is_deleted(r, key_name)]
+        aux = [r for r in self._read_all(self.aux_file) if not self._is_deleted(r, key_name)]
+        aux.extend(extra)
+        aux.sort(key=lambda r: r[key_name])
+        merged = list(heapq.merge(main, aux, key=lambda r: r[key_name]))
+        data = b"".join(self.schema.pack(r) for r in merged)
 
         # Ajustar límite dinámicamente
-        self.aux_limit = int(math.log(self.get_size(self.file_name) + self.aux_limit, 2))
+        self.aux_limit = max(3, int(math.log(len(merged) + self.aux_limit, 2)))
+
+        # Los filtros se rehacen: el del principal con todas las claves, el auxiliar vacío
+        if self.bloom_key:
+            self.blooms[self.file_name] = self._build_bloom(self.file_name, merged)
+            self.blooms[self.aux_file] = self._build_bloom(self.aux_file, [], capacity=self.aux_limit)
 
-        # Vaciar auxiliar
-        open(self.aux_file, "wb").close()
+        # Principal, auxiliar y filtros se reemplazan en un solo commit
+        apply_ops(self.wal, [
+            (TRUNCATE, self.file_name, 0, b""),
+            (WRITE, self.file_name, 0, data),
+            (TRUNCATE, self.aux_file, 0, b""),
+        ] + self._bloom_ops())
 
     def search(self, key, key_name="id"):
         left, right = 0, self.get_size(self.file_name) - 1
+        if not self._may_contain(self.file_name, key, key_name):
+            right = -1
 
         while left <= right:
             mid = (left + right) // 2
@@ -106,7 +184,7 @@ class SequentialFile:
                 left = mid + 1
 
         # Buscar en aux.dat linealmente
-        size = self.get_size(self.aux_file)
+        size = self.get_size(self.aux_file) if self._may_contain(self.aux_file, key, key_name) else 0
         for i in range(size):
             rec = self.read_record(self.aux_file, i)
             if rec and rec[key_name] == key:
@@ -116,7 +194,9 @@ class SequentialFile:
     def remove(self, key, key_name="id"):
         # Buscar en file principal
         left, right = 0, self.get_size(self.file_name) - 1
-        with open(self.file_name, "r+b") as f:
+        if not self._may_contain(self.file_name, key, key_name):
+            right = -1
+        with open(self.file_name, "rb") as f:
             while left <= right:
                 mid = (left + right) // 2
                 f.seek(mid * self.schema.size)
@@ -126,8 +206,7 @@ class SequentialFile:
                 rec = self.schema.unpack(data)
                 if rec[key_name] == key:
                     rec[key_name] = -1
-                    f.seek(mid * self.schema.size)
-                    f.write(self.schema.pack(rec))
+                    self._write_at(self.file_name, mid * self.schema.size, self.schema.pack(rec))
                     return True
                 elif key < rec[key_name]:
                     right = mid - 1
@@ -135,8 +214,8 @@ class SequentialFile:
                     left = mid + 1
 
         # Buscar en auxiliar
-        size_aux = self.get_size(self.aux_file)
-        with open(self.aux_file, "r+b") as f:
+        size_aux = self.get_size(self.aux_file) if self._may_contain(self.aux_file, key, key_name) else 0
+        with open(self.aux_file, "rb") as f:
             for i in range(size_aux):
                 f.seek(i * self.schema.size)
                 data = f.read(self.schema.size)
@@ -145,8 +224,7 @@ class SequentialFile:
                 rec = self.schema.unpack(data)
                 if rec[key_name] == key:
                     rec[key_name] = -1
-                    f.seek(i * self.schema.size)
-                    f.write(self.schema.pack(rec))
+                    self._write_at(self.aux_file, i * self.schema.size, self.schema.pack(rec))
                     return True
         return False
 
@@ -168,17 +246,20 @@ class SequentialFile:
                 else:
                     left = mid + 1
 
-            for i in range(start_pos, size):
-                f.seek(i * self.schema.size)
-                data = f.read(self.schema.size)
-                if not data:
-                    break
-                rec = self.schema.unpack(data)
-                if rec[key_name] == -1:
+        # Desde start_pos se lee en orden, por delante del recorrido
+        rsize = self.schema.size
+        with closing(read_ahead(self.file_name, spans(start_pos * rsize, size * rsize, rsize))) as chunks:
+            for _, data in chunks:
+                for i in range(0, len(data) - rsize + 1, rsize):
+                    rec = self.schema.unpack(data[i:i + rsize])
+                    if rec[key_name] == -1:
+                        continue
+                    if rec[key_name] > end_id:
+                        break
+                    results.append(rec)
+                else:
                     continue
-                if rec[key_name] > end_id:
-                    break
-                results.append(rec)
+                break
 
         # Buscar en auxiliar
         size_aux = self.get_size(self.aux_file)
@@ -196,5 +277,192 @@ class SequentialFile:
         return results
 
     def remove_all(self):
-        open(self.file_name, "wb").close()
-        open(self.aux_file, "wb").close()
+        if self.bloom_key:
+            self.blooms = {f: BloomFilter(0, self.bloom_fpr) for f in self.blooms}
+        apply_ops(self.wal, [(TRUNCATE, self.file_name, 0, b""), (TRUNCATE, self.aux_file, 0, b"")]
+                  + self._bloom_ops())
+
+
+class SequentialIndex(SequentialFile):
+    """
+    Índice secundario sobre archivo secuencial: entradas (key, offset)
+    ordenadas por clave en <base>.seq y las nuevas en <base>.aux.
+    Las entradas borradas se marcan con offset -1. Cada archivo tiene su
+    filtro de Bloom (.seq.bloom y .aux.bloom): una clave ausente no lee nada.
+    """
+
+    def __init__(self, file_name, key_type, wal=None, bloom_fpr=DEFAULT_FPR, offset_type="BIGINT"):
+        """
+        offset_type: BIGINT (los .dat pueden pasar los 2 GB); INT en índices
+        creados antes de ese cambio
+        """
+        schema = RecordSchema([
+            {"name": "key", "type": key_type},
+            {"name": "offset", "type": offset_type},
+        ])
+        super().__init__(f"{file_name}.seq", schema, aux_file=f"{file_name}.aux", wal=wal,
+                         bloom_key="key", bloom_fpr=bloom_fpr)
+        self.aux_limit = max(3, int(math.log(self.get_size(self.file_name) + 1, 2)))
+        self._pending = []
+        self._removed = {}  # (archivo, posición) -> entrada marcada, se escribe en flush()
+        # Contadores de E/S (los usa EXPLAIN ANALYZE)
+        self.node_visits = 0
+        self.pages_read = 0
+        self.bytes_read = 0
+
+    def _is_deleted(self, rec, key_name):
+        return rec["offset"] == -1
+
+    def add(self, key, offset):
+        # Se acumula hasta flush(): un lote entero cuesta una sola escritura
+        self._pending.append({"key": self.schema.coerce("key", key), "offset": offset})
+
+    def flush(self):
+        if self._removed:
+            # Las marcas de borrado van antes: reconstruct lee los archivos
+            ops = [(WRITE, f, pos * self.schema.size, self.schema.pack(rec))
+                   for (f, pos), rec in self._removed.items()]
+            self._removed = {}
+            apply_ops(self.wal, ops)
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        size_aux = self.get_size(self.aux_file)
+        if size_aux + len(pending) > self.aux_limit:
+            self.reconstruct("key", extra=pending)
+        else:
+            data = b"".join(self.schema.pack(r) for r in pending)
+            for rec in pending:
+                self._bloom_add(self.aux_file, rec)
+            apply_ops(self.wal, [(WRITE, self.aux_file, size_aux * self.schema.size, data)] + self._bloom_ops())
+
+    def bulk_load(self, entries, count=None):
+        """
+        Reescribe el índice desde cero con entradas (clave, offset) ordenadas:
+        todas van al .seq, por tramos de BULK_CHUNK, y el auxiliar queda vacío.
+        """
+        if count is None:
+            entries = list(entries)
+            count = len(entries)
+        self._pending, self._removed = [], {}
+        self.aux_limit = max(3, int(math.log(count + 1, 2)))
+        main = self.blooms[self.file_name] = BloomFilter(2 * count, self.bloom_fpr)
+        self.blooms[self.aux_file] = BloomFilter(self.aux_limit, self.bloom_fpr)
+
+        pack = self.schema.pack
+        ops = [(TRUNCATE, self.file_name, 0, b""), (TRUNCATE, self.aux_file, 0, b"")]
+        entries, pos = iter(entries), 0
+        while True:
+            chunk = list(islice(entries, BULK_CHUNK))
+            if not chunk:
+                break
+            for key in dict.fromkeys(k for k, _ in chunk):
+                main.add(key)
+            data = b"".join(pack(entry) for entry in chunk)
+            ops.append((WRITE, self.file_name, pos, data))
+            pos += len(data)
+            # Cada tramo es un commit: no se arma el archivo entero en memoria
+            apply_ops(self.wal, ops)
+            ops = []
+        apply_ops(self.wal, ops + self._bloom_ops())
+
+    def _matches(self, low, high):
+        """
+        Genera (archivo, posición, entrada) con low <= key <= high.
+        En búsquedas puntuales los filtros de Bloom saltan los archivos sin la clave.
+        """
+        point = low is not None and low == high
+        size = self.get_size(self.file_name)
+        if point and not self._may_contain(self.file_name, low, "key"):
+            size = 0
+        with open(self.file_name, "rb") as f:
+            left, right, start = 0, size - 1, size
+            if low is None:
+                start = 0
+            while low is not None and left <= right:
+                mid = (left + right) // 2
+                f.seek(mid * self.schema.size)
+                rec = self.schema.unpack(f.read(self.schema.size))
+                self.node_visits += 1
+                self.pages_read += 1
+                self.bytes_read += self.schema.size
+                if rec["key"] >= low:
+                    start, right = mid, mid - 1
+                else:
+                    left = mid + 1
+
+        # Desde start se lee en orden: lecturas grandes por delante si el rango sigue
+        rsize = self.schema.size
+        scanned = 0
+        try:
+            with closing(read_ahead(self.file_name, spans(start * rsize, size * rsize, rsize))) as chunks:
+                for offset, data in chunks:
+                    scanned += len(data)
+                    for i in range(0, len(data) - rsize + 1, rsize):
+                        rec = self.schema.unpack(data[i:i + rsize])
+                        if high is not None and rec["key"] > high:
+                            break
+                        pos = (offset + i) // rsize
+                        if not self._is_deleted(rec, "key") and (self.file_name, pos) not in self._removed:
+                            yield self.file_name, pos, rec
+                    else:
+                        continue
+                    break
+        finally:
+            self.bytes_read += scanned
+            self.pages_read += -(-scanned // PAGE_SIZE)
+
+        aux = []
+        if not point or self._may_contain(self.aux_file, low, "key"):
+            aux_bytes = os.path.getsize(self.aux_file)
+            self.bytes_read += aux_bytes
+            self.pages_read += -(-aux_bytes // PAGE_SIZE)
+            aux = self._read_all(self.aux_file)
+        for pos, rec in enumerate(aux):
+            if not self._is_deleted(rec, "key") and (self.aux_file, pos) not in self._removed \
+                    and (low is None or rec["key"] >= low) and (high is None or rec["key"] <= high):
+                yield self.aux_file, pos, rec
+
+        for rec in self._pending:
+            if (low is None or rec["key"] >= low) and (high is None or rec["key"] <= high):
+                yield None, None, rec
+
+    def search(self, key, key_name="key"):
+        key = self.schema.coerce("key", key)
+        return [rec["offset"] for _, _, rec in self._matches(key, key)]
+
+    def range_search(self, low=None, high=None, key_name="key"):
+        low = None if low is None else self.schema.coerce("key", low)
+        high = None if high is None else self.schema.coerce("key", high)
+        results = [rec for _, _, rec in self._matches(low, high)]
+        results.sort(key=lambda r: (r["key"], r["offset"]))
+        return [rec["offset"] for rec in results]
+
+    def remove(self, key, offset=None, key_name="key"):
+        key = self.schema.coerce("key", key)
+        removed = False
+        for file_name, pos, rec in list(self._matches(key, key)):
+            if offset is not None and rec["offset"] != offset:
+                continue
+            if file_name is None:
+                self._pending.remove(rec)
+            else:
+                self._removed[(file_name, pos)] = dict(rec, offset=-1)
+            removed = True
+        return removed
+
+    def height(self):
+        return max(1, int(math.log(self.get_size(self.file_name) + 1, 2)))
+
+    def io_counters(self):
+        # Cada sondeo de la búsqueda binaria es una lectura aleatoria
+        return {
+            "pages_read": self.pages_read,
+            "bytes_read": self.bytes_read,
+            "buffer_hits": 0,
+            "node_visits": self.node_visits,
+            "bloom_skips": self.bloom_skips,
+        }
+
+    def __len__(self):
+        return self.get_size(self.file_name) + self.get_size(self.aux_file) + len(self._pending)
@@ -0,0 +1,280 @@
+# dbms/sketch.py
+import os
+import math
+import zlib
+import random
+import struct
+import threading
+
+from src.record import NUMERIC_TYPES
+from src.dbms.statistics import HyperLogLog, HLL_P
+from src.dbms import vectorized
+
+# Ítems que guarda el KLL de una consulta (error de rango ~1.7/k: ~1%)
+KLL_K = 200
+# El de cada bloque es más chico: se guarda en un lugar de tamaño fijo
+BLOCK_K = 128
+BLOCK_CAP = 256
+
+# Cabecera del archivo: magic | registros por bloque | p del HyperLogLog | ítems KLL por bloque
+HEADER = struct.Struct("<4sIII")
+MAGIC = b"SKT1"
+# Cabecera de cada bloque: crc32 del resto | filas | versiones vivas | valores no nulos | ítems KLL
+SLOT_HEADER = struct.Struct("<IIIIH")
+
+
+class KLLSketch:
+    """
+    Cuantiles aproximados (KLL), mezclable. Un compactor por nivel: los
+    ítems del nivel h pesan 2^h. Cuando un nivel se llena se ordena y pasa
+    al siguiente la mitad (los pares o los impares, al azar), así que la
+    memoria queda en O(k) y el error de rango en ~1.7/k con alta
+    probabilidad, sin importar cuántos valores se agreguen o mezclen.
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.levels = [[]]
+        self.count = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        # Los niveles bajos (ítems livianos) tienen menos lugar
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def __len__(self):
+        return sum(len(items) for items in self.levels)
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    def _compact(self, level):
+        if level + 1 == len(self.levels):
+            self.levels.append([])
+        items = sorted(self.levels[level])
+        # Con cantidad impar uno se queda en el nivel
+        keep = [items.pop()] if len(items) % 2 else []
+        self.levels[level + 1].extend(items[self._random.randint(0, 1)::2])
+        self.levels[level] = keep
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self._capacity(level):
+                self._compact(level)
+            level += 1
+
+    def compress_to(self, limit):
+        """
+        Compacta hasta guardar a lo sumo limit ítems (más error, tamaño fijo).
+        """
+        while len(self) > limit:
+            self._compact(next(h for h, items in enumerate(self.levels) if len(items) > 1))
+
+    def quantile(self, q):
+        """
+        Valor con rango aproximado q * count (q entre 0 y 1); None si está vacío.
+        """
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def items(self):
+        # (valor, nivel) de todos los ítems
+        return [(value, level) for level, values in enumerate(self.levels) for value in values]
+
+    @classmethod
+    def from_items(cls, items, count, k=KLL_K, seed=0):
+        sketch = cls(k, seed)
+        for value, level in items:
+            while len(sketch.levels) <= level:
+                sketch.levels.append([])
+            sketch.levels[level].append(value)
+        sketch.count = count
+        return sketch
+
+
+class BlockSketches:
+    """
+    Sketches de una columna por bloque del .dat (los mismos bloques del
+    mapa de zonas): HyperLogLog para valores distintos y, si la columna es
+    numérica, KLL para percentiles. Mezclarlos responde APPROX_COUNT_DISTINCT
+    y APPROX_PERCENTILE de toda la tabla sin leer el .dat.
+
+    Se guardan en <tabla>.c<posición de la columna>.skt, un lugar de tamaño
+    fijo por bloque. Son un caché: no pasan por el WAL y cada lugar lleva
+    su crc32. Un bloque se vuelve a medir (y se reescribe su lugar) cuando
+    cambian sus filas o cuántas versiones ve la consulta (inserciones,
+    borrados); los demás se leen de acá o de memoria.
+    """
+
+    def __init__(self, path, schema, column, block_rows):
+        self.path = path
+        self.schema = schema
+        self.column = column
+        self.block_rows = block_rows
+        self.numeric = schema.types[column] in NUMERIC_TYPES
+        self.hll_size = 1 << HLL_P
+        self.cap = BLOCK_CAP if self.numeric else 0
+        self.slot_size = SLOT_HEADER.size + self.hll_size + self.cap * 9
+        self._lock = threading.Lock()
+        self._cache = {}  # bloque -> ((filas, vivas), valores, HyperLogLog, KLLSketch)
+
+    # ---------------------------
+    # Claves de los bloques
+    # ---------------------------
+    def keys(self, file_manager, snapshot):
+        """
+        (filas, versiones vivas) de cada bloque para el snapshot.
+        """
+        total = os.path.getsize(file_manager.filename) // self.schema.size
+        blocks = -(-total // self.block_rows)
+        if vectorized.available():
+            np = vectorized.np
+            versions = np.frombuffer(file_manager.versions.read(0, total), dtype="<u4")
+            live = vectorized.visible_mask(versions, snapshot).astype(np.int64)
+            starts = np.arange(0, total, self.block_rows)
+            counts = np.add.reduceat(live, starts).tolist() if total else []
+        else:
+            versions = file_manager.versions.read_array(0, total)
+            counts = [0] * blocks
+            for row in range(total):
+                if snapshot.visible(versions[2 * row], versions[2 * row + 1]):
+                    counts[row // self.block_rows] += 1
+        return [(min(self.block_rows, total - block * self.block_rows), counts[block]) for block in range(blocks)]
+
+    # ---------------------------
+    # Bloques
+    # ---------------------------
+    def blocks(self, file_manager, snapshot):
+        """
+        Lista de (valores no nulos, HyperLogLog, KLLSketch o None) de cada bloque.
+        Los sketches que se devuelven son compartidos: no hay que modificarlos.
+        """
+        keys = self.keys(file_manager, snapshot)
+        result, writes = [], []
+        with self._lock:
+            stored = None
+            for block, key in enumerate(keys):
+                cached = self._cache.get(block)
+                if cached is None or cached[0] != key:
+                    if stored is None:
+                        stored = self._read_slots(len(keys))
+                    cached = stored.get(block)
+                    if cached is None or cached[0] != key:
+                        cached = self._measure(file_manager, block, snapshot)
+                        writes.append((block, cached))
+                    self._cache[block] = cached
+                result.append(cached[1:])
+            for block in [b for b in self._cache if b >= len(keys)]:
+                del self._cache[block]
+            self._write_slots(writes)
+        return result
+
+    def _measure(self, file_manager, block, snapshot):
+        # Recorre el bloque y arma sus sketches con las versiones que ve el snapshot
+        size = self.schema.size
+        start = block * self.block_rows
+        with open(file_manager.filename, "rb") as f:
+            f.seek(start * size)
+            data = f.read(self.block_rows * size)
+        rows = len(data) // size
+        versions = file_manager.versions.read_array(start, rows)
+        decode = self.schema.decoder([self.column], as_tuple=True)
+        hll = HyperLogLog()
+        kll = KLLSketch(BLOCK_K, seed=block) if self.numeric else None
+        live = count = 0
+        for i in range(rows):
+            if not snapshot.visible(versions[2 * i], versions[2 * i + 1]):
+                continue
+            live += 1
+            pos = i * size
+            if data[pos:pos + size].strip(b"\x00") == b"":
+                continue
+            value = decode(data, pos)[0]
+            if value is None or value == "":
+                continue
+            count += 1
+            hll.add(value)
+            if kll is not None:
+                kll.add(float(value))
+        if kll is not None:
+            kll.compress_to(self.cap)
+        return (rows, live), count, hll, kll
+
+    # ---------------------------
+    # Archivo
+    # ---------------------------
+    def _header(self):
+        return HEADER.pack(MAGIC, self.block_rows, HLL_P, self.cap)
+
+    def _read_slots(self, blocks):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "rb") as f:
+            data = f.read(HEADER.size + blocks * self.slot_size)
+        if data[:HEADER.size] != self._header():
+            return {}
+        stored = {}
+        for block in range(blocks):
+            start = HEADER.size + block * self.slot_size
+            slot = data[start:start + self.slot_size]
+            if len(slot) < self.slot_size or slot.strip(b"\x00") == b"":
+                continue
+            crc, rows, live, count, items = SLOT_HEADER.unpack_from(slot)
+            if crc != zlib.crc32(slot[4:]):
+                continue
+            pos = SLOT_HEADER.size
+            hll = HyperLogLog(HLL_P, slot[pos:pos + self.hll_size])
+            kll = None
+            if self.numeric:
+                pos += self.hll_size
+                values = struct.unpack_from(f"<{items}d", slot, pos)
+                levels = slot[pos + self.cap * 8:pos + self.cap * 8 + items]
+                kll = KLLSketch.from_items(zip(values, levels), count, BLOCK_K, seed=block)
+            stored[block] = ((rows, live), count, hll, kll)
+        return stored
+
+    def _pack_slot(self, key, count, hll, kll):
+        items = kll.items() if kll is not None else []
+        body = SLOT_HEADER.pack(0, key[0], key[1], count, len(items))[4:] + bytes(hll.registers)
+        if self.numeric:
+            values = struct.pack(f"<{len(items)}d", *(float(v) for v, _ in items))
+            body += values.ljust(self.cap * 8, b"\x00") + bytes(level for _, level in items).ljust(self.cap, b"\x00")
+        return struct.pack("<I", zlib.crc32(body)) + body
+
+    def _write_slots(self, writes):
+        if not writes:
+            return
+        mode = "r+b" if os.path.exists(self.path) else "w+b"
+        with open(self.path, mode) as f:
+            if f.read(HEADER.size) != self._header():
+                f.seek(0)
+                f.truncate()
+                f.write(self._header())
+            for block, (key, count, hll, kll) in writes:
+                f.seek(HEADER.size + block * self.slot_size)
+                f.write(self._pack_slot(key, count, hll, kll))
+
+
+def sketch_path(data_dir, table_name, position):
+    return os.path.join(data_dir, f"{table_name}.c{position}.skt")
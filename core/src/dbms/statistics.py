@@ -0,0 +1,337 @@
+# dbms/statistics.py
+import math
+import base64
+import random
+import hashlib
+from bisect import bisect_right
+
+# HyperLogLog con 2^10 registros (~3% de error, 1 KB por columna)
+HLL_P = 10
+# Buckets del histograma equi-profundo y tamaño de la muestra de ANALYZE
+HISTOGRAM_BUCKETS = 20
+SAMPLE_SIZE = 10000
+
+# Selectividades por defecto cuando no hay información
+DEFAULT_EQ = 0.005
+DEFAULT_RANGE = 1 / 3
+DEFAULT_NEAR = 0.01
+DEFAULT_MATCH = 0.01
+
+
+def hash64(value):
+    """
+    Hash estable de 64 bits (hash() de Python cambia entre procesos).
+    """
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """
+    Estimador de cardinalidad (valores distintos) mezclable.
+    """
+
+    def __init__(self, p=HLL_P, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    def add(self, value):
+        h = hash64(value)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # conteo lineal para cardinalidades bajas
+        return int(round(estimate))
+
+    def to_str(self):
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def from_str(cls, data, p=HLL_P):
+        return cls(p, base64.b64decode(data))
+
+
+class ColumnStats:
+    """
+    Estadísticas de una columna: mínimo, máximo, nulos, valores distintos
+    (HyperLogLog) e histograma equi-profundo.
+    """
+
+    def __init__(self, ctype):
+        self.ctype = ctype
+        self.min = None
+        self.max = None
+        self.nulls = 0
+        self.hll = HyperLogLog()
+        self.bounds = []   # histograma: len(counts) + 1 cotas
+        self.counts = []
+
+    @property
+    def ordered(self):
+        return not self.ctype.startswith("ARRAY")
+
+    def observe(self, value):
+        if value is None or value == "":
+            self.nulls += 1
+            return
+        if not self.ordered:
+            self.hll.add(tuple(value))
+            return
+        self.hll.add(value)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.counts:
+            # Mantener el histograma al día sin reconstruirlo
+            i = min(max(bisect_right(self.bounds, value) - 1, 0), len(self.counts) - 1)
+            self.counts[i] += 1
+            if value < self.bounds[0]:
+                self.bounds[0] = value
+            elif value > self.bounds[-1]:
+                self.bounds[-1] = value
+
+    def merge(self, other):
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def build_histogram(self, sample, total):
+        """
+        Cotas equi-profundas a partir de una muestra ordenada, escaladas al total.
+        """
+        self.bounds, self.counts = [], []
+        if not sample or not self.ordered:
+            return
+        sample.sort()
+        buckets = min(HISTOGRAM_BUCKETS, len(sample))
+        last = len(sample) - 1
+        self.bounds = [sample[round(i * last / buckets)] for i in range(buckets + 1)]
+        per_bucket = total / buckets
+        self.counts = [per_bucket] * buckets
+
+    @property
+    def ndv(self):
+        return self.hll.count()
+
+    # ---------------------------
+    # Selectividad
+    # ---------------------------
+    def eq_selectivity(self, value, rows):
+        if rows == 0:
+            return 0.0
+        if value is None:
+            return self.nulls / rows
+        if self.ordered and self.min is not None and (value < self.min or value > self.max):
+            return 0.0
+        ndv = self.ndv
+        sel = 1.0 / ndv if ndv else DEFAULT_EQ
+        if self.counts:
+            # Un valor que ocupa varias cotas es frecuente: pesa esos buckets
+            repeated = self.bounds.count(value)
+            if repeated > 1:
+                sel = max(sel, (repeated - 1) / len(self.counts))
+        return min(1.0, sel * (rows - self.nulls) / rows)
+
+    def range_selectivity(self, low, high, rows):
+        if rows == 0:
+            return 0.0
+        if self.min is None:
+            return DEFAULT_RANGE
+        low = self.min if low is None else low
+        high = self.max if high is None else high
+        try:
+            if low > high or high < self.min or low > self.max:
+                return 0.0
+        except TypeError:
+            return DEFAULT_RANGE
+        not_null = (rows - self.nulls) / rows
+
+        if self.counts:
+            total = sum(self.counts)
+            covered = 0.0
+            for i, count in enumerate(self.counts):
+                covered += count * _overlap(self.bounds[i], self.bounds[i + 1], low, high)
+            return min(1.0, covered / total * not_null) if total else 0.0
+        return _overlap(self.min, self.max, low, high) * not_null
+
+    # ---------------------------
+    # Persistencia
+    # ---------------------------
+    def to_dict(self):
+        return {
+            "min": self.min,
+            "max": self.max,
+            "nulls": self.nulls,
+            "ndv": self.ndv,
+            "hll": self.hll.to_str(),
+            "histogram": {"bounds": self.bounds, "counts": [round(c, 2) for c in self.counts]},
+        }
+
+    @classmethod
+    def from_dict(cls, ctype, data):
+        stats = cls(ctype)
+        stats.min = data.get("min")
+        stats.max = data.get("max")
+        stats.nulls = data.get("nulls", 0)
+        if data.get("hll"):
+            stats.hll = HyperLogLog.from_str(data["hll"])
+        histogram = data.get("histogram") or {}
+        stats.bounds = histogram.get("bounds", [])
+        stats.counts = histogram.get("counts", [])
+        return stats
+
+
+def _overlap(b_low, b_high, low, high):
+    """
+    Fracción del intervalo [b_low, b_high] que cae en [low, high].
+    Para valores no numéricos se asume la mitad en cruces parciales.
+    """
+    if high < b_low or low > b_high:
+        return 0.0
+    if low <= b_low and high >= b_high:
+        return 1.0
+    if isinstance(b_low, (int, float)) and isinstance(b_high, (int, float)):
+        width = b_high - b_low
+        if width <= 0:
+            return 1.0
+        return (min(high, b_high) - max(low, b_low)) / width
+    return 0.5
+
+
+class TableStats:
+    """
+    Estadísticas de una tabla: cantidad de filas y ColumnStats por columna.
+    Se actualizan incrementalmente en cada inserción y se recalculan con ANALYZE.
+    """
+
+    def __init__(self, schema):
+        self.row_count = 0
+        self.columns = {col["name"]: ColumnStats(col["type"].upper()) for col in schema.columns}
+
+    def observe(self, record):
+        self.row_count += 1
+        for name, stats in self.columns.items():
+            stats.observe(record.get(name))
+
+    def merge(self, other):
+        self.row_count += other.row_count
+        for name, stats in self.columns.items():
+            if name in other.columns:
+                stats.merge(other.columns[name])
+
+    def forget(self, count=1):
+        self.row_count = max(0, self.row_count - count)
+
+    @classmethod
+    def analyze(cls, schema, records, sample_size=SAMPLE_SIZE, seed=0):
+        """
+        Recorre todos los registros: conteos exactos, HLL y una muestra
+        de reservorio por columna para armar los histogramas.
+        """
+        stats = cls(schema)
+        rng = random.Random(seed)
+        samples = {name: [] for name in stats.columns}
+        for rec in records:
+            stats.observe(rec)
+            n = stats.row_count
+            for name, col_stats in stats.columns.items():
+                value = rec.get(name)
+                if value is None or value == "" or not col_stats.ordered:
+                    continue
+                sample = samples[name]
+                if len(sample) < sample_size:
+                    sample.append(value)
+                else:
+                    j = rng.randrange(n)
+                    if j < sample_size:
+                        sample[j] = value
+        for name, col_stats in stats.columns.items():
+            col_stats.build_histogram(samples[name], stats.row_count - col_stats.nulls)
+        return stats
+
+    def to_dict(self):
+        return {
+            "row_count": self.row_count,
+            "columns": {name: stats.to_dict() for name, stats in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, schema, data):
+        stats = cls(schema)
+        if not data:
+            return stats
+        stats.row_count = data.get("row_count", 0)
+        for name, col_data in data.get("columns", {}).items():
+            if name in stats.columns:
+                stats.columns[name] = ColumnStats.from_dict(stats.columns[name].ctype, col_data)
+        return stats
+
+    # ---------------------------
+    # Estimaciones
+    # ---------------------------
+    def selectivity(self, node):
+        """
+        Fracción estimada de filas que cumplen el predicado (ya coercionado).
+        Los predicados de un AND se asumen independientes.
+        """
+        kind = node[0]
+        rows = self.row_count
+        if kind == "true":
+            return 1.0
+        if kind == "false":
+            return 0.0
+        if kind == "and":
+            sel = 1.0
+            for child in node[1]:
+                sel *= self.selectivity(child)
+            return sel
+        if kind == "or":
+            sel = 0.0
+            for child in node[1]:
+                s = self.selectivity(child)
+                sel = sel + s - sel * s
+            return sel
+        if kind == "not":
+            return 1.0 - self.selectivity(node[1])
+
+        col = self.columns.get(node[1])
+        if col is None:
+            return DEFAULT_RANGE
+        if kind == "cmp":
+            op, value = node[2], node[3]
+            if op == "=":
+                return col.eq_selectivity(value, rows)
+            if op in ("!=", "<>"):
+                return 1.0 - col.eq_selectivity(value, rows)
+            if op in ("<", "<="):
+                return col.range_selectivity(None, value, rows)
+            return col.range_selectivity(value, None, rows)
+        if kind == "between":
+            return col.range_selectivity(node[2], node[3], rows)
+        if kind == "in":
+            return min(1.0, sum(col.eq_selectivity(v, rows) for v in node[2]))
+        if kind == "near":
+            return DEFAULT_NEAR
+        if kind == "match":
+            return DEFAULT_MATCH
+        return DEFAULT_RANGE
+
+    def estimate_rows(self, node):
+        if node is None:
+            return self.row_count
+        return self.row_count * self.selectivity(node)
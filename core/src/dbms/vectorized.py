@@ -0,0 +1,304 @@
+# dbms/vectorized.py
+import os
+import mmap
+import logging
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # sin NumPy todo se ejecuta fila a fila
+    np = None
+
+from src.record import type_format, date_to_days, days_to_date, DATE_NULL, INTEGER_TYPES
+from src.dbms.file_manager import PAGE_SIZE
+from src.dbms.prefetch import advise_mmap
+
+logger = logging.getLogger(__name__)
+
+# Se puede apagar para comparar con el camino fila a fila
+ENABLED = True
+# Bloques del mapa de zonas que se procesan juntos como un lote
+BATCH_BLOCKS = 16
+
+# Formato struct -> tipo de NumPy con el mismo tamaño y representación
+NUMPY_FORMATS = {"h": "=i2", "i": "=i4", "q": "=i8", "f": "=f4", "d": "=f8", "?": "?"}
+
+OPERATORS = {
+    "=": operator.eq, "!=": operator.ne, "<>": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+def available():
+    return ENABLED and np is not None
+
+
+# ---------------------------
+# Esquema -> dtype estructurado
+# ---------------------------
+def schema_dtype(schema):
+    """
+    dtype de NumPy con el mismo layout que RecordSchema (formato struct nativo,
+    con su relleno de alineación): un bloque del .dat se ve como un arreglo
+    de registros sin copiar nada.
+    """
+    names, formats = [], []
+    for col in schema.columns:
+        code = type_format(col["type"])
+        if code == "ff":
+            np_format = np.dtype(("=f4", (2,)))
+        elif code.endswith("s"):
+            np_format = np.dtype(f"S{code[:-1]}")
+        else:
+            np_format = np.dtype(NUMPY_FORMATS[code])
+        names.append(col["name"])
+        formats.append(np_format)
+    offsets = [schema.offsets[name] for name in names]
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": schema.size})
+
+
+def supports(schema, node):
+    """
+    True si el WHERE (ya coercionado) se puede evaluar como máscara.
+    """
+    if not available():
+        return False
+    if node is None:
+        return True
+    kind = node[0]
+    if kind in ("true", "false"):
+        return True
+    if kind in ("and", "or"):
+        return all(supports(schema, child) for child in node[1])
+    if kind == "not":
+        return supports(schema, node[1])
+    ctype = schema.types.get(node[1], "")
+    if kind == "near":
+        return ctype.startswith("ARRAY")
+    return kind in ("cmp", "between", "in") and not ctype.startswith("ARRAY")
+
+
+# ---------------------------
+# Predicados como máscaras
+# ---------------------------
+def _literal(ctype, value):
+    # El literal con la misma representación binaria que la columna en disco
+    if ctype == "DATE":
+        return np.int32(date_to_days(value) if value != "" else DATE_NULL)
+    code = type_format(ctype)
+    if code in NUMPY_FORMATS:
+        return np.dtype(NUMPY_FORMATS[code]).type(value)
+    n = int(code[:-1])
+    return str(value).encode("utf-8")[:n].ljust(n, b" ")
+
+
+def _null_literal(ctype):
+    # Cómo se ve en disco un valor nulo; los números y booleanos no tienen nulo
+    if ctype == "DATE" or ctype.startswith("VARCHAR"):
+        return _literal(ctype, "")
+    return None
+
+
+def mask(node, batch, schema):
+    n = len(batch)
+    if node is None:
+        return np.ones(n, dtype=bool)
+    kind = node[0]
+    if kind == "true":
+        return np.ones(n, dtype=bool)
+    if kind == "false":
+        return np.zeros(n, dtype=bool)
+    if kind == "and":
+        result = np.ones(n, dtype=bool)
+        for child in node[1]:
+            result &= mask(child, batch, schema)
+        return result
+    if kind == "or":
+        result = np.zeros(n, dtype=bool)
+        for child in node[1]:
+            result |= mask(child, batch, schema)
+        return result
+    if kind == "not":
+        return ~mask(node[1], batch, schema)
+
+    column = batch[node[1]]
+    ctype = schema.types[node[1]]
+    if kind == "cmp":
+        if node[3] is None:
+            return np.zeros(n, dtype=bool)
+        return OPERATORS[node[2]](column, _literal(ctype, node[3]))
+    if kind == "between":
+        return (column >= _literal(ctype, node[2])) & (column <= _literal(ctype, node[3]))
+    if kind == "in":
+        if not node[2]:
+            return np.zeros(n, dtype=bool)
+        values = np.array([_literal(ctype, v) for v in node[2]], dtype=column.dtype)
+        return np.isin(column, values)
+    if kind == "near":
+        (x, y), radius = node[2], node[3]
+        points = column.astype(np.float64)
+        return np.hypot(points[:, 0] - x, points[:, 1] - y) <= radius
+    raise ValueError(f"Predicado no soportado: {kind}")
+
+
+# ---------------------------
+# Recorrido por lotes
+# ---------------------------
+def visible_mask(versions, snapshot):
+    """
+    Máscara de las versiones (arreglo <u4 [xmin, xmax, ...]) que ve el snapshot.
+    """
+    xmin, xmax = versions[0::2], versions[1::2]
+    invisible = np.fromiter(snapshot.invisible, dtype=np.uint32, count=len(snapshot.invisible))
+
+    def sees(txids):
+        seen = txids < snapshot.xmax
+        if len(invisible):
+            seen &= ~np.isin(txids, invisible)
+        return seen
+
+    return sees(xmin) & ~((xmax != 0) & sees(xmax))
+
+
+def scan_batches(file_manager, condition=None, snapshot=None, sample=None):
+    """
+    Genera (offset, lote, máscara): arreglos estructurados sobre el .dat
+    mapeado en memoria (np.frombuffer, sin copia) y la máscara de filas vivas
+    que cumplen la condición. Salta los bloques descartados por el mapa de zonas.
+    snapshot: si se pasa, la máscara deja solo las versiones que ve
+    sample: TableSample; el lote trae solo las filas de la muestra (con
+    SYSTEM las páginas que no entran no se tocan) y offset es el del bloque
+    """
+    schema = file_manager.schema
+    size = schema.size
+    total_rows = os.path.getsize(file_manager.filename) // size
+    if total_rows == 0:
+        return
+    dtype = schema_dtype(schema)
+    zone_map = file_manager.zone_map
+    block_rows = zone_map.block_rows
+
+    with open(file_manager.filename, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    advise_mmap(data)
+
+    read = skipped = 0
+    try:
+        block, blocks = 0, -(-total_rows // block_rows)
+        while block < blocks:
+            if condition is not None and not zone_map.may_match(block, condition):
+                skipped += 1
+                block += 1
+                continue
+            # Bloques contiguos que hay que leer forman un lote
+            first = block
+            while block < blocks and block - first < BATCH_BLOCKS and \
+                    (condition is None or zone_map.may_match(block, condition)):
+                block += 1
+            start = first * block_rows
+            count = min(block * block_rows, total_rows) - start
+            if block < blocks and (condition is None or zone_map.may_match(block, condition)):
+                # El siguiente lote se pide al disco mientras se evalúa este
+                advise_mmap(data, (start + count) * size, BATCH_BLOCKS * block_rows * size, willneed=True)
+            batch = np.frombuffer(data, dtype=dtype, count=count, offset=start * size)
+            raw = np.frombuffer(data, dtype=np.uint8, count=count * size, offset=start * size).reshape(count, size)
+            if snapshot is not None:
+                versions = np.frombuffer(file_manager.versions.read(start, count), dtype="<u4")
+            if sample is not None:
+                # Solo se copian (y se leen del mmap) las filas elegidas
+                rows = np.flatnonzero(sample.row_mask(start, count, size))
+                batch, raw = batch[rows], raw[rows]
+                if snapshot is not None:
+                    versions = versions.reshape(count, 2)[rows].reshape(-1)
+                if sample.method == "system":
+                    read += -(-len(rows) // sample.page_rows(size)) * PAGE_SIZE
+                else:
+                    read += count * size
+            else:
+                read += count * size
+            # Los borrados son registros todos en cero
+            alive = raw.any(axis=1)
+            if snapshot is not None:
+                alive &= visible_mask(versions, snapshot)
+            yield start * size, batch, alive & mask(condition, batch, schema)
+    finally:
+        file_manager.bytes_read += read
+        file_manager.pages_read += -(-read // PAGE_SIZE)
+        file_manager.blocks_skipped += skipped
+
+
+# ---------------------------
+# De arreglos a valores de Python
+# ---------------------------
+def _converter(ctype):
+    if ctype in INTEGER_TYPES:
+        return int
+    if ctype in ("FLOAT", "DOUBLE"):
+        return float
+    if ctype == "BOOLEAN":
+        return bool
+    if ctype == "DATE":
+        return lambda v: days_to_date(int(v))
+    if ctype.startswith("ARRAY"):
+        return lambda v: [float(v[0]), float(v[1])]
+    return lambda v: v.decode().strip()
+
+
+def to_rows(batch, columns, schema):
+    """
+    Convierte a tuplas solo las filas del lote (ya filtrado) con las
+    columnas pedidas, en ese orden. Se convierte columna por columna.
+    """
+    values = []
+    for name in columns:
+        ctype = schema.types[name]
+        field = batch[name].tolist()
+        if ctype.startswith("VARCHAR"):
+            field = [v.decode().strip() for v in field]
+        elif ctype == "DATE":
+            field = [days_to_date(v) for v in field]
+        values.append(field)
+    if not values:
+        return [()] * len(batch)
+    return list(zip(*values))
+
+
+def reduce_batch(aggregators, batch, schema):
+    """
+    Aplica las agregaciones al lote ya filtrado con reducciones de NumPy.
+    """
+    for agg in aggregators:
+        if agg.column == "*":
+            agg.merge_partial(len(batch))
+            continue
+        ctype = schema.types[agg.column]
+        values = batch[agg.column]
+        if agg.sketch is not None:
+            null = _null_literal(ctype)
+            if null is not None:
+                values = values[values != null]
+            agg.add_many(map(_converter(ctype), values.tolist()))
+            continue
+        if ctype.startswith("ARRAY"):
+            # Sin orden: solo COUNT tiene sentido
+            agg.merge_partial(len(values))
+            continue
+        null = _null_literal(ctype)
+        if null is not None:
+            values = values[values != null]
+        if not len(values):
+            continue
+        if ctype.startswith("VARCHAR"):
+            if agg.func in ("min", "max"):
+                decoded = [v.decode().strip() for v in values.tolist()]
+                agg.merge_partial(len(decoded), low=min(decoded), high=max(decoded))
+            else:
+                agg.merge_partial(len(values))
+            continue
+        total = None
+        if agg.func in ("sum", "avg"):
+            total = int(values.sum(dtype=np.int64)) if ctype in INTEGER_TYPES \
+                else float(values.sum(dtype=np.float64))
+        low = _converter(ctype)(values.min()) if agg.func == "min" else None
+        high = _converter(ctype)(values.max()) if agg.func == "max" else None
+        agg.merge_partial(len(values), total, low, high)
@@ -0,0 +1,349 @@
+# dbms/wal.py
+import os
+import struct
+import threading
+import time
+import zlib
+
+from src.dbms.locks import FileLock
+
+# Tipos de registro del log (redo físico)
+WRITE = 1      # escribir bytes en un offset de un archivo
+TRUNCATE = 2   # truncar un archivo a cierto tamaño
+REPLACE = 3    # reemplazar el contenido completo de un archivo (ej. catalog.json)
+COMMIT = 4     # fin de un lote de apply (sin ruta; offset = cantidad de operaciones)
+
+# crc32 | lsn | largo del payload
+HEADER = struct.Struct("<IQI")
+# tipo | largo de la ruta | offset o tamaño
+PAYLOAD = struct.Struct("<BHq")
+
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+
+def _pwrite(path, offset, data):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+
+
+def _fsync(path):
+    if not os.path.exists(path):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _replace(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _execute(kind, path, position, data):
+    if kind == WRITE:
+        _pwrite(path, position, data)
+    elif kind == TRUNCATE:
+        with open(path, "ab") as f:
+            f.truncate(position)
+    elif kind == REPLACE:
+        _replace(path, data)
+
+
+def apply_ops(wal, ops):
+    """
+    Aplica operaciones (tipo, path, posición, datos): con WAL en un solo
+    commit; sin WAL, directamente sobre los archivos.
+    """
+    if wal is not None:
+        wal.apply(ops)
+        return
+    for kind, path, position, data in ops:
+        _execute(kind, path, position, data)
+
+
+class WriteAheadLog:
+    """
+    Log de escritura anticipada con redo físico.
+
+    Cada escritura se registra en el log antes de tocar el archivo de datos.
+    Los escritores concurrentes comparten un solo fsync por lote (group commit):
+    el primero en llegar hace de líder y vuelca todo lo acumulado, el resto espera.
+    Los archivos de datos solo se sincronizan en el checkpoint.
+
+    Las operaciones de un apply van juntas en el log y terminan en un
+    registro COMMIT; la recuperación solo reaplica lotes con su COMMIT, así
+    que un lote nunca queda aplicado a medias.
+
+    Varios procesos (workers) pueden compartir el log: cada commit se agrega
+    con una sola escritura O_APPEND y, mientras un proceso tiene escrituras
+    entre el log y los archivos, retiene un lock compartido (<log>.lock).
+    El checkpoint y la recuperación lo toman exclusivo.
+    """
+
+    def __init__(self, path, base_dir=None, checkpoint_bytes=CHECKPOINT_BYTES, commit_delay=0.0):
+        """
+        path: ruta del archivo de log (ej. "data/wal.log")
+        base_dir: directorio contra el que se guardan rutas relativas
+        commit_delay: segundos que el líder espera para juntar más commits
+        """
+        self.path = path
+        self.base_dir = base_dir or os.path.dirname(path)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.commit_delay = commit_delay
+
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._next_lsn = 1
+        self._flushed_lsn = 0
+        self._flushing = False
+        self._log_size = 0
+
+        # Escrituras entre su registro en el log y su aplicación en el archivo
+        self._active = 0
+        self._checkpointing = False
+        self._dirty = set()
+
+        self._file = open(self.path, "ab")
+        self._log_size = self._file.tell()
+        self._flock = FileLock(self.path + ".lock")
+
+    # ---------------------------
+    # Operaciones registradas
+    # ---------------------------
+    def write(self, path, offset, data):
+        """
+        Registra y aplica una escritura de `data` en `offset`.
+        Retorna cuando el registro ya es durable.
+        """
+        self.write_many([(path, offset, data)])
+
+    def write_many(self, writes):
+        """
+        Registra varias escrituras (path, offset, data) con un solo commit
+        y luego las aplica en orden. Útil para volcar páginas sucias de un índice.
+        """
+        self.apply([(WRITE, path, offset, data) for path, offset, data in writes])
+
+    def truncate(self, path, size=0):
+        self.apply([(TRUNCATE, path, size, b"")])
+
+    def replace(self, path, data):
+        self.apply([(REPLACE, path, 0, data)])
+
+    def apply(self, ops):
+        """
+        Registra una lista de operaciones (tipo, path, posición, datos) con
+        un solo commit y luego las aplica en orden.
+        """
+        if not ops:
+            return
+        with self._cond:
+            while self._checkpointing:
+                self._cond.wait()
+            if not self._active:
+                # El primero en entrar lo toma por todo el proceso (espera un checkpoint ajeno)
+                self._flock.lock(shared=True)
+            self._active += 1
+        try:
+            lsn = self._append(ops)
+            self.commit(lsn)
+            for kind, path, position, data in ops:
+                _execute(kind, path, position, data)
+                self._dirty.add(path)
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not self._active:
+                    self._flock.unlock()
+                self._cond.notify_all()
+
+        if self._log_size >= self.checkpoint_bytes:
+            self.checkpoint()
+
+    def _append(self, ops):
+        """
+        Agrega al buffer los registros del lote y su COMMIT, todos seguidos
+        (otro hilo no puede intercalar los suyos ni un líder vaciar el
+        buffer en el medio). Devuelve el lsn del COMMIT.
+        """
+        payloads = []
+        for kind, path, position, data in ops:
+            rel = self._relpath(path).encode("utf-8")
+            payloads.append(PAYLOAD.pack(kind, len(rel), position) + rel + data)
+        payloads.append(PAYLOAD.pack(COMMIT, 0, len(ops)))
+        with self._cond:
+            for payload in payloads:
+                lsn = self._next_lsn
+                self._next_lsn += 1
+                header = HEADER.pack(zlib.crc32(payload) & 0xFFFFFFFF, lsn, len(payload))
+                self._buffer.append(header + payload)
+        return lsn
+
+    # ---------------------------
+    # Group commit
+    # ---------------------------
+    def commit(self, lsn):
+        """
+        Bloquea hasta que el log esté sincronizado al menos hasta `lsn`.
+        """
+        while True:
+            with self._cond:
+                while self._flushing and self._flushed_lsn < lsn:
+                    self._cond.wait()
+                if self._flushed_lsn >= lsn:
+                    return
+                self._flushing = True
+
+            # Somos el líder de este lote
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                upto = self._next_lsn - 1
+
+            flushed = False
+            try:
+                # Una sola escritura con O_APPEND: no se intercala con la de otro proceso
+                fd = self._file.fileno()
+                os.write(fd, b"".join(batch))
+                os.fsync(fd)
+                self._log_size = os.fstat(fd).st_size
+                flushed = True
+            finally:
+                with self._cond:
+                    self._flushing = False
+                    if flushed:
+                        self._flushed_lsn = upto
+                    else:
+                        # devolver el lote para que otro líder lo reintente
+                        self._buffer = batch + self._buffer
+                    self._cond.notify_all()
+
+    # ---------------------------
+    # Checkpoint y recuperación
+    # ---------------------------
+    def checkpoint(self):
+        """
+        Sincroniza los archivos de datos modificados y vacía el log.
+        """
+        with self._cond:
+            if self._checkpointing:
+                return
+            self._checkpointing = True
+            while self._active:
+                self._cond.wait()
+        try:
+            self._flock.lock()
+            try:
+                self.commit(self._next_lsn - 1)
+                self._truncate()
+            finally:
+                self._flock.unlock()
+        finally:
+            with self._cond:
+                self._checkpointing = False
+                self._cond.notify_all()
+
+    def _truncate(self):
+        # Con el lock exclusivo: lo del log ya está aplicado (de este proceso o de otro)
+        for path in self._dirty | self._logged_paths():
+            _fsync(path)
+        self._dirty.clear()
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._log_size = 0
+
+    def _logged_paths(self):
+        """
+        Archivos que nombran los registros del log (los de otros procesos
+        también): se sincronizan antes de vaciarlo.
+        """
+        paths = set()
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(HEADER.size + PAYLOAD.size)
+                if len(header) < HEADER.size + PAYLOAD.size:
+                    return paths
+                _, _, length = HEADER.unpack_from(header)
+                _, path_len, _ = PAYLOAD.unpack_from(header, HEADER.size)
+                path = f.read(path_len)
+                if len(path) < path_len:
+                    return paths
+                if path_len:
+                    paths.add(self._abspath(path.decode("utf-8", "replace")))
+                f.seek(length - PAYLOAD.size - path_len, os.SEEK_CUR)
+
+    def recover(self):
+        """
+        Reaplica (redo) los lotes completos del log: sus registros se
+        reaplican recién al leer su COMMIT. Las operaciones son idempotentes,
+        así que repetir registros ya aplicados no hace daño. Se detiene en
+        el primer registro incompleto o con crc inválido; el lote que quedó
+        sin COMMIT se descarta (sus operaciones nunca llegaron a aplicarse:
+        apply espera a que el COMMIT sea durable).
+        Devuelve la cantidad de operaciones reaplicadas.
+
+        Con el lock exclusivo: si hay otros procesos, ninguno está a mitad de
+        una escritura y reaplicar el log deja los archivos como ya estaban.
+        """
+        self._file.flush()
+        self._flock.lock()
+        try:
+            return self._recover()
+        finally:
+            self._flock.unlock()
+
+    def _recover(self):
+        with open(self.path, "rb") as f:
+            log = f.read()
+
+        applied, pos, pending = 0, 0, []
+        while pos + HEADER.size <= len(log):
+            crc, lsn, length = HEADER.unpack_from(log, pos)
+            payload = log[pos + HEADER.size:pos + HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) & 0xFFFFFFFF != crc:
+                break
+            if PAYLOAD.unpack_from(payload, 0)[0] == COMMIT:
+                for op in pending:
+                    self._redo(op)
+                applied += len(pending)
+                pending = []
+            else:
+                pending.append(payload)
+            self._next_lsn = max(self._next_lsn, lsn + 1)
+            pos += HEADER.size + length
+
+        if applied or log:
+            # Los cambios reaplicados quedan en disco antes de vaciar el log
+            self._flushed_lsn = self._next_lsn - 1
+            self._truncate()
+        return applied
+
+    def _redo(self, payload):
+        kind, path_len, position = PAYLOAD.unpack_from(payload, 0)
+        start = PAYLOAD.size
+        path = self._abspath(payload[start:start + path_len].decode("utf-8"))
+        _execute(kind, path, position, payload[start + path_len:])
+        self._dirty.add(path)
+
+    def close(self):
+        self.checkpoint()
+        self._file.close()
+
+    def _relpath(self, path):
+        path = os.path.abspath(path)
+        base = os.path.abspath(self.base_dir)
+        if os.path.commonpath([path, base]) == base:
+            return os.path.relpath(path, base)
+        return path
+
+    def _abspath(self, path):
+        return path if os.path.isabs(path) else os.path.join(self.base_dir, path)
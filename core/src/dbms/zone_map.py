@@ -0,0 +1,235 @@
+# dbms/zone_map.py
+import os
+import struct
+import operator
+import threading
+
+from src.record import RecordSchema
+from src.dbms.wal import WRITE, TRUNCATE, apply_ops
+
+# Cabecera: magic | registros por bloque | cantidad de bloques
+HEADER = struct.Struct("<4sII")
+MAGIC = b"ZMP1"
+# Tamaño de bloque del .dat que resume cada entrada
+BLOCK_BYTES = 64 * 1024
+
+OPERATORS = {
+    "=": operator.eq, "!=": operator.ne, "<>": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+class ZoneMap:
+    """
+    Mapa de zonas de un .dat: por cada bloque de registros guarda, para
+    cada columna ordenable, el mínimo, el máximo, los nulos ("" o None) y
+    los no nulos. Un recorrido puede saltarse los bloques cuyo rango no
+    puede cumplir el WHERE sin leerlos.
+
+    Es conservador: los borrados no achican los rangos, una actualización
+    solo los ensancha. Se persiste en <tabla>.zmap con una entrada de
+    tamaño fijo por bloque; solo se reescriben las entradas que cambiaron.
+    """
+
+    def __init__(self, path, schema, wal=None):
+        self.path = path
+        self.schema = schema
+        self.wal = wal
+        self.block_rows = max(1, BLOCK_BYTES // schema.size)
+        # Las columnas ARRAY[FLOAT] no tienen orden: no se resumen
+        self.columns = [c["name"] for c in schema.columns if not c["type"].upper().startswith("ARRAY")]
+        entry_columns = [{"name": "rows", "type": "INT"}]
+        for name in self.columns:
+            ctype = schema.types[name]
+            entry_columns += [
+                {"name": f"min:{name}", "type": ctype},
+                {"name": f"max:{name}", "type": ctype},
+                {"name": f"nulls:{name}", "type": "INT"},
+                {"name": f"count:{name}", "type": "INT"},
+            ]
+        self.entry = RecordSchema(entry_columns)
+        # blocks[i] = [registros cubiertos, {columna: [min, max, nulos, no nulos]}]
+        self.blocks = []
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.load()
+
+    # ---------------------------
+    # Persistencia
+    # ---------------------------
+    def load(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        magic, block_rows, count = HEADER.unpack_from(data)
+        if magic != MAGIC or block_rows != self.block_rows \
+                or len(data) < HEADER.size + count * self.entry.size:
+            # Formato viejo o archivo incompleto: se rehace desde el .dat
+            return
+        for i in range(count):
+            start = HEADER.size + i * self.entry.size
+            values = self.entry.unpack(data[start:start + self.entry.size])
+            zones = {name: [values[f"min:{name}"], values[f"max:{name}"],
+                            values[f"nulls:{name}"], values[f"count:{name}"]] for name in self.columns}
+            self.blocks.append([values["rows"], zones])
+
+    def collect(self):
+        """
+        Operaciones para persistir las entradas modificadas; van en el mismo
+        commit que la escritura del .dat que las cambió.
+        """
+        with self._lock:
+            if not self._dirty:
+                return []
+            ops = [(WRITE, self.path, 0, HEADER.pack(MAGIC, self.block_rows, len(self.blocks)))]
+            for i in sorted(self._dirty):
+                ops.append((WRITE, self.path, HEADER.size + i * self.entry.size, self._pack_block(i)))
+            self._dirty.clear()
+        return ops
+
+    def _pack_block(self, i):
+        rows, zones = self.blocks[i]
+        values = [rows]
+        for name in self.columns:
+            values.extend(zones[name])
+        return self.entry.pack(values)
+
+    def covered_rows(self):
+        if not self.blocks:
+            return 0
+        return (len(self.blocks) - 1) * self.block_rows + self.blocks[-1][0]
+
+    def sync(self, filename):
+        """
+        Completa el mapa con los registros del .dat que todavía no cubre
+        (archivo sin mapa, o un mapa que quedó atrás sin WAL).
+        """
+        size = self.schema.size
+        total_rows = os.path.getsize(filename) // size
+        covered = self.covered_rows()
+        if covered > total_rows:
+            # El .dat se truncó: se rehace entero
+            self.blocks, covered = [], 0
+            apply_ops(self.wal, [(TRUNCATE, self.path, 0, b"")])
+        if covered == total_rows:
+            return
+        with open(filename, "rb") as f:
+            f.seek(covered * size)
+            data = f.read((total_rows - covered) * size)
+        self.observe_block(covered * size, data)
+        apply_ops(self.wal, self.collect())
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    def observe_block(self, offset, data):
+        """
+        Incorpora registros empacados que empiezan en offset del .dat.
+        """
+        size = self.schema.size
+        slot = offset // size
+        with self._lock:
+            for i in range(0, len(data) - size + 1, size):
+                record = data[i:i + size]
+                tombstone = record.strip(b"\x00") == b""
+                self._observe(slot, None if tombstone else self.schema.unpack(record))
+                slot += 1
+
+    def observe(self, offset, record):
+        with self._lock:
+            self._observe(offset // self.schema.size, record)
+
+    def _observe(self, slot, record):
+        block, pos = divmod(slot, self.block_rows)
+        while len(self.blocks) <= block:
+            self.blocks.append([0, {name: [None, None, 0, 0] for name in self.columns}])
+            self._dirty.add(len(self.blocks) - 1)
+        entry = self.blocks[block]
+        entry[0] = max(entry[0], pos + 1)
+        self._dirty.add(block)
+        if record is None:
+            return
+        for name in self.columns:
+            zone = entry[1][name]
+            value = record.get(name)
+            if value is None or value == "":
+                zone[2] += 1
+                continue
+            if not zone[3] or value < zone[0]:
+                zone[0] = value
+            if not zone[3] or value > zone[1]:
+                zone[1] = value
+            zone[3] += 1
+
+    # ---------------------------
+    # Poda
+    # ---------------------------
+    def may_match(self, block, node):
+        """
+        False si ningún registro del bloque puede cumplir la condición
+        (árbol ya coercionado); True si hay que leerlo.
+        """
+        if node is None or block >= len(self.blocks):
+            return True
+        return _may_match(self.blocks[block][1], node)
+
+    def skippable_blocks(self, node):
+        if node is None:
+            return 0
+        return sum(1 for i in range(len(self.blocks)) if not self.may_match(i, node))
+
+
+def _may_match(zones, node):
+    kind = node[0]
+    if kind == "true":
+        return True
+    if kind == "false":
+        return False
+    if kind == "and":
+        return all(_may_match(zones, child) for child in node[1])
+    if kind == "or":
+        return any(_may_match(zones, child) for child in node[1])
+    zone = zones.get(node[1]) if kind != "not" else None
+    if zone is None:
+        # NOT, columnas sin resumen (ARRAY) o NEAR: no se puede descartar
+        return True
+    low, high, nulls, count = zone
+    try:
+        # Los nulos se leen como "": ¿los cumple el predicado?
+        if nulls and _value_matches("", node):
+            return True
+        if not count:
+            return False
+        if kind == "cmp":
+            op, value = node[2], node[3]
+            if value is None:
+                return False
+            if op == "=":
+                return low <= value <= high
+            if op in ("!=", "<>"):
+                return not (low == high == value)
+            if op in ("<", "<="):
+                return OPERATORS[op](low, value)
+            return OPERATORS[op](high, value)
+        if kind == "between":
+            return not (high < node[2] or low > node[3])
+        if kind == "in":
+            return any(low <= value <= high for value in node[2])
+    except TypeError:
+        return True
+    return True
+
+
+def _value_matches(value, node):
+    kind = node[0]
+    try:
+        if kind == "cmp":
+            return node[3] is not None and OPERATORS[node[2]](value, node[3])
+        if kind == "between":
+            return node[2] <= value <= node[3]
+        if kind == "in":
+            return value in node[2]
+    except TypeError:
+        return False
+    return True
@@ -0,0 +1,299 @@
+# parser/advisor.py
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from src.parser.condition import conjuncts
+from src.parser.planner import EQ_INDEXES, RANGE_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Formas de WHERE distintas que se recuerdan por tabla (se olvidan las menos usadas)
+MAX_SHAPES = 256
+# Sin consultas por tanto tiempo el proceso está ocioso: se pueden crear índices
+IDLE_SECONDS = float(os.environ.get("ADVISOR_IDLE_SECONDS", 30))
+# Para crear un índice solo: consultas que lo usarían y ahorro mínimo (unidades del planner)
+AUTO_MIN_QUERIES = 10
+AUTO_MIN_SAVINGS = 100.0
+
+# Qué tipos de índice sirven para cada uso de una columna
+SERVES = {
+    "eq": EQ_INDEXES,
+    "range": RANGE_INDEXES,
+    "spatial": {"rtree"},
+    "match": {"fulltext"},
+}
+
+
+def _usage(pred):
+    # Uso de la columna en un predicado del WHERE (None si ningún índice lo responde)
+    kind = pred[0]
+    if kind == "in" or (kind == "cmp" and pred[2] == "="):
+        return "eq"
+    if kind == "between" or (kind == "cmp" and pred[2] in ("<", "<=", ">", ">=")):
+        return "range"
+    if kind == "near":
+        return "spatial"
+    if kind == "match":
+        return "match"
+    return None
+
+
+def _scanned(plan):
+    if plan["access"] == "partitions":
+        return any(_scanned(sub) for sub in plan["partitions"])
+    return plan["access"] == "scan"
+
+
+class Workload:
+    """
+    Perfil de las consultas que pasaron por el Executor, por tabla: cuántas
+    veces se usa cada columna en el WHERE y cómo (igualdad, rango,
+    espacial, MATCH), y por cada forma de WHERE (columnas y usos) cuántas
+    veces se ejecutó, cuánto tardó y cuántas terminaron en recorrido completo.
+
+    Vive en la memoria del proceso (con varios workers, cada uno tiene el suyo).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {}
+        self.active = 0
+        self.last_query = time.monotonic()
+
+    @contextmanager
+    def observe(self):
+        """
+        Envuelve la ejecución de un SELECT/DELETE. Lo que se entrega es la
+        función on_plan para el SchemaManager; si la sentencia termina bien,
+        se registra con su plan y su tiempo.
+        """
+        plans = []
+        start = time.perf_counter()
+        with self._lock:
+            self.active += 1
+        try:
+            yield plans.append
+        except BaseException:
+            with self._lock:
+                self.active -= 1
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.active -= 1
+            self.last_query = time.monotonic()
+            if plans:
+                self._record(plans[0], elapsed)
+
+    def _record(self, plan, elapsed):
+        # Con self._lock tomado
+        profile = self.tables.get(plan["table"])
+        if profile is None:
+            profile = self.tables[plan["table"]] = {
+                "queries": 0, "seconds": 0.0, "scans": 0, "scan_seconds": 0.0,
+                "columns": {}, "shapes": {},
+            }
+        scanned = _scanned(plan)
+        profile["queries"] += 1
+        profile["seconds"] += elapsed
+        if scanned:
+            profile["scans"] += 1
+            profile["scan_seconds"] += elapsed
+
+        uses = {}
+        for pred in conjuncts(plan["condition"]):
+            kind = _usage(pred)
+            if kind is not None:
+                uses.setdefault((pred[1], kind), pred)
+        if not uses:
+            return
+        for column, kind in uses:
+            profile["columns"].setdefault(column, Counter())[kind] += 1
+
+        shape = tuple(sorted(uses))
+        shapes = profile["shapes"]
+        entry = shapes.get(shape)
+        if entry is None:
+            if len(shapes) >= MAX_SHAPES:
+                del shapes[min(shapes, key=lambda s: shapes[s]["count"])]
+            entry = shapes[shape] = {"count": 0, "seconds": 0.0, "scans": 0, "cost": 0.0}
+        entry["count"] += 1
+        entry["seconds"] += elapsed
+        entry["scans"] += scanned
+        entry["cost"] += plan["cost"]
+        # Los valores de la última ejecución representan a la forma al estimar ahorros
+        entry["condition"] = plan["condition"]
+
+    def idle_for(self):
+        with self._lock:
+            return 0.0 if self.active else time.monotonic() - self.last_query
+
+    def snapshot(self):
+        """
+        Copia del perfil para leerlo sin el lock.
+        """
+        with self._lock:
+            return {
+                name: dict(profile,
+                           columns={c: Counter(u) for c, u in profile["columns"].items()},
+                           shapes={s: dict(e) for s, e in profile["shapes"].items()})
+                for name, profile in self.tables.items()
+            }
+
+    def summary(self):
+        result = {}
+        for name, profile in self.snapshot().items():
+            result[name] = {
+                "queries": profile["queries"],
+                "full_scans": profile["scans"],
+                "total_ms": round(profile["seconds"] * 1000, 3),
+                "scan_ms": round(profile["scan_seconds"] * 1000, 3),
+                "columns": {c: dict(u) for c, u in profile["columns"].items()},
+            }
+        return result
+
+
+class IndexAdvisor:
+    """
+    Sugiere índices a partir de la carga de trabajo. Para cada columna
+    usada en el WHERE elige el tipo que sirve a sus usos (rtree para NEAR,
+    fulltext para MATCH, btree si hay rangos, hash si solo hay igualdades)
+    y vuelve a planear cada forma de consulta como si el índice existiera:
+    el ahorro es la diferencia de costo por la cantidad de ejecuciones.
+    El tiempo ahorrado se estima escalando el tiempo observado por esa
+    misma proporción.
+    """
+
+    def __init__(self, schema_manager, workload):
+        self.schema_manager = schema_manager
+        self.workload = workload
+        self.built = []       # índices creados solos, para informarlos
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _candidate(self, column_type, usage):
+        if usage["spatial"] and column_type.startswith("ARRAY"):
+            return "rtree"
+        if column_type.startswith("ARRAY"):
+            return None
+        if usage["match"] and column_type.startswith("VARCHAR"):
+            return "fulltext"
+        if usage["range"]:
+            return "btree"
+        if usage["eq"]:
+            return "hash"
+        return None
+
+    def recommend(self):
+        """
+        Lista de recomendaciones, de mayor a menor ahorro estimado. Solo
+        aparecen las que el planner usaría (ahorro mayor que cero).
+        """
+        sm = self.schema_manager
+        recommendations = []
+        for table_name, profile in self.workload.snapshot().items():
+            if not sm.has_table(table_name):
+                continue
+            table = sm.get_table(table_name)
+            if table["view"] is not None:
+                # Las vistas materializadas no admiten índices
+                continue
+            for column, usage in profile["columns"].items():
+                if column not in table["schema"].types:
+                    continue
+                itype = self._candidate(table["schema"].types[column], usage)
+                current = table["index_types"].get(column)
+                if itype is None or (current and all(current in SERVES[k] for k in usage if usage[k])):
+                    continue
+                rec = self._estimate(table_name, column, itype, profile["shapes"])
+                if rec is None:
+                    continue
+                rec.update({
+                    "table": table_name,
+                    "column": column,
+                    "index_type": itype,
+                    "replaces": current,
+                    "usage": dict(usage),
+                    "statement": f"CREATE INDEX ON {table_name} ({column}) USING {itype}",
+                })
+                recommendations.append(rec)
+        recommendations.sort(key=lambda r: r["estimated_savings"], reverse=True)
+        return recommendations
+
+    def _estimate(self, table_name, column, itype, shapes):
+        planner = self.schema_manager.planner
+        queries = 0
+        current_cost = new_cost = seconds = saved_seconds = 0.0
+        for shape, entry in shapes.items():
+            if column not in {c for c, _ in shape}:
+                continue
+            try:
+                before = planner.plan(table_name, entry["condition"])["cost"]
+                after = planner.plan(table_name, entry["condition"], hypothetical=(column, itype))["cost"]
+            except (ValueError, KeyError):
+                # La tabla cambió desde que se registró la consulta
+                continue
+            if after >= before:
+                continue
+            queries += entry["count"]
+            current_cost += entry["count"] * before
+            new_cost += entry["count"] * after
+            seconds += entry["seconds"]
+            saved_seconds += entry["seconds"] * (1 - after / before) if before else 0.0
+        if not queries:
+            return None
+        return {
+            "queries": queries,
+            "current_cost": round(current_cost, 2),
+            "estimated_cost": round(new_cost, 2),
+            "estimated_savings": round(current_cost - new_cost, 2),
+            "observed_ms": round(seconds * 1000, 3),
+            "estimated_ms_saved": round(saved_seconds * 1000, 3),
+        }
+
+    # ---------------------------
+    # Creación automática
+    # ---------------------------
+    def build_idle(self, idle_seconds=IDLE_SECONDS):
+        """
+        Si el proceso está ocioso, crea el índice más conveniente que no
+        reemplace a otro y tenga suficiente uso y ahorro. Devuelve la
+        recomendación aplicada o None.
+        """
+        if self.workload.idle_for() < idle_seconds:
+            return None
+        for rec in self.recommend():
+            if rec["replaces"] or rec["queries"] < AUTO_MIN_QUERIES \
+                    or rec["estimated_savings"] < AUTO_MIN_SAVINGS:
+                continue
+            logger.info("Creando índice sugerido: %s", rec["statement"])
+            rec["result"] = self.schema_manager.create_index(rec["table"], rec["column"], rec["index_type"])
+            self.built.append(rec)
+            return rec
+        return None
+
+    def start(self, idle_seconds=IDLE_SECONDS):
+        """
+        Hilo de fondo que cada idle_seconds intenta build_idle.
+        """
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(idle_seconds):
+                try:
+                    self.build_idle(idle_seconds)
+                except Exception:
+                    logger.exception("Falló la creación automática de índices")
+
+        self._thread = threading.Thread(target=loop, name="index-advisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
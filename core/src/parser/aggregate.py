@@ -0,0 +1,189 @@
+# parser/aggregate.py
+from src.record import NUMERIC_TYPES, INTEGER_TYPES
+from src.dbms.statistics import HyperLogLog
+from src.dbms.sketch import KLLSketch
+
+# Funciones de agregación del SELECT
+AGGREGATES = {"count", "sum", "avg", "min", "max", "approx_count_distinct", "approx_percentile"}
+# Las que se calculan con un sketch (error acotado, memoria constante)
+APPROXIMATE = {"approx_count_distinct", "approx_percentile"}
+
+
+def default_name(func, column, arg=None):
+    """
+    Nombre de la columna de resultado sin AS: count(*), sum(monto),
+    approx_percentile(monto, 0.5).
+    """
+    return f"{func}({column})" if arg is None else f"{func}({column}, {arg})"
+
+
+class Aggregator:
+    """
+    Acumula una función de agregación sobre los valores de una columna.
+    Los nulos (None o "") no cuentan, salvo en COUNT(*).
+
+    Se alimenta fila a fila (add) o con resultados parciales ya reducidos
+    de un lote (merge_partial), que es lo que produce la ejecución vectorizada.
+    Las aproximadas acumulan un sketch (HyperLogLog o KLL): se alimentan con
+    add/add_many o mezclando sketches ya armados (merge_sketch).
+    """
+
+    def __init__(self, func, column, name=None, ctype=None, arg=None):
+        if func not in AGGREGATES:
+            raise ValueError(f"Función de agregación no soportada: {func}")
+        if column == "*" and func != "count":
+            raise ValueError(f"{func.upper()}(*) no está permitido")
+        if (func == "approx_percentile") != (arg is not None):
+            raise ValueError("APPROX_PERCENTILE necesita el percentil: APPROX_PERCENTILE(columna, 0.5)")
+        self.func = func
+        self.column = column
+        self.arg = arg  # percentil de APPROX_PERCENTILE
+        self.name = name or default_name(func, column, arg)
+        self.ctype = ctype  # tipo de la columna agregada
+        self.count = 0
+        self.total = None
+        self.low = None
+        self.high = None
+        self.sketch = None
+        if func == "approx_count_distinct":
+            self.sketch = HyperLogLog()
+        elif func == "approx_percentile":
+            self.sketch = KLLSketch()
+
+    def empty(self):
+        """
+        Otro acumulador de la misma función, sin valores (uno por grupo en GROUP BY).
+        """
+        return Aggregator(self.func, self.column, self.name, self.ctype, self.arg)
+
+    def add(self, value):
+        if self.column != "*" and (value is None or value == ""):
+            return
+        self.count += 1
+        if self.sketch is not None:
+            self.sketch.add(value)
+        elif self.func in ("sum", "avg"):
+            self.total = value if self.total is None else self.total + value
+        elif self.func == "min":
+            if self.low is None or value < self.low:
+                self.low = value
+        elif self.func == "max":
+            if self.high is None or value > self.high:
+                self.high = value
+
+    def add_many(self, values):
+        """
+        Agrega valores ya sin nulos (un lote de la ejecución vectorizada).
+        """
+        for value in values:
+            self.count += 1
+            self.sketch.add(value)
+
+    def merge_sketch(self, count, sketch):
+        """
+        Incorpora un sketch de count valores (el de un bloque, ver BlockSketches).
+        """
+        self.count += count
+        self.sketch.merge(sketch)
+
+    @property
+    def result_type(self):
+        if self.func in ("count", "approx_count_distinct"):
+            return "BIGINT"
+        if self.func in ("avg", "approx_percentile"):
+            return "DOUBLE"
+        if self.func == "sum":
+            return "BIGINT" if self.ctype in INTEGER_TYPES else "DOUBLE"
+        return self.ctype
+
+    def merge_partial(self, count, total=None, low=None, high=None):
+        """
+        Incorpora el resultado parcial de un lote (count, suma, mínimo, máximo).
+        """
+        if not count:
+            return
+        self.count += count
+        if total is not None:
+            self.total = total if self.total is None else self.total + total
+        if low is not None and (self.low is None or low < self.low):
+            self.low = low
+        if high is not None and (self.high is None or high > self.high):
+            self.high = high
+
+    def result(self):
+        if self.func == "count":
+            return self.count
+        if self.func == "approx_count_distinct":
+            return self.sketch.count() if self.count else 0
+        if self.func == "approx_percentile":
+            value = self.sketch.quantile(self.arg)
+            return None if value is None else float(value)
+        if self.func == "sum":
+            return self.total
+        if self.func == "avg":
+            return self.total / self.count if self.count else None
+        if self.func == "min":
+            return self.low
+        return self.high
+
+
+def make_aggregators(aggregates, schema):
+    """
+    aggregates: [{"func", "column", "name", "arg"?}] del parser; resuelve las
+    columnas contra el esquema sin distinguir mayúsculas.
+    """
+    lowered = {c.lower(): c for c in schema.types}
+    result = []
+    for agg in aggregates:
+        column = agg["column"]
+        if column != "*":
+            column = column if column in schema.types else lowered.get(column.lower())
+            if column is None:
+                raise ValueError(f"Columna desconocida: {agg['column']}")
+            if agg["func"] in ("sum", "avg", "approx_percentile") and schema.types[column] not in NUMERIC_TYPES:
+                raise ValueError(f"{agg['func'].upper()} necesita una columna numérica: {column}")
+            if agg["func"] in APPROXIMATE and schema.types[column].startswith("ARRAY"):
+                raise ValueError(f"{agg['func'].upper()} no admite columnas ARRAY: {column}")
+        arg = agg.get("arg")
+        if arg is not None and not 0 <= arg <= 1:
+            raise ValueError(f"El percentil de {agg['func'].upper()} debe estar entre 0 y 1")
+        result.append(Aggregator(agg["func"], column, agg.get("name"), schema.types.get(column), arg))
+    return result
+
+
+def aggregate_columns(aggregates):
+    """
+    Columnas que leen las agregaciones (para la proyección del planner).
+    """
+    return [agg["column"] for agg in aggregates if agg["column"] != "*"]
+
+
+def aggregate_rows(aggregators, rows, positions):
+    """
+    Consume las filas (tuplas; positions: {columna: índice}) y devuelve la
+    única fila de resultado, en el orden de las agregaciones.
+    """
+    pairs = [(agg, None if agg.column == "*" else positions[agg.column]) for agg in aggregators]
+    for row in rows:
+        for agg, i in pairs:
+            agg.add(None if i is None else row[i])
+    return tuple(agg.result() for agg in aggregators)
+
+
+def group_rows(aggregators, rows, keys, positions):
+    """
+    GROUP BY: consume las filas y acumula las agregaciones de cada grupo.
+    keys: posiciones (o nombres, si las filas son dicts) de las columnas agrupadas
+    positions: {columna: posición} de las columnas agregadas
+    Devuelve {clave (tupla): [Aggregator]}, en el orden en que aparecen los grupos.
+    """
+    pairs = [None if agg.column == "*" else positions[agg.column] for agg in aggregators]
+    groups = {}
+    for row in rows:
+        key = tuple(row[i] for i in keys)
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [agg.empty() for agg in aggregators]
+        for state, i in zip(states, pairs):
+            state.add(None if i is None else row[i])
+    return groups
@@ -0,0 +1,342 @@
+# parser/condition.py
+import math
+import operator
+
+from src.parser.lexer import tokenize
+from src.dbms.fulltext import compile_query
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Al voltear "5 < id" a "id > 5"
+FLIPPED = {"=": "=", "!=": "!=", "<>": "<>", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+KEYWORDS = {"and", "or", "not", "between", "in", "near", "match"}
+
+
+class ConditionParser:
+    """
+    Parser descendente recursivo para el WHERE.
+
+    Produce un árbol de tuplas:
+        ("and", [nodos]) | ("or", [nodos]) | ("not", nodo)
+        ("cmp", col, op, valor)
+        ("between", col, bajo, alto)
+        ("in", col, [valores])
+        ("near", col, (x, y), radio)
+        ("match", col, consulta)
+    """
+
+    def parse(self, text):
+        self.tokens = [t for t in tokenize(text)]
+        self.pos = 0
+        node = self._expr()
+        if self.pos < len(self.tokens):
+            raise ValueError(f"Token inesperado en WHERE: {self.tokens[self.pos][1]}")
+        return node
+
+    # ---------------------------
+    # Utilidades
+    # ---------------------------
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            kind, value = self.tokens[self.pos]
+            return kind, value.lower() if kind in ("IDENT", "OP") else value
+        return None, None
+
+    def _next(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expect(self, value):
+        _, got = self._next()
+        if got != value:
+            raise ValueError(f"Se esperaba '{value}' en WHERE y llegó '{got}'")
+
+    def _literal(self):
+        kind, value = self._next()
+        if kind == "NUMBER":
+            # 1e10 y 2.5E-3 son DOUBLE; el planner los lleva al tipo de la columna
+            return float(value) if "." in value or "e" in value.lower() else int(value)
+        if kind == "STRING":
+            return value[1:-1]
+        if kind == "IDENT" and value in ("true", "false"):
+            return value == "true"
+        if kind == "IDENT" and value == "null":
+            return None
+        raise ValueError(f"Se esperaba un literal en WHERE y llegó '{value}'")
+
+    def _is_literal(self):
+        kind, value = self._peek()
+        return kind in ("NUMBER", "STRING") or (kind == "IDENT" and value in ("true", "false", "null"))
+
+    # ---------------------------
+    # Gramática
+    # ---------------------------
+    def _expr(self):
+        nodes = [self._and()]
+        while self._peek()[1] == "or":
+            self._next()
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self):
+        nodes = [self._not()]
+        while self._peek()[1] == "and":
+            self._next()
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _not(self):
+        if self._peek()[1] == "not":
+            self._next()
+            return ("not", self._not())
+        return self._primary()
+
+    def _primary(self):
+        kind, value = self._peek()
+        if value == "(":
+            self._next()
+            node = self._expr()
+            self._expect(")")
+            return node
+        if value == "near":
+            return self._near()
+        if value == "match":
+            return self._match()
+        if self._is_literal():
+            # literal op columna -> columna op' literal
+            literal = self._literal()
+            _, op = self._op()
+            column = self._column()
+            return ("cmp", column, FLIPPED[op], literal)
+        return self._comparison()
+
+    def _column(self):
+        kind, value = self._next()
+        if kind != "IDENT" or value in KEYWORDS:
+            raise ValueError(f"Se esperaba una columna en WHERE y llegó '{value}'")
+        return value
+
+    def _op(self):
+        kind, value = self._next()
+        if value == "=" and self._peek()[1] == "=":
+            self._next()  # aceptar también "=="
+        if value not in OPERATORS:
+            raise ValueError(f"Operador no soportado en WHERE: '{value}'")
+        return kind, value
+
+    def _comparison(self):
+        column = self._column()
+        _, value = self._peek()
+        if value == "between":
+            self._next()
+            low = self._literal()
+            self._expect("and")
+            high = self._literal()
+            return ("between", column, low, high)
+        negated = False
+        if value == "not":
+            self._next()
+            negated = True
+            value = self._peek()[1]
+        if value == "in":
+            self._next()
+            node = ("in", column, self._list())
+            return ("not", node) if negated else node
+        if negated:
+            raise ValueError("NOT solo puede preceder a IN después de una columna")
+        _, op = self._op()
+        return ("cmp", column, op, self._literal())
+
+    def _list(self):
+        self._expect("(")
+        values = [self._literal()]
+        while self._peek()[1] == ",":
+            self._next()
+            values.append(self._literal())
+        self._expect(")")
+        return values
+
+    def _near(self):
+        # NEAR(col, x, y, radio)
+        self._next()
+        self._expect("(")
+        column = self._column()
+        args = []
+        for _ in range(3):
+            self._expect(",")
+            args.append(float(self._literal()))
+        self._expect(")")
+        return ("near", column, (args[0], args[1]), args[2])
+
+    def _match(self):
+        # MATCH(col, 'términos con AND / OR')
+        self._next()
+        self._expect("(")
+        column = self._column()
+        self._expect(",")
+        query = self._literal()
+        if not isinstance(query, str):
+            raise ValueError("MATCH espera la consulta como texto")
+        self._expect(")")
+        return ("match", column, query)
+
+
+def parse_condition(text):
+    return ConditionParser().parse(text)
+
+
+def conjuncts(node):
+    """
+    Lista de predicados unidos por AND en el nivel superior.
+    """
+    if node is None:
+        return []
+    if node[0] == "and":
+        result = []
+        for child in node[1]:
+            result.extend(conjuncts(child))
+        return result
+    return [node]
+
+
+def columns_of(node):
+    """
+    Columnas que referencia la condición.
+    """
+    if node is None:
+        return set()
+    if node[0] in ("and", "or"):
+        cols = set()
+        for child in node[1]:
+            cols |= columns_of(child)
+        return cols
+    if node[0] == "not":
+        return columns_of(node[1])
+    if node[0] in ("true", "false"):
+        return set()
+    return {node[1]}
+
+
+def coerce_node(node, schema):
+    """
+    Convierte los literales al tipo de su columna. Si un literal no es
+    compatible, el predicado queda como ("false",) o ("true",) según el caso.
+    """
+    kind = node[0]
+    if kind in ("and", "or"):
+        return (kind, [coerce_node(child, schema) for child in node[1]])
+    if kind == "not":
+        return ("not", coerce_node(node[1], schema))
+    if kind in ("true", "false"):
+        return node
+    column = _resolve_column(node[1], schema)
+    try:
+        if kind == "cmp":
+            return ("cmp", column, node[2], schema.coerce(column, node[3]))
+        if kind == "between":
+            return ("between", column, schema.coerce(column, node[2]), schema.coerce(column, node[3]))
+        if kind == "in":
+            values = []
+            for value in node[2]:
+                try:
+                    values.append(schema.coerce(column, value))
+                except ValueError:
+                    pass  # un valor imposible no puede coincidir
+            return ("in", column, values)
+    except ValueError:
+        # id = 'abc' sobre INT nunca coincide; id != 'abc' siempre
+        return ("true",) if kind == "cmp" and node[2] in ("!=", "<>") else ("false",)
+    return (kind, column) + tuple(node[2:])
+
+
+def _resolve_column(name, schema):
+    # El lexer pasa los identificadores a minúsculas; las columnas de un CSV pueden no estarlo
+    if name in schema.types:
+        return name
+    for column in schema.types:
+        if column.lower() == name.lower():
+            return column
+    raise ValueError(f"Columna desconocida en WHERE: {name}")
+
+
+def compile_condition(node, schema, positions=None):
+    """
+    Compila el árbol (ya coercionado) a una función registro -> bool.
+    positions: {columna: índice} si los registros son tuplas
+    """
+    if node is None:
+        return lambda rec: True
+    node = coerce_node(node, schema)
+    if positions is not None:
+        node = _positional(node, positions)
+    return _compile(node)
+
+
+def _positional(node, positions):
+    # Cambia los nombres de columna por su posición en la tupla
+    kind = node[0]
+    if kind in ("and", "or"):
+        return (kind, [_positional(child, positions) for child in node[1]])
+    if kind == "not":
+        return ("not", _positional(node[1], positions))
+    if kind in ("true", "false"):
+        return node
+    return (kind, positions[node[1]]) + tuple(node[2:])
+
+
+def _compile(node):
+    kind = node[0]
+    if kind == "true":
+        return lambda rec: True
+    if kind == "false":
+        return lambda rec: False
+    if kind == "and":
+        parts = [_compile(child) for child in node[1]]
+        return lambda rec: all(part(rec) for part in parts)
+    if kind == "or":
+        parts = [_compile(child) for child in node[1]]
+        return lambda rec: any(part(rec) for part in parts)
+    if kind == "not":
+        inner = _compile(node[1])
+        return lambda rec: not inner(rec)
+    if kind == "cmp":
+        _, column, op, value = node
+        fn = OPERATORS[op]
+        if value is None:
+            return lambda rec: False
+        return lambda rec: _safe(fn, rec[column], value)
+    if kind == "between":
+        _, column, low, high = node
+        return lambda rec: _safe(operator.le, low, rec[column]) and _safe(operator.le, rec[column], high)
+    if kind == "in":
+        _, column, values = node
+        try:
+            members = set(values)
+            return lambda rec: rec[column] in members
+        except TypeError:
+            return lambda rec: rec[column] in values
+    if kind == "near":
+        _, column, (x, y), radius = node
+        return lambda rec: math.hypot(rec[column][0] - x, rec[column][1] - y) <= radius
+    if kind == "match":
+        _, column, query = node
+        matches = compile_query(query)
+        return lambda rec: matches(rec[column])
+    raise ValueError(f"Predicado no soportado: {kind}")
+
+
+def _safe(fn, left, right):
+    try:
+        return fn(left, right)
+    except TypeError:
+        return False
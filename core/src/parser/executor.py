@@ -1,5 +1,11 @@
 # parser/executor.py
+import time
+
 from src.parser.parser import SQLParser
+from src.parser.aggregate import aggregate_columns
+from src.parser.profile import QueryProfile
+from src.dbms.sampling import TableSample
+from src.parser.advisor import Workload, IndexAdvisor
 from src.schema_manager import SchemaManager
 
 
@@ -11,6 +17,9 @@ class Executor:
         """
         self.schema_manager = SchemaManager(data_dir)
         self.parser = SQLParser()
+        # Columnas y usos de cada WHERE que se ejecuta: de ahí salen las sugerencias de índices
+        self.workload = Workload()
+        self.advisor = IndexAdvisor(self.schema_manager, self.workload)
 
     def execute(self, query: str):
         ast = self.parser.parse(query)
@@ -18,28 +27,115 @@ class Executor:
 
         if op == "create":
             return self.schema_manager.create_table(
-                ast["table"], ast["columns"], ast.get("index_map")
+                ast["table"], ast["columns"], ast.get("index_map"), ast.get("include_map"),
+                ast.get("partition")
+            )
+
+        elif op == "create_index":
+            return self.schema_manager.create_index(
+                ast["table"], ast["column"], ast["index_type"], ast.get("include")
             )
 
+        elif op == "drop_index":
+            return self.schema_manager.drop_index(ast["table"], ast["column"])
+
+        elif op == "create_view":
+            return self.schema_manager.create_view(ast["view"], ast["query"])
+
+        elif op == "refresh_view":
+            return self.schema_manager.refresh_view(ast["view"])
+
+        elif op == "drop_view":
+            return self.schema_manager.drop_view(ast["view"])
+
+        elif op == "add_partition":
+            return self.schema_manager.add_partition(ast["table"], ast["partition"], ast["bound"])
+
+        elif op == "drop_partition":
+            return self.schema_manager.drop_partition(ast["table"], ast["partition"])
+
         elif op == "insert":
-            return self.schema_manager.insert(ast["table"], ast["values"])
+            rows = ast["rows"]
+            if len(rows) == 1:
+                return self.schema_manager.insert(ast["table"], rows[0])
+            return self.schema_manager.insert_many(ast["table"], rows)
+
+        elif op == "copy":
+            return self.schema_manager.copy_from(
+                ast["table"], ast["path"], header=ast["header"], delimiter=ast["delimiter"]
+            )
+
+        elif op == "explain":
+            return self._explain(ast["statement"], ast["analyze"])
+
+        elif op == "analyze":
+            return self.schema_manager.analyze(ast["table"])
+
+        elif op == "vacuum":
+            return self.schema_manager.vacuum(ast["table"])
 
         elif op == "delete":
-            return self.schema_manager.delete(ast["table"], ast["condition"])
+            with self.workload.observe() as on_plan:
+                return self.schema_manager.delete(ast["table"], ast["condition"], on_plan=on_plan)
 
         elif op == "select":
-            return self.schema_manager.select(
-                ast["table"],
-                ast["columns"],
-                ast["condition"],
-                index=ast.get("index"),
-                limit=ast.get("limit")
-            )
+            with self.workload.observe() as on_plan:
+                return self.schema_manager.select(
+                    ast["table"],
+                    ast["columns"],
+                    ast["condition"],
+                    index=ast.get("index"),
+                    limit=ast.get("limit"),
+                    aggregates=ast.get("aggregates"),
+                    on_plan=on_plan,
+                    group_by=ast.get("group_by"),
+                    sample=ast.get("sample")
+                )
 
+        elif op == "show_recommendations":
+            return self.advisor.recommend()
 
         else:
             raise ValueError(f"Operación no soportada: {op}")
 
+    def _explain(self, stmt, analyze):
+        """
+        EXPLAIN: plan elegido y alternativas con su costo.
+        EXPLAIN ANALYZE: además ejecuta la sentencia (un DELETE borra de verdad)
+        y devuelve filas, tiempo y E/S de cada operador.
+        """
+        planner = self.schema_manager.planner
+        if not analyze:
+            columns = stmt.get("columns")
+            if stmt.get("aggregates"):
+                columns = (stmt.get("group_by") or []) + aggregate_columns(stmt["aggregates"])
+            sample = TableSample.from_dict(stmt["sample"]) if stmt.get("sample") else None
+            plan = planner.plan(stmt["table"], stmt["condition"], hint=stmt.get("index"),
+                                columns=columns, sample=sample)
+            return {"plan": planner.describe(plan)}
+
+        profile = QueryProfile()
+        start = time.perf_counter()
+        if stmt["operation"] == "select":
+            result = self.schema_manager.select(
+                stmt["table"], stmt["columns"], stmt["condition"],
+                index=stmt.get("index"), limit=stmt.get("limit"), profile=profile,
+                aggregates=stmt.get("aggregates"), group_by=stmt.get("group_by"),
+                sample=stmt.get("sample")
+            )
+            rows = len(result)
+        else:
+            self.schema_manager.delete(stmt["table"], stmt["condition"], profile=profile)
+            rows = profile.operators[-1].rows_out if profile.operators else 0
+        elapsed = time.perf_counter() - start
+
+        return {
+            "plan": planner.describe(profile.plan),
+            "operators": profile.to_list(),
+            "actual_rows": rows,
+            "execution_ms": round(elapsed * 1000, 3),
+        }
+
 
 if __name__ == "__main__":
     exe = Executor()
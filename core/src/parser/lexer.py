@@ -3,11 +3,11 @@ import re
 
 # Definición de tokens básicos
 TOKEN_REGEX = [
-    ("NUMBER", r"\d+(\.\d+)?"),
+    ("NUMBER", r"-?\d+(\.\d+)?([eE][+-]?\d+)?"),
     ("STRING", r"'[^']*'|\"[^\"]*\""),
     ("IDENT", r"[a-zA-Z_][a-zA-Z0-9_]*"),
-    ("SYMBOL", r"[(),=*]"),
-    ("OP", r"(=|<=|>=|<|>|between|in)"),
+    ("SYMBOL", r"[(),=*\[\]]"),
+    ("OP", r"(!=|<>|<=|>=|<|>|between|in)"),
     ("WS", r"\s+"),
 ]
 
@@ -0,0 +1,228 @@
+# parser/matview.py
+from contextlib import ExitStack
+
+from src.parser.aggregate import make_aggregators, group_rows, default_name
+from src.parser.condition import parse_condition, coerce_node, compile_condition
+
+# Agregaciones que se mantienen con cada inserción/borrado; AVG obliga a recalcular
+INCREMENTAL = {"count", "sum", "min", "max"}
+
+# Resultado de apply para un grupo que se quedó sin filas
+DROP = "drop"
+
+
+def _default_name(agg):
+    # count(*) -> count, sum(monto) -> sum_monto, approx_percentile(monto, 0.5) ->
+    # approx_percentile_monto_0_5: nombres que se pueden usar en un SELECT
+    arg = agg.get("arg")
+    if agg["name"] != default_name(agg["func"], agg["column"], arg):
+        return agg["name"]
+    if agg["column"] == "*":
+        return agg["func"]
+    name = f"{agg['func']}_{agg['column']}"
+    return name if arg is None else f"{name}_{arg}".replace(".", "_")
+
+
+class ViewDefinition:
+    """
+    Vista materializada: un SELECT con agregaciones (y GROUP BY) sobre una
+    tabla, guardado como otra tabla con una fila por grupo: primero las
+    columnas agrupadas y después una columna por agregación.
+
+    Las filas que se insertan o borran en la tabla se resumen por grupo
+    (delta) y se aplican sobre las filas de la vista; apply dice cuándo eso
+    no alcanza y hay que recalcular la vista entera.
+    """
+
+    def __init__(self, source, group_by, aggregates, condition=None):
+        """
+        source: tabla de la que sale la vista
+        group_by: columnas agrupadas (ya con su nombre en el esquema)
+        aggregates: [{"func", "column", "name", "arg"?}]; name es la columna de la vista
+        condition: texto del WHERE, o None
+        """
+        self.source = source
+        self.group_by = list(group_by)
+        self.aggregates = [dict(agg) for agg in aggregates]
+        self.condition = condition
+        self._node = parse_condition(condition) if condition else None
+
+    @classmethod
+    def from_query(cls, query, schema):
+        """
+        A partir del SELECT del parser: resuelve las columnas contra el
+        esquema de la tabla y valida lo que la vista puede guardar.
+        """
+        if query.get("sample"):
+            raise ValueError("Una vista materializada no puede usar TABLESAMPLE")
+        lowered = {c.lower(): c for c in schema.types}
+        group_by = []
+        for name in query.get("group_by") or []:
+            column = name if name in schema.types else lowered.get(name.lower())
+            if column is None:
+                raise ValueError(f"Columna desconocida en GROUP BY: {name}")
+            if schema.types[column].startswith("ARRAY"):
+                raise ValueError(f"No se puede agrupar por una columna ARRAY: {column}")
+            if column not in group_by:
+                group_by.append(column)
+        aggregates = []
+        for agg, aggregator in zip(query["aggregates"], make_aggregators(query["aggregates"], schema)):
+            aggregates.append({"func": agg["func"], "column": aggregator.column, "name": _default_name(agg)})
+            if aggregator.arg is not None:
+                aggregates[-1]["arg"] = aggregator.arg
+        names = group_by + [agg["name"] for agg in aggregates]
+        if len(set(names)) != len(names):
+            raise ValueError("La vista tendría columnas con el mismo nombre; use AS para renombrarlas")
+        definition = cls(query["table"], group_by, aggregates, query.get("condition"))
+        if definition._node is not None:
+            # Una columna que no existe falla ahora y no en la primera inserción
+            coerce_node(definition._node, schema)
+        return definition
+
+    # ---------------------------
+    # Catálogo
+    # ---------------------------
+    def to_dict(self):
+        meta = {"source": self.source, "group_by": self.group_by, "aggregates": self.aggregates}
+        if self.condition:
+            meta["condition"] = self.condition
+        return meta
+
+    @classmethod
+    def from_dict(cls, meta):
+        return cls(meta["source"], meta["group_by"], meta["aggregates"], meta.get("condition"))
+
+    def columns(self, schema):
+        """
+        Columnas de la tabla de la vista ({"name", "type"}), dado el esquema de la tabla.
+        """
+        columns = [{"name": col, "type": schema.types[col]} for col in self.group_by]
+        for aggregator in make_aggregators(self.aggregates, schema):
+            columns.append({"name": aggregator.name, "type": aggregator.result_type})
+        return columns
+
+    @property
+    def incremental(self):
+        return all(agg["func"] in INCREMENTAL for agg in self.aggregates)
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    def delta(self, schema, rows, positions):
+        """
+        Resume por grupo las filas insertadas o borradas que cumplen el WHERE.
+        rows: tuplas (positions: {columna: índice}) o dicts (positions None)
+        Devuelve {clave: [Aggregator]}.
+        """
+        if self._node is not None:
+            matches = compile_condition(self._node, schema, positions)
+            rows = [row for row in rows if matches(row)]
+        if positions is None:
+            positions = {col: col for col in schema.types}
+        return group_rows(make_aggregators(self.aggregates, schema), rows,
+                          [positions[col] for col in self.group_by], positions)
+
+    def apply(self, current, states, deleting=False):
+        """
+        Nuevos valores de las agregaciones de un grupo.
+        current: valores que tiene la vista para el grupo (None si no está)
+        states: Aggregators del delta del grupo
+        Devuelve la tupla de valores, DROP si el grupo se quedó sin filas, o
+        None si con el delta no alcanza (hay que recalcular la vista).
+        """
+        if not self.incremental:
+            return None
+        if current is not None:
+            # Un MIN/MAX nulo de VARCHAR queda guardado como ""
+            current = tuple(None if value == "" else value for value in current)
+        if not deleting:
+            if current is None:
+                return tuple(state.result() for state in states)
+            return tuple(_add(value, state) for value, state in zip(current, states))
+
+        # Para saber si el grupo se vacía hace falta su COUNT(*)
+        rows = [i for i, agg in enumerate(self.aggregates) if agg["func"] == "count" and agg["column"] == "*"]
+        if current is None or not rows:
+            return None
+        if current[rows[0]] - states[rows[0]].count <= 0:
+            # Sin GROUP BY la vista siempre tiene su fila (COUNT 0, MIN nulo...)
+            return DROP if self.group_by else None
+        values = []
+        for value, state in zip(current, states):
+            value = _subtract(value, state)
+            if value is _RECOMPUTE:
+                return None
+            values.append(value)
+        return tuple(values)
+
+
+class PendingDeltas:
+    """
+    Lo que una escritura cambia en las vistas de su tabla, resumido por
+    grupo y acumulado (una carga agrega un bloque por vez) hasta que la
+    transacción confirma y se aplica.
+    """
+
+    def __init__(self, schema, definitions, locks=()):
+        """
+        schema: esquema de la tabla escrita
+        definitions: {vista: ViewDefinition}
+        locks: locks de las vistas, que se toman con hold
+        """
+        self.schema = schema
+        self.definitions = definitions
+        self.groups = {name: {} for name in definitions}
+        self._locks = list(locks)
+        self._held = ExitStack()
+
+    def __bool__(self):
+        return bool(self.definitions)
+
+    def add(self, rows, positions=None):
+        for name, definition in self.definitions.items():
+            groups = self.groups[name]
+            for key, states in definition.delta(self.schema, rows, positions).items():
+                current = groups.get(key)
+                if current is None:
+                    groups[key] = states
+                    continue
+                for acc, state in zip(current, states):
+                    acc.merge_partial(state.count, state.total, state.low, state.high)
+
+    def hold(self):
+        # Toma los locks que falten; quedan tomados hasta release
+        while self._locks:
+            self._held.enter_context(self._locks.pop(0))
+
+    def release(self):
+        self._held.close()
+
+
+_RECOMPUTE = object()
+
+
+def _add(value, state):
+    if state.func == "count":
+        return value + state.count
+    if state.func == "sum":
+        if state.total is None:
+            return value
+        return state.total if value is None else value + state.total
+    if state.func == "min":
+        return state.low if value is None or (state.low is not None and state.low < value) else value
+    return state.high if value is None or (state.high is not None and state.high > value) else value
+
+
+def _subtract(value, state):
+    if state.func == "count":
+        return value - state.count
+    if state.func == "sum":
+        return value if state.total is None else value - state.total
+    # Si se borró el mínimo (o el máximo) no se sabe cuál es el siguiente
+    if state.func == "min":
+        if state.low is None:
+            return value
+        return value if value is not None and state.low > value else _RECOMPUTE
+    if state.high is None:
+        return value
+    return value if value is not None and state.high < value else _RECOMPUTE
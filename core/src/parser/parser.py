@@ -1,17 +1,43 @@
 # parser/parser.py
 from src.parser.lexer import tokenize  
+from src.parser.aggregate import AGGREGATES, default_name
 
 class SQLParser:
     def parse(self, query: str):
         tokens = [t[1].lower() if t[0] in ("IDENT", "OP") else t[1] for t in tokenize(query)]
-        if tokens[0] == "create":
+        if not tokens:
+            raise ValueError("Sentencia SQL vacía")
+        return self._parse_tokens(tokens)
+
+    def _parse_tokens(self, tokens):
+        if tokens[0] == "explain":
+            return self._parse_explain(tokens)
+        elif tokens[0] == "create" and len(tokens) > 1 and tokens[1] == "index":
+            return self._parse_create_index(tokens)
+        elif tokens[0] == "create" and len(tokens) > 1 and tokens[1] == "materialized":
+            return self._parse_create_view(tokens)
+        elif tokens[0] == "create":
             return self._parse_create(tokens)
+        elif tokens[0] == "drop":
+            return self._parse_drop(tokens)
+        elif tokens[0] == "alter":
+            return self._parse_alter(tokens)
         elif tokens[0] == "insert":
             return self._parse_insert(tokens)
         elif tokens[0] == "delete":
             return self._parse_delete(tokens)
         elif tokens[0] == "select":
             return self._parse_select(tokens)
+        elif tokens[0] == "copy":
+            return self._parse_copy(tokens)
+        elif tokens[0] == "analyze":
+            return self._parse_analyze(tokens)
+        elif tokens[0] == "vacuum":
+            return self._parse_vacuum(tokens)
+        elif tokens[0] == "show":
+            return self._parse_show(tokens)
+        elif tokens[0] == "refresh":
+            return self._parse_refresh(tokens)
         else:
             raise ValueError("Sentencia SQL no soportada")
 
@@ -19,64 +45,377 @@ class SQLParser:
         """
         CREATE TABLE Restaurantes (
             id INT INDEX isam,
-            nombre VARCHAR[20] INDEX btree,
-            fecha DATE
-        )
+            nombre VARCHAR[20] INDEX btree INCLUDE (fecha),
+            fecha DATE,
+            activo BOOLEAN
+        ) [USING btree(id) [INCLUDE (nombre, fecha)]]
+          [PARTITION BY RANGE (fecha) (
+               PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+               PARTITION pmax VALUES LESS THAN (MAXVALUE))
+           | PARTITION BY HASH (id, 4)]
+
+        Tipos: SMALLINT, INT, BIGINT, FLOAT, DOUBLE, BOOLEAN, DATE,
+        VARCHAR[n] y ARRAY[FLOAT]; un tipo desconocido queda como VARCHAR[100].
+        INCLUDE copia esas columnas en las entradas del índice (btree y hash)
+        para responder consultas sin leer el .dat.
+        Con PARTITION BY cada partición tiene su propio .dat e índices.
         """
         table = tokens[2]
-        # Extraer definición de columnas entre paréntesis
-        if "(" in tokens and ")" in tokens:
-            open_paren = tokens.index("(")
-            close_paren = len(tokens) - 1 - tokens[::-1].index(")")
-            cols_tokens = tokens[open_paren+1:close_paren]
-        else:
+        # Extraer definición de columnas entre paréntesis (hasta el ")" que cierra)
+        if "(" not in tokens:
             raise ValueError("CREATE TABLE debe definir columnas")
+        open_paren = tokens.index("(")
+        depth, close_paren = 0, None
+        for i in range(open_paren, len(tokens)):
+            if tokens[i] == "(":
+                depth += 1
+            elif tokens[i] == ")":
+                depth -= 1
+                if depth == 0:
+                    close_paren = i
+                    break
+        if close_paren is None:
+            raise ValueError("CREATE TABLE debe definir columnas")
+        cols_tokens = tokens[open_paren+1:close_paren]
 
+        # Separar definiciones por comas de primer nivel
+        definitions, current, depth = [], [], 0
+        for tok in cols_tokens:
+            if tok in ("(", "["):
+                depth += 1
+            elif tok in (")", "]"):
+                depth -= 1
+            if tok == "," and depth == 0:
+                definitions.append(current)
+                current = []
+            else:
+                current.append(tok)
+        if current:
+            definitions.append(current)
 
         # Parsear columnas
-        columns, index_map = [], {}
-        i = 0
-        valid_types = {"INT", "FLOAT", "DATE", "VARCHAR", "CHAR"}
-        while i < len(cols_tokens):
-                if i+1 >= len(cols_tokens):
-                    break
-                name = cols_tokens[i]
-                ctype = cols_tokens[i+1].upper()
-                
-                # Normalizar VARCHAR sin tamaño a VARCHAR[100]
-                if ctype == "VARCHAR" and i+2 < len(cols_tokens) and not cols_tokens[i+2].startswith("["):
-                    ctype = "VARCHAR[100]"
-                
-                if ctype not in valid_types and not ctype.startswith("VARCHAR["):
-                    ctype = "VARCHAR[100]"
-                    
-                col_def = {"name": name, "type": ctype}
-                i += 2
-                
-                # Si el siguiente token es tamaño [20], lo agregamos al tipo
-                if i < len(cols_tokens) and cols_tokens[i].startswith("["):
-                    ctype += cols_tokens[i]
-                    i += 1
+        columns, index_map, include_map = [], {}, {}
+        valid_types = {"SMALLINT", "INT", "BIGINT", "FLOAT", "DOUBLE", "BOOLEAN", "DATE"}
+        # Sinónimos habituales de SQL
+        aliases = {"INTEGER": "INT", "BOOL": "BOOLEAN", "REAL": "FLOAT"}
+        for col_tokens in definitions:
+            if len(col_tokens) < 2:
+                raise ValueError(f"Definición de columna incompleta: {' '.join(col_tokens)}")
+            name = col_tokens[0]
+            ctype = col_tokens[1].upper()
+            i = 2
+
+            # Si el siguiente token es tamaño [20] o [FLOAT], lo agregamos al tipo
+            if i < len(col_tokens) and col_tokens[i] == "[":
+                close = col_tokens.index("]", i)
+                ctype += "[" + "".join(col_tokens[i+1:close]).upper() + "]"
+                i = close + 1
+
+            ctype = aliases.get(ctype, ctype)
+            if ctype == "CHAR":
+                ctype = "VARCHAR"
+            elif ctype.startswith("CHAR["):
+                ctype = "VAR" + ctype
+            # Normalizar VARCHAR sin tamaño a VARCHAR[100]
+            if ctype == "VARCHAR":
+                ctype = "VARCHAR[100]"
+            if ctype not in valid_types and not ctype.startswith("VARCHAR[") and ctype != "ARRAY[FLOAT]":
+                ctype = "VARCHAR[100]"
+
+            columns.append({"name": name, "type": ctype})
+
+            if i < len(col_tokens) and col_tokens[i] == "index":
+                if i + 1 >= len(col_tokens):
+                    raise ValueError(f"Falta el tipo de índice para {name}")
+                index_map[name] = col_tokens[i + 1]
+                include, _ = self._parse_include(col_tokens[i + 2:])
+                if include:
+                    include_map[name] = include
+
+        # USING tipo(col) [INCLUDE (...)] y PARTITION BY después de las columnas
+        rest = tokens[close_paren+1:]
+        partition = None
+        while rest:
+            if rest[0] == "partition":
+                partition, rest = self._parse_partition(rest)
+                continue
+            if rest[0] != "using" or len(rest) < 5 or rest[2] != "(" or rest[4] != ")":
+                raise ValueError("Se esperaba USING <tipo>(<columna>) después de las columnas")
+            col = rest[3]
+            index_map[col] = rest[1]
+            include, rest = self._parse_include(rest[5:])
+            if include:
+                include_map[col] = include
+            if rest and rest[0] == ",":
+                rest = rest[1:]
 
         return {
             "operation": "create",
             "table": table,
             "columns": columns,
-            "index_map": index_map
+            "index_map": index_map,
+            "include_map": include_map,
+            "partition": partition
         }
 
+    def _parse_partition(self, tokens):
+        """
+        PARTITION BY RANGE (col) (PARTITION p VALUES LESS THAN (v), ...)
+        o PARTITION BY HASH (col, n) al inicio de tokens.
+        Devuelve (definición, tokens restantes).
+        """
+        if len(tokens) < 6 or tokens[1] != "by" or tokens[2] not in ("range", "hash") or tokens[3] != "(":
+            raise ValueError("Se esperaba PARTITION BY RANGE(<columna>) o PARTITION BY HASH(<columna>, <n>)")
+        column = tokens[4]
+        if tokens[2] == "hash":
+            if len(tokens) < 8 or tokens[5] != "," or not tokens[6].isdigit() or tokens[7] != ")":
+                raise ValueError("Se esperaba PARTITION BY HASH(<columna>, <cantidad de particiones>)")
+            return {"kind": "hash", "column": column, "count": int(tokens[6])}, tokens[8:]
+
+        if tokens[5] != ")" or len(tokens) < 7 or tokens[6] != "(":
+            raise ValueError("Se esperaba la lista de particiones después de PARTITION BY RANGE(<columna>)")
+        partitions, i = [], 7
+        while True:
+            name, bound = self._parse_range_partition(tokens[i:i + 8])
+            partitions.append((name, bound))
+            i += 8
+            if i < len(tokens) and tokens[i] == ",":
+                i += 1
+                continue
+            if i < len(tokens) and tokens[i] == ")":
+                return {"kind": "range", "column": column, "partitions": partitions}, tokens[i + 1:]
+            raise ValueError("Falta ')' al final de las particiones")
+
+    def _parse_range_partition(self, tokens):
+        # PARTITION <nombre> VALUES LESS THAN (<literal> | MAXVALUE)
+        if len(tokens) < 8 or tokens[0] != "partition" or tokens[2:6] != ["values", "less", "than", "("] \
+                or tokens[7] != ")":
+            raise ValueError("Se esperaba PARTITION <nombre> VALUES LESS THAN (<valor> | MAXVALUE)")
+        bound = None if tokens[6] == "maxvalue" else tokens[6].strip("'\"")
+        return tokens[1], bound
+
+    def _parse_alter(self, tokens):
+        """
+        ALTER TABLE <tabla> ADD PARTITION <nombre> VALUES LESS THAN (<valor> | MAXVALUE)
+        ALTER TABLE <tabla> DROP PARTITION <nombre>
+        """
+        if len(tokens) < 6 or tokens[1] != "table" or tokens[4] != "partition":
+            raise ValueError("ALTER solo admite ALTER TABLE <tabla> ADD|DROP PARTITION ...")
+        if tokens[3] == "drop" and len(tokens) == 6:
+            return {"operation": "drop_partition", "table": tokens[2], "partition": tokens[5]}
+        if tokens[3] == "add" and len(tokens) == 12:
+            name, bound = self._parse_range_partition(tokens[4:])
+            return {"operation": "add_partition", "table": tokens[2], "partition": name, "bound": bound}
+        raise ValueError("ALTER solo admite ALTER TABLE <tabla> ADD|DROP PARTITION ...")
+
+    def _parse_create_index(self, tokens):
+        """
+        CREATE INDEX ON <tabla> (<columna>) USING <tipo> [INCLUDE (col1, col2)]
+
+        Tipos: sequential, isam, hash, btree, lsm (para tablas con muchas
+        inserciones), rtree (solo ARRAY[FLOAT]) y fulltext (solo VARCHAR, para MATCH).
+        El índice se construye en bloque con los datos que ya tiene la tabla.
+        """
+        if len(tokens) < 9 or tokens[2] != "on" or tokens[4] != "(" or tokens[6] != ")" \
+                or tokens[7] != "using":
+            raise ValueError("CREATE INDEX debe tener la forma CREATE INDEX ON <tabla>(<columna>) USING <tipo>")
+        include, rest = self._parse_include(tokens[9:])
+        if rest:
+            raise ValueError(f"Token inesperado en CREATE INDEX: {rest[0]}")
+        return {
+            "operation": "create_index",
+            "table": tokens[3],
+            "column": tokens[5],
+            "index_type": tokens[8],
+            "include": include
+        }
+
+    def _parse_create_view(self, tokens):
+        """
+        CREATE MATERIALIZED VIEW <vista> AS
+            SELECT region, COUNT(*), SUM(monto) AS total FROM Ventas [WHERE ...] [GROUP BY region]
+
+        La vista se guarda como una tabla con las columnas agrupadas y una
+        columna por agregación (el alias, o func_columna). Las inserciones y
+        borrados de la tabla la mantienen al día.
+        """
+        if len(tokens) < 6 or tokens[2] != "view" or tokens[4] != "as" or tokens[5] != "select":
+            raise ValueError("CREATE MATERIALIZED VIEW debe tener la forma "
+                             "CREATE MATERIALIZED VIEW <vista> AS SELECT ...")
+        query = self._parse_select(tokens[5:])
+        if not query["aggregates"]:
+            raise ValueError("La vista materializada necesita agregaciones")
+        if query["index"] is not None or query["limit"] is not None:
+            raise ValueError("La vista materializada no admite USING ni LIMIT")
+        return {
+            "operation": "create_view",
+            "view": tokens[3],
+            "query": query
+        }
+
+    def _parse_refresh(self, tokens):
+        # REFRESH MATERIALIZED VIEW <vista>: la recalcula entera desde la tabla
+        if len(tokens) != 4 or tokens[1:3] != ["materialized", "view"]:
+            raise ValueError("REFRESH debe tener la forma REFRESH MATERIALIZED VIEW <vista>")
+        return {
+            "operation": "refresh_view",
+            "view": tokens[3]
+        }
+
+    def _parse_drop(self, tokens):
+        # DROP INDEX ON <tabla> (<columna>) | DROP MATERIALIZED VIEW <vista>
+        if len(tokens) == 4 and tokens[1:3] == ["materialized", "view"]:
+            return {"operation": "drop_view", "view": tokens[3]}
+        if len(tokens) != 7 or tokens[1] != "index" or tokens[2] != "on" or tokens[4] != "(" \
+                or tokens[6] != ")":
+            raise ValueError("DROP debe tener la forma DROP INDEX ON <tabla>(<columna>) "
+                             "o DROP MATERIALIZED VIEW <vista>")
+        return {
+            "operation": "drop_index",
+            "table": tokens[3],
+            "column": tokens[5]
+        }
+
+    def _parse_include(self, tokens):
+        """
+        INCLUDE (col1, col2) al inicio de tokens.
+        Devuelve (columnas, tokens restantes).
+        """
+        if not tokens or tokens[0] != "include":
+            return [], tokens
+        if len(tokens) < 3 or tokens[1] != "(" or ")" not in tokens:
+            raise ValueError("Se esperaba INCLUDE (<columnas>)")
+        close = tokens.index(")")
+        include = [tok for tok in tokens[2:close] if tok != ","]
+        if not include:
+            raise ValueError("INCLUDE necesita al menos una columna")
+        return include, tokens[close + 1:]
+
     def _parse_insert(self, tokens):
-        # INSERT INTO <table> VALUES (...)
+        # INSERT INTO <table> VALUES (...), (...), ...
         table = tokens[2]
-        open_paren = tokens.index("(")
-        close_paren = tokens.index(")")
-        values = tokens[open_paren+1:close_paren]
+        if "values" not in tokens:
+            raise ValueError("INSERT debe incluir VALUES")
+
+        rows = []
+        i = tokens.index("values") + 1
+        while i < len(tokens):
+            if tokens[i] != "(":
+                raise ValueError("Se esperaba '(' en la lista de VALUES")
+            row, i = self._parse_tuple(tokens, i)
+            rows.append(row)
+            if i < len(tokens):
+                if tokens[i] != ",":
+                    raise ValueError("Las tuplas de VALUES deben separarse con ','")
+                i += 1
+
+        if not rows:
+            raise ValueError("INSERT debe incluir al menos una tupla")
+
         return {
             "operation": "insert",
             "table": table,
-            "values": [v.strip(",") for v in values]
+            "rows": rows
         }
 
+    def _parse_tuple(self, tokens, start):
+        """
+        Lee una tupla "( v1, v2, ... )" desde tokens[start] == "(".
+        Devuelve (valores, posición siguiente al ")").
+        """
+        values = []
+        i = start + 1
+        expect_value = True
+        while i < len(tokens) and tokens[i] != ")":
+            if tokens[i] == ",":
+                if expect_value:
+                    values.append(None)  # valor vacío: (1, , 3)
+                expect_value = True
+            elif not expect_value:
+                # Dos valores seguidos: sin la coma se correrían las columnas siguientes
+                raise ValueError(f"Se esperaba ',' o ')' después de {tokens[i - 1]} en VALUES y llegó {tokens[i]}")
+            else:
+                values.append(tokens[i])
+                expect_value = False
+            i += 1
+        if i >= len(tokens):
+            raise ValueError("Tupla sin cerrar en VALUES")
+        if expect_value and values:
+            values.append(None)  # coma final: (1, 2, )
+        return values, i + 1
+
+    def _parse_copy(self, tokens):
+        """
+        COPY <table> FROM 'ruta.csv' [WITH HEADER, DELIMITER ';']
+        """
+        table = tokens[1]
+        if len(tokens) < 4 or tokens[2] != "from":
+            raise ValueError("COPY debe tener la forma COPY <tabla> FROM 'archivo'")
+        path = tokens[3].strip("'\"")
+
+        header, delimiter = False, ","
+        if "with" in tokens:
+            options = [t for t in tokens[tokens.index("with") + 1:] if t not in (",", "(", ")")]
+            i = 0
+            while i < len(options):
+                opt = options[i]
+                if opt == "header":
+                    header = True
+                elif opt == "delimiter":
+                    if i + 1 >= len(options):
+                        raise ValueError("DELIMITER requiere un carácter")
+                    delimiter = options[i + 1].strip("'\"")
+                    i += 1
+                else:
+                    raise ValueError(f"Opción de COPY no soportada: {opt}")
+                i += 1
+            if len(delimiter) != 1:
+                raise ValueError("DELIMITER debe ser un solo carácter")
+
+        return {
+            "operation": "copy",
+            "table": table,
+            "path": path,
+            "header": header,
+            "delimiter": delimiter
+        }
+
+    def _parse_explain(self, tokens):
+        # EXPLAIN [ANALYZE] <select|delete>
+        analyze = len(tokens) > 1 and tokens[1] == "analyze"
+        statement = tokens[2:] if analyze else tokens[1:]
+        if not statement or statement[0] not in ("select", "delete"):
+            raise ValueError("EXPLAIN solo soporta SELECT y DELETE")
+        return {
+            "operation": "explain",
+            "analyze": analyze,
+            "statement": self._parse_tokens(statement)
+        }
+
+    def _parse_analyze(self, tokens):
+        # ANALYZE <table>
+        if len(tokens) != 2:
+            raise ValueError("ANALYZE debe tener la forma ANALYZE <tabla>")
+        return {
+            "operation": "analyze",
+            "table": tokens[1]
+        }
+
+    def _parse_vacuum(self, tokens):
+        # VACUUM <table>
+        if len(tokens) != 2:
+            raise ValueError("VACUUM debe tener la forma VACUUM <tabla>")
+        return {
+            "operation": "vacuum",
+            "table": tokens[1]
+        }
+
+    def _parse_show(self, tokens):
+        # SHOW INDEX RECOMMENDATIONS: índices sugeridos según las consultas ejecutadas
+        if tokens[1:] != ["index", "recommendations"]:
+            raise ValueError("SHOW solo admite SHOW INDEX RECOMMENDATIONS")
+        return {"operation": "show_recommendations"}
+
     def _parse_delete(self, tokens):
         # DELETE FROM <table> WHERE <cond>
         table = tokens[2]
@@ -89,24 +428,49 @@ class SQLParser:
         }
 
     def _parse_select(self, tokens):
+        """
+        SELECT <columnas | agregaciones> FROM <tabla>
+            [TABLESAMPLE SYSTEM | BERNOULLI (p) [REPEATABLE (semilla)]]
+            [WHERE <cond>] [GROUP BY col1, col2] [USING <índice>] [LIMIT n]
 
+        Con GROUP BY las columnas del SELECT tienen que estar agrupadas y
+        salen antes que las agregaciones. TABLESAMPLE lee solo el p% de las
+        páginas (SYSTEM) o de las filas (BERNOULLI).
+        """
         from_index = tokens.index("from")
         raw_columns = tokens[1:from_index]
 
-        columns = [c.strip(",") for c in raw_columns if c != ","]
-
         table = tokens[from_index + 1]
+        sample = None
+        if tokens[from_index + 2:from_index + 3] == ["tablesample"]:
+            sample = self._parse_tablesample(tokens[from_index + 3:])
 
-        condition, index, limit = None, None, None
+        condition, index, limit, group_by = None, None, None, None
+        # Fin de cada cláusula: la siguiente que aparezca (GROUP BY, USING o LIMIT)
+        clauses = [i for i, tok in enumerate(tokens) if tok in ("group", "using", "limit")]
+
+        def clause_end(start):
+            return min([i for i in clauses if i > start] + [len(tokens)])
 
         if "where" in tokens:
             where_index = tokens.index("where")
-            end_idx = len(tokens)
-            if "using" in tokens:
-                end_idx = tokens.index("using")
-            if "limit" in tokens:
-                end_idx = min(end_idx, tokens.index("limit"))
-            condition = " ".join(tokens[where_index + 1:end_idx])
+            condition = " ".join(tokens[where_index + 1:clause_end(where_index)])
+
+        if "group" in tokens:
+            group_index = tokens.index("group")
+            if tokens[group_index + 1:group_index + 2] != ["by"]:
+                raise ValueError("Se esperaba GROUP BY")
+            group_by = [tok for tok in tokens[group_index + 2:clause_end(group_index)] if tok != ","]
+            if not group_by:
+                raise ValueError("GROUP BY necesita al menos una columna")
+
+        columns, aggregates = self._parse_select_list(raw_columns, grouped=group_by is not None)
+        if group_by is not None:
+            if not aggregates:
+                raise ValueError("GROUP BY necesita al menos una agregación")
+            missing = [col for col in columns if col not in group_by]
+            if missing:
+                raise ValueError(f"La columna {missing[0]} debe estar en GROUP BY")
 
         if "using" in tokens:
             idx_index = tokens.index("using")
@@ -127,12 +491,88 @@ class SQLParser:
         return {
             "operation": "select",
             "table": table,
-            "columns": columns if columns else ["*"],
+            "columns": columns if columns or aggregates else ["*"],
+            "aggregates": aggregates,
             "condition": condition,
+            "group_by": group_by,
+            "sample": sample,
             "index": index,
             "limit": limit
         }
 
+    def _parse_tablesample(self, tokens):
+        # SYSTEM | BERNOULLI (p) [REPEATABLE (semilla)]
+        if len(tokens) < 4 or tokens[0] not in ("system", "bernoulli") or tokens[1] != "(" or tokens[3] != ")":
+            raise ValueError("TABLESAMPLE debe tener la forma TABLESAMPLE SYSTEM|BERNOULLI (porcentaje)")
+        try:
+            percent = float(tokens[2])
+        except ValueError:
+            raise ValueError("El porcentaje de TABLESAMPLE debe ser un número")
+        if not 0 <= percent <= 100:
+            raise ValueError("El porcentaje de TABLESAMPLE debe estar entre 0 y 100")
+        seed = None
+        if tokens[4:5] == ["repeatable"]:
+            if len(tokens) < 8 or tokens[5] != "(" or tokens[7] != ")":
+                raise ValueError("REPEATABLE debe tener la forma REPEATABLE (semilla)")
+            try:
+                seed = int(tokens[6])
+            except ValueError:
+                raise ValueError("La semilla de REPEATABLE debe ser un número entero")
+        return {"method": tokens[0], "percent": percent, "seed": seed}
+
+    def _parse_select_list(self, tokens, grouped=False):
+        """
+        Separa la lista del SELECT en columnas y agregaciones:
+        func(col | *) [AS alias], con func en COUNT/SUM/AVG/MIN/MAX o
+        APPROX_COUNT_DISTINCT, y APPROX_PERCENTILE(col, percentil) [AS alias].
+        grouped: hay GROUP BY (se pueden mezclar columnas y agregaciones)
+        """
+        items, current, depth = [], [], 0
+        for tok in tokens:
+            if tok == "," and depth == 0:
+                items.append(current)
+                current = []
+                continue
+            depth += (tok == "(") - (tok == ")")
+            current.append(tok)
+        items.append(current)
+
+        columns, aggregates = [], []
+        for item in items:
+            if not item:
+                continue
+            if len(item) >= 4 and item[0] in AGGREGATES and item[1] == "(":
+                func, column, arg = item[0], item[2], None
+                if item[3] == "," and len(item) >= 6 and item[5] == ")":
+                    try:
+                        arg = float(item[4])
+                    except ValueError:
+                        raise ValueError(f"Agregación mal formada: {' '.join(item)}")
+                    rest = item[6:]
+                elif item[3] == ")":
+                    rest = item[4:]
+                else:
+                    raise ValueError(f"Agregación mal formada: {' '.join(item)}")
+                if (func == "approx_percentile") != (arg is not None):
+                    raise ValueError("Solo APPROX_PERCENTILE lleva un segundo argumento, y lo necesita")
+                name = default_name(func, column, arg)
+                if len(rest) == 2 and rest[0] == "as":
+                    name = rest[1]
+                elif rest:
+                    raise ValueError(f"Agregación mal formada: {' '.join(item)}")
+                aggregate = {"func": func, "column": column, "name": name}
+                if arg is not None:
+                    aggregate["arg"] = arg
+                aggregates.append(aggregate)
+            elif len(item) == 1:
+                columns.append(item[0])
+            else:
+                raise ValueError(f"Expresión no soportada en SELECT: {' '.join(item)}")
+
+        if columns and aggregates and not grouped:
+            raise ValueError("No se pueden mezclar columnas y agregaciones sin GROUP BY")
+        return columns, aggregates
+
 
 
 if __name__ == "__main__":
@@ -147,8 +587,58 @@ if __name__ == "__main__":
     """
     print(parser.parse(q1))
 
-    q2 = "INSERT INTO Restaurantes VALUES (1, 'KFC', '2023-01-01')"
+    q2 = "INSERT INTO Restaurantes VALUES (1, 'KFC', '2023-01-01'), (2, 'Bembos', '2023-01-02')"
     print(parser.parse(q2))
 
     q3 = "SELECT * FROM Restaurantes WHERE id = 10 USING btree"
     print(parser.parse(q3))
+
+    q4 = "COPY Restaurantes FROM 'restaurantes.csv' WITH HEADER, DELIMITER ';'"
+    print(parser.parse(q4))
+
+    q5 = "ANALYZE Restaurantes"
+    print(parser.parse(q5))
+
+    q6 = "EXPLAIN ANALYZE SELECT * FROM Restaurantes WHERE id BETWEEN 1 AND 10"
+    print(parser.parse(q6))
+
+    q7 = "CREATE INDEX ON Restaurantes(nombre) USING btree INCLUDE (fecha)"
+    print(parser.parse(q7))
+
+    q8 = "DROP INDEX ON Restaurantes(nombre)"
+    print(parser.parse(q8))
+
+    q9 = "VACUUM Restaurantes"
+    print(parser.parse(q9))
+
+    q10 = "SELECT * FROM Restaurantes WHERE MATCH(nombre, 'pollo OR (pizza AND horno)') LIMIT 10"
+    print(parser.parse(q10))
+
+    q11 = """
+    CREATE TABLE Ventas (id INT INDEX btree, fecha DATE, monto DOUBLE)
+    PARTITION BY RANGE (fecha) (
+        PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+        PARTITION p2024 VALUES LESS THAN ('2025-01-01'))
+    """
+    print(parser.parse(q11))
+
+    q12 = "ALTER TABLE Ventas DROP PARTITION p2023"
+    print(parser.parse(q12))
+
+    q13 = "SHOW INDEX RECOMMENDATIONS"
+    print(parser.parse(q13))
+
+    q14 = "SELECT fecha, COUNT(*), SUM(monto) AS total FROM Ventas WHERE monto > 10 GROUP BY fecha LIMIT 5"
+    print(parser.parse(q14))
+
+    q15 = "CREATE MATERIALIZED VIEW VentasPorDia AS SELECT fecha, COUNT(*), MAX(monto) FROM Ventas GROUP BY fecha"
+    print(parser.parse(q15))
+
+    q16 = "REFRESH MATERIALIZED VIEW VentasPorDia"
+    print(parser.parse(q16))
+
+    q17 = "SELECT AVG(monto) FROM Ventas TABLESAMPLE SYSTEM (10) REPEATABLE (42) WHERE monto > 10"
+    print(parser.parse(q17))
+
+    q18 = "SELECT APPROX_COUNT_DISTINCT(id), APPROX_PERCENTILE(monto, 0.95) AS p95 FROM Ventas"
+    print(parser.parse(q18))
@@ -0,0 +1,386 @@
+# parser/planner.py
+import os
+import math
+
+from src.parser.condition import parse_condition, coerce_node, conjuncts, columns_of
+from src.dbms.statistics import DEFAULT_EQ, DEFAULT_RANGE, DEFAULT_NEAR, DEFAULT_MATCH
+from src.dbms import vectorized
+from src.dbms.partition import partition_table
+
+# Modelo de costos (unidades = lectura secuencial de una página)
+PAGE_SIZE = 4096
+SEQ_PAGE_COST = 1.0
+RANDOM_PAGE_COST = 4.0
+CPU_TUPLE_COST = 0.01
+CPU_INDEX_COST = 0.005
+# Evaluar una fila dentro de un lote vectorizado (NumPy) en vez de como dict
+CPU_VECTOR_COST = 0.0005
+
+# Qué búsquedas responde cada tipo de índice
+RANGE_INDEXES = {"btree", "isam", "sequential", "lsm"}
+EQ_INDEXES = {"btree", "isam", "sequential", "hash", "lsm"}
+# Índices que pueden guardar columnas INCLUDE y responder sin leer el .dat
+COVERING_INDEXES = {"btree", "hash"}
+# Entradas por nodo de un árbol, para estimar la altura de un índice hipotético
+INDEX_FANOUT = 100
+
+
+class Planner:
+    """
+    Elige el camino de acceso de un SELECT/DELETE: recorrido completo o
+    alguno de los índices de la tabla, según el costo estimado con las
+    estadísticas del catálogo.
+    """
+
+    def __init__(self, schema_manager):
+        self.schema_manager = schema_manager
+
+    def plan(self, table_name, condition=None, hint=None, columns=None, hypothetical=None, sample=None):
+        """
+        condition: texto del WHERE (o árbol ya parseado)
+        hint: tipo de índice pedido con USING; se respeta si es aplicable
+        columns: proyección del SELECT; si el índice la cubre junto con la
+                 condición, el plan es index-only (sin leer el .dat)
+        hypothetical: (columna, tipo) de un índice que no existe: se planea
+                 como si estuviera (reemplaza al de la columna, si hay). Lo
+                 usa el asesor de índices para estimar cuánto ahorraría
+        sample: TableSample del FROM; la muestra sale del recorrido (los
+                 índices no la respetan) y SYSTEM solo lee esa parte de las páginas
+        """
+        table = self.schema_manager.get_table(table_name)
+        schema, stats = table["schema"], table["stats"]
+
+        node = None
+        if condition:
+            node = parse_condition(condition) if isinstance(condition, str) else condition
+            node = coerce_node(node, schema)
+        if table["partitioning"] is not None:
+            return self._plan_partitions(table, node, hint, columns, hypothetical, sample)
+
+        file_size = os.path.getsize(table["file"].filename)
+        heap_rows = file_size // schema.size
+        heap_pages = max(1, math.ceil(file_size / PAGE_SIZE))
+        rows = stats.row_count or heap_rows
+
+        # El mapa de zonas dice cuántos bloques del recorrido no hace falta leer
+        zone_map = table["file"].zone_map
+        skipped = zone_map.skippable_blocks(node)
+        read = 1 - skipped / len(zone_map.blocks) if zone_map.blocks else 1
+        vector = vectorized.supports(schema, node)
+        # BERNOULLI lee todas las páginas pero solo procesa la fracción elegida
+        pages_read = sample.fraction if sample is not None and sample.method == "system" else 1
+        processed = sample.fraction if sample is not None else 1
+        scan = {
+            "access": "scan",
+            "cost": heap_pages * read * pages_read * SEQ_PAGE_COST
+                    + heap_rows * read * processed * (CPU_VECTOR_COST if vector else CPU_TUPLE_COST),
+        }
+        if vector:
+            scan["vectorized"] = True
+        if skipped:
+            scan["blocks_skipped"] = skipped
+        if sample is not None:
+            scan["sample"] = sample
+        needed = self._needed_columns(schema, columns, node)
+        candidates = [scan]
+        if sample is None:
+            candidates += self._index_paths(table, node, rows, heap_pages, needed, hypothetical)
+
+        chosen = min(candidates, key=lambda c: c["cost"])
+        hint_used = None
+        if hint:
+            hinted = [c for c in candidates if c.get("index_type") == hint.lower()]
+            if hinted:
+                chosen = min(hinted, key=lambda c: c["cost"])
+                hint_used = True
+            else:
+                hint_used = False
+
+        plan = dict(chosen)
+        rank = self._rank(table, node)
+        if rank is not None:
+            plan["rank"] = rank
+        plan.update({
+            "table": table_name,
+            "condition": node,
+            "estimated_rows": round(self._selectivity(stats, node) * rows * processed, 1)
+                              if node or sample is not None else rows,
+            "alternatives": [self._describe(c) for c in candidates],
+            "columns": _decoded_columns(schema, needed),
+        })
+        if hint:
+            plan["hint"] = {"index": hint, "used": hint_used}
+        return plan
+
+    def _plan_partitions(self, table, node, hint=None, columns=None, hypothetical=None, sample=None):
+        """
+        Tabla particionada: se descartan las particiones que no pueden tener
+        filas que cumplan el WHERE y cada una de las demás se planea aparte
+        (tiene sus propias estadísticas e índices).
+        """
+        partitioning = table["partitioning"]
+        kept = partitioning.prune(node)
+        partitions = []
+        for name in kept:
+            sub = self.plan(partition_table(table["name"], name), node, hint, columns, hypothetical, sample)
+            sub["partition"] = name
+            partitions.append(sub)
+        return {
+            "access": "partitions",
+            "table": table["name"],
+            "condition": node,
+            "partitions": partitions,
+            "pruned": [name for name in partitioning.names if name not in kept],
+            "cost": sum(sub["cost"] for sub in partitions),
+            "estimated_rows": round(sum(sub["estimated_rows"] for sub in partitions), 1),
+            "columns": _decoded_columns(table["schema"], self._needed_columns(table["schema"], columns, node)),
+        }
+
+    # ---------------------------
+    # Caminos por índice
+    # ---------------------------
+    def _index_paths(self, table, node, rows, heap_pages, needed=None, hypothetical=None):
+        if node is None:
+            return []
+        index_types = table["index_types"]
+        if hypothetical is not None:
+            index_types = dict(index_types)
+            index_types[hypothetical[0]] = hypothetical[1]
+        by_column = {}
+        for pred in conjuncts(node):
+            if pred[0] in ("cmp", "between", "in", "near", "match") and pred[1] in index_types:
+                by_column.setdefault(pred[1], []).append(pred)
+
+        paths = []
+        for column, preds in by_column.items():
+            itype = index_types[column]
+            lookup, used = self._lookup(itype, preds)
+            if lookup is None:
+                continue
+            virtual = hypothetical is not None and column == hypothetical[0]
+            index = None if virtual else self.schema_manager.get_index(table, column)
+            if lookup[0] == "match" and index is not None:
+                # El diccionario del índice sabe en cuántos registros está cada término
+                selectivity = min(1.0, index.estimate(lookup[1]) / len(index)) if len(index) else 0.0
+            else:
+                sel_node = used[0] if len(used) == 1 else ("and", used)
+                selectivity = self._selectivity(table["stats"], sel_node)
+            fetched = selectivity * rows
+
+            probes = len(lookup[1]) if lookup[0] == "eq" else 1
+            index_only = (itype in COVERING_INDEXES and needed is not None and not virtual
+                          and needed <= {column, *table["index_include"].get(column, ())})
+            if index_only:
+                # Las filas salen de las entradas del índice: no hay Fetch
+                pages = 0
+            elif lookup[0] == "match":
+                # Se leen en orden de puntaje, no de offset: una página por fila
+                pages = min(fetched, heap_pages)
+            else:
+                # Los offsets se ordenan antes de leer: cada página del .dat
+                # se visita a lo sumo una vez (estimación de Cardenas)
+                pages = heap_pages * (1 - math.exp(-fetched / heap_pages)) if heap_pages else 0
+            height = _estimated_height(itype, rows) if virtual else index.height()
+            cost = (probes * height * RANDOM_PAGE_COST
+                    + fetched * CPU_INDEX_COST
+                    + pages * RANDOM_PAGE_COST
+                    + fetched * CPU_TUPLE_COST)
+            paths.append({
+                "access": "index",
+                "column": column,
+                "index_type": itype,
+                "index_only": index_only,
+                "lookup": lookup,
+                "selectivity": round(selectivity, 6),
+                "cost": cost,
+            })
+            if virtual:
+                paths[-1]["hypothetical"] = True
+        return paths
+
+    def _rank(self, table, node):
+        """
+        MATCH sobre una columna con índice fulltext: el resultado sale por
+        puntaje BM25 sea cual sea el camino elegido (si gana el recorrido u
+        otro índice, las filas se ordenan con los puntajes del fulltext).
+        """
+        if node is None:
+            return None
+        for pred in conjuncts(node):
+            if pred[0] == "match" and table["index_types"].get(pred[1]) == "fulltext":
+                return {"column": pred[1], "query": pred[2]}
+        return None
+
+    def _needed_columns(self, schema, columns, node):
+        """
+        Columnas que la consulta necesita leer (proyección + condición),
+        o None si no se conoce la proyección (DELETE necesita el registro entero).
+        """
+        if columns is None:
+            return None
+        if "*" in columns:
+            needed = set(schema.types)
+        else:
+            lowered = {c.lower(): c for c in schema.types}
+            needed = set()
+            for col in columns:
+                name = col if col in schema.types else lowered.get(col.lower())
+                if name is None:
+                    return None
+                needed.add(name)
+        return needed | columns_of(node)
+
+    def _lookup(self, itype, preds):
+        """
+        Traduce los predicados de una columna a una búsqueda en su índice.
+        Devuelve (lookup, predicados usados) o (None, []).
+        """
+        if itype == "fulltext":
+            for pred in preds:
+                if pred[0] == "match":
+                    return ("match", pred[2]), [pred]
+            return None, []
+
+        if itype == "rtree":
+            for pred in preds:
+                if pred[0] == "near":
+                    return ("near", pred[2], pred[3]), [pred]
+            return None, []
+
+        if itype in EQ_INDEXES:
+            for pred in preds:
+                if pred[0] == "cmp" and pred[2] == "=":
+                    return ("eq", [pred[3]]), [pred]
+            for pred in preds:
+                if pred[0] == "in":
+                    return ("eq", list(pred[2])), [pred]
+
+        if itype in RANGE_INDEXES:
+            low = high = None
+            used = []
+            for pred in preds:
+                if pred[0] == "between":
+                    low, high = _max(low, pred[2]), _min(high, pred[3])
+                elif pred[0] == "cmp" and pred[2] in (">", ">="):
+                    low = _max(low, pred[3])
+                elif pred[0] == "cmp" and pred[2] in ("<", "<="):
+                    high = _min(high, pred[3])
+                else:
+                    continue
+                used.append(pred)
+            if used:
+                # Los límites estrictos se filtran después con la condición completa
+                return ("range", low, high), used
+        return None, []
+
+    # ---------------------------
+    # Utilidades
+    # ---------------------------
+    def _selectivity(self, stats, node):
+        if node is None:
+            return 1.0
+        if stats.row_count == 0:
+            return _default_selectivity(node)
+        return stats.selectivity(node)
+
+    def describe(self, plan):
+        """
+        Versión serializable del plan para EXPLAIN.
+        """
+        if plan["access"] == "partitions":
+            return {
+                "access": "partitions",
+                "cost": round(plan["cost"], 2),
+                "estimated_rows": plan["estimated_rows"],
+                "partitions": [dict(self.describe(sub), partition=sub["partition"]) for sub in plan["partitions"]],
+                "pruned": plan["pruned"],
+            }
+        result = self._describe(plan)
+        if plan["access"] == "index":
+            result["lookup"] = _lookup_text(plan["lookup"])
+            result["selectivity"] = plan["selectivity"]
+        result["estimated_rows"] = plan["estimated_rows"]
+        if plan.get("columns") is not None:
+            result["columns"] = plan["columns"]
+        result["alternatives"] = plan["alternatives"]
+        if "hint" in plan:
+            result["hint"] = plan["hint"]
+        if "rank" in plan:
+            result["rank"] = plan["rank"]
+        return result
+
+    def _describe(self, candidate):
+        if candidate["access"] == "scan":
+            result = {"access": "scan", "cost": round(candidate["cost"], 2)}
+            if candidate.get("vectorized"):
+                result["vectorized"] = True
+            if candidate.get("blocks_skipped"):
+                result["blocks_skipped"] = candidate["blocks_skipped"]
+            if candidate.get("sample") is not None:
+                result["sample"] = candidate["sample"].to_dict()
+            return result
+        result = {
+            "access": "index",
+            "column": candidate["column"],
+            "index_type": candidate["index_type"],
+            "cost": round(candidate["cost"], 2),
+        }
+        if candidate.get("index_only"):
+            result["index_only"] = True
+        return result
+
+
+def _decoded_columns(schema, needed):
+    # Columnas a decodificar de cada registro (None = todas)
+    if needed is None or len(needed) == len(schema.types):
+        return None
+    return [c for c in schema.types if c in needed]
+
+
+def _default_selectivity(node):
+    # Sin estadísticas (tabla nunca analizada): valores fijos
+    kind = node[0]
+    if kind == "and":
+        return math.prod(_default_selectivity(c) for c in node[1])
+    if kind == "or":
+        return min(1.0, sum(_default_selectivity(c) for c in node[1]))
+    if kind == "not":
+        return 1.0 - _default_selectivity(node[1])
+    if kind == "true":
+        return 1.0
+    if kind == "false":
+        return 0.0
+    if kind == "cmp" and node[2] == "=":
+        return DEFAULT_EQ
+    if kind == "in":
+        return min(1.0, DEFAULT_EQ * len(node[2]))
+    if kind == "near":
+        return DEFAULT_NEAR
+    if kind == "match":
+        return DEFAULT_MATCH
+    return DEFAULT_RANGE
+
+
+def _estimated_height(itype, rows):
+    # Altura de un índice que todavía no existe, para el mismo modelo de costos
+    if itype in ("hash", "fulltext"):
+        return 1
+    return max(1, math.ceil(math.log(max(rows, 2), INDEX_FANOUT)))
+
+
+def _lookup_text(lookup):
+    if lookup[0] == "eq":
+        return {"kind": "eq", "values": lookup[1]}
+    if lookup[0] == "range":
+        return {"kind": "range", "low": lookup[1], "high": lookup[2]}
+    if lookup[0] == "match":
+        return {"kind": "match", "query": lookup[1]}
+    return {"kind": "near", "point": list(lookup[1]), "radius": lookup[2]}
+
+
+def _max(a, b):
+    return b if a is None else max(a, b)
+
+
+def _min(a, b):
+    return b if a is None else min(a, b)
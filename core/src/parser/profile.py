@@ -0,0 +1,91 @@
+# parser/profile.py
+import time
+
+
+class OperatorProfile:
+    """
+    Contadores de un operador del plan: filas que produce, tiempo dentro
+    del operador (incluye a sus hijos) y la E/S que hizo la fuente que mide.
+    """
+
+    def __init__(self, name, detail=None, counters=None, child=None, size=None):
+        self.name = name
+        self.detail = detail or {}
+        self.counters = counters  # función -> dict de contadores acumulados
+        self.child = child
+        self.size = size  # filas que representa cada elemento (lotes vectorizados)
+        self.rows_out = 0
+        self.elapsed = 0.0
+        self.io = {}
+        self._start_io = None
+        self._gen = None
+
+    def run(self, iterable):
+        self._gen = self._run(iterable)
+        return self._gen
+
+    def _run(self, iterable):
+        it = iter(iterable)
+        self._start_io = self.counters() if self.counters else None
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    self.elapsed += time.perf_counter() - start
+                    return
+                self.elapsed += time.perf_counter() - start
+                self.rows_out += self.size(item) if self.size else 1
+                yield item
+        finally:
+            # Cerrar la fuente primero para que registre su E/S (corte por LIMIT)
+            if hasattr(it, "close"):
+                it.close()
+            if self.counters:
+                end_io = self.counters()
+                self.io = {k: end_io[k] - self._start_io.get(k, 0) for k in end_io}
+
+    def close(self):
+        if self._gen is not None:
+            self._gen.close()
+
+    def to_dict(self):
+        child_ms = self.child.elapsed * 1000 if self.child else 0.0
+        result = {"operator": self.name}
+        result.update(self.detail)
+        result.update({
+            "rows_in": self.child.rows_out if self.child else None,
+            "rows_out": self.rows_out,
+            "time_ms": round(self.elapsed * 1000, 3),
+            "self_ms": round(self.elapsed * 1000 - child_ms, 3),
+        })
+        result.update(self.io)
+        return result
+
+
+class QueryProfile:
+    """
+    Perfil de una ejecución para EXPLAIN ANALYZE. Los operadores se
+    encadenan de la fuente hacia arriba: cada uno consume al anterior.
+    Sin perfil (profile=None) la ejecución no paga nada de esto.
+    """
+
+    def __init__(self):
+        self.plan = None
+        self.operators = []
+
+    def wrap(self, name, iterable, counters=None, size=None, **detail):
+        child = self.operators[-1] if self.operators else None
+        op = OperatorProfile(name, detail, counters, child, size)
+        self.operators.append(op)
+        return op.run(iterable)
+
+    def finish(self):
+        # Cierra los generadores que quedaron a medias (LIMIT) para fijar su E/S
+        for op in reversed(self.operators):
+            op.close()
+
+    def to_list(self):
+        # De la raíz a las hojas, como lo muestra EXPLAIN
+        return [op.to_dict() for op in reversed(self.operators)]
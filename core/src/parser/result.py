@@ -0,0 +1,170 @@
+# parser/result.py
+import json
+import struct
+
+from src.record import TYPE_FORMATS
+
+# Formato binario (opcional en /query):
+#   cabecera: magic | columnas | filas
+#   por columna: nombre (u16 + utf-8) | tipo (u16 + utf-8) | clase (1 byte) | datos (u32 + bytes)
+# Clases de datos:
+#   h i q f d ?  arreglo little-endian empacado (tipos numéricos y BOOLEAN sin nulos)
+#   s            strings: longitudes u32 seguidas de los bytes utf-8
+#   p            puntos ARRAY[FLOAT]: pares float32 little-endian
+#   j            cualquier otra cosa (o columnas con nulos): arreglo JSON
+BINARY_HEADER = struct.Struct("<4sIQ")
+BINARY_MAGIC = b"RSB1"
+
+
+class ResultSet:
+    """
+    Filas de un SELECT: un encabezado con los nombres de columna compartido
+    por todas las filas, que son tuplas. Los dicts se arman recién al
+    serializar (to_dicts, json_chunks) o al recorrerlo, de a uno.
+    """
+
+    __slots__ = ("columns", "rows", "types")
+
+    def __init__(self, columns, rows, types=None):
+        """
+        types: tipo SQL de cada columna (None si no se conoce); solo lo usan
+        los formatos columnares
+        """
+        self.columns = list(columns)
+        self.rows = rows
+        self.types = list(types) if types is not None else [None] * len(self.columns)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        columns = self.columns
+        return (dict(zip(columns, row)) for row in self.rows)
+
+    def __getitem__(self, i):
+        return dict(zip(self.columns, self.rows[i]))
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSet):
+            return self.columns == other.columns and list(self.rows) == list(other.rows)
+        if isinstance(other, list):
+            return self.to_dicts() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ResultSet(columns={self.columns!r}, rows={len(self.rows)})"
+
+    def to_dicts(self):
+        return list(self)
+
+    def json_chunks(self, batch=1000):
+        """
+        El resultado como arreglo JSON de objetos, generado por tramos
+        de filas: nunca existe la lista entera de dicts en memoria.
+        """
+        # Las claves se codifican una sola vez
+        keys = [json.dumps(str(c)) + ": " for c in self.columns]
+        yield "["
+        for start in range(0, len(self.rows), batch):
+            parts = []
+            for row in self.rows[start:start + batch]:
+                fields = ", ".join(k + json.dumps(v) for k, v in zip(keys, row))
+                parts.append("{" + fields + "}")
+            yield ("" if start == 0 else ", ") + ", ".join(parts)
+        yield "]"
+
+    # ---------------------------
+    # Formatos columnares
+    # ---------------------------
+    def column_values(self):
+        """
+        Una lista de valores por columna (transpuesta de las filas).
+        """
+        if not self.rows:
+            return [[] for _ in self.columns]
+        return [list(values) for values in zip(*self.rows)]
+
+    def to_columnar(self):
+        """
+        Nombres y tipos una sola vez y los valores columna por columna.
+        """
+        return {
+            "columns": self.columns,
+            "types": self.types,
+            "rows": len(self.rows),
+            "data": self.column_values(),
+        }
+
+    def to_binary(self):
+        parts = [BINARY_HEADER.pack(BINARY_MAGIC, len(self.columns), len(self.rows))]
+        for name, ctype, values in zip(self.columns, self.types, self.column_values()):
+            kind, payload = _encode_column(ctype, values)
+            for text in (str(name), ctype or ""):
+                encoded = text.encode("utf-8")
+                parts.append(struct.pack("<H", len(encoded)) + encoded)
+            parts.append(kind + struct.pack("<I", len(payload)))
+            parts.append(payload)
+        return b"".join(parts)
+
+    @classmethod
+    def from_binary(cls, data):
+        """
+        Inverso de to_binary (para clientes en Python y pruebas).
+        """
+        magic, ncols, nrows = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC:
+            raise ValueError("No es un resultado binario")
+        pos = BINARY_HEADER.size
+        names, types, columns = [], [], []
+        for _ in range(ncols):
+            texts = []
+            for _ in range(2):
+                (length,) = struct.unpack_from("<H", data, pos)
+                texts.append(data[pos + 2:pos + 2 + length].decode("utf-8"))
+                pos += 2 + length
+            kind = data[pos:pos + 1]
+            (length,) = struct.unpack_from("<I", data, pos + 1)
+            payload = data[pos + 5:pos + 5 + length]
+            pos += 5 + length
+            names.append(texts[0])
+            types.append(texts[1] or None)
+            columns.append(_decode_column(kind, payload, nrows))
+        rows = list(zip(*columns)) if columns else [()] * nrows
+        return cls(names, rows, types)
+
+
+def _decode_column(kind, payload, n):
+    if kind == b"j":
+        return json.loads(payload)
+    if kind == b"s":
+        lengths = struct.unpack_from(f"<{n}I", payload)
+        values, pos = [], 4 * n
+        for length in lengths:
+            values.append(payload[pos:pos + length].decode("utf-8"))
+            pos += length
+        return values
+    if kind == b"p":
+        flat = struct.unpack(f"<{2 * n}f", payload)
+        return [[flat[i], flat[i + 1]] for i in range(0, 2 * n, 2)]
+    return list(struct.unpack(f"<{n}{kind.decode()}", payload))
+
+
+def _encode_column(ctype, values):
+    """
+    (clase, bytes) de una columna para to_binary.
+    """
+    ctype = (ctype or "").upper()
+    n = len(values)
+    if None not in values:
+        try:
+            if ctype in TYPE_FORMATS and ctype != "DATE":
+                code = TYPE_FORMATS[ctype]
+                return code.encode(), struct.pack(f"<{n}{code}", *values)
+            if ctype.startswith("VARCHAR") or ctype == "DATE":
+                encoded = [v.encode("utf-8") for v in values]
+                return b"s", struct.pack(f"<{n}I", *map(len, encoded)) + b"".join(encoded)
+            if ctype.startswith("ARRAY[FLOAT]"):
+                return b"p", struct.pack(f"<{2 * n}f", *(c for point in values for c in point[:2]))
+        except (struct.error, TypeError, AttributeError):
+            pass  # valores que no calzan con el tipo: van como JSON
+    return b"j", json.dumps(values).encode("utf-8")
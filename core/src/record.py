@@ -1,10 +1,118 @@
 # core/record.py
+import math
 import struct
-from datetime import datetime
+import operator
+from datetime import date, datetime
+from functools import lru_cache
+
+# Formato struct de cada tipo de tamaño fijo
+TYPE_FORMATS = {
+    "SMALLINT": "h",   # 2 bytes
+    "INT": "i",        # 4 bytes
+    "BIGINT": "q",     # 8 bytes
+    "FLOAT": "f",      # 4 bytes
+    "DOUBLE": "d",     # 8 bytes
+    "BOOLEAN": "?",    # 1 byte
+    "DATE": "i",       # días desde 1970-01-01
+}
+INTEGER_TYPES = {"SMALLINT", "INT", "BIGINT"}
+NUMERIC_TYPES = INTEGER_TYPES | {"FLOAT", "DOUBLE"}
+
+# Rango de cada entero: un literal fuera de rango no se puede comparar con la columna
+INTEGER_RANGES = {
+    "SMALLINT": (-2 ** 15, 2 ** 15 - 1),
+    "INT": (-2 ** 31, 2 ** 31 - 1),
+    "BIGINT": (-2 ** 63, 2 ** 63 - 1),
+}
+
+# Mayor FLOAT (32 bits) finito: más allá no se puede empacar
+FLOAT_MAX = struct.unpack("<f", b"\xff\xff\x7f\x7f")[0]
+
+# Una fecha se guarda como número de día; este valor marca la fecha nula ("")
+DATE_NULL = -2 ** 31
+EPOCH = date(1970, 1, 1).toordinal()
+
+TRUE_WORDS = {"true", "t", "1", "yes", "y", "si", "sí"}
+FALSE_WORDS = {"false", "f", "0", "no", "n"}
+
+
+def type_format(ctype):
+    """
+    Formato struct (nativo) con el que se guarda una columna del tipo dado.
+    """
+    ctype = ctype.upper()
+    if ctype in TYPE_FORMATS:
+        return TYPE_FORMATS[ctype]
+    if ctype.startswith("VARCHAR"):
+        n = int(ctype.split("[")[1].strip("]"))
+        return f"{n}s"
+    if ctype.startswith("ARRAY[FLOAT]"):
+        # Por simplicidad, asumimos tamaño fijo de 2 floats (ej. lat, lon)
+        return "ff"
+    raise ValueError(f"Tipo de dato no soportado: {ctype}")
+
+
+def date_to_days(value):
+    """
+    Fecha (date, datetime, 'AAAA-MM-DD' o 'DD-MM-AAAA') -> número de día.
+    Lanza ValueError si no es una fecha válida.
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    if not isinstance(value, date):
+        text = str(value).strip().replace("/", "-")[:10]
+        parts = text.split("-")
+        if len(parts) == 3 and len(parts[0]) <= 2:  # DD-MM-AAAA
+            text = f"{parts[2]}-{parts[1]}-{parts[0]}"
+        value = date.fromisoformat(text)
+    return value.toordinal() - EPOCH
+
+
+@lru_cache(maxsize=4096)
+def days_to_date(days):
+    """
+    Número de día -> 'AAAA-MM-DD' ("" para la fecha nula). Las filas con
+    la misma fecha comparten el mismo string.
+    """
+    if days == DATE_NULL:
+        return ""
+    return date.fromordinal(days + EPOCH).isoformat()
+
+
+def _integer(value):
+    # Entero exacto de un literal: '12', 12, '1e10' o 3.0; 2.5 no es entero
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    try:
+        return operator.index(value)
+    except TypeError:
+        number = float(value)
+    if not number.is_integer():
+        raise ValueError("no es un entero")
+    return int(number)
+
+
+def parse_bool(value):
+    if isinstance(value, str):
+        word = value.strip().lower()
+        if word in TRUE_WORDS:
+            return True
+        if word in FALSE_WORDS:
+            return False
+        raise ValueError(f"{value!r} no es un booleano")
+    return bool(value)
+
 
 class RecordSchema:
     """
     Maneja el esquema de una tabla y genera formato binario para registros.
+
+    Los tipos son de tamaño fijo: SMALLINT, INT, BIGINT, FLOAT (32 bits),
+    DOUBLE, BOOLEAN, VARCHAR[n], DATE y ARRAY[FLOAT]. Una fecha ocupa un
+    int32 (días desde 1970-01-01) y se lee como 'AAAA-MM-DD'.
     """
 
     def __init__(self, columns):
@@ -20,30 +128,86 @@ class RecordSchema:
         self.columns = columns
         self.format = self._build_format(columns)
         self.size = struct.calcsize(self.format)
+        self.types = {col["name"]: col["type"].upper() for col in columns}
+        self.offsets = self._build_offsets(columns)
+        self._decoders = {}
 
     def _build_format(self, columns):
-        fmt = ""
+        return "".join(type_format(col["type"]) for col in columns)
+
+    def _build_offsets(self, columns):
+        # Posición de cada columna en el registro (con el relleno de alineación nativo):
+        # tamaño hasta el campo incluido menos el tamaño del campo
+        offsets, prefix = {}, ""
         for col in columns:
+            code = type_format(col["type"])
+            first = code[-1] if code == "ff" else code
+            offsets[col["name"]] = struct.calcsize(prefix + first) - struct.calcsize(first)
+            prefix += code
+        return offsets
+
+    def decoder(self, names=None, as_tuple=False):
+        """
+        Función (buffer, pos=0) -> dict que decodifica solo las columnas
+        pedidas (todas si names es None), en el orden del esquema.
+        Con as_tuple devuelve una tupla en ese mismo orden (ver row_columns).
+
+        Se compila una vez por subconjunto: un único unpack_from que salta
+        los bytes de las demás columnas y las conversiones escritas en línea.
+        """
+        key = (None if names is None else frozenset(names), as_tuple)
+        decode = self._decoders.get(key)
+        if decode is None:
+            decode = self._decoders[key] = self._compile_decoder(key[0], as_tuple)
+        return decode
+
+    def row_columns(self, names=None):
+        """
+        Nombres de las columnas de una tupla decodificada, en orden.
+        """
+        return [c["name"] for c in self.columns if names is None or c["name"] in names]
+
+    def _compile_decoder(self, names, as_tuple=False):
+        fmt, fields, pos, i = "=", [], 0, 0
+        for col in self.columns:
+            name = col["name"]
+            if names is not None and name not in names:
+                continue
             ctype = col["type"].upper()
-            if ctype == "INT":
-                fmt += "i"   # 4 bytes
-            elif ctype == "FLOAT":
-                fmt += "f"   # 4 bytes
-            elif ctype.startswith("VARCHAR"):
-                n = int(ctype.split("[")[1].strip("]"))
-                fmt += f"{n}s"
+            code = type_format(ctype)
+            start = self.offsets[name]
+            if start > pos:
+                fmt += f"{start - pos}x"
+            fmt += code
+            pos = start + struct.calcsize("=" + code)
+            if ctype.startswith("VARCHAR"):
+                expr = f"v[{i}].decode().strip()"
             elif ctype == "DATE":
-                fmt += "10s"  # AAAA-MM-DD
+                expr = f"days_to_date(v[{i}])"
             elif ctype.startswith("ARRAY[FLOAT]"):
-                # Por simplicidad, asumimos tamaño fijo de 2 floats (ej. lat, lon)
-                fmt += "ff"
+                expr = f"[v[{i}], v[{i + 1}]]"
             else:
-                raise ValueError(f"Tipo de dato no soportado: {ctype}")
-        return fmt
+                expr = f"v[{i}]"
+            fields.append(expr if as_tuple else f"{name!r}: {expr}")
+            i += len(code) if code == "ff" else 1
+
+        body = f"({', '.join(fields)},)" if as_tuple and fields else \
+            "()" if as_tuple else f"{{{', '.join(fields)}}}"
+        source = (
+            "def decode(buffer, pos=0):\n"
+            "    v = unpack_from(buffer, pos)\n"
+            f"    return {body}\n"
+        )
+        scope = {"unpack_from": struct.Struct(fmt).unpack_from, "days_to_date": days_to_date}
+        exec(source, scope)
+        return scope["decode"]
 
     def pack(self, values):
         """
         Convierte una lista o dict de valores a bytes según el esquema.
+        Un valor vacío (None o "") se guarda como el nulo de su tipo; uno que
+        no es compatible con su columna lanza ValueError con la columna y el
+        valor (no se guarda un valor por defecto en su lugar).
         """
         if isinstance(values, dict):
             values = [values[col["name"]] for col in self.columns]
@@ -51,87 +215,97 @@ class RecordSchema:
         packed = []
         for col, val in zip(self.columns, values):
             ctype = col["type"].upper()
-            
+
             # Limpiar valor (quitar comillas si vienen del parser)
             if isinstance(val, str):
                 val = val.strip().strip("'\"")
-            
+            empty = val is None or val == ""
+
             try:
-                if ctype == "INT":
-                    packed.append(int(val) if val else 0)
-                    
-                elif ctype == "FLOAT":
-                    packed.append(float(val) if val else 0.0)
-                    
+                if ctype in INTEGER_TYPES:
+                    number = 0 if empty else _integer(val)
+                    low, high = INTEGER_RANGES[ctype]
+                    if not low <= number <= high:
+                        raise ValueError(f"fuera de rango para {ctype}")
+                    packed.append(number)
+
+                elif ctype in ("FLOAT", "DOUBLE"):
+                    number = 0.0 if empty else float(val)
+                    if ctype == "FLOAT" and abs(number) > FLOAT_MAX and math.isfinite(number):
+                        raise ValueError("fuera de rango para FLOAT")
+                    packed.append(number)
+
+                elif ctype == "BOOLEAN":
+                    packed.append(False if empty else parse_bool(val))
+
                 elif ctype.startswith("VARCHAR"):
                     n = int(ctype.split("[")[1].strip("]"))
-                    val_str = str(val) if val else ""
+                    val_str = "" if empty else str(val)
                     packed.append(val_str.encode('utf-8')[:n].ljust(n, b" "))
-                    
+
                 elif ctype == "DATE":
-                    # Manejar diferentes formatos de fecha
-                    if isinstance(val, datetime):
-                        val = val.strftime("%Y-%m-%d")
-                    elif val:
-                        # Convertir DD-MM-YYYY o similar a YYYY-MM-DD
-                        val_str = str(val)
-                        # Si viene en formato DD-MM-YYYY
-                        if "-" in val_str and len(val_str.split("-")) == 3:
-                            parts = val_str.split("-")
-                            if len(parts[0]) <= 2:  # DD-MM-YYYY
-                                val_str = f"{parts[2]}-{parts[1]}-{parts[0]}"
-                        val = val_str[:10]
-                    else:
-                        val = "0000-00-00"
-                        
-                    packed.append(val.encode('utf-8').ljust(10, b" "))
-                    
+                    packed.append(DATE_NULL if empty else date_to_days(val))
+
                 elif ctype.startswith("ARRAY[FLOAT]"):
                     # val debe ser lista/tupla de 2 floats
-                    if isinstance(val, (list, tuple)):
+                    if empty:
+                        packed.extend([0.0, 0.0])
+                    elif isinstance(val, (list, tuple)) and len(val) == 2:
                         packed.extend([float(val[0]), float(val[1])])
                     else:
-                        packed.extend([0.0, 0.0])
-                        
-            except Exception as e:
-                print(f"Error empaquetando columna {col['name']} con valor '{val}': {e}")
-                # Valores por defecto en caso de error
-                if ctype == "INT":
-                    packed.append(0)
-                elif ctype == "FLOAT":
-                    packed.append(0.0)
-                elif ctype.startswith("VARCHAR"):
-                    n = int(ctype.split("[")[1].strip("]"))
-                    packed.append(b" " * n)
-                elif ctype == "DATE":
-                    packed.append(b"0000-00-00")
-                elif ctype.startswith("ARRAY[FLOAT]"):
-                    packed.extend([0.0, 0.0])
-        
+                        raise ValueError("se esperaba un punto [x, y]")
+
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"Valor {val!r} no es compatible con {col['name']} ({ctype}): {e}") from None
+
         return struct.pack(self.format, *packed)
 
     def unpack(self, binary):
         """
         Convierte bytes a un dict con nombres de columna y valores.
         """
-        unpacked = struct.unpack(self.format, binary)
-        record = {}
-        i = 0
-        for col in self.columns:
-            ctype = col["type"].upper()
-            if ctype == "INT":
-                record[col["name"]] = unpacked[i]
-                i += 1
+        if len(binary) != self.size:
+            raise struct.error(f"se esperaban {self.size} bytes, llegaron {len(binary)}")
+        return self.decoder()(binary)
+
+    def coerce(self, name, value):
+        """
+        Convierte un literal (ej. del WHERE) a la representación con la que
+        se lee la columna desde disco, para comparar sin sorpresas.
+        Lanza ValueError si el valor no es compatible con el tipo.
+        """
+        if name not in self.types:
+            raise ValueError(f"Columna desconocida: {name}")
+        ctype = self.types[name]
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.strip().strip("'\"")
+
+        try:
+            if ctype in INTEGER_TYPES:
+                number = float(value)
+                low, high = INTEGER_RANGES[ctype]
+                if number != int(number) or not low <= number <= high:
+                    raise ValueError
+                return int(number)
             elif ctype == "FLOAT":
-                record[col["name"]] = unpacked[i]
-                i += 1
+                # Redondeo a float32, igual que al empacar
+                return struct.unpack("f", struct.pack("f", float(value)))[0]
+            elif ctype == "DOUBLE":
+                return float(value)
+            elif ctype == "BOOLEAN":
+                return parse_bool(value)
             elif ctype.startswith("VARCHAR"):
-                record[col["name"]] = unpacked[i].decode().strip()
-                i += 1
+                n = int(ctype.split("[")[1].strip("]"))
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                return str(value).encode("utf-8")[:n].decode("utf-8", errors="ignore").strip()
             elif ctype == "DATE":
-                record[col["name"]] = unpacked[i].decode().strip()
-                i += 1
+                # '' es la fecha nula, igual que al leerla
+                return days_to_date(date_to_days(value)) if value != "" else ""
             elif ctype.startswith("ARRAY[FLOAT]"):
-                record[col["name"]] = [unpacked[i], unpacked[i+1]]
-                i += 2
-        return record
+                return [float(value[0]), float(value[1])]
+        except (TypeError, ValueError, IndexError, OverflowError):
+            pass
+        raise ValueError(f"Valor {value!r} no es compatible con {name} ({ctype})")
@@ -1,173 +1,1583 @@
 # core/schema_manager.py
 import os
+import re
 import json
+import heapq
+import logging
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
 from src.record import RecordSchema
 from src.dbms.file_manager import FileManager
-from src.dbms.sequential import SequentialFile
+from src.dbms.bulk_loader import LoadCancelled, load_csv
+from src.dbms.external_sort import external_sort
+from src.dbms.wal import WriteAheadLog, REPLACE
+from src.dbms.mvcc import TransactionManager
+from src.dbms.locks import FileLock, TableLock
+from src.dbms.statistics import TableStats
+from src.dbms.sequential import SequentialIndex
 from src.dbms.isam import ISAMIndex
 from src.dbms.extendible_hash import ExtendibleHash
 from src.dbms.bplustree import BPlusTree
 from src.dbms.rtree import RTree
+from src.dbms.fulltext import FullTextIndex
+from src.dbms.lsm import LSMIndex, run_files
+from src.dbms.partition import Partitioning, partition_table, SEPARATOR
+from src.dbms.sampling import TableSample
+from src.dbms.sketch import BlockSketches, sketch_path
+from src.dbms import vectorized
+from src.parser.condition import compile_condition, columns_of
+from src.parser.aggregate import make_aggregators, aggregate_rows, group_rows, APPROXIMATE
+from src.parser.matview import ViewDefinition, PendingDeltas, DROP
+from src.parser.result import ResultSet
+from src.parser.planner import Planner, COVERING_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Tipos de índice que se pueden pedir en CREATE TABLE
+INDEX_TYPES = {
+    "sequential": SequentialIndex,
+    "isam": ISAMIndex,
+    "hash": ExtendibleHash,
+    "btree": BPlusTree,
+    "rtree": RTree,
+    "fulltext": FullTextIndex,
+    "lsm": LSMIndex,
+}
+
+# Archivos de una tabla además de los índices (<tabla><extensión>)
+TABLE_EXTENSIONS = (".dat", ".zmap", ".ver", ".lock")
+
+# Archivos que puede dejar cada estructura (<base><extensión>)
+INDEX_EXTENSIONS = (".bpt", ".isam", ".isx", ".hash", ".hdir", ".bloom",
+                    ".seq", ".aux", ".seq.bloom", ".aux.bloom", ".rtr",
+                    ".ftm", ".ftt", ".fta", ".ftb", ".lsm", ".lsl")
+
+# Índices que arman su propio orden al construirse (create_index no ordena las entradas)
+UNSORTED_BULK = {"fulltext"}
+
+# Cada cuántas inserciones sueltas se guardan las estadísticas en el catálogo
+STATS_SAVE_EVERY = 100
+
+# Definiciones de tabla: <data_dir>/catalog/<tabla>.json; catalog.json solo las lista
+CATALOG_DIR = "catalog"
+CATALOG_VERSION = 2
+
+# Formato de los registros: 1 = DATE como texto de 10 bytes y offsets INT en
+# los índices secuenciales; 2 = DATE como número de día y offsets BIGINT
+RECORD_LAYOUT = 2
 
 
 class SchemaManager:
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
         os.makedirs(data_dir, exist_ok=True)
+        # catalog.json solo lista las tablas; la definición de cada una está en catalog/<tabla>.json
         self.catalog_path = os.path.join(self.data_dir, "catalog.json")
-        self.tables = {}  # {table_name: {"schema": RecordSchema, "file": FileManager, "indexes": {col: idx}}}
+        self.catalog_dir = os.path.join(self.data_dir, CATALOG_DIR)
+        os.makedirs(self.catalog_dir, exist_ok=True)
+        # Tablas abiertas (se abren en el primer acceso, ver get_table):
+        # {table_name: {"name", "schema", "file", "indexes": {col: idx abierto}, "index_types": {col: tipo},
+        #               "index_include": {col: [columnas INCLUDE]}, "stats": TableStats, "lock": RLock,
+        #               "unsaved": inserciones cuyas estadísticas aún no están en el catálogo,
+        #               "partitioning": Partitioning o None,
+        #               "view": ViewDefinition si es una vista materializada, "views": vistas que dependen de ella}}
+        self.tables = {}
+        self.table_names = []  # todas las tablas del catálogo, abiertas o no
+        self.planner = Planner(self)
+        self._open_lock = threading.Lock()
+        # Varios procesos (workers) pueden compartir data_dir: el catálogo se
+        # escribe con este lock y cada tabla tiene el suyo (<tabla>.lock)
+        self._catalog_lock = FileLock(os.path.join(self.data_dir, "catalog.lock"))
+        self._catalog_key = None
+
+        # Redo de lo que quedó en el log antes de leer catálogo y tablas
+        self.wal = WriteAheadLog(os.path.join(self.data_dir, "wal.log"), base_dir=self.data_dir)
+        recovered = self.wal.recover()
+        if recovered:
+            logger.info("WAL: %d registros reaplicados", recovered)
+        # Cada escritura es una transacción; cada lectura, un snapshot (MVCC)
+        self.transactions = TransactionManager(os.path.join(self.data_dir, "xact.clog"), wal=self.wal)
 
-        # Restaurar catálogo si existe
+        # Restaurar catálogo si existe (solo los nombres; nada se abre todavía)
         if os.path.exists(self.catalog_path):
             self._load_catalog()
 
     # ---------------------------
     # Persistencia del catálogo
     # ---------------------------
-    def _save_catalog(self):
-        catalog = {}
-        for tname, tinfo in self.tables.items():
-            catalog[tname] = {
-                "columns": tinfo["schema"].columns,
-                "indexes": list(tinfo["indexes"].keys()),
-            }
-        with open(self.catalog_path, "w", encoding="utf-8") as f:
-            json.dump(catalog, f, indent=2)
+    def _table_meta_path(self, table_name):
+        return os.path.join(self.catalog_dir, f"{table_name}.json")
 
-    def _load_catalog(self):
+    def _table_meta(self, table):
+        return {
+            "columns": table["schema"].columns,
+            "layout": table["layout"],
+            "indexes": {col: self._index_meta(table, col) for col in table["index_types"]},
+            "stats": table["stats"].to_dict(),
+            "stamp": table["stamp"],
+            **({"partitioning": table["partitioning"].to_dict()} if table["partitioning"] else {}),
+            **({"view": table["view"].to_dict()} if table["view"] else {}),
+            **({"views": table["views"]} if table["views"] else {}),
+        }
+
+    def _manifest(self, stamp, stamps):
+        return json.dumps({"version": CATALOG_VERSION, "stamp": stamp, "tables": self.table_names,
+                           "stamps": stamps}, indent=2).encode("utf-8")
+
+    def _read_manifest(self):
+        if not os.path.exists(self.catalog_path):
+            return {"version": CATALOG_VERSION, "tables": []}
         with open(self.catalog_path, "r", encoding="utf-8") as f:
-            catalog = json.load(f)
-
-        for tname, meta in catalog.items():
-            schema = RecordSchema(meta["columns"])
-            filepath = os.path.join(self.data_dir, f"{tname}.dat")
-            file_manager = FileManager(filepath, schema)
-
-            indexes = {}
-            for col in meta.get("indexes", []):
-                # Si quieres más detalle de qué tipo de índice era, debes guardarlo en JSON
-                indexes[col] = SequentialFile(tname, col)
-
-            self.tables[tname] = {
-                "schema": schema,
-                "file": file_manager,
-                "indexes": indexes,
-            }
+            return json.load(f)
+
+    def _save_catalog(self, *table_names, dropped=()):
+        """
+        Reescribe solo la definición de las tablas indicadas y la lista de
+        tablas. Todo va en un commit del WAL: nunca queda a medias.
+        dropped: tablas que salen de la lista (sus archivos se borran aparte)
+
+        Con el lock del catálogo (lo comparten todos los procesos): se parte
+        de la lista que está en disco, así no se pisan las tablas que creó
+        otro worker, y cada guardado sube el stamp del catálogo y el de las
+        tablas que toca. Los demás procesos recargan solo esas (_sync_catalog).
+        """
+        with self._catalog_lock.exclusive():
+            catalog = self._read_manifest()
+            stamp = catalog.get("stamp", 0) + 1
+            stamps = catalog.get("stamps", {})
+            for name in dropped:
+                stamps.pop(name, None)
+            names = [name for name in catalog.get("tables", []) if name not in dropped]
+            with self._open_lock:
+                # Solo se agregan las que se guardan: una que otro worker borró no vuelve
+                names += [name for name in self.table_names if name not in names and name in table_names]
+                self.table_names = names
+
+            ops = []
+            for name in table_names:
+                table = self.tables[name]
+                table["stamp"] = stamps[name] = stamp
+                data = json.dumps(self._table_meta(table), indent=2).encode("utf-8")
+                ops.append((REPLACE, self._table_meta_path(name), 0, data))
+                table["unsaved"] = 0
+            ops.append((REPLACE, self.catalog_path, 0, self._manifest(stamp, stamps)))
+            self.wal.apply(ops)
+
+    def _index_meta(self, table, col):
+        meta = {"type": table["index_types"][col]}
+        if table["index_include"].get(col):
+            meta["include"] = table["index_include"][col]
+        return meta
+
+    def _load_catalog(self):
+        with self._catalog_lock.exclusive():
+            catalog = self._read_manifest()
+            if catalog.get("version") != CATALOG_VERSION:
+                # Catálogo viejo con todas las tablas en un archivo: se separa una vez
+                self.table_names = list(catalog)
+                ops = [(REPLACE, self._table_meta_path(name), 0, json.dumps(meta, indent=2).encode("utf-8"))
+                       for name, meta in catalog.items()]
+                ops.append((REPLACE, self.catalog_path, 0, self._manifest(0, {})))
+                self.wal.apply(ops)
+                logger.info("Catálogo migrado a un archivo por tabla (%d tablas)", len(self.table_names))
+            else:
+                self.table_names = list(catalog["tables"])
+            self._catalog_key = self._catalog_stat()
+
+        logger.info("Catálogo con %d tablas (se abren al usarlas)", len(self.table_names))
+
+    def _catalog_stat(self):
+        # REPLACE cambia el inodo: alcanza con stat para saber si alguien lo reescribió
+        try:
+            st = os.stat(self.catalog_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
 
-        print(f"[DEBUG] Catálogo restaurado con {len(self.tables)} tablas")
+    def _sync_catalog(self):
+        """
+        Trae los cambios de catálogo de otros procesos: la lista de tablas y,
+        de las abiertas, solo las que tienen otro stamp. Sin cambios cuesta un stat.
+        """
+        key = self._catalog_stat()
+        if key == self._catalog_key:
+            return
+        with self._catalog_lock.exclusive():
+            key = self._catalog_stat()
+            catalog = self._read_manifest()
+        stamps = catalog.get("stamps", {})
+        with self._open_lock:
+            self.table_names = list(catalog.get("tables", []))
+            # Borradas por otro proceso (DROP PARTITION): ya se habían guardado y no están
+            for name in [name for name, table in self.tables.items()
+                         if table["stamp"] and name not in self.table_names]:
+                del self.tables[name]
+            stale = [table for name, table in self.tables.items() if stamps.get(name, table["stamp"]) != table["stamp"]]
+        for table in stale:
+            with table["lock"]:
+                self._refresh_table(table)
+        self._catalog_key = key
+
+    def _refresh_table(self, table):
+        """
+        Otro proceso cambió la tabla (con su lock tomado). Si cambió su
+        definición se relee del catálogo; si no, solo se descarta lo que
+        hay en memoria de sus archivos (fin del .dat, mapa de zonas, páginas
+        de índices) y se conservan las estadísticas locales.
+        """
+        name = table["name"]
+        if not os.path.exists(self._table_meta_path(name)):
+            return
+        with open(self._table_meta_path(name), "r", encoding="utf-8") as f:
+            stamp = json.load(f).get("stamp", 0)
+        if stamp != table["stamp"]:
+            table.update(self._open_table(name, table["lock"]))
+            logger.debug("Tabla %s recargada del catálogo (stamp %d)", name, stamp)
+        elif table["file"] is not None:
+            table["file"] = FileManager(table["file"].filename, table["schema"], wal=self.wal)
+            table["indexes"] = {}
 
     # ---------------------------
-    # Crear tabla
+    # Apertura perezosa
     # ---------------------------
-    def create_table(self, table_name, columns, index_map=None):
+    def has_table(self, table_name):
+        self._sync_catalog()
+        return table_name in self.tables or table_name in self.table_names
+
+    def get_table(self, table_name):
+        """
+        Devuelve la tabla abierta; la primera vez lee su definición del
+        catálogo y abre el .dat. Los índices se abren aparte (get_index).
+        """
+        self._sync_catalog()
+        table = self.tables.get(table_name)
+        if table is not None:
+            return table
+        with self._open_lock:
+            if table_name not in self.tables:
+                if table_name not in self.table_names:
+                    raise ValueError(f"No existe la tabla {table_name}")
+                self.tables[table_name] = self._open_table(table_name)
+                logger.debug("Tabla %s abierta", table_name)
+        return self.tables[table_name]
+
+    def _open_table(self, table_name, lock=None):
+        """
+        lock: el de la tabla ya abierta, si se está recargando
+        """
+        with open(self._table_meta_path(table_name), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        layout = meta.get("layout", 1)
+        columns = meta["columns"]
+        if layout < 2:
+            # Tablas viejas: sus fechas ya están escritas como texto y se siguen
+            # leyendo así (las comparaciones entre 'AAAA-MM-DD' dan el mismo orden)
+            columns = [dict(c, type="VARCHAR[10]") if c["type"].upper() == "DATE" else c for c in columns]
         schema = RecordSchema(columns)
+        index_meta = meta.get("indexes", {})
+        if isinstance(index_meta, list):
+            # Catálogos viejos solo guardaban la columna
+            index_meta = {col: {"type": "sequential"} for col in index_meta}
+
+        return self._new_table(
+            table_name, schema,
+            {col: info["type"] for col, info in index_meta.items()},
+            {col: info["include"] for col, info in index_meta.items() if info.get("include")},
+            TableStats.from_dict(schema, meta.get("stats")),
+            layout, meta.get("stamp", 0), lock,
+            Partitioning.from_dict(meta["partitioning"], schema) if meta.get("partitioning") else None,
+            ViewDefinition.from_dict(meta["view"]) if meta.get("view") else None,
+            meta.get("views"),
+        )
+
+    def _new_table(self, table_name, schema, index_types, index_include, stats, layout=RECORD_LAYOUT,
+                   stamp=0, lock=None, partitioning=None, view=None, views=None):
+        """
+        partitioning: si la tabla está particionada no tiene .dat propio; sus
+        filas están en las tablas de cada partición (ver partition_table)
+        view: ViewDefinition si la tabla guarda una vista materializada
+        views: nombres de las vistas materializadas que salen de esta tabla
+        """
         filepath = os.path.join(self.data_dir, f"{table_name}.dat")
-        file_manager = FileManager(filepath, schema)
-
-        indexes = {}
-        if index_map:
-            for col, idx_type in index_map.items():
-                if idx_type == "sequential":
-                    indexes[col] = SequentialFile(table_name, col)
-                elif idx_type == "isam":
-                    indexes[col] = ISAMIndex(table_name, col)
-                elif idx_type == "hash":
-                    indexes[col] = ExtendibleHash(table_name, col)
-                elif idx_type == "btree":
-                    indexes[col] = BPlusTree(table_name, col)
-                elif idx_type == "rtree":
-                    indexes[col] = RTree(table_name, col)
-
-        self.tables[table_name] = {
+        # El lock va antes que el .dat: lo que otro proceso escriba después de abrirlo se detecta
+        lock = lock or TableLock(os.path.join(self.data_dir, f"{table_name}.lock"))
+        table = {
+            "name": table_name,
             "schema": schema,
-            "file": file_manager,
-            "indexes": indexes,
+            "file": None if partitioning else FileManager(filepath, schema, wal=self.wal),
+            "partitioning": partitioning,
+            "indexes": {},
+            "index_types": index_types,
+            "index_include": index_include,
+            "stats": stats,
+            "layout": layout,
+            "lock": lock,
+            "unsaved": 0,
+            "stamp": stamp,  # stamp del catálogo con el que se guardó su definición
+            "view": view,
+            "views": list(views or []),
+            "sketches": {},  # columna -> BlockSketches, abiertos en su primer uso
         }
+        if lock.on_stale is None:
+            lock.on_stale = lambda: self._refresh_table(table)
+        return table
+
+    def get_index(self, table, col):
+        """
+        Índice de la columna, abierto en su primer uso (solo lee la cabecera).
+        """
+        index = table["indexes"].get(col)
+        if index is None:
+            with table["lock"]:
+                index = table["indexes"].get(col)
+                if index is None:
+                    index = self._open_index(table["name"], col, table["index_types"][col],
+                                             table["schema"], table["index_include"].get(col),
+                                             table["layout"], table["lock"])
+                    table["indexes"][col] = index
+        return index
+
+    def _indexes(self, table):
+        """
+        Todos los índices de la tabla {col: índice} (las escrituras los necesitan todos).
+        """
+        return {col: self.get_index(table, col) for col in table["index_types"]}
+
+    def _open_index(self, table_name, col, idx_type, schema, include=None, layout=RECORD_LAYOUT, lock=None):
+        if idx_type not in INDEX_TYPES:
+            raise ValueError(f"Tipo de índice no soportado: {idx_type}")
+        if col not in schema.types:
+            raise ValueError(f"No existe la columna {col} para indexar")
+        base = self._index_base(table_name, col)
+        if include:
+            return INDEX_TYPES[idx_type](base, schema.types[col], wal=self.wal,
+                                         include=[(c, schema.types[c]) for c in include])
+        if idx_type == "sequential" and layout < 2:
+            return SequentialIndex(base, schema.types[col], wal=self.wal, offset_type="INT")
+        if idx_type == "lsm":
+            # Con el lock de la tabla compacta en segundo plano
+            return LSMIndex(base, schema.types[col], wal=self.wal, lock=lock)
+        return INDEX_TYPES[idx_type](base, schema.types[col], wal=self.wal)
+
+    def _index_base(self, table_name, col):
+        # Ruta base de los archivos del índice; cada estructura agrega sus extensiones
+        return os.path.join(self.data_dir, f"{table_name}_{re.sub(r'[^A-Za-z0-9_]', '_', col)}")
+
+    def _resolve_include(self, col, idx_type, include, schema):
+        """
+        Valida las columnas INCLUDE de un índice y las lleva a su nombre en el esquema.
+        """
+        if not include:
+            return []
+        if idx_type not in COVERING_INDEXES:
+            raise ValueError(f"El índice {idx_type} no soporta INCLUDE")
+        lowered = {c.lower(): c for c in schema.types}
+        resolved = []
+        for name in include:
+            column = name if name in schema.types else lowered.get(name.lower())
+            if column is None:
+                raise ValueError(f"No existe la columna {name} para INCLUDE")
+            # La clave ya está en la entrada
+            if column != col and column not in resolved:
+                resolved.append(column)
+        return resolved
+
+    def checkpoint(self):
+        """
+        Sincroniza a disco los archivos modificados y vacía el WAL.
+        """
+        unsaved = [name for name, table in list(self.tables.items()) if table["unsaved"]]
+        if unsaved:
+            self._save_catalog(*unsaved)
+        self.wal.checkpoint()
+
+    # ---------------------------
+    # Crear tabla
+    # ---------------------------
+    def create_table(self, table_name, columns, index_map=None, include_map=None, partition=None):
+        """
+        index_map: {columna: tipo de índice}
+        include_map: {columna: [columnas INCLUDE]} para índices cubrientes
+        partition: {"kind": "range", "column", "partitions": [(nombre, límite o None)]}
+                   o {"kind": "hash", "column", "count"}; cada partición tiene
+                   su propio .dat y los mismos índices
+        """
+        schema = RecordSchema(columns)
+        partitioning = self._partitioning(schema, partition) if partition else None
+        index_types = {col: idx_type.lower() for col, idx_type in (index_map or {}).items()}
+        index_include = {}
+        for col, include in (include_map or {}).items():
+            include = self._resolve_include(col, index_types.get(col), include, schema)
+            if include:
+                index_include[col] = include
+        for col, itype in index_types.items():
+            if itype not in INDEX_TYPES:
+                raise ValueError(f"Tipo de índice no soportado: {itype}")
+            if col not in schema.types:
+                raise ValueError(f"No existe la columna {col} para indexar")
+            if itype == "fulltext" and not schema.types[col].startswith("VARCHAR"):
+                raise ValueError("El índice fulltext es solo para columnas VARCHAR")
 
-        self._save_catalog()
+        with self._open_lock:
+            # Si ya estaba abierta se sigue usando su lock (un solo descriptor por proceso)
+            previous = self.tables.get(table_name)
+            table = self._new_table(table_name, schema, index_types, index_include, TableStats(schema),
+                                    lock=previous["lock"] if previous else None, partitioning=partitioning)
+            self.tables[table_name] = table
+            if table_name not in self.table_names:
+                self.table_names.append(table_name)
+            parts = self._new_partitions(table, partitioning.names) if partitioning else []
+        self._save_catalog(table_name, *parts)
+        if partitioning:
+            return f"Tabla {table_name} creada con {len(columns)} columnas y {len(parts)} particiones"
         return f"Tabla {table_name} creada con {len(columns)} columnas"
 
+    # ---------------------------
+    # Índices sobre tablas existentes
+    # ---------------------------
+    def create_index(self, table_name, column, idx_type, include=None):
+        """
+        Crea un índice sobre una tabla que ya tiene datos: un recorrido del
+        .dat saca las entradas (clave, offset[, incluidas]), se ordenan con
+        un ordenamiento externo y la estructura se construye de abajo hacia
+        arriba (bulk_load) en vez de insertar fila por fila.
+        """
+        table = self.get_table(table_name)
+        self._check_writable(table)
+        schema = table["schema"]
+        idx_type = idx_type.lower()
+        if idx_type not in INDEX_TYPES:
+            raise ValueError(f"Tipo de índice no soportado: {idx_type}")
+        lowered = {c.lower(): c for c in schema.types}
+        col = column if column in schema.types else lowered.get(column.lower())
+        if col is None:
+            raise ValueError(f"No existe la columna {column} para indexar")
+        if (idx_type == "rtree") != schema.types[col].startswith("ARRAY"):
+            raise ValueError("El índice rtree es solo para columnas ARRAY[FLOAT] (y estas solo admiten rtree)")
+        if idx_type == "fulltext" and not schema.types[col].startswith("VARCHAR"):
+            raise ValueError("El índice fulltext es solo para columnas VARCHAR")
+        include = self._resolve_include(col, idx_type, include, schema)
+        if table["partitioning"]:
+            return self._create_partitioned_index(table, col, idx_type, include)
+
+        with table["lock"]:
+            if col in table["index_types"]:
+                raise ValueError(f"{table_name}.{col} ya tiene un índice {table['index_types'][col]}")
+            # Restos de un índice anterior de la columna (borrado o construcción interrumpida)
+            self._remove_index_files(table_name, col)
+            index = self._open_index(table_name, col, idx_type, schema, include, table["layout"], table["lock"])
+            if idx_type in UNSORTED_BULK:
+                index.bulk_load(self._index_entries(table, col, include))
+                count = len(index)
+            else:
+                count, entries = external_sort(self._index_entries(table, col, include), tmp_dir=self.data_dir)
+                index.bulk_load(entries, count)
+            index.flush()
+
+            table["indexes"][col] = index
+            table["index_types"][col] = idx_type
+            if include:
+                table["index_include"][col] = include
+            # Con el lock tomado: otro proceso que escriba después ya ve el índice
+            self._save_catalog(table_name)
+            table["lock"].modified()
+        return f"Índice {idx_type} creado en {table_name}({col}) con {count} entradas"
+
+    def drop_index(self, table_name, column):
+        table = self.get_table(table_name)
+        lowered = {c.lower(): c for c in table["index_types"]}
+        col = column if column in table["index_types"] else lowered.get(column.lower())
+        if col is None:
+            raise ValueError(f"{table_name}.{column} no tiene índice")
+
+        with table["lock"]:
+            idx_type = table["index_types"].pop(col)
+            table["indexes"].pop(col, None)
+            table["index_include"].pop(col, None)
+            if table["partitioning"]:
+                # La tabla particionada solo guarda la definición: los archivos son de cada partición
+                for name in self._partition_names(table):
+                    self.drop_index(name, col)
+                self._save_catalog(table_name)
+                table["lock"].modified()
+                return f"Índice {idx_type} eliminado de {table_name}({col})"
+            self._save_catalog(table_name)
+            table["lock"].modified()
+            # El log puede tener escrituras pendientes sobre los archivos: se vacía antes de borrarlos
+            self.wal.checkpoint()
+            self._remove_index_files(table_name, col)
+        return f"Índice {idx_type} eliminado de {table_name}({col})"
+
+    def _index_entries(self, table, col, include):
+        """
+        (clave, offset[, incluidas]) de cada registro vivo, decodificando solo esas columnas.
+        """
+        header = table["schema"].row_columns([col] + include)
+        key_at = header.index(col)
+        value_at = [header.index(c) for c in include]
+        for offset, row in table["file"].scan_with_offsets(columns=[col] + include, as_tuple=True):
+            key = row[key_at]
+            if key is None:
+                continue
+            if value_at:
+                yield key, offset, tuple(row[i] for i in value_at)
+            else:
+                yield key, offset
+
+    def _create_partitioned_index(self, table, col, idx_type, include):
+        """
+        El índice se construye en cada partición; la tabla particionada lo
+        anota para las particiones que se agreguen después.
+        """
+        with table["lock"]:
+            if col in table["index_types"]:
+                raise ValueError(f"{table['name']}.{col} ya tiene un índice {table['index_types'][col]}")
+            names = self._partition_names(table)
+            for name in names:
+                self.create_index(name, col, idx_type, include)
+            table["index_types"][col] = idx_type
+            if include:
+                table["index_include"][col] = include
+            self._save_catalog(table["name"])
+            table["lock"].modified()
+        return f"Índice {idx_type} creado en {table['name']}({col}) en {len(names)} particiones"
+
+    def _remove_index_files(self, table_name, col):
+        # Solo extensiones de índice: <tabla>_<col>.dat puede ser otra tabla
+        base = self._index_base(table_name, col)
+        for ext in INDEX_EXTENSIONS:
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
+        # Runs de un índice LSM (<base>.<id>.lsr y su filtro)
+        for path in run_files(base):
+            os.remove(path)
+
+    # ---------------------------
+    # Particiones
+    # ---------------------------
+    def _partitioning(self, schema, spec):
+        """
+        Partitioning a partir de lo que arma el parser, con los límites
+        convertidos al tipo de la columna.
+        """
+        lowered = {c.lower(): c for c in schema.types}
+        col = spec["column"] if spec["column"] in schema.types else lowered.get(spec["column"].lower())
+        if col is None:
+            raise ValueError(f"No existe la columna {spec['column']} para particionar")
+        ctype = schema.types[col]
+        if ctype.startswith("ARRAY"):
+            raise ValueError("No se puede particionar por una columna ARRAY")
+        if spec["kind"] == "hash":
+            return Partitioning.hash(col, ctype, spec["count"])
+        names = [name for name, _ in spec["partitions"]]
+        bounds = [None if bound is None else schema.coerce(col, bound) for _, bound in spec["partitions"]]
+        return Partitioning(spec["kind"], col, ctype, names, bounds)
+
+    def _partition_names(self, table):
+        # Nombres internos de las tablas de las particiones, en orden
+        return [partition_table(table["name"], name) for name in table["partitioning"].names]
+
+    def _partition_tables(self, table):
+        """
+        Las tablas que guardan las filas: las particiones o la tabla misma.
+        """
+        if table["partitioning"] is None:
+            return [table]
+        return [self.get_table(name) for name in self._partition_names(table)]
+
+    def _new_partitions(self, table, names):
+        """
+        Crea (con _open_lock tomado) las tablas de las particiones, con el
+        esquema y los índices de la tabla. Devuelve sus nombres internos.
+        """
+        created = []
+        for name in names:
+            child = partition_table(table["name"], name)
+            previous = self.tables.get(child)
+            self.tables[child] = self._new_table(
+                child, table["schema"], dict(table["index_types"]),
+                {col: list(include) for col, include in table["index_include"].items()},
+                TableStats(table["schema"]), lock=previous["lock"] if previous else None,
+            )
+            if child not in self.table_names:
+                self.table_names.append(child)
+            created.append(child)
+        return created
+
+    def add_partition(self, table_name, name, bound=None):
+        """
+        Nueva partición RANGE por encima de la última (bound None = MAXVALUE).
+        """
+        table = self.get_table(table_name)
+        partitioning = table["partitioning"]
+        if partitioning is None:
+            raise ValueError(f"La tabla {table_name} no está particionada")
+        with table["lock"]:
+            if bound is not None:
+                bound = table["schema"].coerce(partitioning.column, bound)
+            partitioning.add(name, bound)
+            with self._open_lock:
+                created = self._new_partitions(table, [name])
+            self._save_catalog(table_name, *created)
+            table["lock"].modified()
+        return f"Partición {name} agregada a {table_name}"
+
+    def drop_partition(self, table_name, name):
+        """
+        Borra una partición RANGE con todas sus filas: se quitan sus archivos
+        (.dat, índices...), sin recorrer ni borrar fila por fila.
+        """
+        table = self.get_table(table_name)
+        partitioning = table["partitioning"]
+        if partitioning is None:
+            raise ValueError(f"La tabla {table_name} no está particionada")
+        with table["lock"]:
+            partitioning.remove(name)
+            child = partition_table(table_name, name)
+            part = self.get_table(child)
+            with part["lock"]:
+                with self._open_lock:
+                    self.tables.pop(child, None)
+                self._save_catalog(table_name, dropped=(child,))
+                part["lock"].modified()
+                # El log puede tener escrituras pendientes sobre los archivos: se vacía antes de borrarlos
+                self.wal.checkpoint()
+                self._remove_table_files(child, part["index_types"])
+            table["lock"].modified()
+        # Las filas se fueron sin pasar por delete: las vistas se recalculan (fuera del lock de la tabla)
+        for view_name in list(table["views"]):
+            self._refresh_view(self.get_table(view_name))
+        return f"Partición {name} eliminada de {table_name} ({part['stats'].row_count} filas)"
+
+    def _remove_table_files(self, table_name, index_types):
+        for ext in TABLE_EXTENSIONS:
+            path = os.path.join(self.data_dir, table_name + ext)
+            if os.path.exists(path):
+                os.remove(path)
+        for col in index_types:
+            self._remove_index_files(table_name, col)
+        for name in os.listdir(self.data_dir):
+            if re.fullmatch(re.escape(table_name) + r"\.c\d+\.skt", name):
+                os.remove(os.path.join(self.data_dir, name))
+        if os.path.exists(self._table_meta_path(table_name)):
+            os.remove(self._table_meta_path(table_name))
+
+    def _route_batch(self, table, data):
+        """
+        Reparte un bloque empacado entre las particiones según el valor de
+        la columna tal como quedó empacado: {tabla de la partición: bytes}.
+        """
+        partitioning, schema = table["partitioning"], table["schema"]
+        decode = schema.decoder([partitioning.column], as_tuple=True)
+        size = schema.size
+        groups = {}
+        for pos in range(0, len(data), size):
+            name = partitioning.route(decode(data, pos)[0])
+            groups.setdefault(name, []).append(data[pos:pos + size])
+        return {partition_table(table["name"], name): b"".join(chunks) for name, chunks in groups.items()}
+
+    def _append_partitions(self, groups, txid):
+        # Cada bloque a su partición, con el lock de esa partición
+        for name, data in groups.items():
+            part = self.get_table(name)
+            with part["lock"]:
+                self._append_batch(part, data, txid=txid)
+            part["unsaved"] += len(data) // part["schema"].size
+
+    def _insert_partitioned(self, table, data):
+        """
+        Inserta un bloque en una tabla particionada. Si toca varias
+        particiones son varios commits del WAL: la transacción es durable.
+        """
+        with table["lock"]:
+            groups = self._route_batch(table, data)
+            with self.transactions.transaction(durable=len(groups) > 1) as txid:
+                self._append_partitions(groups, txid)
+        return list(groups)
+
+    def _save_partitions(self, table, every=1):
+        # Guarda las estadísticas de las particiones con al menos `every` filas sin guardar
+        names = [name for name in self._partition_names(table)
+                 if name in self.tables and self.tables[name]["unsaved"] >= every]
+        if names:
+            self._save_catalog(*names)
+
     # ---------------------------
     # Insertar registro
     # ---------------------------
     def insert(self, table_name, values):
-        table = self.tables[table_name]
-        schema, file_manager, indexes = table["schema"], table["file"], table["indexes"]
-
-        if isinstance(values, list):
-            record_dict = {}
-            for i, col_def in enumerate(schema.columns):
-                col_name = col_def["name"]
-                if i < len(values):
-                    val = values[i]
-                    if isinstance(val, str):
-                        val = val.strip().strip("'\"")
-                    record_dict[col_name] = val
-                else:
-                    record_dict[col_name] = None
+        table = self.get_table(table_name)
+        self._check_writable(table)
+        schema = table["schema"]
+
+        _check_arity(schema, values)
+        data = schema.pack(self._to_record(schema, values))
+        with self._maintaining(table) as deltas:
+            if deltas:
+                deltas.add(_records(schema, data))
+            if table["partitioning"]:
+                (name,) = self._insert_partitioned(table, data)
+                self._save_partitions(table, STATS_SAVE_EVERY)
+                return {"success": True, "message": f"Registro insertado en {table_name}",
+                        "partition": name.split(SEPARATOR, 1)[1]}
+            with self.transactions.transaction() as txid, table["lock"]:
+                offset = self._append_batch(table, data, txid=txid)
+
+        table["unsaved"] += 1
+        if table["unsaved"] >= STATS_SAVE_EVERY:
+            self._save_catalog(table_name)
+        return {"success": True, "message": f"Registro insertado en {table_name}", "offset": offset}
+
+    def insert_many(self, table_name, rows):
+        """
+        Inserta varias filas empacándolas en un solo bloque:
+        una apertura del archivo y una escritura para todo el lote.
+        """
+        table = self.get_table(table_name)
+        self._check_writable(table)
+        schema = table["schema"]
+
+        for number, values in enumerate(rows, 1):
+            _check_arity(schema, values, number)
+        records = [self._to_record(schema, values) for values in rows]
+        data = b"".join(schema.pack(rec) for rec in records)
+        with self._maintaining(table) as deltas:
+            if deltas:
+                deltas.add(_records(schema, data))
+            if table["partitioning"]:
+                self._insert_partitioned(table, data)
+                self._save_partitions(table)
+                return {
+                    "success": True,
+                    "message": f"{len(records)} registros insertados en {table_name}",
+                    "count": len(records),
+                }
+            with self.transactions.transaction() as txid, table["lock"]:
+                offset = self._append_batch(table, data, txid=txid)
+        self._save_catalog(table_name)
+
+        return {
+            "success": True,
+            "message": f"{len(records)} registros insertados en {table_name}",
+            "offset": offset,
+            "count": len(records),
+        }
+
+    def copy_from(self, table_name, path, header=False, delimiter=",", progress=None, cancelled=None):
+        """
+        Carga un CSV del servidor por bloques. El parseo y empaquetado de
+        cada bloque se hace en procesos worker (ver bulk_loader).
+        Toda la carga es una transacción: las lecturas no ven filas hasta que termina.
+
+        progress: función (filas cargadas, bytes leídos del archivo) que se llama después de cada bloque
+        cancelled: función sin argumentos; si devuelve True entre dos bloques la carga
+            se aborta con LoadCancelled y no queda ninguna fila visible
+        """
+        table = self.get_table(table_name)
+        self._check_writable(table)
+        if not os.path.isabs(path):
+            path = os.path.join(self.data_dir, path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe el archivo {path}")
+
+        total = 0
+        # Los locks de las vistas se toman recién al terminar de leer: la carga no frena sus lecturas
+        with self._maintaining(table, hold=False) as deltas, \
+                self.transactions.transaction(durable=True) as txid:
+            for data, count, stats, position in load_csv(path, table["schema"], header=header, delimiter=delimiter):
+                if cancelled is not None and cancelled():
+                    raise LoadCancelled(f"Carga de {table_name} cancelada tras {total} registros")
+                if count:
+                    with table["lock"]:
+                        if table["partitioning"]:
+                            # Las estadísticas del bloque son de todas las particiones juntas: cada una mide las suyas
+                            self._append_partitions(self._route_batch(table, data), txid)
+                        else:
+                            self._append_batch(table, data, TableStats.from_dict(table["schema"], stats), txid)
+                    if deltas:
+                        deltas.add(_records(table["schema"], data))
+                    total += count
+                if progress is not None:
+                    progress(total, position)
+            deltas.hold()
+        if table["partitioning"]:
+            self._save_partitions(table)
         else:
-            record_dict = values
+            self._save_catalog(table_name)
 
-        offset = file_manager.append_record(record_dict)
+        return {"success": True, "message": f"{total} registros cargados en {table_name}", "count": total}
 
-        for col, index in indexes.items():
-            key = record_dict.get(col)
-            if key is not None:
-                if isinstance(key, str):
-                    key = key.strip().strip("'\"")
-                index.add(key, offset)
+    def _to_record(self, schema, values):
+        if not isinstance(values, list):
+            return values
 
-        return {"success": True, "message": f"Registro insertado en {table_name}", "offset": offset}
+        record_dict = {}
+        for i, col_def in enumerate(schema.columns):
+            col_name = col_def["name"]
+            if i < len(values):
+                val = values[i]
+                if isinstance(val, str):
+                    val = val.strip().strip("'\"")
+                record_dict[col_name] = val
+            else:
+                record_dict[col_name] = None
+        return record_dict
+
+    def _append_batch(self, table, data, stats=None, txid=None):
+        """
+        Escribe un bloque empacado y actualiza estadísticas, mapa de zonas e
+        índices. Los registros se desempacan una vez del bloque (así se indexa
+        y se mide el valor tal como quedó en disco) y se comparten entre todos.
+        txid: transacción que crea los registros
+        """
+        schema, file_manager = table["schema"], table["file"]
+        records = _records(schema, data)
+        offset = file_manager.append_records(data, records, txid)
+        table["lock"].modified()
+
+        if stats is None:
+            for rec in records:
+                table["stats"].observe(rec)
+        else:
+            table["stats"].merge(stats)
+
+        if table["index_types"]:
+            self._index_records(table, [(offset + i * schema.size, rec) for i, rec in enumerate(records)])
+        return offset
+
+    def _index_records(self, table, entries):
+        for col, index in self._indexes(table).items():
+            include = table["index_include"].get(col)
+            for offset, record_dict in entries:
+                key = record_dict.get(col)
+                if key is None:
+                    continue
+                if include:
+                    index.add(key, offset, [record_dict.get(c) for c in include])
+                else:
+                    index.add(key, offset)
+            index.flush()
 
     # ---------------------------
-    # Select
+    # Estadísticas
     # ---------------------------
-    def select(self, table_name, columns, condition=None, index=None, limit=None):
-        table = self.tables[table_name]
-        schema, file_manager, indexes = table["schema"], table["file"], table["indexes"]
+    def analyze(self, table_name):
+        """
+        Recalcula las estadísticas de la tabla con un recorrido completo.
+        """
+        table = self.get_table(table_name)
+        if table["partitioning"]:
+            partitions = {name: self.analyze(partition_table(table_name, name))
+                          for name in table["partitioning"].names}
+            return {
+                "table": table_name,
+                "row_count": sum(p["row_count"] for p in partitions.values()),
+                "partitions": partitions,
+            }
+        with self.transactions.snapshot() as snapshot:
+            records = (rec for _, rec in table["file"].scan_with_offsets(snapshot=snapshot))
+            table["stats"] = TableStats.analyze(table["schema"], records)
+        self._save_catalog(table_name)
 
-        # Recuperar todos los registros
-        results = []
-        all_records = file_manager.scan_all()
+        stats = table["stats"]
+        return {
+            "table": table_name,
+            "row_count": stats.row_count,
+            "columns": {
+                name: {"min": col.min, "max": col.max, "nulls": col.nulls, "ndv": col.ndv}
+                for name, col in stats.columns.items()
+            },
+        }
 
-        for rec in all_records:
-            # Normalizar en dict
-            rec_dict = rec if isinstance(rec, dict) else {
-                schema.columns[i]["name"]: rec[i] for i in range(len(schema.columns))
-            }
+    # ---------------------------
+    # Acceso según el plan
+    # ---------------------------
+    def _header(self, table, plan):
+        """
+        Columnas (en orden) de las tuplas que genera _candidates para el plan.
+        """
+        return table["schema"].row_columns(plan.get("columns"))
+
+    def _candidates(self, table, plan, profile=None, snapshot=None, scores=None):
+        """
+        Genera (offset, fila) según el camino elegido por el planner; cada
+        fila es una tupla con las columnas de _header, sin dicts.
+        Con índice, los offsets se ordenan para leer el .dat hacia adelante.
+        scores: dict opcional que el índice fulltext llena con {offset: puntaje}
+
+        El índice se consulta al llamar (con el lock de la tabla tomado: sus
+        páginas se modifican en el lugar); el .dat se lee después, al consumir
+        las filas, y sin lock: snapshot decide qué versiones se ven.
+        """
+        file_manager, schema = table["file"], table["schema"]
+        columns = plan.get("columns")
+        if plan["access"] == "scan":
+            node, sample = plan["condition"], plan.get("sample")
+            if node is None:
+                rows = file_manager.scan_with_offsets(columns=columns, as_tuple=True, snapshot=snapshot,
+                                                      sample=sample)
+            else:
+                # El WHERE se evalúa dentro del recorrido sobre sus columnas solamente
+                match_columns = schema.row_columns(columns_of(node))
+                matches = compile_condition(node, schema, _positions(match_columns))
+                rows = file_manager.scan_with_offsets(node, columns, matches, match_columns, as_tuple=True,
+                                                      snapshot=snapshot, sample=sample)
+            if profile:
+                details = {"sample": sample.to_dict()} if sample is not None else {}
+                rows = profile.wrap("SeqScan", rows, file_manager.io_counters, table=plan["table"],
+                                    filter=node is not None, **details)
+            return rows
+
+        index = self.get_index(table, plan["column"])
+        if plan.get("index_only"):
+            rows = self._index_only_rows(table, index, plan, snapshot)
+            if profile:
+                rows = profile.wrap("IndexOnlyScan", rows, index.io_counters,
+                                    column=plan["column"], index_type=plan["index_type"])
+            return rows
+
+        offsets = self._index_offsets(index, plan["lookup"], scores)
+        if profile:
+            offsets = profile.wrap("IndexScan", offsets, index.io_counters,
+                                   column=plan["column"], index_type=plan["index_type"])
+        rows = file_manager.read_records(offsets, columns, as_tuple=True, snapshot=snapshot)
+        if profile:
+            rows = profile.wrap("Fetch", rows, file_manager.io_counters, table=plan["table"])
+        return rows
+
+    def _index_offsets(self, index, lookup, scores=None):
+        if lookup[0] == "eq":
+            offsets = [o for value in lookup[1] for o in index.search(value)]
+        elif lookup[0] == "range":
+            low, high = lookup[1], lookup[2]
+            if low is not None and high is not None and low > high:
+                return []
+            offsets = index.range_search(low, high)
+        elif lookup[0] == "match":
+            # Ya vienen sin repetir y por puntaje BM25: LIMIT se queda con los mejores
+            ranked = index.match_scores(lookup[1])
+            if scores is not None:
+                scores.update(ranked)
+            return [offset for offset, _ in ranked]
+        else:
+            offsets = index.radius_search(lookup[1], lookup[2])
+        return sorted(set(offsets))
+
+    def _index_only_rows(self, table, index, plan, snapshot=None):
+        """
+        Arma las filas con la clave y las columnas INCLUDE de cada
+        entrada, sin leer el .dat. Las entradas de versiones borradas
+        siguen en el índice hasta VACUUM: se descartan con el snapshot.
+        """
+        lookup = plan["lookup"]
+        if lookup[0] == "eq":
+            entries = [e for value in lookup[1] for e in index.search_entries(value)]
+        else:
+            low, high = lookup[1], lookup[2]
+            if low is not None and high is not None and low > high:
+                entries = []
+            else:
+                entries = index.range_entries(low, high)
+
+        names = [plan["column"]] + table["index_include"].get(plan["column"], [])
+        # Posición de cada columna del encabezado dentro de (clave, *incluidas)
+        where = [names.index(c) for c in self._header(table, plan)]
+        return self._entry_rows(table, entries, where, snapshot)
 
-            # Evaluar condición si existe
-            if condition:
-                try:
-                    if not eval(condition.replace("=", "=="), {}, rec_dict):
-                        continue
-                except Exception as e:
-                    print(f"Error evaluando condición: {e}")
+    def _entry_rows(self, table, entries, where, snapshot):
+        # Mismo orden que el camino con Fetch: por offset, sin repetidos (IN con valores repetidos)
+        by_offset = {e[1]: e for e in entries}
+        size = table["schema"].size
+        with table["file"].versions.reader() as version:
+            for offset in sorted(by_offset):
+                if snapshot is not None and not snapshot.visible(*version(offset // size)):
                     continue
+                entry = by_offset[offset]
+                values = (entry[0],) + (entry[2] if len(entry) > 2 else ())
+                yield offset, tuple(values[i] for i in where)
 
-            # Proyección de columnas
-            if columns and columns != ["*"]:
-                projected = {col: rec_dict.get(col) for col in columns}
-                results.append(projected)
+    def _filtered(self, table, plan, condition, profile=None, snapshot=None, scores=None):
+        rows = self._candidates(table, plan, profile, snapshot, scores)
+        if plan["condition"] is None or plan["access"] == "scan":
+            # El recorrido secuencial ya filtró
+            return rows
+        matches = compile_condition(plan["condition"], table["schema"], _positions(self._header(table, plan)))
+        rows = ((offset, row) for offset, row in rows if matches(row))
+        if profile:
+            rows = profile.wrap("Filter", rows, condition=condition)
+        return rows
+
+    def _rows(self, table, plan, condition, profile=None, snapshot=None):
+        # Tuplas (columnas de _header) que cumplen el WHERE, por el camino del plan
+        if plan["access"] == "partitions":
+            return self._partition_rows(plan, condition, profile, snapshot)
+        if plan.get("rank"):
+            return (row for _, _, row in self._ranked(table, plan, condition, profile, snapshot))
+        if plan.get("vectorized"):
+            return self._vectorized(table, plan, profile=profile, snapshot=snapshot)
+        return (row for _, row in self._filtered(table, plan, condition, profile, snapshot))
+
+    def _ranked(self, table, plan, condition, profile=None, snapshot=None):
+        """
+        (puntaje, offset, fila) que cumplen el WHERE, de mayor a menor
+        puntaje BM25 del MATCH del plan. Por el índice fulltext ya salen en
+        ese orden; por otro camino (recorrido, otro índice) se ordenan con
+        los puntajes del índice, consultado ahora (con el lock tomado).
+        """
+        rank, scores = plan["rank"], {}
+        rows = self._filtered(table, plan, condition, profile, snapshot, scores)
+        if plan["access"] == "index" and plan["lookup"][0] == "match" and plan["column"] == rank["column"]:
+            return ((scores[offset], offset, row) for offset, row in rows)
+        scores = dict(self.get_index(table, rank["column"]).match_scores(rank["query"]))
+        return _by_score(rows, scores)
+
+    def _aggregate(self, aggregators, rows, positions):
+        yield aggregate_rows(aggregators, rows, positions)
+
+    def _group(self, aggregators, rows, group_by, selected, positions):
+        # Una fila por grupo: las columnas pedidas de la clave y el resultado de cada agregación
+        groups = group_rows(aggregators, rows, [positions[c] for c in group_by], positions)
+        where = [group_by.index(c) for c in selected]
+        for key, states in groups.items():
+            yield tuple(key[i] for i in where) + tuple(state.result() for state in states)
+
+    def _partition_rows(self, plan, condition, profile=None, snapshot=None, aggregators=None):
+        """
+        Filas de las particiones que quedaron en el plan, una tras otra. Cada
+        partición se consulta con su lock recién al llegar a ella (con LIMIT
+        las últimas pueden no leerse). Con aggregators, las que tienen plan
+        vectorizado se reducen por lotes y no generan filas.
+        """
+        parts = [(self.get_table(sub["table"]), sub) for sub in plan["partitions"]]
+        if not aggregators and any(sub.get("rank") for sub in plan["partitions"]):
+            yield from self._merged(parts, condition, profile, snapshot)
+            return
+        for part, sub in parts:
+            batches = rows = None
+            with part["lock"]:
+                if sub.get("vectorized") and aggregators:
+                    batches = self._batches(part, sub, profile, snapshot)
+                elif sub.get("vectorized"):
+                    rows = self._vectorized(part, sub, profile=profile, snapshot=snapshot)
+                else:
+                    rows = (row for _, row in self._filtered(part, sub, condition, profile, snapshot))
+            if batches is not None:
+                for batch in batches:
+                    vectorized.reduce_batch(aggregators, batch, part["schema"])
             else:
-                results.append(rec_dict)
+                yield from rows
+
+    def _merged(self, parts, condition, profile=None, snapshot=None):
+        """
+        MATCH en una tabla particionada: cada partición da sus filas por
+        puntaje y se mezclan por puntaje (antes del LIMIT), en vez de ir una
+        partición tras otra. Todas se consultan de entrada, cada una con su lock.
+        """
+        streams = []
+        for part, sub in parts:
+            with part["lock"]:
+                if sub.get("rank"):
+                    streams.append(self._ranked(part, sub, condition, profile, snapshot))
+                else:
+                    rows = self._filtered(part, sub, condition, profile, snapshot)
+                    streams.append((0.0, offset, row) for offset, row in rows)
+        for _, _, row in heapq.merge(*streams, key=lambda item: -item[0]):
+            yield row
+
+    def _batches(self, table, plan, profile=None, snapshot=None):
+        # Lotes de filas que cumplen el WHERE (arrays estructurados de NumPy)
+        file_manager = table["file"]
+        sample = plan.get("sample")
+        batches = vectorized.scan_batches(file_manager, plan["condition"], snapshot, sample)
+        batches = (batch[keep] for _, batch, keep in batches)
+        if profile:
+            details = {"sample": sample.to_dict()} if sample is not None else {}
+            batches = profile.wrap("VectorScan", batches, file_manager.io_counters, size=len,
+                                   table=plan["table"], **details)
+        return batches
+
+    def _vectorized(self, table, plan, aggregators=None, profile=None, snapshot=None):
+        """
+        Recorrido por lotes con NumPy: el WHERE se evalúa como máscara sobre
+        el .dat mapeado en memoria y solo las filas que cumplen se convierten
+        a tuplas (o se reducen directamente si hay agregaciones).
+        """
+        schema = table["schema"]
+        batches = self._batches(table, plan, profile, snapshot)
+
+        if aggregators:
+            rows = self._reduce(aggregators, batches, schema)
+            if profile:
+                rows = profile.wrap("Aggregate", rows, aggregates=[a.name for a in aggregators])
+            return rows
+
+        header = self._header(table, plan)
+        return (row for batch in batches for row in vectorized.to_rows(batch, header, schema))
+
+    def _reduce(self, aggregators, batches, schema):
+        for batch in batches:
+            vectorized.reduce_batch(aggregators, batch, schema)
+        yield tuple(agg.result() for agg in aggregators)
+
+    def _sketched(self, table, aggregators, snapshot):
+        """
+        Agregaciones aproximadas de toda la tabla sin recorrer el .dat: se
+        mezclan los sketches guardados por bloque (ver BlockSketches); solo
+        se vuelven a medir los bloques que cambiaron desde la última consulta.
+        """
+        for part in self._partition_tables(table):
+            with part["lock"]:
+                file_manager = part["file"]
+                stores = {}
+                for agg in aggregators:
+                    store = part["sketches"].get(agg.column)
+                    if store is None:
+                        path = sketch_path(self.data_dir, part["name"], list(part["schema"].types).index(agg.column))
+                        store = BlockSketches(path, part["schema"], agg.column, file_manager.zone_map.block_rows)
+                        part["sketches"][agg.column] = store
+                    stores[agg.column] = store
+            blocks = {column: store.blocks(file_manager, snapshot) for column, store in stores.items()}
+            for agg in aggregators:
+                for count, hll, kll in blocks[agg.column]:
+                    if count:
+                        agg.merge_sketch(count, hll if agg.func == "approx_count_distinct" else kll)
+        yield tuple(agg.result() for agg in aggregators)
+
+    def _projection(self, schema, header, columns):
+        """
+        (nombres de salida, función fila -> fila) para las columnas pedidas;
+        la función es None si la fila ya sale tal cual.
+        """
+        if not columns or columns == ["*"]:
+            return header, None
+        positions = _positions(header)
+        lowered = {c.lower(): c for c in schema.types}
+        # El lexer baja a minúsculas; las columnas de un CSV pueden no estarlo
+        where = [positions.get(col if col in schema.types else lowered.get(col.lower())) for col in columns]
+        if where == list(range(len(header))):
+            return columns, None
+        if None in where:
+            return columns, lambda row: tuple(None if i is None else row[i] for i in where)
+        if len(where) == 1:
+            i = where[0]
+            return columns, lambda row: (row[i],)
+        return columns, itemgetter(*where)
+
+    # ---------------------------
+    # Select
+    # ---------------------------
+    def select(self, table_name, columns, condition=None, index=None, limit=None, profile=None,
+               aggregates=None, on_plan=None, group_by=None, sample=None):
+        """
+        profile: QueryProfile opcional (EXPLAIN ANALYZE) que mide cada operador
+        aggregates: [{"func", "column", "name", "arg"?}]; devuelve una sola fila
+        group_by: columnas de GROUP BY; con aggregates devuelve una fila por
+                  grupo: las columnas pedidas (de las agrupadas) y las agregaciones
+        on_plan: función que recibe el plan elegido (el Executor registra la carga de trabajo)
+        sample: TABLESAMPLE ({"method", "percent", "seed"}): solo se lee esa muestra
+        Devuelve un ResultSet (encabezado + tuplas).
+
+        Si todas las agregaciones son aproximadas (APPROX_COUNT_DISTINCT,
+        APPROX_PERCENTILE) y no hay WHERE, GROUP BY ni muestra, se responden
+        con los sketches por bloque de la tabla en vez de recorrerla.
+
+        La consulta ve el snapshot tomado al empezar. El lock de la tabla se
+        toma solo para planear y consultar índices; el recorrido del .dat no
+        lo retiene, así que un recorrido largo no frena a las escrituras.
+        """
+        table = self.get_table(table_name)
+        schema = table["schema"]
+        aggregators = make_aggregators(aggregates, schema) if aggregates else None
+        if isinstance(sample, dict):
+            sample = TableSample.from_dict(sample)
+        # Las vistas se reescriben en el lugar: sus bloques no se pueden cachear
+        sketched = aggregators and all(agg.func in APPROXIMATE for agg in aggregators) \
+            and not condition and not group_by and sample is None and table["view"] is None
+        if aggregators and group_by:
+            group_by = [_column(schema, col, "GROUP BY") for col in group_by]
+            selected = [_column(schema, col, "SELECT") for col in columns if col != "*"]
+            columns = list(dict.fromkeys(group_by + [agg.column for agg in aggregators if agg.column != "*"]))
+        elif aggregators:
+            columns = [agg.column for agg in aggregators if agg.column != "*"]
 
-            # Aplicar LIMIT temprano para eficiencia
-            if limit is not None and len(results) >= limit:
-                break
+        with self.transactions.snapshot() as snapshot:
+            with table["lock"]:
+                plan = self.planner.plan(table_name, condition, hint=index, columns=columns, sample=sample)
+                if on_plan is not None:
+                    on_plan(plan)
+                header = self._header(table, plan)
+                if sketched:
+                    output = [agg.name for agg in aggregators]
+                    types = [agg.result_type for agg in aggregators]
+                    rows = self._sketched(table, aggregators, snapshot)
+                    if profile:
+                        rows = profile.wrap("SketchAggregate", rows, aggregates=output)
+                elif aggregators and group_by:
+                    output = selected + [agg.name for agg in aggregators]
+                    types = [schema.types[c] for c in selected] + [agg.result_type for agg in aggregators]
+                    rows = self._rows(table, plan, condition, profile, snapshot)
+                    rows = self._group(aggregators, rows, group_by, selected, _positions(header))
+                    if profile:
+                        rows = profile.wrap("GroupAggregate", rows, group_by=group_by,
+                                            aggregates=[agg.name for agg in aggregators])
+                elif aggregators:
+                    output = [agg.name for agg in aggregators]
+                    types = [agg.result_type for agg in aggregators]
+                    if plan["access"] == "partitions":
+                        rows = self._partition_rows(plan, condition, profile, snapshot, aggregators)
+                        rows = self._aggregate(aggregators, rows, _positions(header))
+                        if profile:
+                            rows = profile.wrap("Aggregate", rows, aggregates=output)
+                    elif plan.get("vectorized"):
+                        rows = self._vectorized(table, plan, aggregators, profile, snapshot)
+                    else:
+                        rows = self._filtered(table, plan, condition, profile, snapshot)
+                        rows = self._aggregate(aggregators, (row for _, row in rows), _positions(header))
+                        if profile:
+                            rows = profile.wrap("Aggregate", rows, aggregates=output)
+                else:
+                    rows = self._rows(table, plan, condition, profile, snapshot)
+                    output, project = self._projection(schema, header, columns)
+                    lowered = {c.lower(): t for c, t in schema.types.items()}
+                    types = [schema.types.get(c) or lowered.get(c.lower()) for c in output]
+                    if project is not None:
+                        rows = map(project, rows)
+                    if profile:
+                        rows = profile.wrap("Project", rows, columns=columns)
+            # LIMIT corta el recorrido en cuanto se completan las filas
+            if limit is not None:
+                rows = islice(rows, limit)
+                if profile:
+                    rows = profile.wrap("Limit", rows, limit=limit)
+            results = ResultSet(output, list(rows), types)
 
+        if profile:
+            profile.plan = plan
+            profile.finish()
         return results
 
     # ---------------------------
     # Delete
     # ---------------------------
-    def delete(self, table_name, condition):
-        table = self.tables[table_name]
-        schema, file_manager = table["schema"], table["file"]
+    def delete(self, table_name, condition, profile=None, on_plan=None):
+        """
+        Borrado lógico: anota el txid como xmax de cada fila. Las lecturas
+        que empezaron antes la siguen viendo; VACUUM la quita después.
+        on_plan: como en select
+        """
+        table = self.get_table(table_name)
+        self._check_writable(table)
+
+        with self._maintaining(table, deleting=True) as deltas, table["lock"]:
+            plan = self.planner.plan(table_name, condition)
+            if on_plan is not None:
+                on_plan(plan)
+            if plan["access"] == "partitions":
+                parts = [(self.get_table(sub["table"]), sub) for sub in plan["partitions"]]
+            else:
+                parts = [(table, plan)]
+            # Filas borradas (todas las columnas) para las vistas que dependen de la tabla
+            removed = [] if deltas else None
+            # Varias particiones son varios commits del WAL
+            with self.transactions.transaction(durable=len(parts) > 1) as txid, \
+                    self.transactions.snapshot() as snapshot:
+                rows = self._delete_parts(parts, condition, txid, profile, snapshot, removed)
+                if profile:
+                    rows = profile.wrap("Delete", rows)
+                deleted = sum(1 for _ in rows)
+            if removed:
+                deltas.add(removed, _positions(table["schema"].row_columns()))
 
-        deleted = 0
-        for off, rec in enumerate(file_manager.scan_all()):
-            if eval(condition.replace("=", "=="), {}, rec):
-                file_manager.delete_record(off * schema.size)
-                deleted += 1
+        if profile:
+            profile.plan = plan
+            profile.finish()
+        if deleted:
+            self._save_catalog(*(part["name"] for part, _ in parts))
         return f"{deleted} registros eliminados de {table_name}"
+
+    def _delete_parts(self, parts, condition, txid, profile=None, snapshot=None, removed=None):
+        for part, plan in parts:
+            with part["lock"]:
+                rows = self._filtered(part, plan, condition, profile, snapshot)
+                deleted = list(self._delete_rows(part, plan, rows, txid, removed))
+                part["stats"].forget(len(deleted))
+            yield from deleted
+
+    def _delete_rows(self, table, plan, rows, txid, removed=None):
+        # Se materializa antes de borrar: no se escribe sobre lo que se está leyendo
+        if removed is None:
+            targets = [offset for offset, _ in rows]
+        else:
+            targets = []
+            for offset, row in rows:
+                targets.append(offset)
+                removed.append(row)
+        # Todos los xmax en un solo commit; las entradas de los índices quedan hasta VACUUM
+        table["file"].delete_records(targets, txid)
+        table["lock"].modified()
+        yield from targets
+
+    # ---------------------------
+    # Vacuum
+    # ---------------------------
+    def vacuum(self, table_name):
+        """
+        Quita las versiones muertas: filas borradas por transacciones que ya
+        ningún snapshot puede ver y filas de transacciones abortadas. Sus
+        entradas salen de los índices y el registro queda en ceros.
+        """
+        table = self.get_table(table_name)
+        removed = sum(self._vacuum(part) for part in self._partition_tables(table))
+        return f"{removed} versiones muertas eliminadas de {table_name}"
+
+    def _vacuum(self, table):
+        schema, file_manager = table["schema"], table["file"]
+        transactions = self.transactions
+
+        with table["lock"]:
+            horizon = transactions.horizon()
+            rows = os.path.getsize(file_manager.filename) // schema.size
+            versions = file_manager.versions.read_array(0, rows)
+            dead = [row * schema.size for row in range(rows)
+                    if (versions[2 * row] or versions[2 * row + 1])
+                    and transactions.is_dead(versions[2 * row], versions[2 * row + 1], horizon)]
+
+            indexes = self._indexes(table)
+            header = schema.row_columns(list(indexes))
+            positions = _positions(header)
+            removed = []
+            for offset, row in file_manager.read_records(dead, list(indexes) or None, as_tuple=True):
+                for col, idx in indexes.items():
+                    key = row[positions[col]]
+                    if key is not None:
+                        idx.remove(key, offset)
+                removed.append(offset)
+            for idx in indexes.values():
+                idx.flush()
+            if removed:
+                file_manager.delete_records(removed)
+                table["lock"].modified()
+        return len(removed)
+
+    # ---------------------------
+    # Vistas materializadas
+    # ---------------------------
+    def create_view(self, view_name, query):
+        """
+        Crea la vista como una tabla con una fila por grupo y la llena con
+        el SELECT. Desde ahí, insert/insert_many/copy_from/delete sobre la
+        tabla la actualizan por grupo (COUNT/SUM/MIN/MAX); cuando eso no
+        alcanza (AVG, se borró el mínimo o el máximo...) se recalcula entera.
+        query: el SELECT como lo arma el parser (con aggregates y group_by)
+        """
+        source = self.get_table(query["table"])
+        if source["view"] is not None:
+            raise ValueError("No se puede crear una vista materializada sobre otra vista")
+        if SEPARATOR in source["name"]:
+            raise ValueError("La vista se define sobre la tabla particionada, no sobre una partición")
+        if self.has_table(view_name):
+            raise ValueError(f"Ya existe la tabla {view_name}")
+        definition = ViewDefinition.from_query(query, source["schema"])
+        schema = RecordSchema(definition.columns(source["schema"]))
+
+        with self._open_lock:
+            view = self._new_table(view_name, schema, {}, {}, TableStats(schema), view=definition)
+            self.tables[view_name] = view
+            self.table_names.append(view_name)
+        # Como en las escrituras: primero el lock de la vista y después el de la tabla
+        with view["lock"]:
+            with source["lock"]:
+                source["views"].append(view_name)
+                self._save_catalog(view_name, source["name"])
+                source["lock"].modified()
+            groups = self._refresh_view(view)
+        return f"Vista materializada {view_name} creada con {groups} grupos"
+
+    def refresh_view(self, view_name):
+        view = self._view(view_name)
+        groups = self._refresh_view(view)
+        return f"Vista materializada {view_name} recalculada: {groups} grupos"
+
+    def drop_view(self, view_name):
+        view = self._view(view_name)
+        source_name = view["view"].source
+        with view["lock"]:
+            source = self.get_table(source_name) if self.has_table(source_name) else None
+            if source is not None:
+                with source["lock"]:
+                    if view_name in source["views"]:
+                        source["views"].remove(view_name)
+                    with self._open_lock:
+                        self.tables.pop(view_name, None)
+                    self._save_catalog(source_name, dropped=(view_name,))
+                    source["lock"].modified()
+            else:
+                with self._open_lock:
+                    self.tables.pop(view_name, None)
+                self._save_catalog(dropped=(view_name,))
+            view["lock"].modified()
+            # El log puede tener escrituras pendientes sobre los archivos: se vacía antes de borrarlos
+            self.wal.checkpoint()
+            self._remove_table_files(view_name, {})
+        return f"Vista materializada {view_name} eliminada"
+
+    def _view(self, view_name):
+        view = self.get_table(view_name)
+        if view["view"] is None:
+            raise ValueError(f"{view_name} no es una vista materializada")
+        return view
+
+    def _check_writable(self, table):
+        if table["view"] is not None:
+            raise ValueError(f"{table['name']} es una vista materializada: se mantiene sola "
+                             f"(REFRESH MATERIALIZED VIEW {table['name']} la recalcula)")
+
+    @contextmanager
+    def _maintaining(self, table, deleting=False, hold=True):
+        """
+        Envuelve una escritura sobre una tabla con vistas: entrega los
+        PendingDeltas donde la escritura anota sus filas y, si termina bien
+        (ya confirmada), los aplica a cada vista.
+
+        Los locks de las vistas se toman antes que el de la tabla (el mismo
+        orden que REFRESH) y se sueltan después de aplicar: un REFRESH no se
+        mete entre la confirmación y el delta. Con hold=False se toman recién
+        con deltas.hold(), que se llama antes de confirmar.
+        """
+        views = [self.get_table(name) for name in sorted(table["views"])]
+        deltas = PendingDeltas(table["schema"], {view["name"]: view["view"] for view in views},
+                               [view["lock"] for view in views])
+        try:
+            if hold:
+                deltas.hold()
+            yield deltas
+            deltas.hold()
+            for view in views:
+                self._apply_delta(view, deltas.groups[view["name"]], deleting)
+        finally:
+            deltas.release()
+
+    def _view_groups(self, view):
+        """
+        {clave del grupo: (offset, valores de las agregaciones)} de las filas
+        de la vista. Se arma con un recorrido (la vista es chica) y se
+        mantiene con cada delta mientras no se reabra el .dat (otro proceso
+        la escribió).
+        """
+        cached = view.get("groups")
+        if cached is not None and cached[0] is view["file"]:
+            return cached[1]
+        width = len(view["view"].group_by)
+        with self.transactions.snapshot() as snapshot:
+            groups = {row[:width]: (offset, row[width:])
+                      for offset, row in view["file"].scan_with_offsets(as_tuple=True, snapshot=snapshot)}
+        view["groups"] = (view["file"], groups)
+        return groups
+
+    def _apply_delta(self, view, delta, deleting=False):
+        """
+        Aplica el delta por grupo (con el lock de la vista tomado). Las filas
+        de la vista se reescriben en su lugar, sin versiones: la vista no
+        junta filas muertas con cada escritura de la tabla. Un grupo nuevo
+        se agrega al final y uno que se quedó sin filas se pone en ceros.
+        """
+        if not delta:
+            return
+        definition, schema, file_manager = view["view"], view["schema"], view["file"]
+        groups = self._view_groups(view)
+        updates, appends, drops = {}, [], []
+        for key, states in delta.items():
+            entry = groups.get(key)
+            values = definition.apply(entry[1] if entry else None, states, deleting)
+            if values is None:
+                logger.info("Vista %s: el cambio no se puede aplicar por grupo, se recalcula", view["name"])
+                self._refresh_view(view)
+                return
+            if values == DROP:
+                drops.append(key)
+            elif entry is None:
+                appends.append((key, values))
+            else:
+                updates[entry[0]] = (key, values)
+
+        if updates:
+            file_manager.update_records({offset: key + values for offset, (key, values) in updates.items()})
+            for offset, (key, values) in updates.items():
+                groups[key] = (offset, values)
+        if appends:
+            data = b"".join(schema.pack(key + values) for key, values in appends)
+            offset = file_manager.append_records(data)
+            for i, (key, values) in enumerate(appends):
+                groups[key] = (offset + i * schema.size, values)
+                view["stats"].observe(schema.unpack(data[i * schema.size:(i + 1) * schema.size]))
+        if drops:
+            file_manager.delete_records([groups.pop(key)[0] for key in drops])
+            view["stats"].forget(len(drops))
+        view["lock"].modified()
+
+        view["unsaved"] += len(appends) + len(drops)
+        if view["unsaved"] >= STATS_SAVE_EVERY:
+            self._save_catalog(view["name"])
+
+    def _refresh_view(self, view):
+        """
+        Recalcula la vista entera con el SELECT sobre la tabla. Las filas
+        viejas se borran y las nuevas se escriben en una transacción: las
+        lecturas ven la vista anterior o la nueva, nunca una mezcla.
+        Devuelve la cantidad de grupos.
+        """
+        definition, schema, file_manager = view["view"], view["schema"], view["file"]
+        with view["lock"]:
+            result = self.select(definition.source, definition.group_by, definition.condition,
+                                 aggregates=definition.aggregates, group_by=definition.group_by)
+            data = b"".join(schema.pack(row) for row in result.rows)
+            with self.transactions.transaction(durable=True) as txid, \
+                    self.transactions.snapshot() as snapshot:
+                live = [offset for offset, _ in file_manager.scan_with_offsets(columns=[], snapshot=snapshot)]
+                if live:
+                    file_manager.delete_records(live, txid)
+                if data:
+                    file_manager.append_records(data, txid=txid)
+            view["lock"].modified()
+            view["groups"] = None
+            view["stats"] = TableStats.analyze(schema, _records(schema, data))
+            self._save_catalog(view["name"])
+            # Las versiones anteriores quedan en ceros si ya ninguna lectura las ve
+            self._vacuum(view)
+        return len(result.rows)
+
+
+
+def _by_score(rows, scores):
+    # Se ordena recién al consumir: el .dat se lee fuera del lock de la tabla
+    yield from sorted(((scores.get(offset, 0.0), offset, row) for offset, row in rows),
+                      key=lambda item: (-item[0], item[1]))
+
+
+def _check_arity(schema, values, number=None):
+    # Una fila de más o de menos valores no se rellena ni se recorta
+    if isinstance(values, (list, tuple)) and len(values) != len(schema.columns):
+        where = f"La fila {number}" if number is not None else "La fila"
+        raise ValueError(f"{where} tiene {len(values)} valores y la tabla tiene {len(schema.columns)} columnas")
+
+
+def _positions(names):
+    return {name: i for i, name in enumerate(names)}
+
+
+def _column(schema, name, clause):
+    # El lexer baja a minúsculas; las columnas de un CSV pueden no estarlo
+    if name in schema.types:
+        return name
+    lowered = {c.lower(): c for c in schema.types}
+    if name.lower() not in lowered:
+        raise ValueError(f"Columna desconocida en {clause}: {name}")
+    return lowered[name.lower()]
+
+
+def _records(schema, data):
+    # Registros (dicts) de un bloque empacado
+    return [schema.unpack(data[i:i + schema.size]) for i in range(0, len(data), schema.size)]
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Igual que PYTHONPATH=/app en el Dockerfile: "src" se importa desde core/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
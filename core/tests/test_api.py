@@ -0,0 +1,47 @@
+# tests/test_api.py
+import time
+import importlib
+
+import pytest
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # La app arma su Executor y sus trabajos sobre data/ del directorio actual
+    monkeypatch.chdir(tmp_path)
+    main = importlib.reload(importlib.import_module("src.api.main"))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _wait(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/jobs/{job_id}").json()["job"]
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"el trabajo {job_id} no terminó")
+
+
+def _upload(client, name, text):
+    response = client.post("/upload", files={"file": (f"{name}.csv", text.encode())}, data={"table_name": name})
+    assert response.status_code == 202
+    return _wait(client, response.json()["jobId"])
+
+
+def test_upload_loads_rows(client):
+    job = _upload(client, "buena", "id,nombre\n1,a\n2,b\n")
+    assert job["status"] == "done" and job["errors"] == []
+    assert job["result"]["inserted"] == 2
+
+
+def test_upload_with_bad_row_fails_and_reports_it(client):
+    job = _upload(client, "mala", "id,nombre\n1,a\n2,b,c\n3,d\n")
+    assert job["status"] == "failed"
+    assert len(job["errors"]) == 1 and job["errors"][0].startswith("Línea 3 del CSV")
+    # La carga es una transacción: no queda ninguna fila visible
+    result = client.post("/query", json={"query": "SELECT * FROM mala"}).json()
+    assert result["ok"] and result["result"] == []
@@ -0,0 +1,73 @@
+# tests/test_bulk_loader.py
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.record import RecordSchema
+from src.dbms import bulk_loader
+from src.dbms.bulk_loader import load_csv, RejectedRow
+
+SCHEMA = RecordSchema([{"name": "id", "type": "INT"}, {"name": "nombre", "type": "VARCHAR[12]"}])
+
+
+class CountingPool(ProcessPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        CountingPool.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def _csv(tmp_path, rows):
+    path = tmp_path / "datos.csv"
+    path.write_text("id,nombre\n" + "".join(f"{i},nombre{i}\n" for i in range(rows)))
+    return str(path)
+
+
+def _parallel(monkeypatch):
+    # Bloques chicos para que un archivo chico se parsee en paralelo
+    monkeypatch.setattr(bulk_loader, "CHUNK_SIZE", 1024)
+    monkeypatch.setattr(bulk_loader, "PARALLEL_THRESHOLD", 0)
+    monkeypatch.setattr(bulk_loader, "ProcessPoolExecutor", CountingPool)
+    CountingPool.submitted = 0
+
+
+def test_parallel_load_keeps_file_order(tmp_path, monkeypatch):
+    _parallel(monkeypatch)
+    path = _csv(tmp_path, 3000)
+    ids, ends = [], []
+    for data, count, stats, end in load_csv(path, SCHEMA, header=True, workers=2):
+        ids += [SCHEMA.unpack(data[i * SCHEMA.size:(i + 1) * SCHEMA.size])["id"] for i in range(count)]
+        ends.append(end)
+    assert ids == list(range(3000))
+    assert ends == sorted(ends) and len(ends) > 10
+
+
+def test_parallel_load_bounds_chunks_in_flight(tmp_path, monkeypatch):
+    _parallel(monkeypatch)
+    path = _csv(tmp_path, 3000)
+    chunks = load_csv(path, SCHEMA, header=True, workers=2)
+    next(chunks)
+    # Con el consumidor detenido en el primer bloque solo hay una ventana encargada
+    assert CountingPool.submitted == 2 * bulk_loader.CHUNKS_PER_WORKER + 1
+    chunks.close()
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize("bad, reason", [
+    ("2500,nombre,sobra", "3 campos"),
+    ("abc,nombre", "id (INT)"),
+])
+def test_rejected_row_reports_file_line(tmp_path, monkeypatch, parallel, bad, reason):
+    if parallel:
+        _parallel(monkeypatch)
+    path = _csv(tmp_path, 3000)
+    lines = open(path).read().splitlines()
+    lines[2501] = bad  # línea 2502 del archivo (la 1 es la cabecera)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    with pytest.raises(RejectedRow) as error:
+        for _ in load_csv(path, SCHEMA, header=True, workers=2):
+            pass
+    assert error.value.line == 2502
+    assert str(error.value).startswith("Línea 2502 del CSV") and reason in str(error.value)
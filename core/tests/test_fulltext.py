@@ -0,0 +1,48 @@
+# tests/test_fulltext.py
+import pytest
+
+from src.parser.executor import Executor
+
+
+@pytest.fixture
+def executor(tmp_path):
+    return Executor(str(tmp_path / "data"))
+
+
+def _text(i):
+    # Un solo "pollo" y entre 0 y 9 palabras de relleno: BM25 baja con el largo
+    return " ".join(["pollo"] + [f"w{j}" for j in range(i % 10)])
+
+
+def test_match_ranks_when_scan_wins(executor):
+    q, sm = executor.execute, executor.schema_manager
+    q("CREATE TABLE r (id INT, descr VARCHAR[60])")
+    sm.insert_many("r", [[i, _text(i)] for i in range(2000)])
+    q("CREATE INDEX ON r(descr) USING fulltext")
+    q("ANALYZE r")
+
+    # Todas las filas cumplen el MATCH: leerlas por el índice cuesta más que el recorrido
+    plan = sm.planner.plan("r", "MATCH(descr, 'pollo')")
+    assert plan["access"] == "scan"
+    assert plan["rank"] == {"column": "descr", "query": "pollo"}
+
+    expected = sorted(range(2000), key=lambda i: (i % 10, i))
+    result = q("SELECT id FROM r WHERE MATCH(descr, 'pollo')")
+    assert [row["id"] for row in result] == expected
+    result = q("SELECT id FROM r WHERE MATCH(descr, 'pollo') LIMIT 5")
+    assert [row["id"] for row in result] == expected[:5]
+
+
+def test_match_merges_partitions_by_score(executor):
+    q = executor.execute
+    q("""CREATE TABLE r (id INT, descr VARCHAR[60]) PARTITION BY RANGE (id)
+         (PARTITION p0 VALUES LESS THAN (1000), PARTITION p1 VALUES LESS THAN (2000),
+          PARTITION p2 VALUES LESS THAN (MAXVALUE))""")
+    q("CREATE INDEX ON r(descr) USING fulltext")
+    best = {500, 1500, 2500}
+    executor.schema_manager.insert_many(
+        "r", [[i, "pollo pollo pollo" if i in best else _text(5)] for i in range(3000)])
+
+    # El mejor de cada partición va antes que el resto de la primera
+    result = q("SELECT id FROM r WHERE MATCH(descr, 'pollo') LIMIT 3")
+    assert {row["id"] for row in result} == best
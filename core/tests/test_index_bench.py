@@ -0,0 +1,22 @@
+# tests/test_index_bench.py
+import pytest
+
+from bench.index_bench import INDEXES, run_case
+from src.dbms import lsm
+
+# El R-tree vive en memoria (se arma al abrir): no lee páginas, solo visita nodos
+IN_MEMORY = {"rtree"}
+
+
+@pytest.mark.parametrize("name", list(INDEXES))
+def test_cold_searches_read_pages(tmp_path, monkeypatch, name):
+    # Con 5000 claves la memtable del LSM no llegaría a volcarse a runs en disco
+    monkeypatch.setattr(lsm, "MEMTABLE_ENTRIES", 1000)
+    # Con el índice recién reabierto las búsquedas tienen que ir a disco:
+    # si pages_read_per_op da 0, algo calentó el caché antes de medir
+    case = run_case(name, "uniform", 5000, 200, 0.001, 42, False, str(tmp_path))
+    counter = "node_visits_per_op" if name in IN_MEMORY else "pages_read_per_op"
+    assert case["verify_errors"] == 0
+    for op in case["operations"]:
+        if op["op"] in ("point_search", "range_search") and not op.get("unsupported"):
+            assert op[counter] > 0, op
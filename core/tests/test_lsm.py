@@ -0,0 +1,90 @@
+# tests/test_lsm.py
+import random
+
+import pytest
+
+from src.dbms import lsm
+from src.dbms.lsm import LSMIndex, run_files
+from src.parser.executor import Executor
+
+
+@pytest.fixture(autouse=True)
+def small_memtable(monkeypatch):
+    # Memtable chica: unos pocos miles de entradas ya pasan por runs y compactaciones
+    monkeypatch.setattr(lsm, "MEMTABLE_ENTRIES", 500)
+
+
+def _load(index, batches, seed=1):
+    """
+    Inserta y borra al azar, con un flush por lote. Devuelve {offset: clave} de lo que sigue vivo.
+    """
+    rng = random.Random(seed)
+    alive, offset = {}, 0
+    for _ in range(batches):
+        for _ in range(200):
+            key = rng.randint(0, 3000)
+            index.add(key, offset)
+            alive[offset] = key
+            offset += 1
+        for victim in rng.sample(sorted(alive), 30):
+            index.remove(alive.pop(victim), victim)
+        index.flush()
+    return alive
+
+
+def _check(index, alive, seed=2):
+    rng = random.Random(seed)
+    for key in rng.sample(range(3001), 200):
+        assert sorted(index.search(key)) == sorted(o for o, k in alive.items() if k == key)
+    for _ in range(50):
+        low = rng.randint(0, 3000)
+        high = low + rng.randint(0, 300)
+        expected = sorted((k, o) for o, k in alive.items() if low <= k <= high)
+        assert index.range_search(low, high) == [o for _, o in expected]
+    assert index.range_search() == [o for _, o in sorted((k, o) for o, k in alive.items())]
+
+
+def test_lookups_in_memtable_only(tmp_path):
+    index = LSMIndex(str(tmp_path / "t_k"), "INT")
+    alive = _load(index, 1)
+    assert index.levels == [] and not run_files(index.base)
+    _check(index, alive)
+
+
+def test_lookups_across_flush_and_compaction(tmp_path):
+    index = LSMIndex(str(tmp_path / "t_k"), "INT")
+    alive = _load(index, 60)
+    # Los runs del nivel 0 se compactaron en niveles más profundos
+    assert len(index.levels) >= 2 and all(len(level) < lsm.FANOUT for level in index.levels)
+    _check(index, alive)
+    # Al reabrir: runs del manifiesto y memtable rehecha desde el log
+    _check(LSMIndex(str(tmp_path / "t_k"), "INT"), alive)
+
+
+def test_bloom_filters_skip_runs_without_the_key(tmp_path):
+    index = LSMIndex(str(tmp_path / "t_k"), "INT")
+    for offset in range(3000):
+        index.add(offset * 2, offset)  # solo claves pares
+        if offset % 500 == 499:
+            index.flush()
+    index.flush()
+    before = index.io_counters()
+    assert index.search(7) == []
+    after = index.io_counters()
+    assert after["bloom_skips"] - before["bloom_skips"] >= 1
+    assert index.search(8) == [4]
+
+
+def test_lsm_table_index(tmp_path):
+    q = Executor(str(tmp_path / "data")).execute
+    q("CREATE TABLE t (id INT INDEX lsm, nombre VARCHAR[10])")
+    for start in range(0, 3000, 500):
+        q("INSERT INTO t VALUES " + ", ".join(f"({i}, 'n{i}')" for i in range(start, start + 500)))
+    q("DELETE FROM t WHERE id BETWEEN 100 AND 199")
+    # USING: con la memtable chica el índice tiene varios niveles y el costo favorecería el recorrido
+    plan = q("EXPLAIN SELECT * FROM t WHERE id = 150 USING lsm")["plan"]
+    assert plan["index_type"] == "lsm"
+    assert list(q("SELECT * FROM t WHERE id = 150 USING lsm")) == []
+    assert [r["id"] for r in q("SELECT id FROM t WHERE id = 2500 USING lsm")] == [2500]
+    assert sorted(r["id"] for r in q("SELECT id FROM t WHERE id BETWEEN 90 AND 210 USING lsm")) == \
+        list(range(90, 100)) + list(range(200, 211))
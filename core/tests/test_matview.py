@@ -0,0 +1,97 @@
+# tests/test_matview.py
+import random
+
+import pytest
+
+from src.parser.executor import Executor
+
+REGIONS = ["norte", "sur", "este", "oeste"]
+VIEW = ("CREATE MATERIALIZED VIEW por_region AS SELECT region, COUNT(*), SUM(monto) AS total, "
+        "MIN(monto), MAX(monto) FROM ventas GROUP BY region")
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = Executor(str(tmp_path / "data"))
+    executor.execute("CREATE TABLE ventas (id INT, region VARCHAR[10], monto DOUBLE)")
+    return executor
+
+
+@pytest.fixture
+def rows(executor):
+    rng = random.Random(1)
+    rows = [[i, rng.choice(REGIONS), float(rng.randint(10, 100))] for i in range(1000)]
+    executor.schema_manager.insert_many("ventas", rows)
+    executor.execute(VIEW)
+    return rows
+
+
+@pytest.fixture
+def refreshes(executor, monkeypatch):
+    # Cuántas veces se recalculó la vista entera (en vez de aplicar el cambio por grupo)
+    calls = []
+    manager = executor.schema_manager
+    original = manager._refresh_view
+    monkeypatch.setattr(manager, "_refresh_view", lambda view: calls.append(view["name"]) or original(view))
+    return calls
+
+
+def _expected(rows):
+    groups = {}
+    for _, region, monto in rows:
+        count, total, low, high = groups.get(region, (0, 0.0, monto, monto))
+        groups[region] = (count + 1, total + monto, min(low, monto), max(high, monto))
+    return groups
+
+
+def _view(executor):
+    return {r["region"]: (r["count"], r["total"], r["min_monto"], r["max_monto"])
+            for r in executor.execute("SELECT * FROM por_region")}
+
+
+def test_inserts_apply_deltas(executor, rows, refreshes):
+    sm = executor.schema_manager
+    executor.execute("INSERT INTO ventas VALUES (5000, 'centro', 7.5)")
+    rows.append([5000, "centro", 7.5])
+    new = [[6000 + i, REGIONS[i % 4], 200.0 + i] for i in range(50)]
+    sm.insert_many("ventas", new)
+    rows += new
+    assert _view(executor) == _expected(rows)
+    assert refreshes == []
+
+
+def test_copy_applies_deltas(executor, rows, refreshes, tmp_path):
+    path = tmp_path / "ventas.csv"
+    new = [[7000 + i, REGIONS[i % 4], 55.0] for i in range(300)]
+    path.write_text("".join(f"{i},{region},{monto}\n" for i, region, monto in new))
+    executor.execute(f"COPY ventas FROM '{path}'")
+    assert _view(executor) == _expected(rows + new)
+    assert refreshes == []
+
+
+def test_deletes_apply_deltas_until_an_extreme_goes(executor, rows, refreshes):
+    groups = _expected(rows)
+    # Ni mínimo ni máximo de su grupo: alcanza con restar
+    middle = next(r for r in rows if groups[r[1]][2] < r[2] < groups[r[1]][3])
+    executor.execute(f"DELETE FROM ventas WHERE id = {middle[0]}")
+    rows.remove(middle)
+    assert _view(executor) == _expected(rows)
+    assert refreshes == []
+
+    # Se borra el mínimo de un grupo: hay que recalcular
+    executor.execute("DELETE FROM ventas WHERE monto < 15")
+    rows = [r for r in rows if r[2] >= 15]
+    assert _view(executor) == _expected(rows)
+    assert refreshes == ["por_region"]
+
+    # Un grupo entero se va de la vista
+    executor.execute("DELETE FROM ventas WHERE region = 'sur'")
+    rows = [r for r in rows if r[1] != "sur"]
+    assert _view(executor) == _expected(rows)
+
+
+def test_view_is_read_only_and_survives_reopen(executor, rows):
+    with pytest.raises(ValueError):
+        executor.execute("INSERT INTO por_region VALUES ('x', 1, 1, 1, 1)")
+    executor.schema_manager.checkpoint()
+    assert _view(Executor(executor.schema_manager.data_dir)) == _expected(rows)
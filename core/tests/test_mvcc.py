@@ -0,0 +1,66 @@
+# tests/test_mvcc.py
+import pytest
+
+from src.parser.executor import Executor
+from src.dbms import bulk_loader
+from src.dbms.bulk_loader import RejectedRow
+
+ROWS = 500
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = Executor(str(tmp_path / "data"))
+    executor.execute("CREATE TABLE t (id INT INDEX btree, nombre VARCHAR[12])")
+    executor.schema_manager.insert_many("t", [[i, f"n{i}"] for i in range(ROWS)])
+    return executor
+
+
+def _ids(executor, query="SELECT id FROM t"):
+    return sorted(row["id"] for row in executor.execute(query))
+
+
+def _snapshot_ids(sm, snapshot):
+    table = sm.get_table("t")
+    return sorted(row["id"] for _, row in table["file"].scan_with_offsets(snapshot=snapshot))
+
+
+def test_snapshot_keeps_seeing_rows_deleted_after_it(executor):
+    sm = executor.schema_manager
+    with sm.transactions.snapshot() as snapshot:
+        executor.execute("DELETE FROM t WHERE id < 100")
+        executor.execute("INSERT INTO t VALUES (1000, 'nuevo')")
+        # La lectura larga ve la tabla como estaba al empezar
+        assert _snapshot_ids(sm, snapshot) == list(range(ROWS))
+    assert _ids(executor) == list(range(100, ROWS)) + [1000]
+    assert _ids(executor, "SELECT id FROM t WHERE id = 5") == []
+    assert _ids(executor, "SELECT id FROM t WHERE id BETWEEN 95 AND 104") == list(range(100, 105))
+
+
+def test_vacuum_waits_for_open_snapshots(executor):
+    sm = executor.schema_manager
+    with sm.transactions.snapshot() as snapshot:
+        executor.execute("DELETE FROM t WHERE id < 100")
+        # Un snapshot abierto todavía ve las filas borradas: no se pueden quitar
+        assert executor.execute("VACUUM t").startswith("0 versiones")
+        assert _snapshot_ids(sm, snapshot) == list(range(ROWS))
+    assert executor.execute("VACUUM t").startswith("100 versiones")
+    assert _ids(executor) == list(range(100, ROWS))
+    # Las entradas de los índices también se fueron
+    assert len(sm.get_table("t")["indexes"]["id"]) == ROWS - 100
+    assert _ids(Executor(sm.data_dir)) == list(range(100, ROWS))
+
+
+def test_aborted_copy_is_invisible_and_vacuumed(executor, tmp_path, monkeypatch):
+    # Bloques chicos: la línea mala llega después de escribir los primeros
+    monkeypatch.setattr(bulk_loader, "CHUNK_SIZE", 64)
+    path = tmp_path / "carga.csv"
+    path.write_text("".join(f"{ROWS + i},c\n" for i in range(50)) + "malo,c\n")
+    with pytest.raises(RejectedRow):
+        executor.execute(f"COPY t FROM '{path}'")
+    assert _ids(executor) == list(range(ROWS))
+    # Los bloques que llegaron a escribirse quedan como versiones abortadas
+    removed = int(executor.execute("VACUUM t").split()[0])
+    assert 0 < removed < 50
+    assert executor.execute("VACUUM t").startswith("0 versiones")
+    assert len(executor.schema_manager.get_table("t")["indexes"]["id"]) == ROWS
@@ -0,0 +1,61 @@
+# tests/test_parser.py
+import pytest
+
+from src.parser.lexer import tokenize
+from src.parser.parser import SQLParser
+from src.parser.executor import Executor
+
+
+@pytest.mark.parametrize("text", ["1e10", "2.5E-3", "-4e+2", "7"])
+def test_number_with_exponent_is_one_token(text):
+    assert tokenize(text) == [("NUMBER", text)]
+
+
+def test_insert_exponent_literals():
+    parsed = SQLParser().parse("INSERT INTO t VALUES (1e10, 2.5E-3)")
+    assert parsed["rows"] == [["1e10", "2.5E-3"]]
+
+
+def test_exponent_literals_into_double_and_bigint(tmp_path):
+    q = Executor(str(tmp_path / "data")).execute
+    q("CREATE TABLE t (id INT, grande BIGINT, monto DOUBLE)")
+    q("INSERT INTO t VALUES (1, 1e10, 2.5E-3), (2, 3E2, -1e-2)")
+    rows = [(r["id"], r["grande"], r["monto"]) for r in q("SELECT * FROM t")]
+    assert rows == [(1, 10 ** 10, 0.0025), (2, 300, -0.01)]
+    assert [r["id"] for r in q("SELECT id FROM t WHERE grande = 1e10")] == [1]
+    assert [r["id"] for r in q("SELECT id FROM t WHERE monto < 1e-3")] == [2]
+    with pytest.raises(ValueError, match="grande"):
+        q("INSERT INTO t VALUES (3, 2.5e-1, 1)")
+
+
+def test_multi_row_insert():
+    parsed = SQLParser().parse("INSERT INTO t VALUES (1, 'a b', -5), (2, , 'c'), (3, 'd', )")
+    assert parsed == {"operation": "insert", "table": "t",
+                      "rows": [["1", "'a b'", "-5"], ["2", None, "'c'"], ["3", "'d'", None]]}
+
+
+@pytest.mark.parametrize("query", [
+    "INSERT INTO t VALUES (2, '15-03-2023' 1e10, -5)",
+    "INSERT INTO t VALUES (1, 2) (3, 4)",
+    "INSERT INTO t VALUES (1, 2",
+    "INSERT INTO t VALUES",
+    "INSERT INTO t VALUES 1, 2",
+])
+def test_insert_syntax_errors(query):
+    with pytest.raises(ValueError):
+        SQLParser().parse(query)
+
+
+def test_insert_checks_row_arity(tmp_path):
+    executor = Executor(str(tmp_path / "data"))
+    q, sm = executor.execute, executor.schema_manager
+    q("CREATE TABLE t (id INT, nombre VARCHAR[10], monto DOUBLE)")
+    with pytest.raises(ValueError, match="2 valores"):
+        q("INSERT INTO t VALUES (1, 'a')")
+    with pytest.raises(ValueError, match="La fila 2 tiene 4 valores"):
+        q("INSERT INTO t VALUES (1, 'a', 1.5), (2, 'b', 2.5, 9)")
+    with pytest.raises(ValueError, match="3 columnas"):
+        sm.insert_many("t", [[1, "a"]])
+    assert list(q("SELECT * FROM t")) == []
+    q("INSERT INTO t VALUES (1, 'a', 1.5), (2, , 2.5)")
+    assert [(r["id"], r["nombre"]) for r in q("SELECT * FROM t")] == [(1, "a"), (2, "")]
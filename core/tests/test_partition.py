@@ -0,0 +1,85 @@
+# tests/test_partition.py
+import os
+import datetime
+
+import pytest
+
+from src.parser.executor import Executor
+from src.dbms.partition import partition_table
+
+RANGE_TABLE = """CREATE TABLE v (id INT INDEX btree, fecha DATE, monto DOUBLE)
+    PARTITION BY RANGE (fecha) (PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'), PARTITION p2024 VALUES LESS THAN ('2025-01-01'))"""
+
+
+@pytest.fixture
+def executor(tmp_path):
+    return Executor(str(tmp_path / "data"))
+
+
+@pytest.fixture
+def rows(executor):
+    executor.execute(RANGE_TABLE)
+    start = datetime.date(2022, 1, 1)
+    rows = [[i, str(start + datetime.timedelta(days=i % (3 * 365))), float(i % 7)] for i in range(3000)]
+    executor.schema_manager.insert_many("v", rows)
+    return rows
+
+
+def _ids(executor, query):
+    return sorted(row["id"] for row in executor.execute(query))
+
+
+def _partition_ids(sm, table, name, column="id"):
+    part = sm.get_table(partition_table(table, name))
+    return sorted(row[column] for _, row in part["file"].scan_with_offsets())
+
+
+def test_range_routing(executor, rows):
+    sm = executor.schema_manager
+    for name, year in (("p2022", "2022"), ("p2023", "2023"), ("p2024", "2024")):
+        assert _partition_ids(sm, "v", name) == [r[0] for r in rows if r[1].startswith(year)]
+    assert sm.insert("v", [5000, "2023-12-31", 1.0])["partition"] == "p2023"
+    assert sm.insert("v", [5001, "2024-01-01", 1.0])["partition"] == "p2024"
+    with pytest.raises(ValueError, match="ninguna partición"):
+        executor.execute("INSERT INTO v VALUES (5002, '2030-01-01', 1.0)")
+
+
+def test_range_pruning(executor, rows):
+    query = "SELECT id FROM v WHERE fecha >= '2023-03-01' AND fecha < '2023-04-01'"
+    plan = executor.execute("EXPLAIN " + query)["plan"]
+    assert plan["pruned"] == ["p2022", "p2024"]
+    assert [p["partition"] for p in plan["partitions"]] == ["p2023"]
+    assert _ids(executor, query) == sorted(r[0] for r in rows if "2023-03-01" <= r[1] < "2023-04-01")
+    # Sin condición sobre la columna de partición se leen todas
+    assert executor.execute("EXPLAIN SELECT id FROM v WHERE id = 7")["plan"]["pruned"] == []
+    assert _ids(executor, "SELECT id FROM v WHERE id = 7") == [7]
+
+
+def test_drop_partition_removes_rows_and_files(executor, rows):
+    sm = executor.schema_manager
+    executor.execute("ALTER TABLE v DROP PARTITION p2022")
+    left = sorted(r[0] for r in rows if r[1] >= "2023-01-01")
+    assert _ids(executor, "SELECT id FROM v") == left
+    assert not [f for f in os.listdir(sm.data_dir) if "p2022" in f]
+    # Los valores de la partición borrada pasan a la siguiente
+    assert sm.insert("v", [6000, "2022-06-01", 1.0])["partition"] == "p2023"
+    assert _ids(Executor(sm.data_dir), "SELECT id FROM v") == left + [6000]
+
+
+def test_hash_routing_and_pruning(executor):
+    sm = executor.schema_manager
+    executor.execute("CREATE TABLE h (k INT, s VARCHAR[10]) PARTITION BY HASH (k, 4)")
+    sm.insert_many("h", [[i, f"s{i}"] for i in range(1000)])
+    table = sm.get_table("h")
+    parts = {name: set(_partition_ids(sm, "h", name, "k")) for name in table["partitioning"].names}
+    # Cada fila está en una sola partición, la que dice route, y todas reciben filas
+    assert sorted(k for ks in parts.values() for k in ks) == list(range(1000))
+    assert all(k in parts[table["partitioning"].route(k)] for k in range(1000))
+    assert all(len(ks) > 100 for ks in parts.values())
+
+    plan = executor.execute("EXPLAIN SELECT * FROM h WHERE k = 3")["plan"]
+    assert [p["partition"] for p in plan["partitions"]] == [table["partitioning"].route(3)]
+    assert [row["k"] for row in executor.execute("SELECT * FROM h WHERE k IN (3, 999)")] in ([3, 999], [999, 3])
+    with pytest.raises(ValueError):
+        executor.execute("ALTER TABLE h DROP PARTITION p1")
@@ -0,0 +1,81 @@
+# tests/test_record.py
+import pytest
+
+from src.record import RecordSchema, DATE_NULL
+
+SCHEMA = RecordSchema([
+    {"name": "id", "type": "INT"},
+    {"name": "fecha", "type": "DATE"},
+    {"name": "monto", "type": "DOUBLE"},
+    {"name": "cantidad", "type": "SMALLINT"},
+    {"name": "grande", "type": "BIGINT"},
+    {"name": "precio", "type": "FLOAT"},
+    {"name": "activo", "type": "BOOLEAN"},
+    {"name": "nombre", "type": "VARCHAR[10]"},
+    {"name": "punto", "type": "ARRAY[FLOAT]"},
+])
+
+VALID = [7, "2020-12-05", 1.5, 300, 2 ** 40, 2.5, "yes", "x", [1.0, 2.0]]
+
+
+def _row(**changes):
+    row = dict(zip(SCHEMA.types, VALID))
+    row.update(changes)
+    return row
+
+
+def test_pack_roundtrip():
+    row = SCHEMA.unpack(SCHEMA.pack(_row()))
+    assert row == {"id": 7, "fecha": "2020-12-05", "monto": 1.5, "cantidad": 300, "grande": 2 ** 40,
+                   "precio": 2.5, "activo": True, "nombre": "x", "punto": [1.0, 2.0]}
+
+
+def test_empty_values_are_type_nulls():
+    empty = {name: None for name in SCHEMA.types}
+    row = SCHEMA.unpack(SCHEMA.pack(empty))
+    assert row["fecha"] == "" and row["id"] == 0 and row["activo"] is False
+    assert SCHEMA.decoder(["fecha"], as_tuple=True)(SCHEMA.pack(empty)) == ("",)
+    assert DATE_NULL < 0
+
+
+@pytest.mark.parametrize("column, value", [
+    ("cantidad", 70000),
+    ("cantidad", "-32769"),
+    ("id", 2 ** 31),
+    ("grande", "9223372036854775808"),
+    ("id", "2.5"),
+    ("id", "abc"),
+    ("precio", 1e39),
+    ("fecha", "2020-13-45"),
+    ("fecha", "ayer"),
+    ("activo", "maybe"),
+    ("punto", "1,2"),
+])
+def test_pack_rejects_invalid_values(column, value):
+    with pytest.raises(ValueError) as error:
+        SCHEMA.pack(_row(**{column: value}))
+    # El mensaje nombra la columna y el valor
+    assert column in str(error.value) and repr(value).strip("'") in str(error.value)
+
+
+@pytest.mark.parametrize("column, value, stored", [
+    ("cantidad", "-32768", -32768),
+    ("grande", "9223372036854775807", 2 ** 63 - 1),
+    ("grande", "1e10", 10 ** 10),
+    ("id", 3.0, 3),
+    ("fecha", "15-03-2023", "2023-03-15"),
+    ("activo", "no", False),
+])
+def test_pack_accepts_limits_and_literal_forms(column, value, stored):
+    assert SCHEMA.unpack(SCHEMA.pack(_row(**{column: value})))[column] == stored
+
+
+def test_insert_with_invalid_value_writes_nothing(tmp_path):
+    from src.parser.executor import Executor
+    q = Executor(str(tmp_path / "data")).execute
+    q("CREATE TABLE t (id INT, f DATE, d DOUBLE, s SMALLINT, b BOOLEAN, v VARCHAR[10])")
+    with pytest.raises(ValueError, match="f \\(DATE\\)"):
+        q("INSERT INTO t VALUES (7, '2020-13-45', 1, 7, true, 'x')")
+    with pytest.raises(ValueError, match="s \\(SMALLINT\\)"):
+        q("INSERT INTO t VALUES (7, '2020-12-05', 1, 70000, true, 'x'), (8, '2020-12-05', 1, 7, true, 'y')")
+    assert list(q("SELECT * FROM t")) == []
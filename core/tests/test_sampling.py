@@ -0,0 +1,135 @@
+# tests/test_sampling.py
+import bisect
+import random
+
+import pytest
+
+from src.dbms import vectorized
+from src.dbms.sketch import KLLSketch
+from src.parser.executor import Executor
+
+N = 20000
+REGIONS = 500
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    executor = Executor(str(tmp_path_factory.mktemp("sampling") / "data"))
+    executor.execute("CREATE TABLE ventas (id INT, region VARCHAR[10], monto DOUBLE)")
+    rng = random.Random(1)
+    rows = [[i, f"r{rng.randint(0, REGIONS - 1)}", rng.gauss(100, 30)] for i in range(N)]
+    executor.schema_manager.insert_many("ventas", rows)
+    return executor, rows
+
+
+@pytest.fixture(params=[True, False], ids=["vectorizado", "filas"])
+def vectorize(request, monkeypatch):
+    monkeypatch.setattr(vectorized, "ENABLED", request.param)
+    return request.param
+
+
+def _rank(ordered, value):
+    return bisect.bisect_left(ordered, value) / len(ordered)
+
+
+# ---------------------------
+# TABLESAMPLE
+# ---------------------------
+@pytest.mark.parametrize("method", ["SYSTEM", "BERNOULLI"])
+def test_sample_size_follows_percent(data, vectorize, method):
+    # SYSTEM elige páginas enteras (~130 en la tabla): con una sola semilla varía mucho, así que se promedia
+    executor, _ = data
+    sql = f"SELECT COUNT(*) FROM ventas TABLESAMPLE {method} (10) REPEATABLE (%d)"
+    counts = [executor.execute(sql % seed).rows[0][0] for seed in range(20)]
+    assert abs(sum(counts) / len(counts) / N - 0.1) < 0.01
+
+
+@pytest.mark.parametrize("method", ["SYSTEM", "BERNOULLI"])
+def test_repeatable_seed_gives_same_sample(data, method):
+    executor, _ = data
+    sql = f"SELECT id FROM ventas TABLESAMPLE {method} (5) REPEATABLE (%d)"
+    first = sorted(row[0] for row in executor.execute(sql % 3).rows)
+    assert first == sorted(row[0] for row in executor.execute(sql % 3).rows)
+    assert first != sorted(row[0] for row in executor.execute(sql % 4).rows)
+
+
+@pytest.mark.parametrize("method", ["SYSTEM", "BERNOULLI"])
+def test_vectorized_and_row_paths_agree(data, monkeypatch, method):
+    executor, _ = data
+    sql = f"SELECT id FROM ventas TABLESAMPLE {method} (5) REPEATABLE (3) WHERE monto > 100"
+    monkeypatch.setattr(vectorized, "ENABLED", True)
+    batched = sorted(row[0] for row in executor.execute(sql).rows)
+    monkeypatch.setattr(vectorized, "ENABLED", False)
+    assert batched and batched == sorted(row[0] for row in executor.execute(sql).rows)
+
+
+def test_sample_bounds(data, vectorize):
+    executor, _ = data
+    assert executor.execute("SELECT COUNT(*) FROM ventas TABLESAMPLE SYSTEM (0)").rows == [(0,)]
+    assert executor.execute("SELECT COUNT(*) FROM ventas TABLESAMPLE BERNOULLI (100)").rows == [(N,)]
+    with pytest.raises(ValueError):
+        executor.execute("SELECT COUNT(*) FROM ventas TABLESAMPLE BERNOULLI (150)")
+
+
+def test_explain_shows_sample(data):
+    executor, _ = data
+    plan = executor.execute("EXPLAIN SELECT id FROM ventas TABLESAMPLE SYSTEM (10) REPEATABLE (3)")["plan"]
+    assert plan["access"] == "scan"
+    assert plan["sample"] == {"method": "system", "percent": 10.0, "seed": 3}
+    assert plan["estimated_rows"] == pytest.approx(N * 0.1)
+
+
+# ---------------------------
+# Sketches
+# ---------------------------
+@pytest.mark.parametrize("seed", range(3))
+def test_kll_rank_error(seed):
+    rng = random.Random(seed)
+    values = [rng.random() for _ in range(50000)]
+    sketch = KLLSketch(k=200, seed=seed)
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert abs(_rank(ordered, sketch.quantile(q)) - q) < 2 / 200
+
+
+def test_kll_merge_keeps_error():
+    rng = random.Random(5)
+    values = [rng.gauss(0, 1) for _ in range(40000)]
+    merged = KLLSketch(k=200)
+    for part in range(8):
+        sketch = KLLSketch(k=200, seed=part)
+        for value in values[part::8]:
+            sketch.add(value)
+        merged.merge(sketch)
+    assert merged.count == len(values)
+    ordered = sorted(values)
+    for q in (0.05, 0.5, 0.95):
+        assert abs(_rank(ordered, merged.quantile(q)) - q) < 2 / 200
+
+
+def test_approx_count_distinct(data):
+    executor, rows = data
+    estimate = executor.execute("SELECT APPROX_COUNT_DISTINCT(region) FROM ventas").rows[0][0]
+    exact = len({row[1] for row in rows})
+    assert abs(estimate - exact) / exact < 0.05
+
+
+def test_approx_percentile(data):
+    executor, rows = data
+    result = executor.execute("SELECT APPROX_PERCENTILE(monto, 0.5), APPROX_PERCENTILE(monto, 0.95) FROM ventas")
+    ordered = sorted(row[2] for row in rows)
+    p50, p95 = result.rows[0]
+    assert abs(_rank(ordered, p50) - 0.5) < 0.02
+    assert abs(_rank(ordered, p95) - 0.95) < 0.02
+
+
+def test_approx_with_where_matches_exact_count(data, vectorize):
+    executor, rows = data
+    result = executor.execute("SELECT APPROX_COUNT_DISTINCT(region), COUNT(*) FROM ventas WHERE monto > 120")
+    estimate, count = result.rows[0]
+    matching = [row for row in rows if row[2] > 120]
+    assert count == len(matching)
+    exact = len({row[1] for row in matching})
+    assert abs(estimate - exact) / exact < 0.05
@@ -0,0 +1,95 @@
+# tests/test_wal.py
+import os
+
+import pytest
+
+from src.dbms import wal as wal_module
+from src.dbms.wal import WriteAheadLog, WRITE, REPLACE, HEADER
+
+
+class Crash(Exception):
+    pass
+
+
+def _crash_after_commit(monkeypatch):
+    # El proceso "muere" con el lote ya durable en el log pero sin aplicarlo
+    def crash(*args):
+        raise Crash()
+    monkeypatch.setattr(wal_module, "_execute", crash)
+
+
+def _records(path):
+    # Offsets donde termina cada registro del log
+    with open(path, "rb") as f:
+        log = f.read()
+    ends, pos = [], 0
+    while pos + HEADER.size <= len(log):
+        _, _, length = HEADER.unpack_from(log, pos)
+        pos += HEADER.size + length
+        ends.append(pos)
+    return ends
+
+
+def _batch(tmp_path):
+    meta, catalog = tmp_path / "t.json", tmp_path / "catalog.json"
+    data = tmp_path / "t.dat"
+    return [
+        (REPLACE, str(meta), 0, b'{"stamp": 2}'),
+        (WRITE, str(data), 0, b"registro"),
+        (REPLACE, str(catalog), 0, b'{"tables": ["t"]}'),
+    ]
+
+
+def test_recover_redoes_complete_batch(tmp_path, monkeypatch):
+    log = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(log)
+    with monkeypatch.context() as m:
+        _crash_after_commit(m)
+        with pytest.raises(Crash):
+            wal.apply(_batch(tmp_path))
+    assert not os.path.exists(tmp_path / "t.json")
+
+    assert WriteAheadLog(log).recover() == 3
+    assert (tmp_path / "t.json").read_bytes() == b'{"stamp": 2}'
+    assert (tmp_path / "t.dat").read_bytes() == b"registro"
+    assert (tmp_path / "catalog.json").read_bytes() == b'{"tables": ["t"]}'
+
+
+@pytest.mark.parametrize("keep", [1, 2, 3])
+def test_recover_discards_batch_truncated_midway(tmp_path, monkeypatch, keep):
+    log = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(log)
+    wal.apply([(WRITE, str(tmp_path / "antes.dat"), 0, b"ok")])
+    with monkeypatch.context() as m:
+        _crash_after_commit(m)
+        with pytest.raises(Crash):
+            wal.apply(_batch(tmp_path))
+    wal._file.close()
+    os.remove(tmp_path / "antes.dat")
+
+    # Registros: el lote anterior (escritura + COMMIT) y el nuevo (3 + COMMIT).
+    # Se corta el log dejando solo `keep` operaciones del lote nuevo, sin su COMMIT
+    ends = _records(log)
+    assert len(ends) == 6
+    with open(log, "r+b") as f:
+        f.truncate(ends[1 + keep])
+
+    assert WriteAheadLog(log).recover() == 1
+    assert (tmp_path / "antes.dat").read_bytes() == b"ok"
+    for name in ("t.json", "t.dat", "catalog.json"):
+        assert not os.path.exists(tmp_path / name)
+
+
+def test_recover_discards_torn_commit_record(tmp_path, monkeypatch):
+    log = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(log)
+    with monkeypatch.context() as m:
+        _crash_after_commit(m)
+        with pytest.raises(Crash):
+            wal.apply(_batch(tmp_path))
+    wal._file.close()
+    with open(log, "r+b") as f:
+        f.truncate(os.path.getsize(log) - 1)
+
+    assert WriteAheadLog(log).recover() == 0
+    assert not os.path.exists(tmp_path / "t.json")
@@ -66,6 +66,38 @@ export function FileUpload() {
     toast.info("File removed")
   }
 
+  // The backend loads the rows in a background job: poll it until it finishes
+  const watchJob = async (jobId: string, table: string) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 1000))
+      let job: any
+      try {
+        const res = await fetch(`http://localhost:8000/jobs/${jobId}`)
+        const data = await res.json()
+        if (!data.ok) {
+          toast.error("Error importing file", { description: data.error })
+          return
+        }
+        job = data.job
+      } catch (err: any) {
+        toast.error("Connection error", { description: err.message })
+        return
+      }
+      if (job.status === "done") {
+        toast.success("File imported successfully!", {
+          description: `Table: ${table} (${job.rowsProcessed} records)`,
+        })
+        return
+      }
+      if (job.status === "failed" || job.status === "cancelled") {
+        toast.error(job.status === "failed" ? "Error importing file" : "Import cancelled", {
+          description: job.errors.join("; "),
+        })
+        return
+      }
+    }
+  }
+
   const handleUploadToBackend = async () => {
     if (!uploadedFile) return
     if (!tableName.trim()) {
@@ -91,9 +123,8 @@ export function FileUpload() {
       if (data.ok) {
         setPreview(data.rows)
         setHeaders(data.headers)
-        toast.success("File imported successfully!", {
-          description: `Table: ${data.tableName} (${data.recordCount} records)`,
-        })
+        toast.info("Import started", { description: `Table: ${data.tableName}` })
+        watchJob(data.jobId, data.tableName)
       } else {
         toast.error("Error importing file", { description: data.error })
       }